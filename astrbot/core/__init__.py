@@ -10,6 +10,7 @@ from astrbot.core.utils.pip_installer import (
 from astrbot.core.utils.pip_installer import (
     PipInstaller,
 )
+from astrbot.core.utils.platform_stats import PlatformStatsService
 from astrbot.core.utils.requirements_utils import (
     RequirementsPrecheckFailed as RequirementsPrecheckFailed,
 )
@@ -39,6 +40,8 @@ LogManager.configure_trace_logger(astrbot_config)
 db_helper = SQLiteDatabase(DB_PATH)
 # 简单的偏好设置存储, 这里后续应该存储到数据库中, 一些部分可以存储到配置中
 sp = SharedPreferences(db_helper=db_helper)
+# 平台消息统计, 内存预聚合后定期写入数据库
+platform_stats = PlatformStatsService(db_helper)
 # 文件令牌服务
 file_token_service = FileTokenService()
 pip_installer = PipInstaller(
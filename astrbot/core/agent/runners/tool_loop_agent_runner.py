@@ -25,7 +25,7 @@ from tenacity import (
 
 from astrbot import logger
 from astrbot.core.agent.message import ImageURLPart, TextPart, ThinkPart
-from astrbot.core.agent.tool import ToolSet
+from astrbot.core.agent.tool import FunctionTool, ToolSet
 from astrbot.core.agent.tool_image_cache import tool_image_cache
 from astrbot.core.exceptions import EmptyModelOutputError
 from astrbot.core.message.components import Json
@@ -160,9 +160,14 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
         custom_compressor: ContextCompressor | None = None,
         tool_schema_mode: str | None = "full",
         fallback_providers: list[Provider] | None = None,
+        # run independent tool calls of one LLM turn concurrently
+        parallel_tool_calls: bool = False,
+        max_parallel_tool_calls: int = 4,
         **kwargs: T.Any,
     ) -> None:
         self.req = request
+        self.parallel_tool_calls = parallel_tool_calls
+        self.max_parallel_tool_calls = max_parallel_tool_calls
         self.streaming = streaming
         self.enforce_max_turns = enforce_max_turns
         self.llm_compress_instruction = llm_compress_instruction
@@ -693,241 +698,341 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
         req: ProviderRequest,
         llm_response: LLMResponse,
     ) -> T.AsyncGenerator[_HandleFunctionToolsResult, None]:
-        """处理函数工具调用。"""
+        """处理函数工具调用。
+
+        默认逐个执行工具调用。开启 parallel_tool_calls 后, 相邻的可并行工具调用作为一批并发执行,
+        并发数不超过 max_parallel_tool_calls; 声明了 serial_execution 的工具单独成批, 与前后的调用
+        保持先后顺序。无论是否并发, tool_call 事件与工具结果都按 LLM 给出的调用顺序产出。
+        """
         tool_call_result_blocks: list[ToolCallMessageSegment] = []
         logger.info(f"Agent 使用工具: {llm_response.tools_call_name}")
 
-        def _append_tool_call_result(tool_call_id: str, content: str) -> None:
-            tool_call_result_blocks.append(
-                ToolCallMessageSegment(
-                    role="tool",
-                    tool_call_id=tool_call_id,
-                    content=self._merge_follow_up_notice(content),
-                ),
+        tool_calls = list(
+            zip(
+                llm_response.tools_call_name,
+                llm_response.tools_call_args,
+                llm_response.tools_call_ids,
             )
+        )
+        semaphore = asyncio.Semaphore(max(1, self.max_parallel_tool_calls))
 
         # 执行函数调用
-        for func_tool_name, func_tool_args, func_tool_id in zip(
-            llm_response.tools_call_name,
-            llm_response.tools_call_args,
-            llm_response.tools_call_ids,
-        ):
+        for batch in self._plan_tool_call_batches(req, tool_calls):
+            if len(batch) == 1:
+                func_tool_name, func_tool_args, func_tool_id = batch[0]
+                yield self._tool_call_event(
+                    func_tool_name, func_tool_args, func_tool_id
+                )
+                if not req.func_tool:
+                    return
+                async for result in self._execute_tool_call(
+                    req,
+                    func_tool_name,
+                    func_tool_args,
+                    func_tool_id,
+                    tool_call_result_blocks,
+                ):
+                    yield result
+                continue
+
+            for func_tool_name, func_tool_args, func_tool_id in batch:
+                yield self._tool_call_event(
+                    func_tool_name, func_tool_args, func_tool_id
+                )
+
+            # 每个调用的结果先写入各自的缓冲区, 全部完成后按调用顺序合并
+            batch_blocks: list[list[ToolCallMessageSegment]] = [[] for _ in batch]
+            batch_results: list[list[_HandleFunctionToolsResult]] = [[] for _ in batch]
+
+            async def _run(index: int) -> None:
+                func_tool_name, func_tool_args, func_tool_id = batch[index]
+                async with semaphore:
+                    async for result in self._execute_tool_call(
+                        req,
+                        func_tool_name,
+                        func_tool_args,
+                        func_tool_id,
+                        batch_blocks[index],
+                    ):
+                        batch_results[index].append(result)
+
+            tasks = [asyncio.create_task(_run(index)) for index in range(len(batch))]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                # 被中断或取消时, 同一批次中仍在执行的工具调用一并取消
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            for results, blocks in zip(batch_results, batch_blocks):
+                for result in results:
+                    yield result
+                tool_call_result_blocks.extend(blocks)
+
+        # yield the last tool call result
+        if tool_call_result_blocks:
+            func_tool_name, _, func_tool_id = tool_calls[-1]
+            last_tcr_content = str(tool_call_result_blocks[-1].content)
             yield _HandleFunctionToolsResult.from_message_chain(
                 MessageChain(
-                    type="tool_call",
+                    type="tool_call_result",
                     chain=[
                         Json(
                             data={
                                 "id": func_tool_id,
-                                "name": func_tool_name,
-                                "args": func_tool_args,
                                 "ts": time.time(),
+                                "result": last_tcr_content,
                             }
                         )
                     ],
                 )
             )
-            try:
-                if not req.func_tool:
-                    return
-
-                if (
-                    self.tool_schema_mode == "skills_like"
-                    and self._skill_like_raw_tool_set
-                ):
-                    # in 'skills_like' mode, raw.func_tool is light schema, does not have handler
-                    # so we need to get the tool from the raw tool set
-                    func_tool = self._skill_like_raw_tool_set.get_tool(func_tool_name)
-                else:
-                    func_tool = req.func_tool.get_tool(func_tool_name)
+            logger.info(f"Tool `{func_tool_name}` Result: {last_tcr_content}")
 
-                logger.info(f"使用工具：{func_tool_name}，参数：{func_tool_args}")
+        # 处理函数调用响应
+        if tool_call_result_blocks:
+            yield _HandleFunctionToolsResult.from_tool_call_result_blocks(
+                tool_call_result_blocks
+            )
 
-                if not func_tool:
-                    logger.warning(f"未找到指定的工具: {func_tool_name}，将跳过。")
-                    _append_tool_call_result(
-                        func_tool_id,
-                        f"error: Tool {func_tool_name} not found.",
+    @staticmethod
+    def _tool_call_event(
+        func_tool_name: str,
+        func_tool_args: dict,
+        func_tool_id: str,
+    ) -> _HandleFunctionToolsResult:
+        return _HandleFunctionToolsResult.from_message_chain(
+            MessageChain(
+                type="tool_call",
+                chain=[
+                    Json(
+                        data={
+                            "id": func_tool_id,
+                            "name": func_tool_name,
+                            "args": func_tool_args,
+                            "ts": time.time(),
+                        }
                     )
-                    continue
+                ],
+            )
+        )
 
-                valid_params = {}  # 参数过滤：只传递函数实际需要的参数
+    def _get_func_tool(self, req: ProviderRequest, name: str) -> FunctionTool | None:
+        if not req.func_tool:
+            return None
+        if self.tool_schema_mode == "skills_like" and self._skill_like_raw_tool_set:
+            # in 'skills_like' mode, raw.func_tool is light schema, does not have handler
+            # so we need to get the tool from the raw tool set
+            return self._skill_like_raw_tool_set.get_tool(name)
+        return req.func_tool.get_tool(name)
 
-                # 获取实际的 handler 函数
-                if func_tool.handler:
-                    logger.debug(
-                        f"工具 {func_tool_name} 期望的参数: {func_tool.parameters}",
-                    )
-                    if func_tool.parameters and func_tool.parameters.get("properties"):
-                        expected_params = set(func_tool.parameters["properties"].keys())
+    def _plan_tool_call_batches(
+        self,
+        req: ProviderRequest,
+        tool_calls: list[tuple[str, dict, str]],
+    ) -> list[list[tuple[str, dict, str]]]:
+        """将工具调用划分为依次执行的批次, 同一批次内的调用可以并发执行"""
+        if not self.parallel_tool_calls or not req.func_tool or len(tool_calls) < 2:
+            return [[call] for call in tool_calls]
+        batches: list[list[tuple[str, dict, str]]] = []
+        current: list[tuple[str, dict, str]] = []
+        for call in tool_calls:
+            func_tool = self._get_func_tool(req, call[0])
+            if func_tool is not None and getattr(func_tool, "serial_execution", False):
+                if current:
+                    batches.append(current)
+                    current = []
+                batches.append([call])
+            else:
+                current.append(call)
+        if current:
+            batches.append(current)
+        return batches
 
-                        valid_params = {
-                            k: v
-                            for k, v in func_tool_args.items()
-                            if k in expected_params
-                        }
+    async def _execute_tool_call(
+        self,
+        req: ProviderRequest,
+        func_tool_name: str,
+        func_tool_args: dict,
+        func_tool_id: str,
+        tool_call_result_blocks: list[ToolCallMessageSegment],
+    ) -> T.AsyncGenerator[_HandleFunctionToolsResult, None]:
+        """执行单个工具调用, 结果追加到 tool_call_result_blocks"""
 
-                    # 记录被忽略的参数
-                    ignored_params = set(func_tool_args.keys()) - set(
-                        valid_params.keys(),
-                    )
-                    if ignored_params:
-                        logger.warning(
-                            f"工具 {func_tool_name} 忽略非期望参数: {ignored_params}",
-                        )
-                else:
-                    # 如果没有 handler（如 MCP 工具），使用所有参数
-                    valid_params = func_tool_args
+        def _append_tool_call_result(tool_call_id: str, content: str) -> None:
+            tool_call_result_blocks.append(
+                ToolCallMessageSegment(
+                    role="tool",
+                    tool_call_id=tool_call_id,
+                    content=self._merge_follow_up_notice(content),
+                ),
+            )
 
-                try:
-                    await self.agent_hooks.on_tool_start(
-                        self.run_context,
-                        func_tool,
-                        valid_params,
+        try:
+            func_tool = self._get_func_tool(req, func_tool_name)
+
+            logger.info(f"使用工具：{func_tool_name}，参数：{func_tool_args}")
+
+            if not func_tool:
+                logger.warning(f"未找到指定的工具: {func_tool_name}，将跳过。")
+                _append_tool_call_result(
+                    func_tool_id,
+                    f"error: Tool {func_tool_name} not found.",
+                )
+                return
+
+            valid_params = {}  # 参数过滤：只传递函数实际需要的参数
+
+            # 获取实际的 handler 函数
+            if func_tool.handler:
+                logger.debug(
+                    f"工具 {func_tool_name} 期望的参数: {func_tool.parameters}",
+                )
+                if func_tool.parameters and func_tool.parameters.get("properties"):
+                    expected_params = set(func_tool.parameters["properties"].keys())
+
+                    valid_params = {
+                        k: v for k, v in func_tool_args.items() if k in expected_params
+                    }
+
+                # 记录被忽略的参数
+                ignored_params = set(func_tool_args.keys()) - set(
+                    valid_params.keys(),
+                )
+                if ignored_params:
+                    logger.warning(
+                        f"工具 {func_tool_name} 忽略非期望参数: {ignored_params}",
                     )
-                except Exception as e:
-                    logger.error(f"Error in on_tool_start hook: {e}", exc_info=True)
+            else:
+                # 如果没有 handler（如 MCP 工具），使用所有参数
+                valid_params = func_tool_args
 
-                executor = self.tool_executor.execute(
-                    tool=func_tool,
-                    run_context=self.run_context,
-                    **valid_params,  # 只传递有效的参数
+            try:
+                await self.agent_hooks.on_tool_start(
+                    self.run_context,
+                    func_tool,
+                    valid_params,
                 )
+            except Exception as e:
+                logger.error(f"Error in on_tool_start hook: {e}", exc_info=True)
 
-                _final_resp: CallToolResult | None = None
-                async for resp in self._iter_tool_executor_results(executor):  # type: ignore
-                    if isinstance(resp, CallToolResult):
-                        res = resp
-                        _final_resp = resp
-                        if not res.content:
-                            _append_tool_call_result(
-                                func_tool_id,
-                                "The tool returned no content.",
-                            )
-                            continue
+            executor = self.tool_executor.execute(
+                tool=func_tool,
+                run_context=self.run_context,
+                **valid_params,  # 只传递有效的参数
+            )
 
-                        result_parts: list[str] = []
-                        for index, content_item in enumerate(res.content):
-                            if isinstance(content_item, TextContent):
-                                result_parts.append(content_item.text)
-                            elif isinstance(content_item, ImageContent):
+            _final_resp: CallToolResult | None = None
+            async for resp in self._iter_tool_executor_results(executor):  # type: ignore
+                if isinstance(resp, CallToolResult):
+                    res = resp
+                    _final_resp = resp
+                    if not res.content:
+                        _append_tool_call_result(
+                            func_tool_id,
+                            "The tool returned no content.",
+                        )
+                        continue
+
+                    result_parts: list[str] = []
+                    for index, content_item in enumerate(res.content):
+                        if isinstance(content_item, TextContent):
+                            result_parts.append(content_item.text)
+                        elif isinstance(content_item, ImageContent):
+                            # Cache the image instead of sending directly
+                            cached_img = tool_image_cache.save_image(
+                                base64_data=content_item.data,
+                                tool_call_id=func_tool_id,
+                                tool_name=func_tool_name,
+                                index=index,
+                                mime_type=content_item.mimeType or "image/png",
+                            )
+                            result_parts.append(
+                                f"Image returned and cached at path='{cached_img.file_path}'. "
+                                f"Review the image below. Use send_message_to_user to send it to the user if satisfied, "
+                                f"with type='image' and path='{cached_img.file_path}'."
+                            )
+                            # Yield image info for LLM visibility (will be handled in step())
+                            yield _HandleFunctionToolsResult.from_cached_image(
+                                cached_img
+                            )
+                        elif isinstance(content_item, EmbeddedResource):
+                            resource = content_item.resource
+                            if isinstance(resource, TextResourceContents):
+                                result_parts.append(resource.text)
+                            elif (
+                                isinstance(resource, BlobResourceContents)
+                                and resource.mimeType
+                                and resource.mimeType.startswith("image/")
+                            ):
                                 # Cache the image instead of sending directly
                                 cached_img = tool_image_cache.save_image(
-                                    base64_data=content_item.data,
+                                    base64_data=resource.blob,
                                     tool_call_id=func_tool_id,
                                     tool_name=func_tool_name,
                                     index=index,
-                                    mime_type=content_item.mimeType or "image/png",
+                                    mime_type=resource.mimeType,
                                 )
                                 result_parts.append(
                                     f"Image returned and cached at path='{cached_img.file_path}'. "
                                     f"Review the image below. Use send_message_to_user to send it to the user if satisfied, "
                                     f"with type='image' and path='{cached_img.file_path}'."
                                 )
-                                # Yield image info for LLM visibility (will be handled in step())
+                                # Yield image info for LLM visibility
                                 yield _HandleFunctionToolsResult.from_cached_image(
                                     cached_img
                                 )
-                            elif isinstance(content_item, EmbeddedResource):
-                                resource = content_item.resource
-                                if isinstance(resource, TextResourceContents):
-                                    result_parts.append(resource.text)
-                                elif (
-                                    isinstance(resource, BlobResourceContents)
-                                    and resource.mimeType
-                                    and resource.mimeType.startswith("image/")
-                                ):
-                                    # Cache the image instead of sending directly
-                                    cached_img = tool_image_cache.save_image(
-                                        base64_data=resource.blob,
-                                        tool_call_id=func_tool_id,
-                                        tool_name=func_tool_name,
-                                        index=index,
-                                        mime_type=resource.mimeType,
-                                    )
-                                    result_parts.append(
-                                        f"Image returned and cached at path='{cached_img.file_path}'. "
-                                        f"Review the image below. Use send_message_to_user to send it to the user if satisfied, "
-                                        f"with type='image' and path='{cached_img.file_path}'."
-                                    )
-                                    # Yield image info for LLM visibility
-                                    yield _HandleFunctionToolsResult.from_cached_image(
-                                        cached_img
-                                    )
-                                else:
-                                    result_parts.append(
-                                        "The tool has returned a data type that is not supported."
-                                    )
-                        if result_parts:
-                            _append_tool_call_result(
-                                func_tool_id,
-                                "\n\n".join(result_parts),
-                            )
-
-                    elif resp is None:
-                        # Tool 直接请求发送消息给用户
-                        # 这里我们将直接结束 Agent Loop
-                        # 发送消息逻辑在 ToolExecutor 中处理了
-                        logger.warning(
-                            f"{func_tool_name} 没有返回值，或者已将结果直接发送给用户。"
-                        )
-                        self._transition_state(AgentState.DONE)
-                        self.stats.end_time = time.time()
-                        _append_tool_call_result(
-                            func_tool_id,
-                            "The tool has no return value, or has sent the result directly to the user.",
-                        )
-                    else:
-                        # 不应该出现其他类型
-                        logger.warning(
-                            f"Tool 返回了不支持的类型: {type(resp)}。",
-                        )
+                            else:
+                                result_parts.append(
+                                    "The tool has returned a data type that is not supported."
+                                )
+                    if result_parts:
                         _append_tool_call_result(
                             func_tool_id,
-                            "*The tool has returned an unsupported type. Please tell the user to check the definition and implementation of this tool.*",
+                            "\n\n".join(result_parts),
                         )
 
-                try:
-                    await self.agent_hooks.on_tool_end(
-                        self.run_context,
-                        func_tool,
-                        func_tool_args,
-                        _final_resp,
+                elif resp is None:
+                    # Tool 直接请求发送消息给用户
+                    # 这里我们将直接结束 Agent Loop
+                    # 发送消息逻辑在 ToolExecutor 中处理了
+                    logger.warning(
+                        f"{func_tool_name} 没有返回值，或者已将结果直接发送给用户。"
+                    )
+                    self._transition_state(AgentState.DONE)
+                    self.stats.end_time = time.time()
+                    _append_tool_call_result(
+                        func_tool_id,
+                        "The tool has no return value, or has sent the result directly to the user.",
+                    )
+                else:
+                    # 不应该出现其他类型
+                    logger.warning(
+                        f"Tool 返回了不支持的类型: {type(resp)}。",
+                    )
+                    _append_tool_call_result(
+                        func_tool_id,
+                        "*The tool has returned an unsupported type. Please tell the user to check the definition and implementation of this tool.*",
                     )
-                except Exception as e:
-                    logger.error(f"Error in on_tool_end hook: {e}", exc_info=True)
-            except Exception as e:
-                if isinstance(e, _ToolExecutionInterrupted):
-                    raise
-                logger.warning(traceback.format_exc())
-                _append_tool_call_result(
-                    func_tool_id,
-                    f"error: {e!s}",
-                )
 
-        # yield the last tool call result
-        if tool_call_result_blocks:
-            last_tcr_content = str(tool_call_result_blocks[-1].content)
-            yield _HandleFunctionToolsResult.from_message_chain(
-                MessageChain(
-                    type="tool_call_result",
-                    chain=[
-                        Json(
-                            data={
-                                "id": func_tool_id,
-                                "ts": time.time(),
-                                "result": last_tcr_content,
-                            }
-                        )
-                    ],
+            try:
+                await self.agent_hooks.on_tool_end(
+                    self.run_context,
+                    func_tool,
+                    func_tool_args,
+                    _final_resp,
                 )
-            )
-            logger.info(f"Tool `{func_tool_name}` Result: {last_tcr_content}")
-
-        # 处理函数调用响应
-        if tool_call_result_blocks:
-            yield _HandleFunctionToolsResult.from_tool_call_result_blocks(
-                tool_call_result_blocks
+            except Exception as e:
+                logger.error(f"Error in on_tool_end hook: {e}", exc_info=True)
+        except Exception as e:
+            if isinstance(e, _ToolExecutionInterrupted):
+                raise
+            logger.warning(traceback.format_exc())
+            _append_tool_call_result(
+                func_tool_id,
+                f"error: {e!s}",
             )
 
     def _build_tool_requery_context(
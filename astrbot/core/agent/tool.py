@@ -63,6 +63,12 @@ class FunctionTool(ToolSchema, Generic[TContext]):
     Declare this tool as a background task. Background tasks return immediately
     with a task identifier while the real work continues asynchronously.
     """
+    serial_execution: bool = False
+    """
+    Declare this tool must not run concurrently with other tool calls.
+    When parallel tool calls are enabled, such a tool waits for the preceding
+    calls to finish, and the following calls wait for it.
+    """
 
     def __repr__(self) -> str:
         return f"FuncTool(name={self.name}, parameters={self.parameters}, description={self.description})"
@@ -74,6 +80,106 @@ class FunctionTool(ToolSchema, Generic[TContext]):
         )
 
 
+def _convert_google_schema(schema: dict) -> dict:
+    """Convert schema to Gemini API format."""
+    supported_types = {
+        "string",
+        "number",
+        "integer",
+        "boolean",
+        "array",
+        "object",
+        "null",
+    }
+    supported_formats = {
+        "string": {"enum", "date-time"},
+        "integer": {"int32", "int64"},
+        "number": {"float", "double"},
+    }
+
+    if "anyOf" in schema:
+        return {"anyOf": [_convert_google_schema(s) for s in schema["anyOf"]]}
+
+    result = {}
+
+    # Avoid side effects by not modifying the original schema
+    origin_type = schema.get("type")
+    target_type = origin_type
+
+    # Compatibility fix: Gemini API expects 'type' to be a string (enum),
+    # but standard JSON Schema (MCP) allows lists (e.g. ["string", "null"]).
+    # We fallback to the first non-null type.
+    if isinstance(origin_type, list):
+        target_type = next((t for t in origin_type if t != "null"), "string")
+
+    if target_type in supported_types:
+        result["type"] = target_type
+        if "format" in schema and schema["format"] in supported_formats.get(
+            result["type"],
+            set(),
+        ):
+            result["format"] = schema["format"]
+    else:
+        result["type"] = "null"
+
+    support_fields = {
+        "title",
+        "description",
+        "enum",
+        "minimum",
+        "maximum",
+        "maxItems",
+        "minItems",
+        "nullable",
+        "required",
+    }
+    result.update({k: schema[k] for k in support_fields if k in schema})
+
+    if "properties" in schema:
+        properties = {}
+        for key, value in schema["properties"].items():
+            prop_value = _convert_google_schema(value)
+            if "default" in prop_value:
+                del prop_value["default"]
+            # see #5217
+            if "additionalProperties" in prop_value:
+                del prop_value["additionalProperties"]
+            properties[key] = prop_value
+
+        if properties:
+            result["properties"] = properties
+
+    if target_type == "array":
+        items_schema = schema.get("items")
+        if isinstance(items_schema, dict):
+            result["items"] = _convert_google_schema(items_schema)
+        else:
+            # Gemini requires array schemas to include an `items` schema.
+            # JSON Schema allows omitting it, so fall back to a permissive
+            # string item schema instead of emitting an invalid declaration.
+            result["items"] = {"type": "string"}
+
+    return result
+
+
+_google_parameters_cache: dict[int, tuple[ParametersType, dict]] = {}
+"""id(parameters) -> (parameters, converted). Shared by all ToolSets, since a
+ToolSet is usually rebuilt for each request while its tools are not."""
+_GOOGLE_PARAMETERS_CACHE_SIZE = 1024
+
+
+def _google_parameters(parameters: ParametersType) -> dict:
+    cached = _google_parameters_cache.get(id(parameters))
+    if cached is not None and cached[0] is parameters:
+        return cached[1]
+    converted = _convert_google_schema(parameters)
+    if len(_google_parameters_cache) >= _GOOGLE_PARAMETERS_CACHE_SIZE:
+        _google_parameters_cache.clear()
+    # the parameters dict is kept referenced so its id cannot be reused
+    _google_parameters_cache[id(parameters)] = (parameters, converted)
+    return converted
+
+
 @dataclass
 class ToolSet:
     """A set of function tools that can be used in function calling.
@@ -84,6 +190,35 @@ class ToolSet:
 
     tools: list[FunctionTool] = Field(default_factory=list)
 
+    def __post_init__(self) -> None:
+        self._index: dict[str, int] = {}
+        """Tool name -> position in `tools` (first occurrence)."""
+        self._indexed_list: list[FunctionTool] | None = None
+        self._indexed_len = -1
+        self._schema_cache: dict[tuple, tuple[tuple, list, tuple]] = {}
+        """(schema kind, options) -> (tools fingerprint, serialized tools)."""
+
+    def _get_index(self) -> dict[str, int]:
+        # `tools` is a public field and may be reassigned or appended to
+        # directly, in which case the index is rebuilt. Items replaced in
+        # place are only noticed when their old name is looked up.
+        if self.tools is not self._indexed_list or len(self.tools) != self._indexed_len:
+            index: dict[str, int] = {}
+            for i, tool in enumerate(self.tools):
+                index.setdefault(tool.name, i)
+            self._index = index
+            self._indexed_list = self.tools
+            self._indexed_len = len(self.tools)
+        return self._index
+
+    def _lookup(self, name: str) -> int | None:
+        i = self._get_index().get(name)
+        if i is not None and self.tools[i].name != name:
+            # an item was replaced in place, bypassing add_tool()
+            self._indexed_list = None
+            i = self._get_index().get(name)
+        return i
+
     def empty(self) -> bool:
         """Check if the tool set is empty."""
         return len(self.tools) == 0
@@ -95,28 +230,31 @@ class ToolSet:
         - Prefer the one that is active (active=True)
         - If both have the same active state, use the new one (overwrite)
         """
-        for i, existing_tool in enumerate(self.tools):
-            if existing_tool.name == tool.name:
-                # Use getattr with a default of True for compatibility with tools
-                # that may not define an `active` attribute (e.g., mocks).
-                existing_active = bool(getattr(existing_tool, "active", True))
-                new_active = bool(getattr(tool, "active", True))
-                # Overwrite if new tool is active, or if existing tool is not active
-                if new_active or not existing_active:
-                    self.tools[i] = tool
-                return
+        i = self._lookup(tool.name)
+        if i is not None:
+            existing_tool = self.tools[i]
+            # Use getattr with a default of True for compatibility with tools
+            # that may not define an `active` attribute (e.g., mocks).
+            existing_active = bool(getattr(existing_tool, "active", True))
+            new_active = bool(getattr(tool, "active", True))
+            # Overwrite if new tool is active, or if existing tool is not active
+            if new_active or not existing_active:
+                self.tools[i] = tool
+            return
         self.tools.append(tool)
+        self._index[tool.name] = self._indexed_len
+        self._indexed_len += 1
 
     def remove_tool(self, name: str) -> None:
         """Remove a tool by its name."""
+        if self._lookup(name) is None:
+            return
         self.tools = [tool for tool in self.tools if tool.name != name]
 
     def get_tool(self, name: str) -> FunctionTool | None:
         """Get a tool by its name."""
-        for tool in self.tools:
-            if tool.name == name:
-                return tool
-        return None
+        i = self._lookup(name)
+        return self.tools[i] if i is not None else None
 
     def get_light_tool_set(self) -> "ToolSet":
         """Return a light tool set with only name/description."""
@@ -200,8 +338,37 @@ class ToolSet:
         """Get the list of function tools."""
         return self.tools
 
+    def _fingerprint(self) -> tuple:
+        return tuple(
+            (id(tool), tool.name, tool.description, id(tool.parameters))
+            for tool in self.tools
+        )
+
+    def _cached_schema(self, key: tuple, build: Callable[[], list]) -> list:
+        """Memoize a serialization of the tools until the set or a tool changes.
+
+        Tools are compared by identity, name, description and the identity of
+        their parameters dict; mutating a parameters dict in place is not
+        detected. The returned list is a copy, but its items are shared and
+        must not be modified.
+        """
+        fingerprint = self._fingerprint()
+        cached = self._schema_cache.get(key)
+        if cached is None or cached[0] != fingerprint:
+            # the tools are kept referenced, so their ids in the fingerprint
+            # cannot be reused while cached
+            cached = (fingerprint, build(), tuple(self.tools))
+            self._schema_cache[key] = cached
+        return list(cached[1])
+
     def openai_schema(self, omit_empty_parameter_field: bool = False) -> list[dict]:
         """Convert tools to OpenAI API function calling schema format."""
+        return self._cached_schema(
+            ("openai", omit_empty_parameter_field),
+            lambda: self._build_openai_schema(omit_empty_parameter_field),
+        )
+
+    def _build_openai_schema(self, omit_empty_parameter_field: bool) -> list[dict]:
         result = []
         for tool in self.tools:
             func_def = {"type": "function", "function": {"name": tool.name}}
@@ -219,6 +386,9 @@ class ToolSet:
 
     def anthropic_schema(self) -> list[dict]:
         """Convert tools to Anthropic API format."""
+        return self._cached_schema(("anthropic",), self._build_anthropic_schema)
+
+    def _build_anthropic_schema(self) -> list[dict]:
         result = []
         for tool in self.tools:
             input_schema = {"type": "object"}
@@ -233,101 +403,22 @@ class ToolSet:
 
     def google_schema(self) -> dict:
         """Convert tools to Google GenAI API format."""
+        tools = self._cached_schema(("google",), self._build_google_schema)
+        declarations = {}
+        if tools:
+            declarations["function_declarations"] = tools
+        return declarations
 
-        def convert_schema(schema: dict) -> dict:
-            """Convert schema to Gemini API format."""
-            supported_types = {
-                "string",
-                "number",
-                "integer",
-                "boolean",
-                "array",
-                "object",
-                "null",
-            }
-            supported_formats = {
-                "string": {"enum", "date-time"},
-                "integer": {"int32", "int64"},
-                "number": {"float", "double"},
-            }
-
-            if "anyOf" in schema:
-                return {"anyOf": [convert_schema(s) for s in schema["anyOf"]]}
-
-            result = {}
-
-            # Avoid side effects by not modifying the original schema
-            origin_type = schema.get("type")
-            target_type = origin_type
-
-            # Compatibility fix: Gemini API expects 'type' to be a string (enum),
-            # but standard JSON Schema (MCP) allows lists (e.g. ["string", "null"]).
-            # We fallback to the first non-null type.
-            if isinstance(origin_type, list):
-                target_type = next((t for t in origin_type if t != "null"), "string")
-
-            if target_type in supported_types:
-                result["type"] = target_type
-                if "format" in schema and schema["format"] in supported_formats.get(
-                    result["type"],
-                    set(),
-                ):
-                    result["format"] = schema["format"]
-            else:
-                result["type"] = "null"
-
-            support_fields = {
-                "title",
-                "description",
-                "enum",
-                "minimum",
-                "maximum",
-                "maxItems",
-                "minItems",
-                "nullable",
-                "required",
-            }
-            result.update({k: schema[k] for k in support_fields if k in schema})
-
-            if "properties" in schema:
-                properties = {}
-                for key, value in schema["properties"].items():
-                    prop_value = convert_schema(value)
-                    if "default" in prop_value:
-                        del prop_value["default"]
-                    # see #5217
-                    if "additionalProperties" in prop_value:
-                        del prop_value["additionalProperties"]
-                    properties[key] = prop_value
-
-                if properties:
-                    result["properties"] = properties
-
-            if target_type == "array":
-                items_schema = schema.get("items")
-                if isinstance(items_schema, dict):
-                    result["items"] = convert_schema(items_schema)
-                else:
-                    # Gemini requires array schemas to include an `items` schema.
-                    # JSON Schema allows omitting it, so fall back to a permissive
-                    # string item schema instead of emitting an invalid declaration.
-                    result["items"] = {"type": "string"}
-
-            return result
-
+    def _build_google_schema(self) -> list[dict]:
         tools = []
         for tool in self.tools:
             d: dict[str, Any] = {"name": tool.name}
             if tool.description:
                 d["description"] = tool.description
             if tool.parameters:
-                d["parameters"] = convert_schema(tool.parameters)
+                d["parameters"] = _google_parameters(tool.parameters)
             tools.append(d)
-
-        declarations = {}
-        if tools:
-            declarations["function_declarations"] = tools
-        return declarations
+        return tools
 
     @deprecated(reason="Use openai_schema() instead", version="4.0.0")
     def get_func_desc_openai_style(self, omit_empty_parameter_field: bool = False):
@@ -491,7 +491,7 @@ class FunctionToolExecutor(BaseFunctionToolExecutor[AstrAgentContext]):
         req = ProviderRequest()
         conv = await _get_session_conv(event=cron_event, plugin_context=ctx)
         req.conversation = conv
-        context = json.loads(conv.history)
+        context = conv.get_messages()
         if context:
             req.contexts = context
             context_dump = req._print_friendly_context()
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import asyncio
-import copy
 import datetime
 import json
 import os
@@ -11,7 +10,6 @@ from collections.abc import Coroutine
 from dataclasses import dataclass, field
 
 from astrbot.core import logger
-from astrbot.core.agent.handoff import HandoffTool
 from astrbot.core.agent.mcp_client import MCPTool
 from astrbot.core.agent.message import TextPart
 from astrbot.core.agent.tool import ToolSet
@@ -23,7 +21,6 @@ from astrbot.core.astr_main_agent_resources import (
     ANNOTATE_EXECUTION_TOOL,
     BROWSER_BATCH_EXEC_TOOL,
     BROWSER_EXEC_TOOL,
-    CHATUI_SPECIAL_DEFAULT_PERSONA_PROMPT,
     CREATE_SKILL_CANDIDATE_TOOL,
     CREATE_SKILL_PAYLOAD_TOOL,
     EVALUATE_SKILL_CANDIDATE_TOOL,
@@ -52,6 +49,7 @@ from astrbot.core.astr_main_agent_resources import (
 )
 from astrbot.core.conversation_mgr import Conversation
 from astrbot.core.message.components import File, Image, Reply
+from astrbot.core.persona_bundle import persona_bundle_cache
 from astrbot.core.persona_error_reply import (
     extract_persona_custom_error_message_from_persona,
     set_persona_custom_error_message_on_event,
@@ -59,7 +57,7 @@ from astrbot.core.persona_error_reply import (
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.provider import Provider
 from astrbot.core.provider.entities import ProviderRequest
-from astrbot.core.skills.skill_manager import SkillManager, build_skills_prompt
+from astrbot.core.skills.skill_manager import SkillManager
 from astrbot.core.star.context import Context
 from astrbot.core.star.star_handler import star_map
 from astrbot.core.tools.cron_tools import (
@@ -99,6 +97,10 @@ class MainAgentBuildConfig:
     """
     tool_schema_mode: str = "full"
     """The tool schema mode, can be 'full' or 'skills-like'."""
+    parallel_tool_calls: bool = False
+    """Whether to run independent tool calls of one LLM turn concurrently."""
+    max_parallel_tool_calls: int = 4
+    """The maximum number of tool calls running concurrently in one LLM turn."""
     provider_wake_prefix: str = ""
     """The wake prefix for the provider. If the user message does not start with this prefix,
     the main agent will not be triggered."""
@@ -176,17 +178,24 @@ def _select_provider(
 
 
 async def _get_session_conv(
-    event: AstrMessageEvent, plugin_context: Context
+    event: AstrMessageEvent,
+    plugin_context: Context,
+    max_turns: int | None = None,
+    dequeue_turns: int = 1,
 ) -> Conversation:
     conv_mgr = plugin_context.conversation_manager
     umo = event.unified_msg_origin
     cid = await conv_mgr.get_curr_conversation_id(umo)
     if not cid:
         cid = await conv_mgr.new_conversation(umo, event.get_platform_id())
-    conversation = await conv_mgr.get_conversation(umo, cid)
+    conversation = await conv_mgr.get_conversation(
+        umo, cid, max_turns=max_turns, dequeue_turns=dequeue_turns
+    )
     if not conversation:
         cid = await conv_mgr.new_conversation(umo, event.get_platform_id())
-        conversation = await conv_mgr.get_conversation(umo, cid)
+        conversation = await conv_mgr.get_conversation(
+            umo, cid, max_turns=max_turns, dequeue_turns=dequeue_turns
+        )
     if not conversation:
         raise RuntimeError("无法创建新的对话。")
     return conversation
@@ -329,121 +338,40 @@ async def _ensure_persona_and_skills(
         event, extract_persona_custom_error_message_from_persona(persona)
     )
 
-    if persona:
-        # Inject persona system prompt
-        if prompt := persona["prompt"]:
-            req.system_prompt += f"\n# Persona Instructions\n\n{prompt}\n"
-        if begin_dialogs := copy.deepcopy(persona.get("_begin_dialogs_processed")):
-            req.contexts[:0] = begin_dialogs
-    elif use_webchat_special_default:
-        req.system_prompt += CHATUI_SPECIAL_DEFAULT_PERSONA_PROMPT
+    # persona prompt, begin dialogs and toolsets are prebuilt per persona
+    bundle = persona_bundle_cache.get(
+        plugin_context, persona, use_webchat_special_default
+    )
+    req.system_prompt += bundle.persona_prompt
+    bundle.apply_begin_dialogs(req)
 
     # Inject skills prompt
     runtime = cfg.get("computer_use_runtime", "local")
-    skill_manager = SkillManager()
-    skills = skill_manager.list_skills(active_only=True, runtime=runtime)
-
-    if skills:
-        if persona and persona.get("skills") is not None:
-            if not persona["skills"]:
-                skills = []
-            else:
-                allowed = set(persona["skills"])
-                skills = [skill for skill in skills if skill.name in allowed]
-        if skills:
-            req.system_prompt += f"\n{build_skills_prompt(skills)}\n"
-            if runtime == "none":
-                req.system_prompt += (
-                    "User has not enabled the Computer Use feature. "
-                    "You cannot use shell or Python to perform skills. "
-                    "If you need to use these capabilities, ask the user to enable Computer Use in the AstrBot WebUI -> Config."
-                )
-    tmgr = plugin_context.get_llm_tool_manager()
-
-    # inject toolset in the persona
-    if (persona and persona.get("tools") is None) or not persona:
-        persona_toolset = tmgr.get_full_tool_set()
-        for tool in list(persona_toolset):
-            if not tool.active:
-                persona_toolset.remove_tool(tool.name)
-    else:
-        persona_toolset = ToolSet()
-        if persona["tools"]:
-            for tool_name in persona["tools"]:
-                tool = tmgr.get_func(tool_name)
-                if tool and tool.active:
-                    persona_toolset.add_tool(tool)
-    if not req.func_tool:
-        req.func_tool = persona_toolset
-    else:
-        req.func_tool.merge(persona_toolset)
-
-    # sub agents integration
-    orch_cfg = plugin_context.get_config().get("subagent_orchestrator", {})
-    so = plugin_context.subagent_orchestrator
-    if orch_cfg.get("main_enable", False) and so:
-        remove_dup = bool(orch_cfg.get("remove_main_duplicate_tools", False))
-
-        assigned_tools: set[str] = set()
-        agents = orch_cfg.get("agents", [])
-        if isinstance(agents, list):
-            for a in agents:
-                if not isinstance(a, dict):
-                    continue
-                if a.get("enabled", True) is False:
-                    continue
-                persona_tools = None
-                pid = a.get("persona_id")
-                if pid:
-                    persona = plugin_context.persona_manager.get_persona_v3_by_id(pid)
-                    if persona is not None:
-                        persona_tools = persona.get("tools")
-                tools = a.get("tools", [])
-                if persona_tools is not None:
-                    tools = persona_tools
-                if tools is None:
-                    assigned_tools.update(
-                        [
-                            tool.name
-                            for tool in tmgr.func_list
-                            if not isinstance(tool, HandoffTool)
-                        ]
-                    )
-                    continue
-                if not isinstance(tools, list):
-                    continue
-                for t in tools:
-                    name = str(t).strip()
-                    if name:
-                        assigned_tools.add(name)
-
-        if req.func_tool is None:
-            req.func_tool = ToolSet()
-
-        # add subagent handoff tools
-        for tool in so.handoffs:
-            req.func_tool.add_tool(tool)
+    allowed_skills = None
+    if persona and persona.get("skills") is not None:
+        allowed_skills = persona["skills"]
+    # the skill listing and rendered prompt are cached until the skill files change
+    skills_prompt = SkillManager().build_skills_prompt(
+        runtime=runtime,
+        allowed_skills=allowed_skills,
+    )
+    if skills_prompt:
+        req.system_prompt += f"\n{skills_prompt}\n"
+        if runtime == "none":
+            req.system_prompt += (
+                "User has not enabled the Computer Use feature. "
+                "You cannot use shell or Python to perform skills. "
+                "If you need to use these capabilities, ask the user to enable Computer Use in the AstrBot WebUI -> Config."
+            )
 
-        # check duplicates
-        if remove_dup:
-            handoff_names = {tool.name for tool in so.handoffs}
-            for tool_name in assigned_tools:
-                if tool_name in handoff_names:
-                    continue
-                req.func_tool.remove_tool(tool_name)
-
-        router_prompt = (
-            plugin_context.get_config()
-            .get("subagent_orchestrator", {})
-            .get("router_system_prompt", "")
-        ).strip()
-        if router_prompt:
-            req.system_prompt += f"\n{router_prompt}\n"
+    # inject toolset in the persona, and sub agents integration
+    bundle.apply_tools(req)
+    req.system_prompt += bundle.router_prompt
     try:
         event.trace.record(
             "sel_persona",
             persona_id=persona_id,
-            persona_toolset=persona_toolset.names(),
+            persona_toolset=bundle.persona_tool_names,
         )
     except Exception:
         pass
@@ -1096,7 +1024,7 @@ async def build_main_agent(
                 "provider_request 必须是 ProviderRequest 类型。"
             )
             if req.conversation:
-                req.contexts = json.loads(req.conversation.history)
+                req.contexts = req.conversation.get_messages()
         else:
             req = ProviderRequest()
             req.prompt = ""
@@ -1214,9 +1142,18 @@ async def build_main_agent(
                             exc_info=True,
                         )
 
-            conversation = await _get_session_conv(event, plugin_context)
+            # 只加载模型可见的窗口：超出 max_context_length 后每次丢弃
+            # dequeue_context_length 轮，与截断后保存历史时的上下文一致
+            conversation = await _get_session_conv(
+                event,
+                plugin_context,
+                max_turns=config.max_context_length
+                if config.max_context_length > 0
+                else None,
+                dequeue_turns=config.dequeue_context_length,
+            )
             req.conversation = conversation
-            req.contexts = json.loads(conversation.history)
+            req.contexts = conversation.get_messages()
             event.set_extra("provider_request", req)
 
     if isinstance(req.contexts, str):
@@ -1306,6 +1243,8 @@ async def build_main_agent(
         truncate_turns=config.dequeue_context_length,
         enforce_max_turns=config.max_context_length,
         tool_schema_mode=config.tool_schema_mode,
+        parallel_tool_calls=config.parallel_tool_calls,
+        max_parallel_tool_calls=config.max_parallel_tool_calls,
         fallback_providers=_get_fallback_chat_providers(
             provider, plugin_context, config.provider_settings
         ),
@@ -237,6 +237,8 @@ class SendMessageToUserTool(FunctionTool[AstrAgentContext]):
             "required": ["messages"],
         }
     )
+    # 多条消息需按调用顺序发送给用户
+    serial_execution: bool = True
 
     async def _resolve_path_from_sandbox(
         self, context: ContextWrapper[AstrAgentContext], path: str
@@ -277,6 +277,10 @@ class AstrBotExporter:
     ) -> None:
         """导出 FAISS 索引文件"""
         try:
+            # 索引采用延迟保存, 导出前先写入所有未保存的变更
+            vec_db = getattr(kb_helper, "vec_db", None)
+            if vec_db is not None:
+                await vec_db.embedding_storage.flush()
             index_path = kb_helper.kb_dir / "index.faiss"
             if index_path.exists():
                 archive_path = f"databases/kb_{kb_id}/index.faiss"
@@ -59,6 +59,11 @@ DEFAULT_CONFIG = {
             "time": 60,
             "count": 30,
             "strategy": "stall",  # stall, discard
+            "stall_timeout": 60,
+            "config_count": 0,
+            "platform_count": 0,
+            "global_count": 0,
+            "provider_count": 0,
         },
         "reply_prefix": "",
         "forward_threshold": 1500,
@@ -94,6 +99,13 @@ DEFAULT_CONFIG = {
         "friend_message_needs_wake_prefix": False,
         "ignore_bot_self_message": False,
         "ignore_at_all": False,
+        "dispatch": {
+            "max_concurrency": 32,
+            "max_pending": 1000,
+            "session_concurrency": 0,
+            "overload_policy": "drop_oldest",  # drop_oldest, coalesce, reject
+            "overload_reply": "",
+        },
     },
     "provider_sources": [],  # provider sources
     "provider": [],  # models from provider_sources
@@ -151,6 +163,8 @@ DEFAULT_CONFIG = {
         "max_agent_step": 30,
         "tool_call_timeout": 120,
         "tool_schema_mode": "full",
+        "parallel_tool_calls": False,
+        "max_parallel_tool_calls": 4,
         "llm_safety_mode": True,
         "safety_mode_strategy": "system_prompt",  # TODO: llm judge
         "file_extract": {
@@ -980,6 +994,52 @@ CONFIG_METADATA_2 = {
                                 "type": "string",
                                 "options": ["stall", "discard"],
                             },
+                            "stall_timeout": {
+                                "type": "int",
+                                "hint": "stall 策略下单条消息最多排队等待的秒数，超过后丢弃。",
+                            },
+                            "config_count": {
+                                "type": "int",
+                                "hint": "使用此配置文件的所有会话在时间窗口内的消息总数上限，0 表示不限制。",
+                            },
+                            "platform_count": {
+                                "type": "int",
+                                "hint": "单个平台适配器在时间窗口内的消息总数上限，0 表示不限制。仅默认配置文件生效。",
+                            },
+                            "global_count": {
+                                "type": "int",
+                                "hint": "所有平台与配置文件在时间窗口内的消息总数上限，0 表示不限制。仅默认配置文件生效。",
+                            },
+                            "provider_count": {
+                                "type": "int",
+                                "hint": "单个对话模型提供商在时间窗口内的请求数上限，0 表示不限制。仅默认配置文件生效。",
+                            },
+                        },
+                    },
+                    "dispatch": {
+                        "type": "object",
+                        "items": {
+                            "max_concurrency": {
+                                "type": "int",
+                                "hint": "同时处理的消息事件数量上限。",
+                            },
+                            "max_pending": {
+                                "type": "int",
+                                "hint": "等待处理的消息事件数量上限，超过后触发过载策略。",
+                            },
+                            "session_concurrency": {
+                                "type": "int",
+                                "hint": "同一会话同时处理的消息事件数量上限，0 表示不限制。",
+                            },
+                            "overload_policy": {
+                                "type": "string",
+                                "options": ["drop_oldest", "coalesce", "reject"],
+                                "hint": "drop_oldest: 丢弃最早的待处理消息；coalesce: 用新消息替换同一会话中尚未处理的消息；reject: 拒绝新消息。",
+                            },
+                            "overload_reply": {
+                                "type": "string",
+                                "hint": "过载策略为 reject 时回复给用户的提示，留空则不回复。",
+                            },
                         },
                     },
                     "no_permission_reply": {
@@ -1736,6 +1796,7 @@ CONFIG_METADATA_2 = {
                         "embedding_api_base": "",
                         "embedding_model": "",
                         "embedding_dimensions": 1024,
+                        "embedding_max_concurrency": 16,
                         "timeout": 20,
                         "proxy": "",
                     },
@@ -1750,6 +1811,7 @@ CONFIG_METADATA_2 = {
                         "embedding_api_base": "",
                         "embedding_model": "gemini-embedding-exp-03-07",
                         "embedding_dimensions": 768,
+                        "embedding_max_concurrency": 16,
                         "timeout": 20,
                         "proxy": "",
                     },
@@ -2038,6 +2100,11 @@ CONFIG_METADATA_2 = {
                         "type": "string",
                         "hint": "嵌入模型名称。",
                     },
+                    "embedding_max_concurrency": {
+                        "description": "最大并发请求数",
+                        "type": "int",
+                        "hint": "批量生成向量 (如上传知识库文档) 时的并发请求数上限。并发数会根据延迟与限流 (429) 自动调整, 同一提供商的所有上传任务共用该上限。",
+                    },
                     "embedding_api_key": {
                         "description": "API Key",
                         "type": "string",
@@ -2695,6 +2762,12 @@ CONFIG_METADATA_2 = {
                     "tool_schema_mode": {
                         "type": "string",
                     },
+                    "parallel_tool_calls": {
+                        "type": "bool",
+                    },
+                    "max_parallel_tool_calls": {
+                        "type": "int",
+                    },
                     "file_extract": {
                         "type": "object",
                         "items": {
@@ -3451,6 +3524,22 @@ CONFIG_METADATA_3 = {
                             "provider_settings.agent_runner_type": "local",
                         },
                     },
+                    "provider_settings.parallel_tool_calls": {
+                        "description": "并行执行工具调用",
+                        "type": "bool",
+                        "hint": "模型在一轮中调用多个工具时并发执行，总耗时取决于最慢的工具。声明为需串行执行的工具（如发送消息）仍按顺序执行。",
+                        "condition": {
+                            "provider_settings.agent_runner_type": "local",
+                        },
+                    },
+                    "provider_settings.max_parallel_tool_calls": {
+                        "description": "单轮最大并发工具调用数",
+                        "type": "int",
+                        "condition": {
+                            "provider_settings.agent_runner_type": "local",
+                            "provider_settings.parallel_tool_calls": True,
+                        },
+                    },
                     "provider_settings.wake_prefix": {
                         "description": "LLM 聊天额外唤醒前缀 ",
                         "type": "string",
@@ -3647,6 +3736,34 @@ CONFIG_METADATA_3 = {
                         "type": "string",
                         "options": ["stall", "discard"],
                     },
+                    "platform_settings.rate_limit.stall_timeout": {
+                        "description": "最长排队等待时间(秒)",
+                        "type": "int",
+                        "hint": "stall 策略下消息排队超过此时间仍无法放行时将被丢弃。",
+                        "condition": {
+                            "platform_settings.rate_limit.strategy": "stall",
+                        },
+                    },
+                    "platform_settings.rate_limit.config_count": {
+                        "description": "配置文件消息速率限制计数",
+                        "type": "int",
+                        "hint": "使用此配置文件的所有会话共享的限额，0 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.platform_count": {
+                        "description": "单平台消息速率限制计数",
+                        "type": "int",
+                        "hint": "每个平台适配器的限额，0 表示不限制。仅默认配置文件生效。",
+                    },
+                    "platform_settings.rate_limit.global_count": {
+                        "description": "全局消息速率限制计数",
+                        "type": "int",
+                        "hint": "所有平台与配置文件共享的限额，0 表示不限制。仅默认配置文件生效。",
+                    },
+                    "platform_settings.rate_limit.provider_count": {
+                        "description": "单个模型提供商请求速率限制计数",
+                        "type": "int",
+                        "hint": "每个对话模型提供商的 LLM 请求限额，0 表示不限制。仅默认配置文件生效。",
+                    },
                 },
             },
             "content_safety": {
@@ -2,25 +2,50 @@
 
 在 AstrBot 中, 会话和对话是独立的, 会话用于标记对话窗口, 例如群聊"123456789"可以建立一个会话,
 在一个会话中可以建立多个对话, 并且支持对话的切换和删除
+
+活跃对话的消息列表缓存在内存中 (LRU), 对话历史的写入先更新缓存,
+再合并为一次数据库写入延迟 save_interval 秒落盘, 关闭时全部写入.
 """
 
+import asyncio
 import json
+from collections import OrderedDict
 from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
 
-from astrbot.core import sp
+from astrbot.core import logger, sp
 from astrbot.core.agent.message import AssistantMessageSegment, UserMessageSegment
 from astrbot.core.db import BaseDatabase
-from astrbot.core.db.po import Conversation, ConversationV2
+from astrbot.core.db.po import Conversation, ConversationV2, last_turns_start
 from astrbot.core.utils.datetime_utils import to_utc_timestamp
 
 
+@dataclass
+class _CachedConversation:
+    conv: ConversationV2
+    """对话元数据, 其 content 不再使用"""
+    messages: list[dict]
+    """消息列表。只整体替换, 不原地修改, 已返回的 Conversation 会引用它"""
+    offset: int
+    """messages 中第一条消息的序号下界, 与 Conversation.history_offset 一致"""
+    max_turns: int | None
+    """加载时的轮数窗口。None 表示 messages 是完整的对话历史"""
+    dirty: bool = False
+
+
 class ConversationManager:
     """负责管理会话与 LLM 的对话，某个会话当前正在用哪个对话。"""
 
-    def __init__(self, db_helper: BaseDatabase) -> None:
+    def __init__(self, db_helper: BaseDatabase, cache_size: int = 256) -> None:
         self.session_conversations: dict[str, str] = {}
         self.db = db_helper
-        self.save_interval = 60  # 每 60 秒保存一次
+        self.save_interval = 5
+        """对话历史的修改最多延迟 save_interval 秒写入数据库"""
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, _CachedConversation] = OrderedDict()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
 
         # 会话删除回调函数列表（用于级联清理，如知识库配置）
         self._on_session_deleted_callbacks: list[Callable[[str], Awaitable[None]]] = []
@@ -57,23 +82,170 @@ class ConversationManager:
                     f"会话删除回调执行失败 (session: {unified_msg_origin}): {e}",
                 )
 
-    def _convert_conv_from_v2_to_v1(self, conv_v2: ConversationV2) -> Conversation:
+    def _convert_conv_from_v2_to_v1(
+        self,
+        conv_v2: ConversationV2,
+        history: list[dict] | None = None,
+        history_offset: int = 0,
+    ) -> Conversation:
         """将 ConversationV2 对象转换为 Conversation 对象"""
         created_ts = to_utc_timestamp(conv_v2.created_at)
         updated_ts = to_utc_timestamp(conv_v2.updated_at)
         created_at = int(created_ts) if created_ts is not None else 0
         updated_at = int(updated_ts) if updated_ts is not None else 0
-        return Conversation(
+        conv = Conversation(
             platform_id=conv_v2.platform_id,
             user_id=conv_v2.user_id,
             cid=conv_v2.conversation_id,
-            history=json.dumps(conv_v2.content or []),
             title=conv_v2.title,
             persona_id=conv_v2.persona_id,
             created_at=created_at,
             updated_at=updated_at,
             token_usage=conv_v2.token_usage,
+            history_offset=history_offset,
+        )
+        # history 在首次访问时才序列化
+        conv.set_messages(history if history is not None else conv_v2.content or [])
+        return conv
+
+    def _cache_put(self, cid: str, entry: _CachedConversation) -> None:
+        self._cache[cid] = entry
+        self._cache.move_to_end(cid)
+        self._trim_cache()
+
+    def _trim_cache(self) -> None:
+        # 未写入的对话不会被淘汰, 写入后再淘汰; 最近使用的对话总是保留
+        overflow = len(self._cache) - self.cache_size
+        if overflow <= 0:
+            return
+        evictable = [
+            cid for cid, entry in list(self._cache.items())[:-1] if not entry.dirty
+        ]
+        for cid in evictable[:overflow]:
+            del self._cache[cid]
+
+    def _cache_hit(
+        self,
+        entry: _CachedConversation,
+        max_turns: int | None,
+    ) -> bool:
+        if max_turns is None:
+            return entry.max_turns is None
+        if entry.max_turns is not None and entry.max_turns < max_turns:
+            return False
+        # 缓存中超出窗口的消息没有对应的序号, 无法截取
+        return last_turns_start(entry.messages, max_turns) == 0
+
+    async def _load_conversation(
+        self,
+        cid: str,
+        max_turns: int | None = None,
+        dequeue_turns: int = 1,
+    ) -> _CachedConversation | None:
+        """从缓存或数据库中加载对话。max_turns 为 None 时加载完整的对话历史。"""
+        entry = self._cache.get(cid)
+        if entry is not None:
+            if self._cache_hit(entry, max_turns):
+                self._cache.move_to_end(cid)
+                return entry
+            if entry.dirty:
+                await self._flush_conversation(cid)
+
+        conv = await self.db.get_conversation_by_id(
+            cid=cid,
+            load_messages=max_turns is None,
+        )
+        if not conv:
+            self._cache.pop(cid, None)
+            return None
+        if max_turns is None:
+            messages, offset = conv.content or [], 0
+        else:
+            messages, offset = await self.db.get_conversation_messages(
+                cid=cid,
+                max_turns=max_turns,
+                dequeue_turns=dequeue_turns,
+            )
+        conv.content = None
+        entry = _CachedConversation(
+            conv=conv,
+            messages=messages,
+            offset=offset,
+            max_turns=max_turns,
         )
+        self._cache_put(cid, entry)
+        return entry
+
+    def _mark_dirty(self, entry: _CachedConversation) -> None:
+        entry.dirty = True
+        entry.conv.updated_at = datetime.now(timezone.utc)
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(
+                self._flush_later(),
+                name="conversation_flush",
+            )
+
+    async def _flush_later(self) -> None:
+        # 写入期间可能有对话再次变脏 (或写入失败), 直到没有脏对话才退出
+        while True:
+            await asyncio.sleep(self.save_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"写入对话历史失败: {e}")
+            if not any(entry.dirty for entry in self._cache.values()):
+                return
+
+    async def _flush_conversation(self, cid: str) -> None:
+        async with self._flush_lock:
+            await self._write_entry(cid)
+
+    async def _write_entry(self, cid: str) -> None:
+        entry = self._cache.get(cid)
+        if entry is None or not entry.dirty:
+            return
+        entry.dirty = False
+        try:
+            await self.db.update_conversation(
+                cid=cid,
+                content=entry.messages,
+                token_usage=entry.conv.token_usage,
+                content_offset=entry.offset,
+            )
+        except Exception:
+            # 保持为脏, 下次重试
+            entry.dirty = True
+            raise
+
+    async def flush(self) -> None:
+        """将缓存中所有未写入的对话历史写入数据库"""
+        async with self._flush_lock:
+            errors = 0
+            for cid in [cid for cid, entry in self._cache.items() if entry.dirty]:
+                try:
+                    await self._write_entry(cid)
+                except Exception as e:
+                    errors += 1
+                    logger.error(f"写入对话 {cid} 的历史失败: {e}")
+            self._trim_cache()
+        if errors:
+            # 失败的对话稍后重试
+            self._schedule_flush()
+
+    async def terminate(self) -> None:
+        """取消延迟写入任务, 并立即写入所有未写入的对话历史"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+        async with self._flush_lock:
+            for cid in [cid for cid, entry in self._cache.items() if entry.dirty]:
+                try:
+                    await self._write_entry(cid)
+                except Exception as e:
+                    logger.error(f"写入对话 {cid} 的历史失败: {e}")
 
     async def new_conversation(
         self,
@@ -105,6 +277,16 @@ class ConversationManager:
             title=title,
             persona_id=persona_id,
         )
+        messages, conv.content = conv.content or [], None
+        self._cache_put(
+            conv.conversation_id,
+            _CachedConversation(
+                conv=conv,
+                messages=messages,
+                offset=0,
+                max_turns=None,
+            ),
+        )
         self.session_conversations[unified_msg_origin] = conv.conversation_id
         await sp.session_put(unified_msg_origin, "sel_conv_id", conv.conversation_id)
         return conv.conversation_id
@@ -137,6 +319,7 @@ class ConversationManager:
         if not conversation_id:
             conversation_id = self.session_conversations.get(unified_msg_origin)
         if conversation_id:
+            self._cache.pop(conversation_id, None)
             await self.db.delete_conversation(cid=conversation_id)
             curr_cid = await self.get_curr_conversation_id(unified_msg_origin)
             if curr_cid == conversation_id:
@@ -150,6 +333,12 @@ class ConversationManager:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
 
         """
+        for cid in [
+            cid
+            for cid, entry in self._cache.items()
+            if entry.conv.user_id == unified_msg_origin
+        ]:
+            del self._cache[cid]
         await self.db.delete_conversations_by_user_id(user_id=unified_msg_origin)
         self.session_conversations.pop(unified_msg_origin, None)
         await sp.session_remove(unified_msg_origin, "sel_conv_id")
@@ -178,6 +367,8 @@ class ConversationManager:
         unified_msg_origin: str,
         conversation_id: str,
         create_if_not_exists: bool = False,
+        max_turns: int | None = None,
+        dequeue_turns: int = 1,
     ) -> Conversation | None:
         """获取会话的对话.
 
@@ -185,19 +376,30 @@ class ConversationManager:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
             conversation_id (str): 对话 ID, 是 uuid 格式的字符串
             create_if_not_exists (bool): 如果对话不存在,是否创建一个新的对话
+            max_turns (int | None): 只加载最近的若干轮对话。None 表示加载全部。
+                此时返回对象的 history_offset 为第一条消息的序号，写回时需一并传入。
+            dequeue_turns (int): 超出 max_turns 时每次丢弃的轮数。窗口起点每 dequeue_turns 轮才移动一次，
+                与按轮次截断存储历史时模型看到的上下文一致。
         Returns:
             conversation (Conversation): 对话对象
 
         """
-        conv = await self.db.get_conversation_by_id(cid=conversation_id)
-        if not conv and create_if_not_exists:
+        if max_turns is not None and max_turns <= 0:
+            max_turns = None
+        entry = await self._load_conversation(conversation_id, max_turns, dequeue_turns)
+        if not entry and create_if_not_exists:
             # 如果对话不存在且需要创建，则新建一个对话
             conversation_id = await self.new_conversation(unified_msg_origin)
-            conv = await self.db.get_conversation_by_id(cid=conversation_id)
-        conv_res = None
-        if conv:
-            conv_res = self._convert_conv_from_v2_to_v1(conv)
-        return conv_res
+            entry = await self._load_conversation(
+                conversation_id, max_turns, dequeue_turns
+            )
+        if not entry:
+            return None
+        return self._convert_conv_from_v2_to_v1(
+            entry.conv,
+            entry.messages,
+            entry.offset,
+        )
 
     async def get_conversations(
         self,
@@ -213,6 +415,7 @@ class ConversationManager:
             conversations (List[Conversation]): 对话对象列表
 
         """
+        await self.flush()
         convs = await self.db.get_conversations(
             user_id=unified_msg_origin,
             platform_id=platform_id,
@@ -242,6 +445,7 @@ class ConversationManager:
             conversations (list[Conversation]): 对话对象列表
 
         """
+        await self.flush()
         convs, cnt = await self.db.get_filtered_conversations(
             page=page,
             page_size=page_size,
@@ -263,6 +467,7 @@ class ConversationManager:
         title: str | None = None,
         persona_id: str | None = None,
         token_usage: int | None = None,
+        history_offset: int = 0,
     ) -> None:
         """更新会话的对话.
 
@@ -271,19 +476,46 @@ class ConversationManager:
             conversation_id (str): 对话 ID, 是 uuid 格式的字符串
             history (List[Dict]): 对话历史记录, 是一个字典列表, 每个字典包含 role 和 content 字段
             token_usage (int | None): token 使用量。None 表示不更新
+            history_offset (int): history 中第一条消息的序号，即 `Conversation.history_offset`。
+                序号之前的消息保持不变。只有变化的消息会被写入。
 
         """
         if not conversation_id:
             # 如果没有提供 conversation_id，则获取当前的
             conversation_id = await self.get_curr_conversation_id(unified_msg_origin)
-        if conversation_id:
-            await self.db.update_conversation(
-                cid=conversation_id,
-                title=title,
-                persona_id=persona_id,
-                content=history,
-                token_usage=token_usage,
-            )
+        if not conversation_id:
+            return
+        entry = self._cache.get(conversation_id)
+        if entry is not None:
+            if title is not None:
+                entry.conv.title = title
+            if persona_id is not None:
+                entry.conv.persona_id = persona_id
+            if history is not None and history_offset in (0, entry.offset):
+                # 对话历史与 token 用量延迟写入
+                entry.messages = list(history)
+                if history_offset == 0:
+                    entry.offset, entry.max_turns = 0, None
+                if token_usage is not None:
+                    entry.conv.token_usage = token_usage
+                self._mark_dirty(entry)
+                history = token_usage = None
+            elif history is not None:
+                # 窗口与缓存不一致, 先写入缓存中的修改, 再直接写入数据库
+                await self._flush_conversation(conversation_id)
+                self._cache.pop(conversation_id, None)
+            elif token_usage is not None:
+                entry.conv.token_usage = token_usage
+        if all(v is None for v in (title, persona_id, history, token_usage)):
+            return
+        await self.db.update_conversation(
+            cid=conversation_id,
+            title=title,
+            persona_id=persona_id,
+            content=history,
+            token_usage=token_usage,
+            content_offset=history_offset,
+        )
 
     async def update_conversation_title(
         self,
@@ -345,10 +577,6 @@ class ConversationManager:
         Raises:
             Exception: If the conversation with the given ID is not found
         """
-        conv = await self.db.get_conversation_by_id(cid=cid)
-        if not conv:
-            raise Exception(f"Conversation with id {cid} not found")
-        history = conv.content or []
         if isinstance(user_message, UserMessageSegment):
             user_msg_dict = user_message.model_dump()
         else:
@@ -357,11 +585,14 @@ class ConversationManager:
             assistant_msg_dict = assistant_message.model_dump()
         else:
             assistant_msg_dict = assistant_message
-        history.append(user_msg_dict)
-        history.append(assistant_msg_dict)
-        await self.db.update_conversation(
+        entry = self._cache.get(cid)
+        if entry is not None:
+            entry.messages = [*entry.messages, user_msg_dict, assistant_msg_dict]
+            self._mark_dirty(entry)
+            return
+        await self.db.append_conversation_messages(
             cid=cid,
-            content=history,
+            messages=[user_msg_dict, assistant_msg_dict],
         )
 
     async def get_human_readable_context(
@@ -383,7 +614,7 @@ class ConversationManager:
         conversation = await self.get_conversation(unified_msg_origin, conversation_id)
         if not conversation:
             return [], 0
-        history = json.loads(conversation.history)
+        history = conversation.get_messages()
 
         # contexts_groups 存放按顺序的段落（每个段落是一个 str 列表），
         # 之后会被展平成一个扁平的 str 列表返回。
@@ -39,7 +39,7 @@ from astrbot.core.utils.llm_metadata import update_llm_metadata
 from astrbot.core.utils.migra_helper import migra
 from astrbot.core.utils.temp_dir_cleaner import TempDirCleaner
 
-from . import astrbot_config, html_renderer
+from . import astrbot_config, html_renderer, platform_stats
 from .event_bus import EventBus
 
 
@@ -59,6 +59,7 @@ class AstrBotCoreLifecycle:
         self.subagent_orchestrator: SubAgentOrchestrator | None = None
         self.cron_manager: CronJobManager | None = None
         self.temp_dir_cleaner: TempDirCleaner | None = None
+        self.conversation_manager: ConversationManager | None = None
 
         # 设置代理
         proxy_config = self.astrbot_config.get("http_proxy", "")
@@ -253,6 +254,11 @@ class AstrBotCoreLifecycle:
                 name="temp_dir_cleaner",
             )
 
+        platform_stats_task = asyncio.create_task(
+            platform_stats.run(),
+            name="platform_stats",
+        )
+
         # 把插件中注册的所有协程函数注册到事件总线中并执行
         extra_tasks = []
         for task in self.star_context._register_tasks:
@@ -263,6 +269,7 @@ class AstrBotCoreLifecycle:
             tasks_.append(cron_task)
         if temp_dir_cleaner_task:
             tasks_.append(temp_dir_cleaner_task)
+        tasks_.append(platform_stats_task)
         for task in tasks_:
             self.curr_tasks.append(
                 asyncio.create_task(self._task_wrapper(task), name=task.get_name()),
@@ -316,6 +323,7 @@ class AstrBotCoreLifecycle:
         """停止 AstrBot 核心生命周期管理类, 取消所有当前任务并终止各个管理器."""
         if self.temp_dir_cleaner:
             await self.temp_dir_cleaner.stop()
+        await platform_stats.stop()
 
         # 请求停止所有正在运行的异步任务
         for task in self.curr_tasks:
@@ -333,6 +341,8 @@ class AstrBotCoreLifecycle:
                     f"插件 {plugin.name} 未被正常终止 {e!s}, 可能会导致资源泄露等问题。",
                 )
 
+        if self.conversation_manager:
+            await self.conversation_manager.terminate()
         await self.provider_manager.terminate()
         await self.platform_manager.terminate()
         await self.kb_manager.terminate()
@@ -349,6 +359,8 @@ class AstrBotCoreLifecycle:
 
     async def restart(self) -> None:
         """重启 AstrBot 核心生命周期管理类, 终止各个管理器并重新加载平台实例"""
+        if self.conversation_manager:
+            await self.conversation_manager.terminate()
         await self.provider_manager.terminate()
         await self.platform_manager.terminate()
         await self.kb_manager.terminate()
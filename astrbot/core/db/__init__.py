@@ -13,6 +13,7 @@ from astrbot.core.db.po import (
     ChatUIProject,
     CommandConfig,
     CommandConflict,
+    ConversationMessage,
     ConversationV2,
     CronJob,
     Persona,
@@ -96,6 +97,36 @@ class BaseDatabase(abc.ABC):
         """Insert a new platform statistic record."""
         ...
 
+    async def insert_platform_stats_batch(
+        self,
+        rows: list[tuple[datetime.datetime, str, str, int]],
+    ) -> None:
+        """Accumulate pre-aggregated platform statistics.
+
+        Args:
+            rows: List of (hour timestamp, platform_id, platform_type, count) tuples.
+        """
+        for timestamp, platform_id, platform_type, count in rows:
+            await self.insert_platform_stats(
+                platform_id,
+                platform_type,
+                count=count,
+                timestamp=timestamp,
+            )
+
+    @abc.abstractmethod
+    async def get_platform_stats_rows(
+        self,
+        start_time: datetime.datetime | None = None,
+    ) -> list[tuple[datetime.datetime, str, str, int]]:
+        """Get hourly (timestamp, platform_id, platform_type, count) rows ordered by timestamp."""
+        ...
+
+    @abc.abstractmethod
+    async def get_platform_stats_total(self) -> int:
+        """Get the total message count across all platform statistics."""
+        ...
+
     @abc.abstractmethod
     async def count_platform_stats(self) -> int:
         """Count the number of platform statistics records."""
@@ -134,8 +165,16 @@ class BaseDatabase(abc.ABC):
         ...
 
     @abc.abstractmethod
-    async def get_conversation_by_id(self, cid: str) -> ConversationV2:
-        """Get a specific conversation by its ID."""
+    async def get_conversation_by_id(
+        self,
+        cid: str,
+        load_messages: bool = True,
+    ) -> ConversationV2:
+        """Get a specific conversation by its ID.
+
+        When `load_messages` is False, content is only filled for conversations
+        whose history has not been moved to the message table yet.
+        """
         ...
 
     @abc.abstractmethod
@@ -182,8 +221,38 @@ class BaseDatabase(abc.ABC):
         persona_id: str | None = None,
         content: list[dict] | None = None,
         token_usage: int | None = None,
+        content_offset: int = 0,
     ) -> None:
-        """Update a conversation's history."""
+        """Update a conversation's history.
+
+        `content` replaces the messages from sequence number `content_offset`
+        on. Messages before `content_offset` are kept.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def get_conversation_messages(
+        self,
+        cid: str,
+        max_turns: int | None = None,
+        dequeue_turns: int = 1,
+    ) -> tuple[list[dict], int]:
+        """Get the messages of a conversation.
+
+        When `max_turns` is set, only the most recent turns that the LLM would
+        see are returned (see `window_turns`: the window slides `dequeue_turns`
+        turns at a time). A turn starts with a user message. Returns the
+        messages and the sequence number of the first returned message.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def append_conversation_messages(
+        self,
+        cid: str,
+        messages: list[dict],
+    ) -> list[ConversationMessage]:
+        """Append messages to the end of a conversation's history."""
         ...
 
     @abc.abstractmethod
@@ -465,6 +534,18 @@ class BaseDatabase(abc.ABC):
         """Insert a new preference record."""
         ...
 
+    async def insert_preferences_or_update(
+        self,
+        items: list[tuple[str, str, str, dict]],
+    ) -> None:
+        """Batch insert or update preference records.
+
+        Args:
+            items: List of (scope, scope_id, key, value) tuples.
+        """
+        for scope, scope_id, key, value in items:
+            await self.insert_preference_or_update(scope, scope_id, key, value)
+
     @abc.abstractmethod
     async def get_preference(self, scope: str, scope_id: str, key: str) -> Preference:
         """Get a preference by scope ID and key."""
@@ -1,3 +1,4 @@
+import json
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
@@ -79,6 +80,7 @@ class ConversationV2(TimestampMixin, SQLModel, table=True):
     platform_id: str = Field(nullable=False)
     user_id: str = Field(nullable=False)
     content: list | None = Field(default=None, sa_type=JSON)
+    """Legacy JSON history. NULL once the messages live in `conversation_messages`."""
 
     title: str | None = Field(default=None, max_length=255)
     persona_id: str | None = Field(default=None)
@@ -96,6 +98,40 @@ class ConversationV2(TimestampMixin, SQLModel, table=True):
     )
 
 
+class ConversationMessage(SQLModel, table=True):
+    """A single message of a conversation, stored append-only.
+
+    Messages are ordered by `seq`, which only grows within a conversation.
+    Conversations created before this table existed keep their history in
+    `ConversationV2.content` until the next write moves it here.
+    """
+
+    __tablename__: str = "conversation_messages"
+
+    id: int | None = Field(
+        default=None,
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": True},
+    )
+    conversation_id: str = Field(max_length=36, nullable=False)
+    seq: int = Field(nullable=False)
+    role: str = Field(nullable=False)
+    content: dict = Field(sa_type=JSON, nullable=False)
+    """The OpenAI-formated message."""
+    content_hash: str = Field(max_length=32, nullable=False)
+    token_count: int = Field(default=0, nullable=False)
+    """Estimated token count of the message."""
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint(
+            "conversation_id",
+            "seq",
+            name="uix_conversation_message_seq",
+        ),
+    )
+
+
 class PersonaFolder(TimestampMixin, SQLModel, table=True):
     """Persona 文件夹，支持递归层级结构。
 
@@ -481,6 +517,71 @@ class Conversation:
     updated_at: int = 0
     token_usage: int = 0
     """对话的总 token 数量。AstrBot 会保留最近一次 LLM 请求返回的总 token 数，方便统计。token_usage 可能为 0，表示未知。"""
+    history_offset: int = 0
+    """history 中第一条消息的序号。只加载最近若干轮时大于 0，写回 history 时不会影响此序号之前的消息。"""
+
+    # history 由解析后的对话列表按需序列化，避免每轮对话都做一次 JSON 往返。
+    # dataclass 未传入 history 时，setter 收到的默认值是这个 property 本身。
+    @property
+    def history(self) -> str:  # noqa: F811
+        history = self.__dict__.get("_history")
+        if history is None:
+            history = json.dumps(self.__dict__.get("_messages") or [])
+            self.__dict__["_history"] = history
+        return history
+
+    @history.setter
+    def history(self, value: str) -> None:
+        self.__dict__["_history"] = "" if isinstance(value, property) else value
+        self.__dict__["_messages"] = None
+
+    def get_messages(self) -> list[dict]:
+        """获取解析后的对话列表。
+
+        每次调用返回新的列表，其中的消息是浅拷贝，可以增删字段，但不要原地修改嵌套的内容。
+        """
+        messages = self.__dict__.get("_messages")
+        if messages is None:
+            messages = json.loads(self.history or "[]")
+            self.__dict__["_messages"] = messages
+        return [dict(message) for message in messages]
+
+    def set_messages(self, messages: list[dict]) -> None:
+        """设置对话列表。列表会被直接引用，调用方之后不应再修改它。"""
+        self.__dict__["_messages"] = messages
+        self.__dict__["_history"] = None
+
+
+def last_turns_start(messages: list[dict], max_turns: int | None) -> int:
+    """Index of the first message of the last `max_turns` turns.
+
+    A turn starts with a user message. Returns 0 when `max_turns` is not set or
+    the messages have fewer turns.
+    """
+    if not max_turns or max_turns <= 0:
+        return 0
+    turns = 0
+    for idx in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[idx], dict) and messages[idx].get("role") == "user":
+            turns += 1
+            if turns == max_turns:
+                return idx
+    return 0
+
+
+def window_turns(total_turns: int, max_turns: int, dequeue_turns: int = 1) -> int:
+    """Number of most recent turns visible to the LLM out of `total_turns`.
+
+    Reproduces turn-based truncation on a stored history: once the history
+    exceeds `max_turns`, the oldest turns are dropped `dequeue_turns` at a time
+    (keeping `max_turns - dequeue_turns + 1`), so the window start only moves
+    every `dequeue_turns` turns and the prompt prefix stays cacheable in between.
+    """
+    if max_turns <= 0 or total_turns <= max_turns:
+        return total_turns
+    dequeue_turns = min(max(1, dequeue_turns), max_turns)
+    kept = max_turns - dequeue_turns + 1
+    return kept + (total_turns - max_turns - 1) % dequeue_turns
 
 
 class Personality(TypedDict):
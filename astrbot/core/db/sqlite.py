@@ -1,13 +1,18 @@
 import asyncio
+import hashlib
+import json
 import threading
 import typing as T
 from collections.abc import Awaitable, Callable
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import CursorResult, Row
+from sqlalchemy import CursorResult, Row, null
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import col, delete, desc, func, or_, select, text, update
 
+from astrbot.core.agent.context.token_counter import EstimateTokenCounter
+from astrbot.core.agent.message import Message
 from astrbot.core.db import BaseDatabase
 from astrbot.core.db.po import (
     ApiKey,
@@ -15,6 +20,7 @@ from astrbot.core.db.po import (
     ChatUIProject,
     CommandConfig,
     CommandConflict,
+    ConversationMessage,
     ConversationV2,
     CronJob,
     Persona,
@@ -26,6 +32,8 @@ from astrbot.core.db.po import (
     ProviderStat,
     SessionProjectRelation,
     SQLModel,
+    last_turns_start,
+    window_turns,
 )
 from astrbot.core.db.po import (
     Platform as DeprecatedPlatformStat,
@@ -37,6 +45,19 @@ from astrbot.core.sentinels import NOT_GIVEN
 
 TxResult = T.TypeVar("TxResult")
 CRON_FIELD_NOT_SET = object()
+_MESSAGE_TOKEN_COUNTER = EstimateTokenCounter()
+
+
+def _hash_message(message: dict) -> str:
+    payload = json.dumps(message, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+
+def _estimate_message_tokens(message: dict) -> int:
+    try:
+        return _MESSAGE_TOKEN_COUNTER.count_tokens([Message.model_validate(message)])
+    except Exception:
+        return 0
 
 
 class SQLiteDatabase(BaseDatabase):
@@ -141,6 +162,65 @@ class SQLiteDatabase(BaseDatabase):
                     },
                 )
 
+    async def insert_platform_stats_batch(self, rows) -> None:
+        """Accumulate pre-aggregated platform statistics in a single transaction."""
+        if not rows:
+            return
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                await session.execute(
+                    text("""
+                    INSERT INTO platform_stats (timestamp, platform_id, platform_type, count)
+                    VALUES (:timestamp, :platform_id, :platform_type, :count)
+                    ON CONFLICT(timestamp, platform_id, platform_type) DO UPDATE SET
+                        count = platform_stats.count + EXCLUDED.count
+                    """),
+                    [
+                        {
+                            "timestamp": timestamp,
+                            "platform_id": platform_id,
+                            "platform_type": platform_type,
+                            "count": count,
+                        }
+                        for timestamp, platform_id, platform_type, count in rows
+                    ],
+                )
+
+    async def get_platform_stats_rows(self, start_time=None):
+        """Get hourly platform statistics rows ordered by timestamp."""
+        query = (
+            "SELECT timestamp, platform_id, platform_type, count FROM platform_stats"
+        )
+        params = {}
+        if start_time is not None:
+            query += " WHERE timestamp >= :start_time"
+            params["start_time"] = start_time
+        query += " ORDER BY timestamp"
+        async with self.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(text(query), params)
+            return [
+                (
+                    timestamp
+                    if isinstance(timestamp, datetime)
+                    else datetime.fromisoformat(timestamp),
+                    platform_id,
+                    platform_type,
+                    count,
+                )
+                for timestamp, platform_id, platform_type, count in result.all()
+            ]
+
+    async def get_platform_stats_total(self) -> int:
+        """Get the total message count across all platform statistics."""
+        async with self.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                text("SELECT COALESCE(SUM(count), 0) FROM platform_stats"),
+            )
+            return int(result.scalar_one())
+
     async def count_platform_stats(self) -> int:
         """Count the number of platform statistics records."""
         async with self.get_db() as session:
@@ -231,15 +311,23 @@ class SQLiteDatabase(BaseDatabase):
             # order by
             query = query.order_by(desc(ConversationV2.created_at))
             result = await session.execute(query)
+            conversations = result.scalars().all()
+            contents = await self._select_contents_for(session, conversations)
+        return self._fill_contents(conversations, contents)
 
-            return result.scalars().all()
-
-    async def get_conversation_by_id(self, cid):
+    async def get_conversation_by_id(self, cid, load_messages=True):
         async with self.get_db() as session:
             session: AsyncSession
             query = select(ConversationV2).where(ConversationV2.conversation_id == cid)
             result = await session.execute(query)
-            return result.scalar_one_or_none()
+            conv = result.scalar_one_or_none()
+            messages = None
+            if load_messages and conv is not None and conv.content is None:
+                messages, _ = await self._select_conversation_messages(session, cid)
+        if messages is not None:
+            # 消息存储在 conversation_messages 中，仅填充到返回对象上，不写回
+            conv.content = messages
+        return conv
 
     async def get_all_conversations(self, page=1, page_size=20):
         async with self.get_db() as session:
@@ -251,7 +339,9 @@ class SQLiteDatabase(BaseDatabase):
                 .offset(offset)
                 .limit(page_size),
             )
-            return result.scalars().all()
+            conversations = result.scalars().all()
+            contents = await self._select_contents_for(session, conversations)
+        return self._fill_contents(conversations, contents)
 
     async def get_filtered_conversations(
         self,
@@ -276,6 +366,13 @@ class SQLiteDatabase(BaseDatabase):
                     or_(
                         col(ConversationV2.title).ilike(f"%{search_query}%"),
                         col(ConversationV2.content).ilike(f"%{search_query}%"),
+                        col(ConversationV2.conversation_id).in_(
+                            select(ConversationMessage.conversation_id).where(
+                                col(ConversationMessage.content).ilike(
+                                    f"%{search_query}%"
+                                ),
+                            ),
+                        ),
                         col(ConversationV2.user_id).ilike(f"%{search_query}%"),
                         col(ConversationV2.conversation_id).ilike(f"%{search_query}%"),
                     ),
@@ -304,8 +401,43 @@ class SQLiteDatabase(BaseDatabase):
             )
             result = await session.execute(result_query)
             conversations = result.scalars().all()
+            contents = await self._select_contents_for(session, conversations)
+        return self._fill_contents(conversations, contents), total
+
+    async def _select_contents_for(
+        self,
+        session: AsyncSession,
+        conversations,
+    ) -> dict[str, list[dict]]:
+        """批量读取已迁移到 conversation_messages 的对话的完整历史"""
+        cids = [conv.conversation_id for conv in conversations if conv.content is None]
+        if not cids:
+            return {}
+        contents: dict[str, list[dict]] = {cid: [] for cid in cids}
+        # 分批查询，避免超出 SQLite 的参数数量上限
+        for i in range(0, len(cids), 500):
+            result = await session.execute(
+                select(
+                    ConversationMessage.conversation_id,
+                    ConversationMessage.content,
+                )
+                .where(col(ConversationMessage.conversation_id).in_(cids[i : i + 500]))
+                .order_by(
+                    col(ConversationMessage.conversation_id),
+                    col(ConversationMessage.seq),
+                ),
+            )
+            for row in result.all():
+                contents[row.conversation_id].append(row.content)
+        return contents
 
-            return conversations, total
+    @staticmethod
+    def _fill_contents(conversations, contents: dict[str, list[dict]]) -> list:
+        # 仅填充到返回对象上，不写回
+        for conv in conversations:
+            if conv.conversation_id in contents:
+                conv.content = contents[conv.conversation_id]
+        return list(conversations)
 
     async def create_conversation(
         self,
@@ -330,43 +462,288 @@ class SQLiteDatabase(BaseDatabase):
             async with session.begin():
                 new_conversation = ConversationV2(
                     user_id=user_id,
-                    content=content or [],
+                    content=None,
                     platform_id=platform_id,
                     title=title,
                     persona_id=persona_id,
                     **kwargs,
                 )
                 session.add(new_conversation)
-                return new_conversation
+                if content:
+                    await self._insert_conversation_messages(
+                        session,
+                        new_conversation.conversation_id,
+                        content,
+                        start_seq=0,
+                    )
+        new_conversation.content = list(content or [])
+        return new_conversation
 
     async def update_conversation(
-        self, cid, title=None, persona_id=None, content=None, token_usage=None
+        self,
+        cid,
+        title=None,
+        persona_id=None,
+        content=None,
+        token_usage=None,
+        content_offset=0,
     ):
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
-                query = update(ConversationV2).where(
-                    col(ConversationV2.conversation_id) == cid,
-                )
                 values = {}
+                if content is not None:
+                    if not await self._migrate_legacy_content(session, cid):
+                        return None
+                    await self._replace_conversation_messages(
+                        session,
+                        cid,
+                        content,
+                        content_offset,
+                    )
+                    values["updated_at"] = datetime.now(timezone.utc)
                 if title is not None:
                     values["title"] = title
                 if persona_id is not None:
                     values["persona_id"] = persona_id
-                if content is not None:
-                    values["content"] = content
                 if token_usage is not None:
                     values["token_usage"] = token_usage
                 if not values:
                     return None
-                query = query.values(**values)
-                await session.execute(query)
-        return await self.get_conversation_by_id(cid)
+                await session.execute(
+                    update(ConversationV2)
+                    .where(col(ConversationV2.conversation_id) == cid)
+                    .values(**values),
+                )
+
+    async def get_conversation_messages(self, cid, max_turns=None, dequeue_turns=1):
+        async with self.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                select(ConversationV2.content).where(
+                    col(ConversationV2.conversation_id) == cid,
+                ),
+            )
+            legacy = result.first()
+            if legacy is not None and legacy[0] is not None:
+                messages = legacy[0]
+                if max_turns and max_turns > 0:
+                    total = sum(
+                        1
+                        for m in messages
+                        if isinstance(m, dict) and m.get("role") == "user"
+                    )
+                    start = last_turns_start(
+                        messages, window_turns(total, max_turns, dequeue_turns)
+                    )
+                else:
+                    start = 0
+                return messages[start:], start
+            return await self._select_conversation_messages(
+                session, cid, max_turns, dequeue_turns
+            )
+
+    async def append_conversation_messages(self, cid, messages):
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                if not await self._migrate_legacy_content(session, cid):
+                    raise ValueError(f"Conversation with id {cid} not found")
+                result = await session.execute(
+                    select(func.max(ConversationMessage.seq)).where(
+                        col(ConversationMessage.conversation_id) == cid,
+                    ),
+                )
+                last_seq = result.scalar_one_or_none()
+                rows = await self._insert_conversation_messages(
+                    session,
+                    cid,
+                    messages,
+                    start_seq=0 if last_seq is None else last_seq + 1,
+                )
+                await session.execute(
+                    update(ConversationV2)
+                    .where(col(ConversationV2.conversation_id) == cid)
+                    .values(updated_at=datetime.now(timezone.utc)),
+                )
+                return rows
+
+    async def _select_conversation_messages(
+        self,
+        session: AsyncSession,
+        cid: str,
+        max_turns: int | None = None,
+        dequeue_turns: int = 1,
+    ) -> tuple[list[dict], int]:
+        query = select(ConversationMessage.seq, ConversationMessage.content).where(
+            col(ConversationMessage.conversation_id) == cid,
+        )
+        if max_turns and max_turns > 0:
+            result = await session.execute(
+                select(func.count()).where(
+                    col(ConversationMessage.conversation_id) == cid,
+                    col(ConversationMessage.role) == "user",
+                ),
+            )
+            turns = window_turns(result.scalar_one(), max_turns, dequeue_turns)
+            # 窗口从倒数第 turns 条用户消息开始
+            result = await session.execute(
+                select(ConversationMessage.seq)
+                .where(
+                    col(ConversationMessage.conversation_id) == cid,
+                    col(ConversationMessage.role) == "user",
+                )
+                .order_by(desc(ConversationMessage.seq))
+                .offset(max(turns, 1) - 1)
+                .limit(1),
+            )
+            start_seq = result.scalar_one_or_none()
+            if start_seq is not None:
+                query = query.where(col(ConversationMessage.seq) >= start_seq)
+        result = await session.execute(query.order_by(col(ConversationMessage.seq)))
+        rows = result.all()
+        if not rows:
+            return [], 0
+        return [row.content for row in rows], rows[0].seq
+
+    async def _insert_conversation_messages(
+        self,
+        session: AsyncSession,
+        cid: str,
+        messages: list[dict],
+        start_seq: int,
+    ) -> list[ConversationMessage]:
+        now = datetime.now(timezone.utc)
+        rows = [
+            ConversationMessage(
+                conversation_id=cid,
+                seq=start_seq + idx,
+                role=str(message.get("role", "")),
+                content=message,
+                content_hash=_hash_message(message),
+                token_count=_estimate_message_tokens(message),
+                created_at=now,
+            )
+            for idx, message in enumerate(messages)
+        ]
+        session.add_all(rows)
+        await session.flush()
+        return rows
+
+    async def _migrate_legacy_content(self, session: AsyncSession, cid: str) -> bool:
+        """Move the legacy JSON history of a conversation into conversation_messages.
+
+        Returns False if the conversation does not exist.
+        """
+        result = await session.execute(
+            select(ConversationV2.content).where(
+                col(ConversationV2.conversation_id) == cid,
+            ),
+        )
+        row = result.first()
+        if row is None:
+            return False
+        if row[0] is None:
+            return True
+        await session.execute(
+            delete(ConversationMessage).where(
+                col(ConversationMessage.conversation_id) == cid,
+            ),
+        )
+        await self._insert_conversation_messages(session, cid, row[0], start_seq=0)
+        await session.execute(
+            update(ConversationV2)
+            .where(col(ConversationV2.conversation_id) == cid)
+            .values(content=null()),
+        )
+        return True
+
+    async def _replace_conversation_messages(
+        self,
+        session: AsyncSession,
+        cid: str,
+        messages: list[dict],
+        offset: int,
+    ) -> None:
+        """Make the messages from sequence number `offset` on equal to `messages`.
+
+        Only the difference is written: the longest run of stored messages
+        that `messages` starts with is kept, messages dropped from the front
+        (e.g. by context truncation) or replaced at the end are deleted, and
+        the rest is appended.
+        """
+        result = await session.execute(
+            select(ConversationMessage.seq, ConversationMessage.content_hash)
+            .where(
+                col(ConversationMessage.conversation_id) == cid,
+                col(ConversationMessage.seq) >= offset,
+            )
+            .order_by(col(ConversationMessage.seq)),
+        )
+        stored = result.all()
+        hashes = [_hash_message(message) for message in messages]
+
+        head = 0
+        if stored and hashes and stored[0].content_hash != hashes[0]:
+            head = next(
+                (
+                    idx
+                    for idx, row in enumerate(stored)
+                    if row.content_hash == hashes[0]
+                ),
+                0,
+            )
+        common = 0
+        while (
+            head + common < len(stored)
+            and common < len(hashes)
+            and stored[head + common].content_hash == hashes[common]
+        ):
+            common += 1
+        if not common:
+            head = 0
+
+        msg_cid = col(ConversationMessage.conversation_id) == cid
+        msg_seq = col(ConversationMessage.seq)
+        if head:
+            await session.execute(
+                delete(ConversationMessage).where(
+                    msg_cid,
+                    msg_seq >= offset,
+                    msg_seq < stored[head].seq,
+                ),
+            )
+        if head + common < len(stored):
+            await session.execute(
+                delete(ConversationMessage).where(
+                    msg_cid,
+                    msg_seq >= stored[head + common].seq,
+                ),
+            )
+        if common == len(messages):
+            return
+        if common:
+            next_seq = stored[head + common - 1].seq + 1
+        elif stored:
+            next_seq = stored[0].seq
+        else:
+            next_seq = offset
+        await self._insert_conversation_messages(
+            session,
+            cid,
+            messages[common:],
+            start_seq=next_seq,
+        )
 
     async def delete_conversation(self, cid) -> None:
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
+                await session.execute(
+                    delete(ConversationMessage).where(
+                        col(ConversationMessage.conversation_id) == cid,
+                    ),
+                )
                 await session.execute(
                     delete(ConversationV2).where(
                         col(ConversationV2.conversation_id) == cid,
@@ -377,6 +754,15 @@ class SQLiteDatabase(BaseDatabase):
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
+                await session.execute(
+                    delete(ConversationMessage).where(
+                        col(ConversationMessage.conversation_id).in_(
+                            select(ConversationV2.conversation_id).where(
+                                col(ConversationV2.user_id) == user_id
+                            ),
+                        ),
+                    ),
+                )
                 await session.execute(
                     delete(ConversationV2).where(
                         col(ConversationV2.user_id) == user_id
@@ -1012,29 +1398,63 @@ class SQLiteDatabase(BaseDatabase):
                             .values(sort_order=sort_order)
                         )
 
+    @staticmethod
+    def _preference_upsert(rows: list[dict]):
+        """INSERT ... ON CONFLICT(scope, scope_id, key) DO UPDATE"""
+        stmt = sqlite_insert(Preference).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=["scope", "scope_id", "key"],
+            set_={
+                "value": stmt.excluded.value,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+
     async def insert_preference_or_update(self, scope, scope_id, key, value):
         """Insert a new preference record or update if it exists."""
+        now = datetime.now(timezone.utc)
+        row = {
+            "scope": scope,
+            "scope_id": scope_id,
+            "key": key,
+            "value": value,
+            "created_at": now,
+            "updated_at": now,
+        }
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
-                query = select(Preference).where(
-                    Preference.scope == scope,
-                    Preference.scope_id == scope_id,
-                    Preference.key == key,
-                )
-                result = await session.execute(query)
-                existing_preference = result.scalar_one_or_none()
-                if existing_preference:
-                    existing_preference.value = value
-                else:
-                    new_preference = Preference(
-                        scope=scope,
-                        scope_id=scope_id,
-                        key=key,
-                        value=value,
+                result = await session.execute(
+                    self._preference_upsert([row]).returning(Preference),
+                )
+                return result.scalar_one()
+
+    async def insert_preferences_or_update(self, items) -> None:
+        """Batch insert or update preference records in a single transaction."""
+        if not items:
+            return
+        now = datetime.now(timezone.utc)
+        # 同一批次内的重复键以最后一次写入为准
+        rows = {
+            (scope, scope_id, key): {
+                "scope": scope,
+                "scope_id": scope_id,
+                "key": key,
+                "value": value,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for scope, scope_id, key, value in items
+        }
+        rows_list = list(rows.values())
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                # 每行 6 个绑定参数, 控制在旧版 SQLite 的 999 个参数上限以内
+                for i in range(0, len(rows_list), 150):
+                    await session.execute(
+                        self._preference_upsert(rows_list[i : i + 150]),
                     )
-                    session.add(new_preference)
-                return existing_preference or new_preference
 
     async def get_preference(self, scope, scope_id, key):
         """Get a preference by key."""
@@ -32,11 +32,15 @@ class BaseVecDB:
         tasks_limit: int = 3,
         max_retries: int = 3,
         progress_callback=None,
+        checkpoint_callback=None,
+        reuse_vectors: bool = False,
     ) -> int:
         """批量插入文本和其对应向量，自动生成 ID 并保持一致性。
 
         Args:
             progress_callback: 进度回调函数，接收参数 (current, total)
+            checkpoint_callback: 每批写入完成后调用，接收参数 (completed, int_ids)
+            reuse_vectors: 复用库中内容相同的文本的向量
 
         """
         ...
@@ -3,13 +3,16 @@ import os
 from contextlib import asynccontextmanager
 from datetime import datetime
 
-from sqlalchemy import Column, Text
+from sqlalchemy import Column, Text, delete, literal_column
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import Field, MetaData, SQLModel, col, func, select, text
 
 from astrbot.core import logger
 
+_CONTENT_HASH_EXPR = "json_extract(metadata, '$.content_hash')"
+"""与表达式索引 idx_documents_content_hash 完全一致, 查询时才能命中索引"""
+
 
 class BaseDocModel(SQLModel, table=False):
     metadata = MetaData()
@@ -78,6 +81,14 @@ class DocumentStorage:
             except BaseException:
                 pass
 
+            # 按内容哈希查找已有的块以复用其向量, 见 get_ids_by_content_hashes
+            await conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS idx_documents_content_hash "
+                    f"ON documents({_CONTENT_HASH_EXPR})",
+                ),
+            )
+
             await conn.commit()
 
     async def connect(self) -> None:
@@ -228,6 +239,48 @@ class DocumentStorage:
             if document:
                 await session.delete(document)
 
+    async def delete_documents_by_ids(self, ids: list[int]) -> None:
+        """Delete documents by their integer IDs.
+
+        Args:
+            ids (list[int]): The integer IDs of the documents to delete.
+
+        """
+        assert self.engine is not None, "Database connection is not initialized."
+
+        async with self.get_session() as session, session.begin():
+            # SQLite 参数上限为 999，分片删除避免超限
+            for i in range(0, len(ids), 900):
+                await session.execute(
+                    delete(Document).where(col(Document.id).in_(ids[i : i + 900])),
+                )
+
+    async def get_ids_by_content_hashes(self, hashes: list[str]) -> dict[str, int]:
+        """Find stored documents by the ``content_hash`` in their metadata.
+
+        Args:
+            hashes (list[str]): The content hashes to look up.
+
+        Returns:
+            dict[str, int]: Maps each found hash to the integer ID of one
+                document carrying it.
+
+        """
+        assert self.engine is not None, "Database connection is not initialized."
+
+        found: dict[str, int] = {}
+        content_hash = literal_column(_CONTENT_HASH_EXPR)
+        async with self.get_session() as session:
+            for i in range(0, len(hashes), 900):
+                query = (
+                    select(content_hash, func.min(Document.id))
+                    .where(content_hash.in_(hashes[i : i + 900]))
+                    .group_by(content_hash)
+                )
+                result = await session.execute(query)
+                found.update({row[0]: row[1] for row in result.all()})
+        return found
+
     async def get_document_by_doc_id(self, doc_id: str):
         """Retrieve a document by its doc_id.
 
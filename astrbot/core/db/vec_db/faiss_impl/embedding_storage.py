@@ -4,21 +4,279 @@ except ModuleNotFoundError:
     raise ImportError(
         "faiss 未安装。请使用 'pip install faiss-cpu' 或 'pip install faiss-gpu' 安装。",
     )
+import asyncio
+import functools
+import json
+import math
 import os
+import struct
+import time
+from contextlib import asynccontextmanager
 
 import numpy as np
 
+from astrbot import logger
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq", "ivf_sq8")
+"""支持的索引类型"""
+TRAINED_INDEX_TYPES = ("ivf_flat", "ivf_pq", "ivf_sq8")
+"""需要训练的索引类型。向量数量不足时先使用 flat 索引，数量足够后再迁移。"""
+MIN_TRAIN_VECTORS = 1000
+"""训练 IVF 类索引所需的最少向量数量"""
+HNSW_COMPACT_RATIO = 0.2
+"""HNSW 不支持物理删除，已删除向量占比超过该值时重建索引"""
+
+_WAL_OP_ADD = 1
+_WAL_OP_REMOVE = 2
+_WAL_OP_TOMBSTONE = 3
+_WAL_HEADER = struct.Struct("<BI")
+
+
+def normalize_index_params(index_type: str, params: dict | None = None) -> dict:
+    """校验索引类型并补全参数默认值
+
+    参数:
+    - ivf_*: nlist (聚类中心数，0 表示按向量数自动计算), nprobe (检索时探查的聚类数)
+    - hnsw: m (每个节点的邻居数), ef_construction, ef_search
+    - ivf_pq: pq_m (子量化器数量，需整除向量维度), pq_nbits
+
+    Raises:
+        ValueError: 索引类型不受支持
+
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(
+            f"不支持的索引类型: {index_type}, 可选: {', '.join(INDEX_TYPES)}"
+        )
+    params = dict(params or {})
+    if index_type in TRAINED_INDEX_TYPES:
+        params.setdefault("nlist", 0)
+        params.setdefault("nprobe", 16)
+    if index_type == "hnsw":
+        params.setdefault("m", 32)
+        params.setdefault("ef_construction", 200)
+        params.setdefault("ef_search", 64)
+    if index_type == "ivf_pq":
+        params.setdefault("pq_m", 0)
+        params.setdefault("pq_nbits", 8)
+    return params
+
+
+def min_train_size(index_type: str, params: dict) -> int:
+    """返回该索引类型训练所需的最少向量数量, 不需要训练时返回 0"""
+    if index_type not in TRAINED_INDEX_TYPES:
+        return 0
+    # faiss 建议每个聚类中心至少 39 个训练样本
+    return max(MIN_TRAIN_VECTORS, 39 * int(params.get("nlist") or 0))
+
+
+def build_index(
+    dimension: int, index_type: str, params: dict, n_vectors: int = 0
+) -> "faiss.Index":
+    """创建一个空的 (未训练的) FAISS 索引
+
+    flat 与 hnsw 使用 IndexIDMap 包装以支持自定义 ID；IVF 类索引原生支持自定义 ID，
+    并且 IndexIDMap 在 IVF 上删除向量后会导致 ID 映射错乱，因此不做包装。
+    """
+    if index_type == "flat":
+        return faiss.IndexIDMap(faiss.IndexFlatL2(dimension))
+    if index_type == "hnsw":
+        inner = faiss.IndexHNSWFlat(dimension, int(params["m"]))
+        inner.hnsw.efConstruction = int(params["ef_construction"])
+        inner.hnsw.efSearch = int(params["ef_search"])
+        return faiss.IndexIDMap(inner)
+
+    nlist = int(params.get("nlist") or 0)
+    if nlist <= 0:
+        nlist = max(1, min(int(4 * math.sqrt(max(n_vectors, 1))), n_vectors // 39))
+    if index_type == "ivf_flat":
+        desc = f"IVF{nlist},Flat"
+    elif index_type == "ivf_sq8":
+        desc = f"IVF{nlist},SQ8"
+    else:
+        pq_m = int(params.get("pq_m") or 0)
+        if pq_m <= 0:
+            pq_m = next(m for m in (64, 48, 32, 16, 8, 4, 2, 1) if dimension % m == 0)
+        if dimension % pq_m != 0:
+            raise ValueError(f"pq_m={pq_m} 无法整除向量维度 {dimension}")
+        desc = f"IVF{nlist},PQ{pq_m}x{int(params['pq_nbits'])}"
+    index = faiss.index_factory(dimension, desc)
+    faiss.extract_index_ivf(index).nprobe = int(params["nprobe"])
+    return index
+
+
+def detect_index_type(index: "faiss.Index") -> str:
+    """根据索引结构判断索引类型"""
+    if isinstance(index, faiss.IndexIDMap):
+        inner = faiss.downcast_index(index.index)
+        return "hnsw" if isinstance(inner, faiss.IndexHNSW) else "flat"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFScalarQuantizer):
+        return "ivf_sq8"
+    return "ivf_flat"
+
+
+def reconstruct_vectors(index: "faiss.Index") -> tuple[np.ndarray, np.ndarray]:
+    """从任意受支持的索引中取出所有 (ID, 向量)
+
+    对于 PQ/SQ 等有损索引，取出的是近似向量。
+    """
+    if isinstance(index, faiss.IndexIDMap):
+        ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+        inner = faiss.downcast_index(index.index)
+        if inner.ntotal == 0:
+            return ids, np.zeros((0, index.d), dtype=np.float32)
+        return ids, inner.reconstruct_n(0, inner.ntotal)
+
+    # 逐条按倒排表偏移重建, 不修改索引本身 (无需 direct map), 可与检索并发执行
+    ivf = faiss.extract_index_ivf(index)
+    invlists = ivf.invlists
+    ids = np.empty(ivf.ntotal, dtype=np.int64)
+    vectors = np.empty((ivf.ntotal, index.d), dtype=np.float32)
+    row = 0
+    for list_no in range(ivf.nlist):
+        size = invlists.list_size(list_no)
+        if not size:
+            continue
+        ids[row : row + size] = faiss.rev_swig_ptr(invlists.get_ids(list_no), size)
+        for offset in range(size):
+            ivf.reconstruct_from_offset(
+                list_no, offset, faiss.swig_ptr(vectors[row + offset])
+            )
+        row += size
+    return ids[:row], vectors[:row]
+
+
+def reconstruct_by_ids(
+    index: "faiss.Index", ids: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """取出指定 ID 的 (ID, 向量), 索引中不存在的 ID 会被忽略
+
+    对于 PQ/SQ 等有损索引，取出的是近似向量。
+    """
+    if isinstance(index, faiss.IndexIDMap):
+        all_ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+        positions = np.flatnonzero(np.isin(all_ids, ids))
+        inner = faiss.downcast_index(index.index)
+        vectors = np.empty((len(positions), index.d), dtype=np.float32)
+        for row, pos in enumerate(positions):
+            vectors[row] = inner.reconstruct(int(pos))
+        return all_ids[positions], vectors
+
+    ivf = faiss.extract_index_ivf(index)
+    invlists = ivf.invlists
+    found: list[int] = []
+    rows: list[np.ndarray] = []
+    for list_no in range(ivf.nlist):
+        size = invlists.list_size(list_no)
+        if not size:
+            continue
+        list_ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), size)
+        for offset in np.flatnonzero(np.isin(list_ids, ids)):
+            vector = np.empty(index.d, dtype=np.float32)
+            ivf.reconstruct_from_offset(list_no, int(offset), faiss.swig_ptr(vector))
+            found.append(int(list_ids[offset]))
+            rows.append(vector)
+    return (
+        np.array(found, dtype=np.int64),
+        np.array(rows, dtype=np.float32).reshape(len(rows), index.d),
+    )
+
 
 class EmbeddingStorage:
-    def __init__(self, dimension: int, path: str | None = None) -> None:
+    """FAISS 向量存储
+
+    写入采用 write-behind 策略: 每次变更先追加到 ``<path>.wal`` 增量日志并落盘,
+    再修改内存中的索引; 完整索引文件只在变更累积到 ``flush_threshold`` 个向量,
+    或距首次未保存的变更超过 ``flush_interval`` 秒时在线程中原子地重写一次。
+    initialize() 会先加载索引文件, 再重放增量日志, 因此两次保存之间崩溃也不会丢失数据。
+    指定了 path 时, 使用前需要先调用 initialize()。
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        path: str | None = None,
+        index_type: str = "flat",
+        index_params: dict | None = None,
+        flush_interval: float = 10.0,
+        flush_threshold: int = 5000,
+    ) -> None:
         self.dimension = dimension
         self.path = path
         self.index = None
-        if path and os.path.exists(path):
-            self.index = faiss.read_index(path)
+        # 期望的索引配置
+        self.index_type = index_type
+        self.index_params = normalize_index_params(index_type, index_params)
+        # 磁盘上索引的实际配置, 与期望配置不同时需要迁移
+        self.current_type = "flat"
+        self.current_params = normalize_index_params("flat")
+        self.tombstones: set[int] = set()
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._lock = asyncio.Lock()
+        self._dirty = 0
+        self._flush_task: asyncio.Task | None = None
+        self._flush_now = asyncio.Event()
+        # 检索在线程池中执行, 写操作需要等待进行中的检索结束
+        self._readers = 0
+        self._no_readers = asyncio.Event()
+        self._no_readers.set()
+        self._no_writer = asyncio.Event()
+        self._no_writer.set()
+
+        if not path:
+            # 纯内存索引无需加载
+            self.index = build_index(dimension, "flat", self.current_params)
+            self._apply_search_params()
+
+    async def initialize(self) -> None:
+        """加载索引文件并重放增量日志
+
+        读写文件与序列化索引都是阻塞操作, 在线程中执行。
+        """
+        if self.index is None:
+            await asyncio.to_thread(self._load)
+
+    def _load(self) -> None:
+        assert self.path is not None
+        if os.path.exists(self.path):
+            self.index = faiss.read_index(self.path)
+            self.current_type = detect_index_type(self.index)
+            self.current_params = normalize_index_params(self.current_type)
+            self._load_meta()
         else:
-            base_index = faiss.IndexFlatL2(dimension)
-            self.index = faiss.IndexIDMap(base_index)
+            self.index = build_index(self.dimension, "flat", self.current_params)
+        self._apply_search_params()
+        if self._replay_wal():
+            self._write_snapshot()
+
+    @property
+    def meta_path(self) -> str | None:
+        return f"{self.path}.meta.json" if self.path else None
+
+    @property
+    def wal_path(self) -> str | None:
+        return f"{self.path}.wal" if self.path else None
+
+    def configure(self, index_type: str, index_params: dict | None = None) -> None:
+        """设置期望的索引配置, 实际迁移需要调用 rebuild"""
+        self.index_params = normalize_index_params(index_type, index_params)
+        self.index_type = index_type
+
+    def needs_rebuild(self) -> bool:
+        """当前索引是否需要迁移到期望的索引配置"""
+        assert self.index is not None, "FAISS index is not initialized."
+        if len(self.tombstones) > HNSW_COMPACT_RATIO * max(self.index.ntotal, 1):
+            return True
+        if (self.current_type, self.current_params) == (
+            self.index_type,
+            self.index_params,
+        ):
+            return False
+        live = self.index.ntotal - len(self.tombstones)
+        return live >= min_train_size(self.index_type, self.index_params)
 
     async def insert(self, vector: np.ndarray, id: int) -> None:
         """插入向量
@@ -35,8 +293,7 @@ class EmbeddingStorage:
             raise ValueError(
                 f"向量维度不匹配, 期望: {self.dimension}, 实际: {vector.shape[0]}",
             )
-        self.index.add_with_ids(vector.reshape(1, -1), np.array([id]))
-        await self.save_index()
+        await self.insert_batch(vector.reshape(1, -1), [id])
 
     async def insert_batch(self, vectors: np.ndarray, ids: list[int]) -> None:
         """批量插入向量
@@ -53,8 +310,13 @@ class EmbeddingStorage:
             raise ValueError(
                 f"向量维度不匹配, 期望: {self.dimension}, 实际: {vectors.shape[1]}",
             )
-        self.index.add_with_ids(vectors, np.array(ids))
-        await self.save_index()
+        id_array = np.array(ids, dtype=np.int64)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        async with self._lock:
+            await self._append_wal(_WAL_OP_ADD, id_array, vectors)
+            async with self._exclusive():
+                self.index.add_with_ids(vectors, id_array)
+            self._mark_dirty(len(id_array))
 
     async def search(self, vector: np.ndarray, k: int) -> tuple:
         """搜索最相似的向量
@@ -68,8 +330,57 @@ class EmbeddingStorage:
         """
         assert self.index is not None, "FAISS index is not initialized."
         faiss.normalize_L2(vector)
-        distances, indices = self.index.search(vector, k)
-        return distances, indices
+        index = self.index
+        if self.tombstones:
+            selector = faiss.IDSelectorNot(
+                faiss.IDSelectorBatch(np.fromiter(self.tombstones, dtype=np.int64))
+            )
+            params = faiss.SearchParametersHNSW(
+                sel=selector, efSearch=int(self.current_params["ef_search"])
+            )
+            fn = functools.partial(index.search, vector, k, params=params)
+        else:
+            fn = functools.partial(index.search, vector, k)
+        return await self._run_reader(fn)
+
+    async def get_vectors(self, ids: list[int]) -> dict[int, np.ndarray]:
+        """按 ID 取出已存储的向量, 不存在或已删除的 ID 不会出现在结果中"""
+        assert self.index is not None, "FAISS index is not initialized."
+        wanted = np.array(
+            [i for i in ids if i not in self.tombstones],
+            dtype=np.int64,
+        )
+        if not len(wanted):
+            return {}
+        found, vectors = await self._run_reader(
+            functools.partial(reconstruct_by_ids, self.index, wanted),
+        )
+        return {int(i): vector for i, vector in zip(found, vectors)}
+
+    async def _run_reader(self, fn):
+        """在线程池中执行只读操作, 与写操作互斥"""
+        await self._no_writer.wait()
+        self._readers += 1
+        self._no_readers.clear()
+        fut = asyncio.get_running_loop().run_in_executor(None, fn)
+        fut.add_done_callback(self._release_reader)
+        # 调用方被取消时线程仍在运行, 读计数只在线程结束后释放
+        return await asyncio.shield(fut)
+
+    def _release_reader(self, _fut) -> None:
+        self._readers -= 1
+        if not self._readers:
+            self._no_readers.set()
+
+    @asynccontextmanager
+    async def _exclusive(self):
+        """等待进行中的检索结束, 并阻止新的检索, 用于原地修改索引"""
+        self._no_writer.clear()
+        try:
+            await self._no_readers.wait()
+            yield
+        finally:
+            self._no_writer.set()
 
     async def delete(self, ids: list[int]) -> None:
         """删除向量
@@ -80,16 +391,311 @@ class EmbeddingStorage:
         """
         assert self.index is not None, "FAISS index is not initialized."
         id_array = np.array(ids, dtype=np.int64)
-        self.index.remove_ids(id_array)
-        await self.save_index()
+        async with self._lock:
+            if self.current_type == "hnsw":
+                # HNSW 不支持物理删除, 先标记, 由重建时统一清理
+                await self._append_wal(_WAL_OP_TOMBSTONE, id_array)
+                self.tombstones.update(int(i) for i in id_array)
+            else:
+                await self._append_wal(_WAL_OP_REMOVE, id_array)
+                async with self._exclusive():
+                    self.index.remove_ids(id_array)
+            self._mark_dirty(len(id_array))
 
-    async def save_index(self) -> None:
-        """保存索引
+    async def rebuild(
+        self,
+        index_type: str | None = None,
+        index_params: dict | None = None,
+    ) -> None:
+        """重建索引, 用于切换索引类型、训练 IVF 索引或清理 HNSW 中已删除的向量
+
+        训练与构建在线程中执行, 期间旧索引仍可正常检索, 写操作会等待重建完成。
 
         Args:
-            path (str): 保存索引的路径
+            index_type: 新的索引类型, 为空时使用当前期望的索引类型
+            index_params: 新的索引参数
 
         """
-        if self.index is None:
+        if index_type is not None:
+            self.configure(index_type, index_params)
+
+        async with self._lock:
+            start = time.time()
+            old_index = self.index
+            target_type, target_params = self.index_type, self.index_params
+            tombstones = set(self.tombstones)
+
+            def _build():
+                ids, vectors = reconstruct_vectors(old_index)
+                if tombstones:
+                    mask = ~np.isin(ids, np.fromiter(tombstones, dtype=np.int64))
+                    ids, vectors = ids[mask], vectors[mask]
+                build_type = target_type
+                if len(ids) < min_train_size(target_type, target_params):
+                    # 向量不足以训练, 暂时保持 flat 索引
+                    build_type = "flat"
+                build_params = (
+                    target_params
+                    if build_type == target_type
+                    else normalize_index_params("flat")
+                )
+                new_index = build_index(
+                    self.dimension, build_type, build_params, len(ids)
+                )
+                if not new_index.is_trained:
+                    new_index.train(vectors)
+                if len(ids):
+                    new_index.add_with_ids(vectors, ids)
+                return new_index, build_type, build_params
+
+            new_index, build_type, build_params = await asyncio.to_thread(_build)
+            self.index = new_index
+            self.current_type = build_type
+            self.current_params = build_params
+            self.tombstones = set()
+            self._apply_search_params()
+            await self._flush_locked()
+            logger.info(
+                f"FAISS 索引已重建为 {build_type} ({new_index.ntotal} 个向量), "
+                f"耗时 {time.time() - start:.2f}s",
+            )
+
+    async def evaluate(self, sample_size: int = 100, k: int = 10) -> dict:
+        """生成召回率与延迟报告
+
+        从已存储的向量中采样作为查询, 以精确的 flat 检索结果为基准计算 recall@k,
+        并比较当前索引与 flat 索引的平均检索延迟和内存占用。
+        """
+        assert self.index is not None, "FAISS index is not initialized."
+        index = self.index
+        tombstones = set(self.tombstones)
+
+        def _evaluate() -> dict:
+            ids, vectors = reconstruct_vectors(index)
+            if tombstones:
+                mask = ~np.isin(ids, np.fromiter(tombstones, dtype=np.int64))
+                ids, vectors = ids[mask], vectors[mask]
+            report = {
+                "index_type": self.current_type,
+                "index_params": self.current_params,
+                "target_index_type": self.index_type,
+                "ntotal": int(len(ids)),
+                "k": k,
+            }
+            if not len(ids):
+                return report
+
+            rng = np.random.default_rng(0)
+            sample = rng.choice(
+                len(ids), size=min(sample_size, len(ids)), replace=False
+            )
+            queries = np.ascontiguousarray(vectors[sample], dtype=np.float32)
+            faiss.normalize_L2(queries)
+
+            flat = faiss.IndexIDMap(faiss.IndexFlatL2(self.dimension))
+            flat.add_with_ids(vectors, ids)
+            t0 = time.perf_counter()
+            _, truth = flat.search(queries, k)
+            flat_latency = (time.perf_counter() - t0) / len(queries)
+
+            t0 = time.perf_counter()
+            if tombstones:
+                params = faiss.SearchParametersHNSW(
+                    sel=faiss.IDSelectorNot(
+                        faiss.IDSelectorBatch(np.fromiter(tombstones, dtype=np.int64))
+                    ),
+                    efSearch=int(self.current_params["ef_search"]),
+                )
+                _, found = index.search(queries, k, params=params)
+            else:
+                _, found = index.search(queries, k)
+            latency = (time.perf_counter() - t0) / len(queries)
+
+            hits = sum(
+                len(set(t[t != -1]) & set(f[f != -1])) for t, f in zip(truth, found)
+            )
+            expected = sum(int((t != -1).sum()) for t in truth)
+            report.update(
+                {
+                    "recall": hits / expected if expected else 1.0,
+                    "latency_ms": latency * 1000,
+                    "flat_latency_ms": flat_latency * 1000,
+                    "memory_bytes": int(faiss.serialize_index(index).nbytes),
+                    "flat_memory_bytes": int(faiss.serialize_index(flat).nbytes),
+                }
+            )
+            return report
+
+        # 取出向量期间不允许写入, 保证报告基于同一份数据
+        async with self._lock:
+            return await asyncio.to_thread(_evaluate)
+
+    async def save_index(self) -> None:
+        """立即将索引完整写入磁盘"""
+        async with self._lock:
+            await self._flush_locked()
+
+    async def flush(self) -> None:
+        """将未保存的变更写入索引文件, 没有变更时不做任何事"""
+        async with self._lock:
+            if self._dirty:
+                await self._flush_locked()
+
+    async def close(self) -> None:
+        """取消等待中的定时保存并写入所有未保存的变更"""
+        task = self._flush_task
+        self._flush_task = None
+        if task and not task.done():
+            task.cancel()
+        await self.flush()
+
+    def _mark_dirty(self, n: int) -> None:
+        if not self.path:
+            return
+        self._dirty += n
+        if self._dirty >= self.flush_threshold:
+            self._flush_now.set()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._flush_now.clear()
+        # 进入保存阶段后不再允许被 close() 取消, 之后的变更会创建新的定时任务
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"保存 FAISS 索引 {self.path} 失败: {e}")
+
+    async def _flush_locked(self) -> None:
+        if self.index is None or not self.path:
+            return
+        await asyncio.to_thread(self._write_snapshot)
+        self._dirty = 0
+
+    def _write_snapshot(self) -> None:
+        """原子地写入索引文件与元数据, 然后清空增量日志"""
+        assert self.path is not None
+        tmp_path = f"{self.path}.tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.path)
+        self._save_meta()
+        with open(self.wal_path, "wb"):  # type: ignore
+            pass
+
+    async def _append_wal(
+        self, op: int, ids: np.ndarray, vectors: np.ndarray | None = None
+    ) -> None:
+        if not self.wal_path:
+            return
+        payload = _WAL_HEADER.pack(op, len(ids)) + ids.astype("<i8").tobytes()
+        if vectors is not None:
+            payload += vectors.astype("<f4").tobytes()
+        await asyncio.to_thread(self._write_wal, payload)
+
+    def _write_wal(self, payload: bytes) -> None:
+        with open(self.wal_path, "ab") as f:  # type: ignore
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay_wal(self) -> int:
+        """重放增量日志中的变更, 返回重放的记录数
+
+        日志可能包含已经写入索引文件的变更 (保存后、清空日志前崩溃),
+        因此重放需要是幂等的。末尾不完整的记录 (追加时崩溃) 会被截掉,
+        否则之后追加的记录都会跟在它后面, 下次启动时无法重放。
+        """
+        wal_path = self.wal_path
+        if not wal_path or not os.path.exists(wal_path):
+            return 0
+        with open(wal_path, "rb") as f:
+            data = f.read()
+
+        existing: set[int] | None = None
+        if isinstance(self.index, faiss.IndexIDMap):
+            existing = set(faiss.vector_to_array(self.index.id_map).tolist())
+
+        replayed = 0
+        offset = 0
+        while offset + _WAL_HEADER.size <= len(data):
+            op, n = _WAL_HEADER.unpack_from(data, offset)
+            ids_end = offset + _WAL_HEADER.size + 8 * n
+            end = ids_end + (4 * n * self.dimension if op == _WAL_OP_ADD else 0)
+            if end > len(data):
+                break
+            ids = np.frombuffer(data[offset + _WAL_HEADER.size : ids_end], "<i8")
+            ids = ids.astype(np.int64)
+            if op == _WAL_OP_ADD:
+                vectors = np.frombuffer(data[ids_end:end], "<f4").astype(np.float32)
+                vectors = vectors.reshape(n, self.dimension)
+                if existing is not None:
+                    mask = np.array([int(i) not in existing for i in ids], dtype=bool)
+                    ids, vectors = ids[mask], vectors[mask]
+                    existing.update(ids.tolist())
+                else:
+                    self.index.remove_ids(ids)
+                if len(ids):
+                    self.index.add_with_ids(vectors, ids)
+            elif self.current_type == "hnsw":
+                # 重建过程中崩溃时, 日志中可能有切换索引类型之前的删除记录
+                self.tombstones.update(ids.tolist())
+            else:
+                self.index.remove_ids(ids)
+                if existing is not None:
+                    existing.difference_update(ids.tolist())
+            offset = end
+            replayed += 1
+
+        if offset < len(data):
+            logger.warning(f"FAISS 增量日志 {wal_path} 末尾记录不完整, 已截断")
+            with open(wal_path, "r+b") as f:
+                f.truncate(offset)
+                f.flush()
+                os.fsync(f.fileno())
+        if replayed:
+            logger.info(f"已从增量日志 {wal_path} 恢复 {replayed} 条 FAISS 索引变更")
+        return replayed
+
+    def _apply_search_params(self) -> None:
+        if self.current_type == "hnsw":
+            inner = faiss.downcast_index(self.index.index)
+            inner.hnsw.efSearch = int(self.current_params["ef_search"])
+        elif self.current_type in TRAINED_INDEX_TYPES:
+            faiss.extract_index_ivf(self.index).nprobe = int(
+                self.current_params["nprobe"]
+            )
+
+    def _load_meta(self) -> None:
+        meta_path = self.meta_path
+        if not meta_path or not os.path.exists(meta_path):
+            return
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            # 以索引文件的实际结构为准, 元数据只提供参数
+            if meta.get("index_type") == self.current_type:
+                self.current_params = normalize_index_params(
+                    self.current_type, meta.get("index_params")
+                )
+                self.tombstones = set(meta.get("tombstones", []))
+        except Exception as e:
+            logger.warning(f"读取索引元数据 {meta_path} 失败: {e}")
+
+    def _save_meta(self) -> None:
+        meta_path = self.meta_path
+        if not meta_path:
             return
-        faiss.write_index(self.index, self.path)
+        meta = {
+            "index_type": self.current_type,
+            "index_params": self.current_params,
+            "tombstones": sorted(self.tombstones),
+        }
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
@@ -1,5 +1,8 @@
+import hashlib
 import time
 import uuid
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
 
 import numpy as np
 
@@ -20,6 +23,8 @@ class FaissVecDB(BaseVecDB):
         index_store_path: str,
         embedding_provider: EmbeddingProvider,
         rerank_provider: RerankProvider | None = None,
+        index_type: str = "flat",
+        index_params: dict | None = None,
     ) -> None:
         self.doc_store_path = doc_store_path
         self.index_store_path = index_store_path
@@ -28,12 +33,15 @@ class FaissVecDB(BaseVecDB):
         self.embedding_storage = EmbeddingStorage(
             embedding_provider.get_dim(),
             index_store_path,
+            index_type=index_type,
+            index_params=index_params,
         )
         self.embedding_provider = embedding_provider
         self.rerank_provider = rerank_provider
 
     async def initialize(self) -> None:
         await self.document_storage.initialize()
+        await self.embedding_storage.initialize()
 
     async def insert(
         self,
@@ -64,11 +72,22 @@ class FaissVecDB(BaseVecDB):
         tasks_limit: int = 3,
         max_retries: int = 3,
         progress_callback=None,
+        checkpoint_callback=None,
+        reuse_vectors: bool = False,
     ) -> list[int]:
         """批量插入文本和其对应向量，自动生成 ID 并保持一致性。
 
+        向量按提交顺序逐批写入预分配的 float32 缓冲区, 并随即写入 SQLite 与 FAISS,
+        内存中不会保留整个文档的向量。
+
         Args:
             progress_callback: 进度回调函数，接收参数 (current, total)
+            checkpoint_callback: 每批写入完成后调用，接收参数 (completed, int_ids),
+                completed 为已写入的文本数量, int_ids 为本批文本的整数 ID。
+                提供该回调时, 失败前已写入的批次会被保留, 以便调用方从断点继续;
+                否则失败时会删除本次已写入的批次。
+            reuse_vectors: 在元数据中记录文本的内容哈希 (content_hash), 并直接复用库中
+                内容相同的文本的向量, 本次输入中重复的文本也只生成一次向量。
 
         """
         metadatas = metadatas or [{} for _ in contents]
@@ -80,31 +99,149 @@ class FaissVecDB(BaseVecDB):
             )
             return []
 
+        if reuse_vectors:
+            hashes = [
+                hashlib.sha256(content.encode()).hexdigest() for content in contents
+            ]
+            metadatas = [
+                {**metadata, "content_hash": content_hash}
+                for metadata, content_hash in zip(metadatas, hashes)
+            ]
+            vector_batches = self._iter_vectors_with_reuse(
+                contents,
+                hashes,
+                await self._find_vectors(hashes),
+                batch_size=batch_size,
+                tasks_limit=tasks_limit,
+                max_retries=max_retries,
+                progress_callback=progress_callback,
+            )
+        else:
+            vector_batches = self.embedding_provider.iter_embeddings_batches(
+                contents,
+                batch_size=batch_size,
+                tasks_limit=tasks_limit,
+                max_retries=max_retries,
+                progress_callback=progress_callback,
+            )
+
         start = time.time()
         logger.debug(f"Generating embeddings for {len(contents)} contents...")
-        vectors = await self.embedding_provider.get_embeddings_batch(
-            contents,
-            batch_size=batch_size,
-            tasks_limit=tasks_limit,
-            max_retries=max_retries,
-            progress_callback=progress_callback,
+        buffer = np.empty(
+            (min(batch_size, len(contents)), self.embedding_storage.dimension),
+            dtype=np.float32,
         )
+        int_ids: list[int] = []
+        try:
+            async with aclosing(vector_batches) as batches:
+                async for offset, vectors in batches:
+                    if len(vectors[0]) != buffer.shape[1]:
+                        raise ValueError(
+                            f"向量维度不匹配, 期望: {buffer.shape[1]}, 实际: {len(vectors[0])}",
+                        )
+                    end = offset + len(vectors)
+                    batch_vectors = buffer[: len(vectors)]
+                    batch_vectors[:] = vectors
+                    batch_ids = await self.document_storage.insert_documents_batch(
+                        ids[offset:end],
+                        contents[offset:end],
+                        metadatas[offset:end],
+                    )
+                    await self.embedding_storage.insert_batch(batch_vectors, batch_ids)
+                    int_ids.extend(batch_ids)
+                    if checkpoint_callback:
+                        await checkpoint_callback(end, batch_ids)
+        except BaseException:
+            if int_ids and not checkpoint_callback:
+                await self._delete_by_int_ids(int_ids)
+            raise
         end = time.time()
         logger.debug(
-            f"Generated embeddings for {len(contents)} contents in {end - start:.2f} seconds.",
+            f"Embedded and stored {len(contents)} contents in {end - start:.2f} seconds.",
         )
+        return int_ids
 
-        # 使用 DocumentStorage 的批量插入方法
-        int_ids = await self.document_storage.insert_documents_batch(
-            ids,
-            contents,
-            metadatas,
+    async def _find_vectors(self, hashes: list[str]) -> dict[str, np.ndarray]:
+        """按内容哈希查找库中已有的向量"""
+        int_ids = await self.document_storage.get_ids_by_content_hashes(
+            list(set(hashes)),
         )
+        if not int_ids:
+            return {}
+        vectors = await self.embedding_storage.get_vectors(list(int_ids.values()))
+        return {
+            content_hash: vectors[int_id]
+            for content_hash, int_id in int_ids.items()
+            if int_id in vectors
+        }
+
+    async def _iter_vectors_with_reuse(
+        self,
+        contents: list[str],
+        hashes: list[str],
+        reused: dict[str, np.ndarray],
+        batch_size: int,
+        tasks_limit: int,
+        max_retries: int,
+        progress_callback=None,
+    ) -> AsyncGenerator[tuple[int, list], None]:
+        """与 iter_embeddings_batches 一样按顺序产出 (offset, vectors)
 
-        # 批量插入向量到 FAISS
-        vectors_array = np.array(vectors).astype("float32")
-        await self.embedding_storage.insert_batch(vectors_array, int_ids)
-        return int_ids
+        已有的向量直接复用, 其余文本去重后再生成向量。
+        """
+        unique_hashes: list[str] = []
+        texts: list[str] = []
+        last_use: dict[str, int] = {}
+        for idx, (content, content_hash) in enumerate(zip(contents, hashes)):
+            if content_hash in reused:
+                continue
+            if content_hash not in last_use:
+                unique_hashes.append(content_hash)
+                texts.append(content)
+            last_use[content_hash] = idx
+        if len(texts) < len(contents):
+            logger.debug(
+                f"Reusing existing embeddings for {len(contents) - len(texts)} of "
+                f"{len(contents)} contents.",
+            )
+
+        # 已生成、但还有位置未用到的向量
+        embedded: dict[str, list[float]] = {}
+        async with aclosing(
+            self.embedding_provider.iter_embeddings_batches(
+                texts,
+                batch_size=batch_size,
+                tasks_limit=tasks_limit,
+                max_retries=max_retries,
+            ),
+        ) as batches:
+            offset = 0
+            batch: list = []
+            for idx, content_hash in enumerate(hashes):
+                vector = reused.get(content_hash)
+                if vector is None:
+                    while content_hash not in embedded:
+                        start, vectors = await anext(batches)
+                        for i, v in enumerate(vectors):
+                            embedded[unique_hashes[start + i]] = v
+                    if last_use[content_hash] == idx:
+                        vector = embedded.pop(content_hash)
+                    else:
+                        vector = embedded[content_hash]
+                batch.append(vector)
+                if len(batch) == batch_size or idx == len(hashes) - 1:
+                    yield offset, batch
+                    offset += len(batch)
+                    batch = []
+                    if progress_callback:
+                        await progress_callback(offset, len(contents))
+
+    async def _delete_by_int_ids(self, int_ids: list[int]) -> None:
+        try:
+            await self.embedding_storage.delete(int_ids)
+            await self.document_storage.delete_documents_by_ids(int_ids)
+        except Exception as e:
+            logger.error(f"清理未完成的批量插入失败: {e}")
 
     async def retrieve(
         self,
@@ -113,6 +250,7 @@ class FaissVecDB(BaseVecDB):
         fetch_k: int = 20,
         rerank: bool = False,
         metadata_filters: dict | None = None,
+        embedding: list[float] | None = None,
     ) -> list[Result]:
         """搜索最相似的文档。
 
@@ -122,12 +260,14 @@ class FaissVecDB(BaseVecDB):
             fetch_k (int): 在根据 metadata 过滤前从 FAISS 中获取的数量
             rerank (bool): 是否使用重排序。这需要在实例化时提供 rerank_provider, 如果未提供并且 rerank 为 True, 不会抛出异常。
             metadata_filters (dict): 元数据过滤器
+            embedding (list[float] | None): 预先计算好的查询向量, 多个知识库共用同一个 Embedding Provider 时可避免重复计算
 
         Returns:
             List[Result]: 查询结果
 
         """
-        embedding = await self.embedding_provider.get_embedding(query)
+        if embedding is None:
+            embedding = await self.embedding_provider.get_embedding(query)
         scores, indices = await self.embedding_storage.search(
             vector=np.array([embedding]).astype("float32"),
             k=fetch_k if metadata_filters else k,
@@ -184,6 +324,7 @@ class FaissVecDB(BaseVecDB):
         await self.embedding_storage.delete([int_id])
 
     async def close(self) -> None:
+        await self.embedding_storage.close()
         await self.document_storage.close()
 
     async def count_documents(self, metadata_filter: dict | None = None) -> int:
@@ -1,24 +1,257 @@
 """事件总线, 用于处理事件的分发和处理
 事件总线是一个异步队列, 用于接收各种消息事件, 并将其发送到Scheduler调度器进行处理
-其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并创建一个新的异步任务来执行管道调度器的处理逻辑
+其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并交给对应配置文件的分发通道执行管道调度器的处理逻辑
 
 class:
     EventBus: 事件总线, 用于处理事件的分发和处理
+    DispatchLane: 单个配置文件的分发通道, 负责并发限制、会话内顺序和过载处理
 
 工作流程:
 1. 维护一个异步队列, 来接受各种消息事件
-2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并创建一个新的异步任务来执行管道调度器的处理逻辑
+2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并放入对应配置文件的分发通道
+3. 分发通道按会话 (unified_msg_origin) 维护先进先出的待处理队列, 在并发上限内轮流从各会话取出事件执行,
+   待处理事件过多时按配置的过载策略丢弃或拒绝事件
 """
 
 import asyncio
+import time
 from asyncio import Queue
+from collections import deque
+from dataclasses import dataclass, field
 
 from astrbot.core import logger
 from astrbot.core.astrbot_config_mgr import AstrBotConfigManager
+from astrbot.core.message.message_event_result import MessageChain
 from astrbot.core.pipeline.scheduler import PipelineScheduler
 
 from .platform import AstrMessageEvent
 
+OVERLOAD_POLICIES = ("drop_oldest", "coalesce", "reject")
+DEFAULT_DISPATCH_SETTINGS = {
+    "max_concurrency": 32,
+    "max_pending": 1000,
+    "session_concurrency": 0,
+    "overload_policy": "drop_oldest",
+    "overload_reply": "",
+}
+
+
+@dataclass
+class _PendingEvent:
+    event: AstrMessageEvent
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class DispatchLane:
+    """单个配置文件的事件分发通道
+
+    - 同时执行的事件数不超过 max_concurrency
+    - 同一会话 (unified_msg_origin) 的事件按到达顺序开始处理,
+      session_concurrency > 0 时同一会话同时处理的事件数不超过该值。默认不限制,
+      因为 session_waiter 需要在处理中的事件等待期间收到同一会话的后续消息
+    - 各会话轮流获得执行机会, 单个大群的消息洪峰不会饿死其他会话
+    - 待处理事件超过 max_pending 时按 overload_policy 处理:
+      drop_oldest 丢弃最早的待处理事件; coalesce 用新消息替换同一会话中尚未开始处理的旧消息;
+      reject 拒绝新事件, 并在配置了 overload_reply 时回复用户
+
+    所有状态只在事件循环线程中修改, 无需加锁。
+    """
+
+    def __init__(self, conf_id: str, scheduler_getter) -> None:
+        self.conf_id = conf_id
+        self._get_scheduler = scheduler_getter
+        self.max_concurrency = DEFAULT_DISPATCH_SETTINGS["max_concurrency"]
+        self.max_pending = DEFAULT_DISPATCH_SETTINGS["max_pending"]
+        self.session_concurrency = DEFAULT_DISPATCH_SETTINGS["session_concurrency"]
+        self.overload_policy = DEFAULT_DISPATCH_SETTINGS["overload_policy"]
+        self.overload_reply = DEFAULT_DISPATCH_SETTINGS["overload_reply"]
+
+        # umo -> 尚未开始处理的事件
+        self._sessions: dict[str, deque[_PendingEvent]] = {}
+        # 有待处理事件且未达到会话并发上限的会话, 按轮转顺序排列
+        self._ready: deque[str] = deque()
+        self._ready_set: set[str] = set()
+        self._session_inflight: dict[str, int] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.pending = 0
+        self.inflight = 0
+
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.peak_pending = 0
+        self._wait_total = 0.0
+        self.wait_max = 0.0
+        self._run_total = 0.0
+
+    def configure(self, settings: dict | None) -> None:
+        """根据配置文件中的 platform_settings.dispatch 更新限制"""
+        settings = settings if isinstance(settings, dict) else {}
+
+        def _int(key: str, minimum: int) -> int:
+            try:
+                value = int(settings.get(key, DEFAULT_DISPATCH_SETTINGS[key]))
+            except (TypeError, ValueError):
+                value = DEFAULT_DISPATCH_SETTINGS[key]
+            return max(value, minimum)
+
+        self.max_concurrency = _int("max_concurrency", 1)
+        self.max_pending = _int("max_pending", 1)
+        self.session_concurrency = _int("session_concurrency", 0)
+        policy = settings.get("overload_policy", "drop_oldest")
+        self.overload_policy = policy if policy in OVERLOAD_POLICIES else "drop_oldest"
+        self.overload_reply = str(settings.get("overload_reply") or "")
+        self._pump()
+
+    def submit(self, event: AstrMessageEvent) -> bool:
+        """提交事件
+
+        Returns:
+            bool: 事件是否被接受。被拒绝的事件不会被处理。
+
+        """
+        umo = event.unified_msg_origin
+        if self.pending >= self.max_pending and not self._make_room(event):
+            return False
+
+        queue = self._sessions.get(umo)
+        if queue is None:
+            queue = self._sessions[umo] = deque()
+        queue.append(_PendingEvent(event))
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        self._mark_ready(umo)
+        self._pump()
+        return True
+
+    def stats(self) -> dict:
+        started = self.processed + self.failed + self.inflight
+        finished = self.processed + self.failed
+        return {
+            "pending": self.pending,
+            "inflight": self.inflight,
+            "sessions": len(self._sessions),
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "session_concurrency": self.session_concurrency,
+            "overload_policy": self.overload_policy,
+            "peak_pending": self.peak_pending,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "wait_ms_avg": self._wait_total / started * 1000 if started else 0.0,
+            "wait_ms_max": self.wait_max * 1000,
+            "run_ms_avg": self._run_total / finished * 1000 if finished else 0.0,
+        }
+
+    def _make_room(self, event: AstrMessageEvent) -> bool:
+        """待处理事件已满时按过载策略腾出空间, 返回新事件是否可以入队"""
+        if self.overload_policy == "coalesce":
+            queue = self._sessions.get(event.unified_msg_origin)
+            if queue:
+                self.coalesced += len(queue)
+                self.pending -= len(queue)
+                queue.clear()
+                return True
+            # 该会话没有可合并的事件, 退化为丢弃最早的事件
+        elif self.overload_policy == "reject":
+            self.rejected += 1
+            if self.overload_reply:
+                self._spawn(self._reply_overload(event))
+            return False
+
+        oldest_umo = None
+        oldest_at = float("inf")
+        for umo, queue in self._sessions.items():
+            if queue and queue[0].enqueued_at < oldest_at:
+                oldest_umo, oldest_at = umo, queue[0].enqueued_at
+        if oldest_umo is None:
+            return True
+        oldest_queue = self._sessions[oldest_umo]
+        dropped = oldest_queue.popleft()
+        if not oldest_queue:
+            del self._sessions[oldest_umo]
+        self.pending -= 1
+        self.dropped += 1
+        logger.warning(
+            f"[{self.conf_id}] 待处理事件过多, 已丢弃来自 {oldest_umo} 的事件: "
+            f"{dropped.event.get_message_outline()}",
+        )
+        return True
+
+    def _mark_ready(self, umo: str) -> None:
+        if umo in self._ready_set:
+            return
+        limit = self.session_concurrency
+        if limit and self._session_inflight.get(umo, 0) >= limit:
+            return
+        self._ready.append(umo)
+        self._ready_set.add(umo)
+
+    def _pump(self) -> None:
+        """在并发上限内启动待处理的事件"""
+        while self.inflight < self.max_concurrency and self._ready:
+            umo = self._ready.popleft()
+            self._ready_set.discard(umo)
+            queue = self._sessions.get(umo)
+            if not queue:
+                # 事件已被过载策略移除
+                self._sessions.pop(umo, None)
+                continue
+            item = queue.popleft()
+            if not queue:
+                del self._sessions[umo]
+            self.pending -= 1
+            self.inflight += 1
+            self._session_inflight[umo] = self._session_inflight.get(umo, 0) + 1
+            if umo in self._sessions:
+                self._mark_ready(umo)
+
+            waited = time.monotonic() - item.enqueued_at
+            self._wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self._spawn(self._run(umo, item.event))
+
+    async def _run(self, umo: str, event: AstrMessageEvent) -> None:
+        start = time.monotonic()
+        try:
+            scheduler = self._get_scheduler(self.conf_id)
+            if not scheduler:
+                raise RuntimeError(
+                    f"PipelineScheduler not found for id: {self.conf_id}"
+                )
+            await scheduler.execute(event)
+            self.processed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"[{self.conf_id}] 处理事件时发生异常: {e!s}")
+        finally:
+            self._run_total += time.monotonic() - start
+            self.inflight -= 1
+            remaining = self._session_inflight.get(umo, 1) - 1
+            if remaining:
+                self._session_inflight[umo] = remaining
+            else:
+                self._session_inflight.pop(umo, None)
+            if umo in self._sessions:
+                self._mark_ready(umo)
+            self._pump()
+
+    async def _reply_overload(self, event: AstrMessageEvent) -> None:
+        try:
+            await event.send(MessageChain().message(self.overload_reply))
+        except Exception as e:
+            logger.warning(f"[{self.conf_id}] 发送过载提示失败: {e!s}")
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
 
 class EventBus:
     """用于处理事件的分发和处理"""
@@ -33,6 +266,8 @@ class EventBus:
         # abconf uuid -> scheduler
         self.pipeline_scheduler_mapping = pipeline_scheduler_mapping
         self.astrbot_config_mgr = astrbot_config_mgr
+        # abconf uuid -> dispatch lane
+        self.lanes: dict[str, DispatchLane] = {}
 
     async def dispatch(self) -> None:
         while True:
@@ -47,7 +282,31 @@ class EventBus:
                     f"PipelineScheduler not found for id: {conf_id}, event ignored."
                 )
                 continue
-            asyncio.create_task(scheduler.execute(event))
+            lane = self._get_lane(conf_id)
+            lane.configure(self._get_dispatch_settings(conf_id))
+            lane.submit(event)
+
+    def stats(self) -> dict:
+        """返回事件队列深度和各分发通道的统计信息"""
+        return {
+            "queue_size": self.event_queue.qsize(),
+            "lanes": {conf_id: lane.stats() for conf_id, lane in self.lanes.items()},
+        }
+
+    def _get_lane(self, conf_id: str) -> DispatchLane:
+        lane = self.lanes.get(conf_id)
+        if lane is None:
+            lane = self.lanes[conf_id] = DispatchLane(
+                conf_id,
+                self.pipeline_scheduler_mapping.get,
+            )
+        return lane
+
+    def _get_dispatch_settings(self, conf_id: str) -> dict | None:
+        conf = self.astrbot_config_mgr.confs.get(conf_id)
+        if not isinstance(conf, dict):
+            return None
+        return conf.get("platform_settings", {}).get("dispatch")
 
     def _print_event(self, event: AstrMessageEvent, conf_name: str) -> None:
         """用于记录事件信息
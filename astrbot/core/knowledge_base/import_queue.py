@@ -0,0 +1,364 @@
+"""知识库批量导入队列
+
+批量导入的文件先暂存到磁盘, 并与导入任务一起记录在 kb.db 中, 由固定数量的后台 worker
+按提交顺序逐个导入:
+
+- 文档级去重: 知识库中已有内容哈希相同的文档时, 文件标记为 skipped, 不再解析和生成向量;
+- 块级去重: 导入时复用知识库中内容相同的块的向量 (见 FaissVecDB.insert_batch 的 reuse_vectors);
+- 断点续传: 进程退出时仍在处理中的文件在下次启动时重新排队, 并由 upload_document
+  的上传断点从最后完成的批次继续。
+
+导入失败的文件保留暂存文件, 可以通过 retry_job 重新排队; cancel_job 取消任务中
+尚未处理以及失败的文件并删除其暂存文件。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import aiofiles
+
+from astrbot.core import logger
+
+from .models import KBImportFile, KBImportJob
+
+if TYPE_CHECKING:
+    from .kb_db_sqlite import KBSQLiteDatabase
+    from .kb_mgr import KnowledgeBaseManager
+
+DEFAULT_IMPORT_OPTIONS = {
+    "chunk_size": 512,
+    "chunk_overlap": 50,
+    "batch_size": 32,
+    "tasks_limit": 3,
+    "max_retries": 3,
+}
+
+ACTIVE_FILE_STATUSES = ("pending", "processing")
+
+
+@dataclass
+class ImportItem:
+    """待导入的文件, path 与 chunks 二选一"""
+
+    file_name: str
+    file_type: str
+    path: str | None = None
+    """已保存到磁盘的原始文件, 提交时移动到暂存目录"""
+    chunks: list[str] | None = None
+    """预分块文本"""
+
+
+def compute_content_hash(source: bytes | list[str]) -> str:
+    """原始文件内容或预分块文本的 SHA-256, 用于文档级去重"""
+    digest = hashlib.sha256()
+    if isinstance(source, bytes):
+        digest.update(source)
+    else:
+        for chunk in source:
+            digest.update(b"\0")
+            digest.update(chunk.encode())
+    return digest.hexdigest()
+
+
+def _stage_file(src: str, dst: Path) -> tuple[int, str]:
+    """将文件移动到暂存目录, 返回 (文件大小, SHA-256)"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(src, dst)
+    digest = hashlib.sha256()
+    size = 0
+    with open(dst, "rb") as f:
+        while block := f.read(1 << 20):
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+
+def _write_file(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+class KBImportQueue:
+    """持久化的知识库批量导入队列"""
+
+    def __init__(
+        self,
+        kb_manager: KnowledgeBaseManager,
+        staging_dir: Path,
+        max_workers: int = 2,
+    ) -> None:
+        self.kb_manager = kb_manager
+        self.staging_dir = staging_dir
+        self.max_workers = max(1, max_workers)
+        self.progress: dict[str, dict] = {}
+        """处理中文件的进度 {file_id: {stage, current, total}}"""
+        self._workers: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._claim_lock = asyncio.Lock()
+        # 内容相同的文件不能同时导入, 否则文档级去重对它们无效
+        self._hash_locks: dict[tuple[str, str], tuple[asyncio.Lock, int]] = {}
+
+    @property
+    def kb_db(self) -> KBSQLiteDatabase:
+        return self.kb_manager.kb_db
+
+    async def start(self) -> None:
+        """启动后台 worker, 并将上次退出时未完成的文件重新排队"""
+        if self._workers:
+            return
+        if count := await self.kb_db.reset_interrupted_imports():
+            logger.info(f"{count} 个未完成的知识库导入文件已重新排队")
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"kb_import_worker_{i}")
+            for i in range(self.max_workers)
+        ]
+
+    async def stop(self) -> None:
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def submit(
+        self,
+        kb_id: str,
+        items: list[ImportItem],
+        options: dict | None = None,
+    ) -> KBImportJob:
+        """暂存文件并创建导入任务
+
+        Args:
+            options: 分块与向量化参数, 缺省的参数使用 DEFAULT_IMPORT_OPTIONS
+
+        """
+        for item in items:
+            if item.chunks is None and not item.file_type:
+                raise ValueError(f"无法识别 {item.file_name} 的文件类型")
+        opts = dict(DEFAULT_IMPORT_OPTIONS)
+        for key, value in (options or {}).items():
+            if key in opts and value is not None:
+                opts[key] = int(value)
+        job = KBImportJob(kb_id=kb_id, options=opts, file_total=len(items))
+        job_dir = self.staging_dir / job.job_id
+
+        files: list[KBImportFile] = []
+        try:
+            for item in items:
+                file = KBImportFile(
+                    job_id=job.job_id,
+                    kb_id=kb_id,
+                    file_name=item.file_name,
+                    file_type=item.file_type,
+                    staged_path="",
+                    content_hash="",
+                )
+                staged_path = job_dir / file.file_id
+                if item.chunks is not None:
+                    payload = json.dumps(item.chunks, ensure_ascii=False).encode()
+                    await asyncio.to_thread(_write_file, staged_path, payload)
+                    file.pre_chunked = True
+                    file.file_size = sum(len(chunk) for chunk in item.chunks)
+                    file.content_hash = compute_content_hash(item.chunks)
+                elif item.path is not None:
+                    file.file_size, file.content_hash = await asyncio.to_thread(
+                        _stage_file,
+                        item.path,
+                        staged_path,
+                    )
+                else:
+                    raise ValueError(f"{item.file_name} 缺少文件内容")
+                file.staged_path = str(staged_path)
+                files.append(file)
+            await self.kb_db.create_import_job(job, files)
+        except BaseException:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"已创建知识库导入任务 {job.job_id}, 共 {len(files)} 个文件")
+        self._wakeup.set()
+        return job
+
+    async def get_job(self, job_id: str) -> dict | None:
+        """任务详情, 包括每个文件的状态与处理中文件的进度"""
+        job = await self.kb_db.get_import_job(job_id)
+        if job is None:
+            return None
+        files = await self.kb_db.list_import_files(job_id)
+        data = self._dump_job(
+            job, await self.kb_db.count_import_files_by_status(job_id)
+        )
+        data["files"] = [
+            {
+                **file.model_dump(exclude={"id", "staged_path"}),
+                "progress": self.progress.get(file.file_id),
+            }
+            for file in files
+        ]
+        return data
+
+    async def list_jobs(
+        self,
+        kb_id: str | None = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> list[dict]:
+        jobs = await self.kb_db.list_import_jobs(kb_id, offset, limit)
+        return [
+            self._dump_job(
+                job,
+                await self.kb_db.count_import_files_by_status(job.job_id),
+            )
+            for job in jobs
+        ]
+
+    async def cancel_job(self, job_id: str) -> int:
+        """取消任务中尚未处理以及导入失败的文件, 返回取消的文件数
+
+        正在处理的文件会继续导入完成。
+        """
+        cancelled = 0
+        for status in ("pending", "failed"):
+            cancelled += await self.kb_db.update_import_files(
+                job_id,
+                status,
+                "cancelled",
+            )
+        for file in await self.kb_db.list_import_files(job_id):
+            if file.status == "cancelled":
+                Path(file.staged_path).unlink(missing_ok=True)
+        await self._finish_job_if_done(job_id)
+        return cancelled
+
+    async def retry_job(self, job_id: str) -> int:
+        """将任务中导入失败的文件重新排队, 返回重新排队的文件数"""
+        count = await self.kb_db.update_import_files(job_id, "failed", "pending")
+        if count:
+            await self.kb_db.update_import_job_status(job_id, "pending")
+            self._wakeup.set()
+        return count
+
+    @staticmethod
+    def _dump_job(job: KBImportJob, counts: dict[str, int]) -> dict:
+        return {
+            **job.model_dump(exclude={"id"}),
+            "counts": counts,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            # 先清除再检查队列, 以免错过检查之后提交的任务
+            self._wakeup.clear()
+            try:
+                async with self._claim_lock:
+                    file = await self.kb_db.claim_next_import_file()
+            except Exception as e:
+                logger.error(f"读取知识库导入队列失败: {e}")
+                file = None
+            if file is None:
+                await self._wakeup.wait()
+                continue
+            try:
+                await self._process(file)
+                await self._finish_job_if_done(file.job_id)
+            except Exception as e:
+                logger.error(f"处理知识库导入文件 {file.file_name} 失败: {e}")
+
+    async def _process(self, file: KBImportFile) -> None:
+        key = (file.kb_id, file.content_hash)
+        lock, refs = self._hash_locks.get(key, (asyncio.Lock(), 0))
+        self._hash_locks[key] = (lock, refs + 1)
+        try:
+            async with lock:
+                await self._import_file(file)
+        except Exception as e:
+            logger.error(f"导入文件 {file.file_name} 失败: {e}")
+            await self.kb_db.update_import_file(
+                file.file_id,
+                status="failed",
+                error=str(e),
+            )
+        finally:
+            self.progress.pop(file.file_id, None)
+            lock, refs = self._hash_locks[key]
+            if refs > 1:
+                self._hash_locks[key] = (lock, refs - 1)
+            else:
+                del self._hash_locks[key]
+
+    async def _import_file(self, file: KBImportFile) -> None:
+        kb_helper = await self.kb_manager.get_kb(file.kb_id)
+        if kb_helper is None:
+            raise ValueError("知识库不存在")
+        job = await self.kb_db.get_import_job(file.job_id)
+        options = {**DEFAULT_IMPORT_OPTIONS, **((job and job.options) or {})}
+
+        existing = await self.kb_db.get_document_by_content_hash(
+            file.kb_id,
+            file.content_hash,
+        )
+        if existing is not None:
+            logger.info(
+                f"{file.file_name} 与已有文档 {existing.doc_name} 内容相同, 跳过导入",
+            )
+            await self.kb_db.update_import_file(
+                file.file_id,
+                status="skipped",
+                doc_id=existing.doc_id,
+            )
+            Path(file.staged_path).unlink(missing_ok=True)
+            return
+
+        async with aiofiles.open(file.staged_path, "rb") as f:
+            content = await f.read()
+
+        async def progress_callback(stage: str, current: int, total: int) -> None:
+            self.progress[file.file_id] = {
+                "stage": stage,
+                "current": current,
+                "total": total,
+            }
+
+        doc = await kb_helper.upload_document(
+            file_name=file.file_name,
+            file_content=None if file.pre_chunked else content,
+            file_type=file.file_type,
+            chunk_size=options["chunk_size"],
+            chunk_overlap=options["chunk_overlap"],
+            batch_size=options["batch_size"],
+            tasks_limit=options["tasks_limit"],
+            max_retries=options["max_retries"],
+            progress_callback=progress_callback,
+            pre_chunked_text=json.loads(content) if file.pre_chunked else None,
+        )
+        await self.kb_db.update_import_file(
+            file.file_id,
+            status="completed",
+            doc_id=doc.doc_id,
+        )
+        Path(file.staged_path).unlink(missing_ok=True)
+
+    async def _finish_job_if_done(self, job_id: str) -> None:
+        counts = await self.kb_db.count_import_files_by_status(job_id)
+        if any(counts.get(status) for status in ACTIVE_FILE_STATUSES):
+            return
+        if counts.get("failed"):
+            # 部分文件导入成功时为 partial, 可通过 retry_job 重试失败的文件
+            succeeded = counts.get("completed") or counts.get("skipped")
+            status = "partial" if succeeded else "failed"
+        elif counts.get("cancelled"):
+            status = "cancelled"
+        else:
+            status = "completed"
+        await self.kb_db.update_import_job_status(job_id, status)
+        job_dir = self.staging_dir / job_id
+        if job_dir.is_dir() and not any(job_dir.iterdir()):
+            job_dir.rmdir()
+        logger.info(f"知识库导入任务 {job_id} 已结束: {counts}")
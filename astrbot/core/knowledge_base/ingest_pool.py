@@ -0,0 +1,213 @@
+"""知识库文档解析与分块的进程池
+
+PDF 文本与图片提取 (pypdf)、markitdown 转换以及递归分块都是纯 Python 的 CPU 密集操作,
+直接在事件循环中执行会在上传大文档期间阻塞所有平台的消息处理。这里将它们放到进程池中执行:
+
+- PDF 按固定页数拆分为多个任务并行解析, 每个任务解析完成后在同一进程中分块;
+- 各任务的分块结果按页码顺序逐段产出, 调用方可以一边解析一边生成向量;
+- 每次上传最多同时占用 cpu_budget 个工作进程, 多个上传共用同一个进程池。
+
+工作进程以 spawn 方式启动 (与 Windows 一致, 避免在多线程进程中 fork), 首次使用时创建,
+知识库模块关闭时销毁。进程池不可用时退回到线程中执行。工作进程只导入 ingest_worker
+与解析器、分块器, 不会初始化 astrbot.core (见 ingest_worker_bootstrap.py)。
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import runpy
+import tempfile
+from collections import deque
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from pathlib import Path
+
+from .chunking.base import BaseChunker
+from .ingest_worker import Segment, parse_and_chunk_file, parse_file, parse_pdf_range
+from .parsers.pdf_parser import PDFParser
+
+logger = logging.getLogger("astrbot")
+
+PAGES_PER_TASK = 8
+"""每个 PDF 解析任务处理的页数。分块不跨越任务边界, 因此该值固定, 以保证同一文件的分块结果稳定"""
+
+WORKER_BOOTSTRAP = str(Path(__file__).with_name("ingest_worker_bootstrap.py"))
+
+
+def _is_picklable(obj: object) -> bool:
+    try:
+        pickle.dumps(obj)
+    except Exception:
+        return False
+    return True
+
+
+class IngestPool:
+    """解析与分块任务的共享进程池"""
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._executor: Executor | None = None
+        self._use_threads = False
+
+    @property
+    def default_cpu_budget(self) -> int:
+        """单次上传默认可同时占用的工作进程数, 为其他上传留出余量"""
+        return max(1, self.max_workers // 2)
+
+    def _get_executor(self) -> Executor | None:
+        if self._use_threads:
+            return None
+        if self._executor is None:
+            try:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=get_context("spawn"),
+                    initializer=runpy.run_path,
+                    initargs=(WORKER_BOOTSTRAP,),
+                )
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"无法创建文档解析进程池, 将在线程中解析: {e}")
+                self._use_threads = True
+                return None
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        """在进程池中执行 fn(*args)"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        if executor is None:
+            return await asyncio.to_thread(fn, *args)
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # 工作进程异常退出 (如内存不足) 后进程池不可再用, 下次使用时重新创建
+            if self._executor is executor:
+                self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+
+    async def iter_segments(
+        self,
+        file_content: bytes,
+        file_name: str,
+        file_type: str,
+        chunker: BaseChunker,
+        chunk_size: int,
+        chunk_overlap: int,
+        cpu_budget: int | None = None,
+        progress_callback: Callable[[int, int], Awaitable[None]] | None = None,
+    ) -> AsyncGenerator[Segment, None]:
+        """解析并分块文档, 按顺序逐段产出 (分块文本, 多媒体资源)
+
+        Args:
+            cpu_budget: 本次上传最多同时占用的工作进程数, 默认为 default_cpu_budget
+            progress_callback: 解析进度回调, 接收参数 (已完成的段数, 总段数)
+
+        """
+        budget = max(1, cpu_budget or self.default_cpu_budget)
+        if not _is_picklable(chunker):
+            # 自定义分块器无法传入工作进程时, 只在进程中解析, 分块仍在事件循环中执行
+            async for segment in self._iter_segments_local_chunker(
+                file_content, file_name, file_type, chunker, chunk_size, chunk_overlap
+            ):
+                yield segment
+            return
+
+        if file_type != "pdf":
+            segment = await self.run(
+                parse_and_chunk_file,
+                file_content,
+                file_name,
+                file_type,
+                chunker,
+                chunk_size,
+                chunk_overlap,
+            )
+            if progress_callback:
+                await progress_callback(1, 1)
+            yield segment
+            return
+
+        # 各任务从临时文件读取 PDF, 避免把整个文件重复传给每个工作进程
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                await asyncio.to_thread(f.write, file_content)
+            page_count = await self.run(PDFParser.count_pages, path)
+            ranges = deque(
+                (start, min(start + PAGES_PER_TASK, page_count))
+                for start in range(0, page_count, PAGES_PER_TASK)
+            )
+            total = len(ranges)
+            pending: deque[asyncio.Future] = deque()
+
+            def schedule() -> None:
+                while ranges and len(pending) < budget:
+                    start, end = ranges.popleft()
+                    pending.append(
+                        asyncio.ensure_future(
+                            self.run(
+                                parse_pdf_range,
+                                path,
+                                start,
+                                end,
+                                chunker,
+                                chunk_size,
+                                chunk_overlap,
+                            ),
+                        ),
+                    )
+
+            done = 0
+            try:
+                schedule()
+                while pending:
+                    segment = await pending[0]
+                    pending.popleft()
+                    schedule()
+                    done += 1
+                    if progress_callback:
+                        await progress_callback(done, total)
+                    yield segment
+            finally:
+                for fut in pending:
+                    fut.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            try:
+                os.unlink(path)
+            except OSError as e:
+                logger.warning(f"删除临时文件 {path} 失败: {e}")
+
+    async def _iter_segments_local_chunker(
+        self,
+        file_content: bytes,
+        file_name: str,
+        file_type: str,
+        chunker: BaseChunker,
+        chunk_size: int,
+        chunk_overlap: int,
+    ) -> AsyncGenerator[Segment, None]:
+        if file_type == "pdf":
+            result = await self.run(PDFParser.parse_pages, file_content)
+        else:
+            result = await self.run(parse_file, file_content, file_name, file_type)
+        chunks = await chunker.chunk(
+            result.text,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+        )
+        yield chunks, result.media
+
+
+ingest_pool = IngestPool()
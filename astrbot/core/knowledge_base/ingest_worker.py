@@ -0,0 +1,62 @@
+"""知识库文档解析进程池的工作进程入口
+
+进程池中执行的函数都定义在这里, 本模块只依赖解析器与分块器。工作进程启动时先执行
+ingest_worker_bootstrap.py, 之后导入本模块时不会触发 astrbot.core 的初始化。
+"""
+
+import asyncio
+
+from .chunking.base import BaseChunker
+from .parsers.base import MediaItem, ParseResult
+from .parsers.pdf_parser import PDFParser
+from .parsers.util import select_parser
+
+Segment = tuple[list[str], list[MediaItem]]
+"""按顺序产出的一段解析结果: (分块文本, 多媒体资源)"""
+
+
+def chunk_text(
+    chunker: BaseChunker,
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> list[str]:
+    return asyncio.run(
+        chunker.chunk(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap),
+    )
+
+
+def parse_pdf_range(
+    path: str,
+    start: int,
+    end: int,
+    chunker: BaseChunker,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Segment:
+    """解析并分块 PDF 的 [start, end) 页"""
+    result = PDFParser.parse_pages(path, start, end)
+    return chunk_text(chunker, result.text, chunk_size, chunk_overlap), result.media
+
+
+def parse_file(file_content: bytes, file_name: str, file_type: str) -> ParseResult:
+    """解析整个文件"""
+
+    async def _run() -> ParseResult:
+        parser = await select_parser(f".{file_type}")
+        return await parser.parse(file_content, file_name)
+
+    return asyncio.run(_run())
+
+
+def parse_and_chunk_file(
+    file_content: bytes,
+    file_name: str,
+    file_type: str,
+    chunker: BaseChunker,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Segment:
+    """解析并分块整个文件"""
+    result = parse_file(file_content, file_name, file_type)
+    return chunk_text(chunker, result.text, chunk_size, chunk_overlap), result.media
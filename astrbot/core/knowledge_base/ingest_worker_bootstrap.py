@@ -0,0 +1,22 @@
+"""知识库文档解析进程池的工作进程引导脚本
+
+由 IngestPool 在工作进程启动时按文件路径执行 (runpy.run_path), 不经过包导入。
+
+导入 astrbot 下的任何模块都会先执行 astrbot 与 astrbot.core 的 __init__, 读取配置、
+创建数据库与日志等。这里把这两个包注册为只有 __path__ 的空包, 工作进程随后只导入
+ingest_worker 与解析器、分块器。两个包已经导入时 (如在主进程中执行) 不做任何事。
+"""
+
+import sys
+import types
+from pathlib import Path
+
+_astrbot_dir = Path(__file__).resolve().parents[2]
+for _name, _path in (
+    ("astrbot", _astrbot_dir),
+    ("astrbot.core", _astrbot_dir / "core"),
+):
+    if _name not in sys.modules:
+        _package = types.ModuleType(_name)
+        _package.__path__ = [str(_path)]
+        sys.modules[_name] = _package
@@ -1,4 +1,5 @@
 from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 
 from sqlalchemy import delete, func, select, text, update
@@ -10,6 +11,8 @@ from astrbot.core.db.vec_db.faiss_impl import FaissVecDB
 from astrbot.core.knowledge_base.models import (
     BaseKBModel,
     KBDocument,
+    KBImportFile,
+    KBImportJob,
     KBMedia,
     KnowledgeBase,
 )
@@ -73,10 +76,49 @@ class KBSQLiteDatabase:
             await conn.execute(text("PRAGMA temp_store=MEMORY"))
             await conn.execute(text("PRAGMA mmap_size=134217728"))
             await conn.execute(text("PRAGMA optimize"))
+            await self._ensure_kb_index_columns(conn)
+            await self._ensure_document_columns(conn)
             await conn.commit()
 
         self.inited = True
 
+    async def _ensure_kb_index_columns(self, conn) -> None:
+        """确保 knowledge_bases 表有 index_type 和 index_params 列。
+
+        这是为了支持旧版数据库的平滑升级。新版数据库通过 SQLModel
+        的 metadata.create_all 自动创建这些列。
+        """
+        result = await conn.execute(text("PRAGMA table_info(knowledge_bases)"))
+        columns = {row[1] for row in result.fetchall()}
+
+        if "index_type" not in columns:
+            await conn.execute(
+                text(
+                    "ALTER TABLE knowledge_bases ADD COLUMN index_type VARCHAR(20) "
+                    "DEFAULT 'flat'"
+                )
+            )
+        if "index_params" not in columns:
+            await conn.execute(
+                text("ALTER TABLE knowledge_bases ADD COLUMN index_params JSON")
+            )
+
+    async def _ensure_document_columns(self, conn) -> None:
+        """确保 kb_documents 表有 content_hash 列, 用于支持旧版数据库的平滑升级。"""
+        result = await conn.execute(text("PRAGMA table_info(kb_documents)"))
+        columns = {row[1] for row in result.fetchall()}
+
+        if "content_hash" not in columns:
+            await conn.execute(
+                text("ALTER TABLE kb_documents ADD COLUMN content_hash VARCHAR(64)")
+            )
+            await conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_kb_documents_content_hash "
+                    "ON kb_documents(content_hash)"
+                )
+            )
+
     async def migrate_to_v1(self) -> None:
         """执行知识库数据库 v1 迁移
 
@@ -238,6 +280,24 @@ class KBSQLiteDatabase:
             result = await session.execute(stmt)
             return result.scalar() or 0
 
+    async def get_document_by_content_hash(
+        self,
+        kb_id: str,
+        content_hash: str,
+    ) -> KBDocument | None:
+        """获取知识库中内容哈希相同的文档"""
+        async with self.get_db() as session:
+            stmt = (
+                select(KBDocument)
+                .where(
+                    col(KBDocument.kb_id) == kb_id,
+                    col(KBDocument.content_hash) == content_hash,
+                )
+                .limit(1)
+            )
+            result = await session.execute(stmt)
+            return result.scalar_one_or_none()
+
     async def get_document_with_metadata(self, doc_id: str) -> dict | None:
         async with self.get_db() as session:
             stmt = (
@@ -342,3 +402,129 @@ class KBSQLiteDatabase:
 
             await session.execute(update_stmt)
             await session.commit()
+
+    # ===== 批量导入任务 =====
+
+    async def create_import_job(
+        self,
+        job: KBImportJob,
+        files: list[KBImportFile],
+    ) -> None:
+        """创建导入任务及其文件"""
+        async with self.get_db() as session, session.begin():
+            session.add(job)
+            session.add_all(files)
+
+    async def get_import_job(self, job_id: str) -> KBImportJob | None:
+        async with self.get_db() as session:
+            stmt = select(KBImportJob).where(col(KBImportJob.job_id) == job_id)
+            result = await session.execute(stmt)
+            return result.scalar_one_or_none()
+
+    async def list_import_jobs(
+        self,
+        kb_id: str | None = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> list[KBImportJob]:
+        """按创建时间倒序列出导入任务"""
+        async with self.get_db() as session:
+            stmt = select(KBImportJob)
+            if kb_id:
+                stmt = stmt.where(col(KBImportJob.kb_id) == kb_id)
+            stmt = stmt.order_by(desc(KBImportJob.id)).offset(offset).limit(limit)
+            result = await session.execute(stmt)
+            return list(result.scalars().all())
+
+    async def list_import_files(self, job_id: str) -> list[KBImportFile]:
+        async with self.get_db() as session:
+            stmt = (
+                select(KBImportFile)
+                .where(col(KBImportFile.job_id) == job_id)
+                .order_by(col(KBImportFile.id))
+            )
+            result = await session.execute(stmt)
+            return list(result.scalars().all())
+
+    async def count_import_files_by_status(self, job_id: str) -> dict[str, int]:
+        async with self.get_db() as session:
+            stmt = (
+                select(col(KBImportFile.status), func.count(col(KBImportFile.id)))
+                .where(col(KBImportFile.job_id) == job_id)
+                .group_by(col(KBImportFile.status))
+            )
+            result = await session.execute(stmt)
+            return {row[0]: row[1] for row in result.all()}
+
+    async def claim_next_import_file(self) -> KBImportFile | None:
+        """取出最早提交的待处理文件, 并将其与所属任务标记为处理中"""
+        now = datetime.now(timezone.utc)
+        async with self.get_db() as session, session.begin():
+            stmt = (
+                select(KBImportFile)
+                .where(col(KBImportFile.status) == "pending")
+                .order_by(col(KBImportFile.id))
+                .limit(1)
+            )
+            file = (await session.execute(stmt)).scalar_one_or_none()
+            if file is None:
+                return None
+            file.status = "processing"
+            file.updated_at = now
+            await session.execute(
+                update(KBImportJob)
+                .where(
+                    col(KBImportJob.job_id) == file.job_id,
+                    col(KBImportJob.status) == "pending",
+                )
+                .values(status="processing", updated_at=now),
+            )
+            return file
+
+    async def update_import_file(self, file_id: str, **values) -> None:
+        async with self.get_db() as session, session.begin():
+            await session.execute(
+                update(KBImportFile)
+                .where(col(KBImportFile.file_id) == file_id)
+                .values(**values, updated_at=datetime.now(timezone.utc)),
+            )
+
+    async def update_import_files(
+        self,
+        job_id: str,
+        from_status: str,
+        to_status: str,
+    ) -> int:
+        """将任务中处于 from_status 的文件改为 to_status, 返回修改的文件数"""
+        async with self.get_db() as session, session.begin():
+            result = await session.execute(
+                update(KBImportFile)
+                .where(
+                    col(KBImportFile.job_id) == job_id,
+                    col(KBImportFile.status) == from_status,
+                )
+                .values(
+                    status=to_status,
+                    error=None,
+                    updated_at=datetime.now(timezone.utc),
+                ),
+            )
+            return result.rowcount  # type: ignore
+
+    async def update_import_job_status(self, job_id: str, status: str) -> None:
+        async with self.get_db() as session, session.begin():
+            await session.execute(
+                update(KBImportJob)
+                .where(col(KBImportJob.job_id) == job_id)
+                .values(status=status, updated_at=datetime.now(timezone.utc)),
+            )
+
+    async def reset_interrupted_imports(self) -> int:
+        """将上次退出时仍在处理中的文件重新放回队列, 返回文件数"""
+        async with self.get_db() as session, session.begin():
+            result = await session.execute(
+                update(KBImportFile)
+                .where(col(KBImportFile.status) == "processing")
+                .values(status="pending"),
+            )
+            return result.rowcount  # type: ignore
@@ -1,8 +1,11 @@
 import asyncio
+import hashlib
 import json
 import re
 import time
 import uuid
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
 from pathlib import Path
 
 import aiofiles
@@ -21,11 +24,20 @@ from astrbot.core.provider.provider import (
 
 from .chunking.base import BaseChunker
 from .chunking.recursive import RecursiveCharacterChunker
+from .import_queue import compute_content_hash
+from .ingest_pool import Segment, ingest_pool
 from .kb_db_sqlite import KBSQLiteDatabase
 from .models import KBDocument, KBMedia, KnowledgeBase
 from .parsers.url_parser import extract_text_from_url
-from .parsers.util import select_parser
 from .prompts import TEXT_REPAIR_SYSTEM_PROMPT
+from .retrieval.sparse_index import BM25Index
+
+# 超过该时间 (秒) 未续传的上传断点视为已放弃
+UPLOAD_CHECKPOINT_TTL = 24 * 3600
+
+
+async def _single_segment(chunks: list[str]) -> AsyncGenerator[Segment, None]:
+    yield chunks, []
 
 
 class RateLimiter:
@@ -108,6 +120,7 @@ Text chunk to process:
 class KBHelper:
     vec_db: BaseVecDB
     kb: KnowledgeBase
+    sparse_index: BM25Index | None
 
     def __init__(
         self,
@@ -130,8 +143,17 @@ class KBHelper:
         self.kb_medias_dir.mkdir(parents=True, exist_ok=True)
         self.kb_files_dir.mkdir(parents=True, exist_ok=True)
 
+        self.sparse_index = None
+        self._index_rebuild_task: asyncio.Task | None = None
+        # 内容版本号, 文档增删或配置变更时递增, 用作检索结果缓存键的一部分
+        self.version = 0
+        # 块已写入向量库但尚未保存文档记录的文档 ID (上传中或留有断点), 检索时排除
+        self.uncommitted_doc_ids: set[str] = set()
+
     async def initialize(self) -> None:
         await self._ensure_vec_db()
+        await self._sweep_upload_checkpoints()
+        await self._ensure_sparse_index()
 
     async def get_ep(self) -> EmbeddingProvider:
         if not self.kb.embedding_provider_id:
@@ -164,25 +186,108 @@ class KBHelper:
         ep = await self.get_ep()
         rp = await self.get_rp()
 
+        # Provider 未变化时复用已有实例, 避免丢失正在进行的索引重建
+        vec_db: FaissVecDB | None = getattr(self, "vec_db", None)  # type: ignore
+        if (
+            isinstance(vec_db, FaissVecDB)
+            and vec_db.embedding_provider is ep
+            and vec_db.rerank_provider is rp
+        ):
+            return vec_db
+        if vec_db:
+            await self._await_index_rebuild()
+            await vec_db.close()
+
         vec_db = FaissVecDB(
             doc_store_path=str(self.kb_dir / "doc.db"),
             index_store_path=str(self.kb_dir / "index.faiss"),
             embedding_provider=ep,
             rerank_provider=rp,
+            index_type=self.kb.index_type or "flat",
+            index_params=self.kb.index_params,
         )
         await vec_db.initialize()
         self.vec_db = vec_db
+        self.bump_version()
+        self.schedule_index_rebuild()
         return vec_db
 
+    def bump_version(self) -> None:
+        """递增内容版本号, 使该知识库的检索结果缓存失效"""
+        self.version += 1
+
+    def schedule_index_rebuild(self, force: bool = False) -> bool:
+        """在后台重建向量索引
+
+        当知识库配置的索引类型与磁盘上的索引不一致 (例如从旧版 flat 索引迁移,
+        或 IVF 索引积累到足够的训练向量) 时触发。
+
+        Returns:
+            bool: 是否启动了新的重建任务
+
+        """
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
+        storage = vec_db.embedding_storage
+        storage.configure(self.kb.index_type or "flat", self.kb.index_params)
+        if self._index_rebuild_task and not self._index_rebuild_task.done():
+            # 正在运行的重建任务结束后会再次检查配置
+            return False
+        if not force and not storage.needs_rebuild():
+            return False
+        self._index_rebuild_task = asyncio.create_task(self._rebuild_index(storage))
+        return True
+
+    async def _rebuild_index(self, storage) -> None:
+        try:
+            await storage.rebuild()
+            while storage.needs_rebuild():
+                await storage.rebuild()
+        except Exception as e:
+            logger.error(f"重建知识库 {self.kb.kb_name} 的向量索引失败: {e}")
+
+    async def _await_index_rebuild(self) -> None:
+        task = self._index_rebuild_task
+        if task and not task.done():
+            await task
+
+    async def evaluate_index(self, sample_size: int = 100, k: int = 10) -> dict:
+        """生成向量索引的召回率与延迟报告"""
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
+        report = await vec_db.embedding_storage.evaluate(sample_size=sample_size, k=k)
+        task = self._index_rebuild_task
+        report["rebuilding"] = bool(task and not task.done())
+        return report
+
+    async def _ensure_sparse_index(self) -> BM25Index:
+        """加载 BM25 倒排索引, 不存在或与文档存储不一致时全量重建"""
+        if self.sparse_index is not None:
+            return self.sparse_index
+
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
+        sparse_index = BM25Index(str(self.kb_dir / "index.bm25"))
+        loaded = await sparse_index.load()
+        chunk_count = await vec_db.count_documents()
+        if not loaded or len(sparse_index) != chunk_count:
+            logger.info(
+                f"正在为知识库 {self.kb.kb_name} 重建 BM25 索引 ({chunk_count} 个块)..."
+            )
+            await sparse_index.rebuild(vec_db.document_storage)
+        self.sparse_index = sparse_index
+        return sparse_index
+
     async def delete_vec_db(self) -> None:
         """删除知识库的向量数据库和所有相关文件"""
         import shutil
 
         await self.terminate()
+        self.sparse_index = None
         if self.kb_dir.exists():
             shutil.rmtree(self.kb_dir)
 
     async def terminate(self) -> None:
+        await self._await_index_rebuild()
+        if self.sparse_index is not None:
+            await self.sparse_index.close()
         if self.vec_db:
             await self.vec_db.close()
 
@@ -198,6 +303,7 @@ class KBHelper:
         max_retries: int = 3,
         progress_callback=None,
         pre_chunked_text: list[str] | None = None,
+        cpu_budget: int | None = None,
     ) -> KBDocument:
         """上传并处理文档（带原子性保证和失败清理）
 
@@ -210,31 +316,38 @@ class KBHelper:
         6. 保存元数据（事务）
         7. 更新统计
 
+        文档在进程池中解析、分块, 分块结果逐段产出, 解析尚未完成时即开始生成向量。
+        知识库中已有内容相同的块时直接复用其向量。
+        向量按批写入, 每批完成后记录断点; 上传失败后重新上传同一文件时,
+        从最后完成的批次继续。
+
         Args:
             progress_callback: 进度回调函数，接收参数 (stage, current, total)
                 - stage: 当前阶段 ('parsing', 'chunking', 'embedding')
                 - current: 当前进度
                 - total: 总数
+            cpu_budget: 本次上传最多同时占用的解析进程数, 默认为进程池的一半
 
         """
         await self._ensure_vec_db()
-        doc_id = str(uuid.uuid4())
+        sparse_index = await self._ensure_sparse_index()
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
         media_paths: list[Path] = []
-        file_size = 0
+        checkpoint_path: Path | None = None
 
         # file_path = self.kb_files_dir / f"{doc_id}.{file_type}"
         # async with aiofiles.open(file_path, "wb") as f:
         #     await f.write(file_content)
 
         try:
-            chunks_text = []
-            saved_media = []
-
             if pre_chunked_text is not None:
                 # 如果提供了预分块文本，直接使用
-                chunks_text = pre_chunked_text
-                file_size = sum(len(chunk) for chunk in chunks_text)
-                logger.info(f"使用预分块文本进行上传，共 {len(chunks_text)} 个块。")
+                file_size = sum(len(chunk) for chunk in pre_chunked_text)
+                segments = _single_segment(pre_chunked_text)
+                checkpoint_source: bytes | list[str] = pre_chunked_text
+                logger.info(
+                    f"使用预分块文本进行上传，共 {len(pre_chunked_text)} 个块。"
+                )
             else:
                 # 否则，执行标准的文件解析和分块流程
                 if file_content is None:
@@ -243,68 +356,141 @@ class KBHelper:
                     )
 
                 file_size = len(file_content)
+                checkpoint_source = file_content
 
-                # 阶段1: 解析文档
+                # 阶段1、2: 在进程池中解析并分块, 按顺序逐段产出
                 if progress_callback:
                     await progress_callback("parsing", 0, 100)
 
-                parser = await select_parser(f".{file_type}")
-                parse_result = await parser.parse(file_content, file_name)
-                text_content = parse_result.text
-                media_items = parse_result.media
-
-                if progress_callback:
-                    await progress_callback("parsing", 100, 100)
-
-                # 保存媒体文件
-                for media_item in media_items:
-                    media = await self._save_media(
-                        doc_id=doc_id,
-                        media_type=media_item.media_type,
-                        file_name=media_item.file_name,
-                        content=media_item.content,
-                        mime_type=media_item.mime_type,
-                    )
-                    saved_media.append(media)
-                    media_paths.append(Path(media.file_path))
-
-                # 阶段2: 分块
-                if progress_callback:
-                    await progress_callback("chunking", 0, 100)
+                async def parsing_progress_callback(done, total) -> None:
+                    if progress_callback:
+                        await progress_callback("parsing", done, total)
+
+                segments = ingest_pool.iter_segments(
+                    file_content,
+                    file_name,
+                    file_type,
+                    self.chunker,
+                    chunk_size,
+                    chunk_overlap,
+                    cpu_budget=cpu_budget,
+                    progress_callback=parsing_progress_callback,
+                )
 
-                chunks_text = await self.chunker.chunk(
-                    text_content,
-                    chunk_size=chunk_size,
-                    chunk_overlap=chunk_overlap,
+            # 同一文件此前上传失败时, 从断点继续
+            checkpoint_path = self._upload_checkpoint_path(
+                file_name,
+                file_type,
+                chunk_size,
+                chunk_overlap,
+                checkpoint_source,
+            )
+            checkpoint = await self._load_upload_checkpoint(checkpoint_path)
+            if checkpoint:
+                doc_id, done_chunk_ids, done_int_ids = checkpoint
+                logger.info(
+                    f"从断点继续上传 {file_name}: 已完成 {len(done_int_ids)} 个块",
                 )
-            contents = []
-            metadatas = []
-            for idx, chunk_text in enumerate(chunks_text):
-                contents.append(chunk_text)
-                metadatas.append(
-                    {
-                        "kb_id": self.kb.kb_id,
-                        "kb_doc_id": doc_id,
-                        "chunk_index": idx,
-                    },
+            else:
+                doc_id = str(uuid.uuid4())
+                done_chunk_ids, done_int_ids = [], []
+                await self._write_upload_checkpoint(checkpoint_path, doc_id)
+            self.uncommitted_doc_ids.add(doc_id)
+            resume_from = len(done_int_ids)
+
+            contents: list[str] = []
+            metadatas: list[dict] = []
+            chunk_ids: list[str] = []
+            int_ids: list[int] = list(done_int_ids)
+            saved_media: list[KBMedia] = []
+            checkpointed = resume_from
+
+            async def checkpoint_callback(_completed, batch_int_ids) -> None:
+                nonlocal checkpointed
+                assert checkpoint_path is not None
+                batch_chunk_ids = chunk_ids[
+                    checkpointed : checkpointed + len(batch_int_ids)
+                ]
+                checkpointed += len(batch_int_ids)
+                record = {"chunk_ids": batch_chunk_ids, "int_ids": batch_int_ids}
+                async with aiofiles.open(checkpoint_path, "a", encoding="utf-8") as f:
+                    await f.write(json.dumps(record) + "\n")
+
+            async def flush() -> None:
+                """为已分块、尚未生成向量的块生成向量并写入向量库"""
+                start = len(int_ids)
+                if start >= len(contents):
+                    return
+
+                async def embedding_progress_callback(current, _total) -> None:
+                    if progress_callback:
+                        await progress_callback(
+                            "embedding", start + current, len(contents)
+                        )
+
+                int_ids.extend(
+                    await vec_db.insert_batch(
+                        contents=contents[start:],
+                        metadatas=metadatas[start:],
+                        ids=chunk_ids[start:],
+                        batch_size=batch_size,
+                        tasks_limit=tasks_limit,
+                        max_retries=max_retries,
+                        progress_callback=embedding_progress_callback,
+                        checkpoint_callback=checkpoint_callback,
+                        reuse_vectors=True,
+                    ),
                 )
 
+            # 阶段3: 解析仍在进行时, 攒够能让向量请求并发跑满的块数就开始生成向量
+            limiter = vec_db.embedding_provider.get_concurrency_limiter(tasks_limit)
+            async with aclosing(segments) as stream:
+                async for segment_chunks, segment_media in stream:
+                    # 保存媒体文件
+                    for media_item in segment_media:
+                        media = await self._save_media(
+                            doc_id=doc_id,
+                            media_type=media_item.media_type,
+                            file_name=media_item.file_name,
+                            content=media_item.content,
+                            mime_type=media_item.mime_type,
+                        )
+                        saved_media.append(media)
+                        media_paths.append(Path(media.file_path))
+
+                    for chunk_text in segment_chunks:
+                        idx = len(contents)
+                        contents.append(chunk_text)
+                        metadatas.append(
+                            {
+                                "kb_id": self.kb.kb_id,
+                                "kb_doc_id": doc_id,
+                                "chunk_index": idx,
+                            },
+                        )
+                        chunk_ids.append(
+                            done_chunk_ids[idx]
+                            if idx < resume_from
+                            else str(uuid.uuid4()),
+                        )
+
+                    pending = len(contents) - len(int_ids)
+                    if pending >= batch_size * limiter.concurrency * 2:
+                        await flush()
+
             if progress_callback:
                 await progress_callback("chunking", 100, 100)
 
-            # 阶段3: 生成向量（带进度回调）
-            async def embedding_progress_callback(current, total) -> None:
-                if progress_callback:
-                    await progress_callback("embedding", current, total)
-
-            await self.vec_db.insert_batch(
-                contents=contents,
-                metadatas=metadatas,
-                batch_size=batch_size,
-                tasks_limit=tasks_limit,
-                max_retries=max_retries,
-                progress_callback=embedding_progress_callback,
-            )
+            if len(contents) < resume_from:
+                # 分块结果与断点不一致 (如分块器实现发生了变化), 丢弃断点
+                await vec_db.delete_documents(metadata_filters={"kb_doc_id": doc_id})
+                self.uncommitted_doc_ids.discard(doc_id)
+                checkpoint_path.unlink(missing_ok=True)
+                checkpoint_path = None
+                raise Exception(f"{file_name} 的分块结果与上传断点不一致, 请重新上传")
+
+            await flush()
+            await sparse_index.add_chunks(int_ids, chunk_ids, contents, metadatas)
 
             # 保存文档的元数据
             doc = KBDocument(
@@ -315,8 +501,9 @@ class KBHelper:
                 file_size=file_size,
                 # file_path=str(file_path),
                 file_path="",
-                chunk_count=len(chunks_text),
+                chunk_count=len(contents),
                 media_count=0,
+                content_hash=compute_content_hash(checkpoint_source),
             )
             async with self.kb_db.get_db() as session:
                 async with session.begin():
@@ -327,13 +514,18 @@ class KBHelper:
 
                 await session.refresh(doc)
 
-            vec_db: FaissVecDB = self.vec_db  # type: ignore
+            self.uncommitted_doc_ids.discard(doc_id)
+            self.bump_version()
             await self.kb_db.update_kb_stats(kb_id=self.kb.kb_id, vec_db=vec_db)
             await self.refresh_kb()
             await self.refresh_document(doc_id)
+            self.schedule_index_rebuild()
+            checkpoint_path.unlink(missing_ok=True)
             return doc
         except Exception as e:
             logger.error(f"上传文档失败: {e}")
+            if checkpoint_path is not None:
+                await self._report_upload_checkpoint(checkpoint_path, file_name)
             # if file_path.exists():
             #     file_path.unlink()
 
@@ -346,6 +538,113 @@ class KBHelper:
 
             raise e
 
+    def _upload_checkpoint_path(
+        self,
+        file_name: str,
+        file_type: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        source: bytes | list[str],
+    ) -> Path:
+        """断点文件路径, 由文件名、分块参数与原始内容 (或预分块文本) 决定"""
+        digest = hashlib.sha256(
+            json.dumps([file_name, file_type, chunk_size, chunk_overlap]).encode(),
+        )
+        digest.update(compute_content_hash(source).encode())
+        return self.kb_dir / "upload_checkpoints" / f"{digest.hexdigest()}.jsonl"
+
+    async def _write_upload_checkpoint(self, path: Path, doc_id: str) -> None:
+        """创建上传断点文件
+
+        第一行记录文档 ID, 之后每写入一批向量追加一行该批块的 ID 与整数 ID。
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        async with aiofiles.open(path, "w", encoding="utf-8") as f:
+            await f.write(json.dumps({"doc_id": doc_id}) + "\n")
+
+    async def _load_upload_checkpoint(
+        self,
+        path: Path,
+    ) -> tuple[str, list[str], list[int]] | None:
+        """读取上传断点, 返回 (文档 ID, 已写入的块 ID 列表, 已写入的整数 ID 列表)"""
+        if not path.exists():
+            return None
+        try:
+            async with aiofiles.open(path, encoding="utf-8") as f:
+                lines = (await f.read()).splitlines()
+            doc_id: str = json.loads(lines[0])["doc_id"]
+        except Exception as e:
+            logger.warning(f"读取上传断点 {path} 失败: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        chunk_ids: list[str] = []
+        int_ids: list[int] = []
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 末尾不完整的记录
+                break
+            chunk_ids.extend(record["chunk_ids"])
+            int_ids.extend(record["int_ids"])
+
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
+        stored = await vec_db.count_documents(metadata_filter={"kb_doc_id": doc_id})
+        if len(chunk_ids) != len(int_ids) or stored != len(int_ids):
+            # 写入向量库之后、记录断点之前中断时两者不一致, 丢弃已写入的块重新上传
+            logger.warning(f"上传断点 {path} 与向量库不一致, 将重新上传")
+            await vec_db.delete_documents(metadata_filters={"kb_doc_id": doc_id})
+            path.unlink(missing_ok=True)
+            return None
+        return doc_id, chunk_ids, int_ids
+
+    async def _sweep_upload_checkpoints(
+        self,
+        ttl: float = UPLOAD_CHECKPOINT_TTL,
+    ) -> None:
+        """启动时检查遗留的上传断点
+
+        断点对应的块已写入向量库, 但还没有文档记录。未过期的断点保留以便续传,
+        其文档在检索时被排除; 超过 ttl 未续传的断点视为已放弃, 删除其块与断点文件。
+        """
+        checkpoint_dir = self.kb_dir / "upload_checkpoints"
+        if not checkpoint_dir.exists():
+            return
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
+        now = time.time()
+        for path in checkpoint_dir.glob("*.jsonl"):
+            try:
+                async with aiofiles.open(path, encoding="utf-8") as f:
+                    doc_id: str = json.loads(await f.readline())["doc_id"]
+            except Exception as e:
+                logger.warning(f"读取上传断点 {path} 失败: {e}")
+                path.unlink(missing_ok=True)
+                continue
+            if await self.kb_db.get_document_by_id(doc_id):
+                # 文档记录已保存, 只是断点文件没来得及删除
+                path.unlink(missing_ok=True)
+                continue
+            if now - path.stat().st_mtime < ttl:
+                self.uncommitted_doc_ids.add(doc_id)
+                continue
+            await vec_db.delete_documents(metadata_filters={"kb_doc_id": doc_id})
+            if self.sparse_index is not None:
+                await self.sparse_index.remove_document(doc_id)
+            path.unlink(missing_ok=True)
+            logger.info(f"已清理知识库 {self.kb.kb_name} 中过期的上传断点 {path.name}")
+
+    async def _report_upload_checkpoint(self, path: Path, file_name: str) -> None:
+        """上传失败后保留有进度的断点, 没有任何进度时删除"""
+        try:
+            async with aiofiles.open(path, encoding="utf-8") as f:
+                lines = (await f.read()).splitlines()
+        except FileNotFoundError:
+            return
+        if len(lines) > 1:
+            logger.info(f"已保存 {file_name} 的上传进度, 重新上传同一文件将从断点继续")
+        else:
+            path.unlink(missing_ok=True)
+
     async def list_documents(
         self,
         offset: int = 0,
@@ -366,6 +665,10 @@ class KBHelper:
             doc_id=doc_id,
             vec_db=self.vec_db,  # type: ignore
         )
+        if self.sparse_index is not None:
+            await self.sparse_index.remove_document(doc_id)
+        self.bump_version()
+        self.schedule_index_rebuild()
         await self.kb_db.update_kb_stats(
             kb_id=self.kb.kb_id,
             vec_db=self.vec_db,  # type: ignore
@@ -376,6 +679,10 @@ class KBHelper:
         """删除单个文本块及其相关数据"""
         vec_db: FaissVecDB = self.vec_db  # type: ignore
         await vec_db.delete(chunk_id)
+        if self.sparse_index is not None:
+            await self.sparse_index.remove_chunks([chunk_id])
+        self.bump_version()
+        self.schedule_index_rebuild()
         await self.kb_db.update_kb_stats(
             kb_id=self.kb.kb_id,
             vec_db=self.vec_db,  # type: ignore
@@ -2,11 +2,14 @@ import traceback
 from pathlib import Path
 
 from astrbot.core import logger
+from astrbot.core.db.vec_db.faiss_impl.embedding_storage import normalize_index_params
 from astrbot.core.provider.manager import ProviderManager
 from astrbot.core.utils.astrbot_path import get_astrbot_knowledge_base_path
 
 # from .chunking.fixed_size import FixedSizeChunker
 from .chunking.recursive import RecursiveCharacterChunker
+from .import_queue import KBImportQueue
+from .ingest_pool import ingest_pool
 from .kb_db_sqlite import KBSQLiteDatabase
 from .kb_helper import KBHelper
 from .models import KBDocument, KnowledgeBase
@@ -33,6 +36,7 @@ class KnowledgeBaseManager:
         self._session_deleted_callback_registered = False
 
         self.kb_insts: dict[str, KBHelper] = {}
+        self.import_queue = KBImportQueue(self, Path(FILES_PATH) / "import_staging")
 
     async def initialize(self) -> None:
         """初始化知识库模块"""
@@ -51,6 +55,7 @@ class KnowledgeBaseManager:
                 kb_db=self.kb_db,
             )
             await self.load_kbs()
+            await self.import_queue.start()
 
         except ImportError as e:
             logger.error(f"知识库模块导入失败: {e}")
@@ -91,10 +96,14 @@ class KnowledgeBaseManager:
         top_k_dense: int | None = None,
         top_k_sparse: int | None = None,
         top_m_final: int | None = None,
+        index_type: str | None = None,
+        index_params: dict | None = None,
     ) -> KBHelper:
         """创建新的知识库实例"""
         if embedding_provider_id is None:
             raise ValueError("创建知识库时必须提供embedding_provider_id")
+        index_type = index_type or "flat"
+        normalize_index_params(index_type, index_params)
         kb = KnowledgeBase(
             kb_name=kb_name,
             description=description,
@@ -106,6 +115,8 @@ class KnowledgeBaseManager:
             top_k_dense=top_k_dense if top_k_dense is not None else 50,
             top_k_sparse=top_k_sparse if top_k_sparse is not None else 50,
             top_m_final=top_m_final if top_m_final is not None else 5,
+            index_type=index_type,
+            index_params=index_params,
         )
         try:
             async with self.kb_db.get_db() as session:
@@ -172,11 +183,20 @@ class KnowledgeBaseManager:
         top_k_dense: int | None = None,
         top_k_sparse: int | None = None,
         top_m_final: int | None = None,
+        index_type: str | None = None,
+        index_params: dict | None = None,
     ) -> KBHelper | None:
-        """更新知识库实例"""
+        """更新知识库实例
+
+        修改 index_type 或 index_params 后会在后台将已有向量迁移到新的索引。
+        """
         kb_helper = await self.get_kb(kb_id)
         if not kb_helper:
             return None
+        if index_type is not None or index_params is not None:
+            normalize_index_params(
+                index_type or kb_helper.kb.index_type or "flat", index_params
+            )
 
         kb = kb_helper.kb
         if kb_name is not None:
@@ -198,11 +218,21 @@ class KnowledgeBaseManager:
             kb.top_k_sparse = top_k_sparse
         if top_m_final is not None:
             kb.top_m_final = top_m_final
+        index_changed = False
+        if index_type is not None and index_type != kb.index_type:
+            kb.index_type = index_type
+            index_changed = True
+        if index_params is not None and index_params != kb.index_params:
+            kb.index_params = index_params
+            index_changed = True
         async with self.kb_db.get_db() as session:
             session.add(kb)
             await session.commit()
             await session.refresh(kb)
 
+        kb_helper.bump_version()
+        if index_changed:
+            kb_helper.schedule_index_rebuild(force=True)
         return kb_helper
 
     async def retrieve(
@@ -223,13 +253,14 @@ class KnowledgeBaseManager:
         if not kb_ids:
             return {}
 
-        results = await self.retrieval_manager.retrieve(
+        response = await self.retrieval_manager.retrieve_with_timings(
             query=query,
             kb_ids=kb_ids,
             kb_id_helper_map=kb_id_helper_map,
             top_k_fusion=top_k_fusion,
             top_m_final=top_m_final,
         )
+        results = response.results
         if not results:
             return None
 
@@ -253,6 +284,8 @@ class KnowledgeBaseManager:
         return {
             "context_text": context_text,
             "results": results_dict,
+            "timings": response.timings,
+            "cached": response.cached,
         }
 
     def _format_context(self, results: list[RetrievalResult]) -> str:
@@ -278,6 +311,8 @@ class KnowledgeBaseManager:
 
     async def terminate(self) -> None:
         """终止所有知识库实例,关闭数据库连接"""
+        # 正在导入的文件会在下次启动时从上传断点继续
+        await self.import_queue.stop()
         for kb_id, kb_helper in self.kb_insts.items():
             try:
                 await kb_helper.terminate()
@@ -285,6 +320,7 @@ class KnowledgeBaseManager:
                 logger.error(f"关闭知识库 {kb_id} 失败: {e}")
 
         self.kb_insts.clear()
+        await ingest_pool.shutdown()
 
         # 关闭元数据数据库
         if hasattr(self, "kb_db") and self.kb_db:
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 
-from sqlmodel import Field, MetaData, SQLModel, Text, UniqueConstraint
+from sqlmodel import JSON, Field, MetaData, SQLModel, Text, UniqueConstraint
 
 
 class BaseKBModel(SQLModel, table=False):
@@ -40,6 +40,9 @@ class KnowledgeBase(BaseKBModel, table=True):
     top_k_dense: int | None = Field(default=50, nullable=True)
     top_k_sparse: int | None = Field(default=50, nullable=True)
     top_m_final: int | None = Field(default=5, nullable=True)
+    # 向量索引配置参数
+    index_type: str | None = Field(default="flat", max_length=20, nullable=True)
+    index_params: dict | None = Field(default=None, sa_type=JSON)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -83,6 +86,8 @@ class KBDocument(BaseKBModel, table=True):
     file_path: str = Field(max_length=512, nullable=False)
     chunk_count: int = Field(default=0, nullable=False)
     media_count: int = Field(default=0, nullable=False)
+    content_hash: str | None = Field(default=None, max_length=64, index=True)
+    """原始文件 (或预分块文本) 的 SHA-256, 用于导入时跳过重复文档"""
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -118,3 +123,76 @@ class KBMedia(BaseKBModel, table=True):
     file_size: int = Field(nullable=False)
     mime_type: str = Field(max_length=100, nullable=False)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class KBImportJob(BaseKBModel, table=True):
+    """批量导入任务表
+
+    一次批量导入提交的所有文件属于同一个任务, 任务在后台排队处理, 重启后继续。
+    """
+
+    __tablename__ = "kb_import_jobs"  # type: ignore
+
+    id: int | None = Field(
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": True},
+        default=None,
+    )
+    job_id: str = Field(
+        max_length=36,
+        nullable=False,
+        unique=True,
+        default_factory=lambda: str(uuid.uuid4()),
+        index=True,
+    )
+    kb_id: str = Field(max_length=36, nullable=False, index=True)
+    status: str = Field(default="pending", max_length=20, nullable=False)
+    """pending / processing / completed / partial / failed / cancelled"""
+    options: dict | None = Field(default=None, sa_type=JSON)
+    """分块与向量化参数: chunk_size, chunk_overlap, batch_size, tasks_limit, max_retries"""
+    file_total: int = Field(default=0, nullable=False)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column_kwargs={"onupdate": datetime.now(timezone.utc)},
+    )
+
+
+class KBImportFile(BaseKBModel, table=True):
+    """批量导入任务中的单个文件
+
+    状态: pending → processing → completed / skipped (与已有文档重复) / failed / cancelled
+    """
+
+    __tablename__ = "kb_import_files"  # type: ignore
+
+    id: int | None = Field(
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": True},
+        default=None,
+    )
+    file_id: str = Field(
+        max_length=36,
+        nullable=False,
+        unique=True,
+        default_factory=lambda: str(uuid.uuid4()),
+        index=True,
+    )
+    job_id: str = Field(max_length=36, nullable=False, index=True)
+    kb_id: str = Field(max_length=36, nullable=False)
+    file_name: str = Field(max_length=255, nullable=False)
+    file_type: str = Field(max_length=20, nullable=False)
+    file_size: int = Field(default=0, nullable=False)
+    staged_path: str = Field(max_length=512, nullable=False)
+    """暂存的原始文件, 预分块文档暂存为 JSON 格式的块列表"""
+    pre_chunked: bool = Field(default=False, nullable=False)
+    content_hash: str = Field(max_length=64, nullable=False)
+    status: str = Field(default="pending", max_length=20, nullable=False, index=True)
+    doc_id: str | None = Field(default=None, max_length=36)
+    """导入生成的文档, 或被跳过时与之重复的已有文档"""
+    error: str | None = Field(default=None, sa_type=Text)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column_kwargs={"onupdate": datetime.now(timezone.utc)},
+    )
@@ -31,71 +31,98 @@ class PDFParser(BaseParser):
             ParseResult: 包含文本和图片的解析结果
 
         """
-        pdf_file = io.BytesIO(file_content)
-        reader = PdfReader(pdf_file)
+        return self.parse_pages(file_content)
+
+    @staticmethod
+    def count_pages(source: bytes | str) -> int:
+        """获取 PDF 的页数, source 为文件内容或文件路径"""
+        return len(_open_reader(source).pages)
+
+    @staticmethod
+    def parse_pages(
+        source: bytes | str,
+        start: int = 0,
+        end: int | None = None,
+    ) -> ParseResult:
+        """同步解析 [start, end) 范围内的页面, source 为文件内容或文件路径
+
+        只依赖参数, 可以在其他进程中按页码范围并行执行。
+        """
+        reader = _open_reader(source)
+        pages = reader.pages[start:end]
 
         text_parts = []
         media_items = []
 
         # 提取文本
-        for page in reader.pages:
+        for page in pages:
             text = page.extract_text()
             if text:
                 text_parts.append(text)
 
         # 提取图片
-        image_counter = 0
-        for page_num, page in enumerate(reader.pages):
-            try:
-                # 安全检查 Resources
-                if "/Resources" not in page:
-                    continue
+        for page_num, page in enumerate(pages, start=start):
+            media_items.extend(_extract_page_images(page, page_num))
+
+        full_text = "\n\n".join(text_parts)
+        return ParseResult(text=full_text, media=media_items)
+
+
+def _open_reader(source: bytes | str) -> PdfReader:
+    if isinstance(source, bytes):
+        return PdfReader(io.BytesIO(source))
+    return PdfReader(source)
 
-                resources = page["/Resources"]
-                if not resources or "/XObject" not in resources:  # type: ignore
-                    continue
 
-                xobjects = resources["/XObject"].get_object()  # type: ignore
-                if not xobjects:
+def _extract_page_images(page, page_num: int) -> list[MediaItem]:
+    media_items = []
+    try:
+        # 安全检查 Resources
+        if "/Resources" not in page:
+            return media_items
+
+        resources = page["/Resources"]
+        if not resources or "/XObject" not in resources:  # type: ignore
+            return media_items
+
+        xobjects = resources["/XObject"].get_object()  # type: ignore
+        if not xobjects:
+            return media_items
+
+        for obj_name in xobjects:
+            try:
+                obj = xobjects[obj_name]
+
+                if obj.get("/Subtype") != "/Image":
                     continue
 
-                for obj_name in xobjects:
-                    try:
-                        obj = xobjects[obj_name]
-
-                        if obj.get("/Subtype") != "/Image":
-                            continue
-
-                        # 提取图片数据
-                        image_data = obj.get_data()
-
-                        # 确定格式
-                        filter_type = obj.get("/Filter", "")
-                        if filter_type == "/DCTDecode":
-                            ext = "jpg"
-                            mime_type = "image/jpeg"
-                        elif filter_type == "/FlateDecode":
-                            ext = "png"
-                            mime_type = "image/png"
-                        else:
-                            ext = "png"
-                            mime_type = "image/png"
-
-                        image_counter += 1
-                        media_items.append(
-                            MediaItem(
-                                media_type="image",
-                                file_name=f"page_{page_num}_img_{image_counter}.{ext}",
-                                content=image_data,
-                                mime_type=mime_type,
-                            ),
-                        )
-                    except Exception:
-                        # 单个图片提取失败不影响整体
-                        continue
+                # 提取图片数据
+                image_data = obj.get_data()
+
+                # 确定格式
+                filter_type = obj.get("/Filter", "")
+                if filter_type == "/DCTDecode":
+                    ext = "jpg"
+                    mime_type = "image/jpeg"
+                elif filter_type == "/FlateDecode":
+                    ext = "png"
+                    mime_type = "image/png"
+                else:
+                    ext = "png"
+                    mime_type = "image/png"
+
+                media_items.append(
+                    MediaItem(
+                        media_type="image",
+                        file_name=f"page_{page_num}_img_{len(media_items) + 1}.{ext}",
+                        content=image_data,
+                        mime_type=mime_type,
+                    ),
+                )
             except Exception:
-                # 页面处理失败不影响其他页面
+                # 单个图片提取失败不影响整体
                 continue
-
-        full_text = "\n\n".join(text_parts)
-        return ParseResult(text=full_text, media=media_items)
+    except Exception:
+        # 页面处理失败不影响其他页面
+        pass
+    return media_items
@@ -1,13 +1,16 @@
 """检索模块"""
 
-from .manager import RetrievalManager, RetrievalResult
+from .manager import RetrievalManager, RetrievalResponse, RetrievalResult
 from .rank_fusion import FusedResult, RankFusion
+from .sparse_index import BM25Index
 from .sparse_retriever import SparseResult, SparseRetriever
 
 __all__ = [
+    "BM25Index",
     "FusedResult",
     "RankFusion",
     "RetrievalManager",
+    "RetrievalResponse",
     "RetrievalResult",
     "SparseResult",
     "SparseRetriever",
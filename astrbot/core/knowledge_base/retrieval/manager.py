@@ -3,8 +3,13 @@
 协调稠密检索、稀疏检索和 Rerank,提供统一的检索接口
 """
 
+import asyncio
+import json
 import time
-from dataclasses import dataclass
+import unicodedata
+from collections.abc import Awaitable
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, TypeVar
 
 from astrbot import logger
 from astrbot.core.db.vec_db.base import Result
@@ -12,9 +17,23 @@ from astrbot.core.db.vec_db.faiss_impl import FaissVecDB
 from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
 from astrbot.core.knowledge_base.retrieval.rank_fusion import RankFusion
 from astrbot.core.knowledge_base.retrieval.sparse_retriever import SparseRetriever
-from astrbot.core.provider.provider import RerankProvider
+from astrbot.core.provider.provider import EmbeddingProvider, RerankProvider
+from astrbot.core.utils.ttl_cache import TTLCache
 
-from ..kb_helper import KBHelper
+if TYPE_CHECKING:
+    from ..kb_helper import KBHelper
+
+T = TypeVar("T")
+
+EMBEDDING_CACHE_SIZE = 2048
+EMBEDDING_CACHE_TTL = 3600.0
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_TTL = 300.0
+
+
+def normalize_query(query: str) -> str:
+    """归一化查询文本, 用作缓存键 (全角转半角, 合并空白)"""
+    return " ".join(unicodedata.normalize("NFKC", query).split())
 
 
 @dataclass
@@ -30,6 +49,19 @@ class RetrievalResult:
     score: float
     metadata: dict
 
+    def copy(self) -> "RetrievalResult":
+        """复制结果, metadata 也会被复制"""
+        return replace(self, metadata=dict(self.metadata))
+
+
+@dataclass
+class RetrievalResponse:
+    """检索结果及各阶段耗时 (毫秒)"""
+
+    results: list[RetrievalResult]
+    timings: dict[str, float] = field(default_factory=dict)
+    cached: bool = False
+
 
 class RetrievalManager:
     """检索管理器
@@ -37,6 +69,7 @@ class RetrievalManager:
     职责:
     - 协调稠密检索、稀疏检索和 Rerank
     - 结果融合和排序
+    - 缓存查询向量和检索结果
     """
 
     def __init__(
@@ -57,47 +90,101 @@ class RetrievalManager:
         self.sparse_retriever = sparse_retriever
         self.rank_fusion = rank_fusion
         self.kb_db = kb_db
+        # (provider id, 模型, 归一化查询) -> 查询向量
+        self.embedding_cache: TTLCache[tuple, list[float]] = TTLCache(
+            EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL
+        )
+        # (各知识库 ID/版本/检索配置, 归一化查询, top_k) -> 检索结果
+        self.result_cache: TTLCache[tuple, list[RetrievalResult]] = TTLCache(
+            RESULT_CACHE_SIZE, RESULT_CACHE_TTL
+        )
 
     async def retrieve(
         self,
         query: str,
         kb_ids: list[str],
-        kb_id_helper_map: dict[str, KBHelper],
+        kb_id_helper_map: dict[str, "KBHelper"],
         top_k_fusion: int = 20,
         top_m_final: int = 5,
     ) -> list[RetrievalResult]:
         """混合检索
 
+        Args:
+            query: 查询文本
+            kb_ids: 知识库 ID 列表
+            top_m_final: 最终返回数量
+
+        Returns:
+            List[RetrievalResult]: 检索结果列表
+
+        """
+        response = await self.retrieve_with_timings(
+            query=query,
+            kb_ids=kb_ids,
+            kb_id_helper_map=kb_id_helper_map,
+            top_k_fusion=top_k_fusion,
+            top_m_final=top_m_final,
+        )
+        return response.results
+
+    async def retrieve_with_timings(
+        self,
+        query: str,
+        kb_ids: list[str],
+        kb_id_helper_map: dict[str, "KBHelper"],
+        top_k_fusion: int = 20,
+        top_m_final: int = 5,
+    ) -> RetrievalResponse:
+        """混合检索, 并返回各阶段耗时
+
         流程:
-        1. 稠密检索 (向量相似度)
-        2. 稀疏检索 (BM25)
-        3. 结果融合 (RRF)
-        4. Rerank 重排序
+        1. 稠密检索 (向量相似度) 与稀疏检索 (BM25) 并发执行,
+           同一个 Embedding Provider 下的知识库共享一次查询向量计算
+        2. 结果融合 (RRF)
+        3. Rerank 重排序
+
+        相同的查询在知识库内容 (KBHelper.version) 未变化时直接返回缓存的结果。
 
         Args:
             query: 查询文本
             kb_ids: 知识库 ID 列表
+            kb_id_helper_map: 知识库 ID 到 KBHelper 的映射
+            top_k_fusion: 融合阶段保留的结果数量
             top_m_final: 最终返回数量
-            enable_rerank: 是否启用 Rerank
 
         Returns:
-            List[RetrievalResult]: 检索结果列表
+            RetrievalResponse: 检索结果及各阶段耗时 (毫秒)
 
         """
+        timings: dict[str, float] = {}
         if not kb_ids:
-            return []
+            return RetrievalResponse(results=[], timings=timings)
+        total_start = time.perf_counter()
 
         kb_options: dict = {}
         new_kb_ids = []
+        kb_states = []
         for kb_id in kb_ids:
             kb_helper = kb_id_helper_map.get(kb_id)
             if kb_helper:
                 kb = kb_helper.kb
+                kb_states.append(
+                    (
+                        kb_id,
+                        kb_helper.version,
+                        kb.embedding_provider_id,
+                        kb.rerank_provider_id,
+                        kb.top_k_dense,
+                        kb.top_k_sparse,
+                    ),
+                )
                 kb_options[kb_id] = {
                     "top_k_dense": kb.top_k_dense or 50,
                     "top_k_sparse": kb.top_k_sparse or 50,
                     "top_m_final": kb.top_m_final or 5,
                     "vec_db": kb_helper.vec_db,
+                    "sparse_index": kb_helper.sparse_index,
+                    "uncommitted_doc_ids": kb_helper.uncommitted_doc_ids,
                     "rerank_provider_id": kb.rerank_provider_id,
                 }
                 new_kb_ids.append(kb_id)
@@ -106,45 +193,65 @@ class RetrievalManager:
 
         kb_ids = new_kb_ids
 
-        # 1. 稠密检索
-        time_start = time.time()
-        dense_results = await self._dense_retrieve(
-            query=query,
-            kb_ids=kb_ids,
-            kb_options=kb_options,
-        )
-        time_end = time.time()
-        logger.debug(
-            f"Dense retrieval across {len(kb_ids)} bases took {time_end - time_start:.2f}s and returned {len(dense_results)} results.",
+        cache_key = (
+            tuple(kb_states),
+            normalize_query(query),
+            top_k_fusion,
+            top_m_final,
         )
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            timings["total"] = (time.perf_counter() - total_start) * 1000
+            # 缓存中的结果可能被调用方修改 (如改写 content), 每次返回副本
+            return RetrievalResponse(
+                results=[r.copy() for r in cached],
+                timings=timings,
+                cached=True,
+            )
 
-        # 2. 稀疏检索
-        time_start = time.time()
-        sparse_results = await self.sparse_retriever.retrieve(
-            query=query,
-            kb_ids=kb_ids,
-            kb_options=kb_options,
+        # 1. 稠密检索和稀疏检索互不依赖, 并发执行
+        failed_kb_ids: list[str] = []
+        dense_results, sparse_results = await asyncio.gather(
+            self._dense_retrieve(
+                query=query,
+                kb_ids=kb_ids,
+                kb_options=kb_options,
+                timings=timings,
+                failed_kb_ids=failed_kb_ids,
+            ),
+            self._timed(
+                timings,
+                "sparse",
+                self.sparse_retriever.retrieve(
+                    query=query,
+                    kb_ids=kb_ids,
+                    kb_options=kb_options,
+                ),
+            ),
         )
-        time_end = time.time()
         logger.debug(
-            f"Sparse retrieval across {len(kb_ids)} bases took {time_end - time_start:.2f}s and returned {len(sparse_results)} results.",
+            f"Retrieval across {len(kb_ids)} bases returned {len(dense_results)} dense "
+            f"and {len(sparse_results)} sparse results, timings: {timings}",
         )
 
-        # 3. 结果融合
-        time_start = time.time()
-        fused_results = await self.rank_fusion.fuse(
-            dense_results=dense_results,
-            sparse_results=sparse_results,
-            top_k=top_k_fusion,
-        )
-        time_end = time.time()
-        logger.debug(
-            f"Rank fusion took {time_end - time_start:.2f}s and returned {len(fused_results)} results.",
+        # 2. 结果融合 (RRF 需要完整的排名列表, 因此在汇合之后进行)
+        fused_results = await self._timed(
+            timings,
+            "fusion",
+            self.rank_fusion.fuse(
+                dense_results=dense_results,
+                sparse_results=sparse_results,
+                top_k=top_k_fusion,
+            ),
         )
 
-        # 4. 转换为 RetrievalResult (批量获取元数据)
+        # 3. 转换为 RetrievalResult (批量获取元数据)
         doc_ids = {fr.doc_id for fr in fused_results}
-        metadata_map = await self.kb_db.get_documents_with_metadata_batch(doc_ids)
+        metadata_map = await self._timed(
+            timings,
+            "metadata",
+            self.kb_db.get_documents_with_metadata_batch(doc_ids),
+        )
 
         retrieval_results = []
         for fr in fused_results:
@@ -166,7 +273,7 @@ class RetrievalManager:
                     ),
                 )
 
-        # 5. Rerank
+        # 4. Rerank
         first_rerank = None
         for kb_id in kb_ids:
             vec_db = kb_options[kb_id]["vec_db"]
@@ -184,61 +291,155 @@ class RetrievalManager:
                 first_rerank = vec_db.rerank_provider
                 break
         if first_rerank and retrieval_results:
-            retrieval_results = await self._rerank(
-                query=query,
-                results=retrieval_results,
-                top_k=top_m_final,
-                rerank_provider=first_rerank,
+            retrieval_results = await self._timed(
+                timings,
+                "rerank",
+                self._rerank(
+                    query=query,
+                    results=retrieval_results,
+                    top_k=top_m_final,
+                    rerank_provider=first_rerank,
+                ),
             )
 
-        return retrieval_results[:top_m_final]
+        retrieval_results = retrieval_results[:top_m_final]
+        # 部分知识库检索失败时结果不完整, 不写入缓存
+        if not failed_kb_ids:
+            self.result_cache.set(cache_key, [r.copy() for r in retrieval_results])
+
+        timings["total"] = (time.perf_counter() - total_start) * 1000
+        return RetrievalResponse(results=retrieval_results, timings=timings)
+
+    def clear_cache(self) -> None:
+        """清空查询向量缓存和检索结果缓存"""
+        self.embedding_cache.clear()
+        self.result_cache.clear()
+
+    def cache_stats(self) -> dict:
+        """返回缓存命中统计"""
+        return {
+            "embedding": self.embedding_cache.stats(),
+            "result": self.result_cache.stats(),
+        }
+
+    async def _get_query_embedding(
+        self,
+        provider: EmbeddingProvider,
+        query: str,
+    ) -> list[float]:
+        """获取查询向量, 优先使用缓存"""
+        meta = provider.meta()
+        key = (meta.id, meta.model, normalize_query(query))
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = await provider.get_embedding(query)
+            self.embedding_cache.set(key, embedding)
+        return embedding
 
     async def _dense_retrieve(
         self,
         query: str,
         kb_ids: list[str],
         kb_options: dict,
+        timings: dict[str, float] | None = None,
+        failed_kb_ids: list[str] | None = None,
     ):
         """稠密检索 (向量相似度)
 
-        为每个知识库使用独立的向量数据库进行检索,然后合并结果。
+        查询向量按 Embedding Provider 去重后只计算一次, 再并发地在各知识库的
+        向量数据库中检索, 最后合并结果。
 
         Args:
             query: 查询文本
             kb_ids: 知识库 ID 列表
-            top_k: 返回结果数量
+            kb_options: 各知识库的检索配置
+            timings: 用于记录阶段耗时的字典 (毫秒)
+            failed_kb_ids: 用于收集检索失败的知识库 ID
 
         Returns:
             List[Result]: 检索结果列表
 
         """
-        all_results: list[Result] = []
+        if timings is None:
+            timings = {}
+        if failed_kb_ids is None:
+            failed_kb_ids = []
+        start = time.perf_counter()
+
+        # 按 Embedding Provider 实例分组
+        groups: dict[int, list[str]] = {}
         for kb_id in kb_ids:
             if kb_id not in kb_options:
                 continue
+            vec_db: FaissVecDB = kb_options[kb_id]["vec_db"]
+            groups.setdefault(id(vec_db.embedding_provider), []).append(kb_id)
+
+        async def embed(group_kb_ids: list[str]) -> list[float] | None:
+            vec_db: FaissVecDB = kb_options[group_kb_ids[0]]["vec_db"]
+            try:
+                return await self._get_query_embedding(vec_db.embedding_provider, query)
+            except Exception as e:
+                logger.warning(f"知识库 {group_kb_ids} 查询向量计算失败: {e}")
+                failed_kb_ids.extend(group_kb_ids)
+                return None
+
+        group_kb_ids_list = list(groups.values())
+        embeddings = await asyncio.gather(*(embed(g) for g in group_kb_ids_list))
+        timings["embedding"] = (time.perf_counter() - start) * 1000
+
+        async def search(kb_id: str, embedding: list[float]) -> list[Result]:
             try:
                 vec_db: FaissVecDB = kb_options[kb_id]["vec_db"]
                 dense_k = int(kb_options[kb_id]["top_k_dense"])
-                vec_results = await vec_db.retrieve(
+                results = await vec_db.retrieve(
                     query=query,
                     k=dense_k,
                     fetch_k=dense_k * 2,
                     rerank=False,  # 稠密检索阶段不进行 rerank
                     metadata_filters={"kb_id": kb_id},
+                    embedding=embedding,
                 )
-
-                all_results.extend(vec_results)
             except Exception as e:
-                from astrbot.core import logger
-
                 logger.warning(f"知识库 {kb_id} 稠密检索失败: {e}")
-                continue
+                failed_kb_ids.append(kb_id)
+                return []
+            # 排除尚未保存文档记录的块 (上传中或上传失败留有断点)
+            uncommitted = kb_options[kb_id].get("uncommitted_doc_ids")
+            if uncommitted:
+                results = [
+                    r
+                    for r in results
+                    if json.loads(r.data["metadata"]).get("kb_doc_id")
+                    not in uncommitted
+                ]
+            return results
+
+        search_start = time.perf_counter()
+        tasks = [
+            search(kb_id, embedding)
+            for group_kb_ids, embedding in zip(group_kb_ids_list, embeddings)
+            if embedding is not None
+            for kb_id in group_kb_ids
+        ]
+        all_results: list[Result] = []
+        for vec_results in await asyncio.gather(*tasks):
+            all_results.extend(vec_results)
+        timings["dense_search"] = (time.perf_counter() - search_start) * 1000
+        timings["dense"] = (time.perf_counter() - start) * 1000
 
-        # 按相似度排序并返回 top_k
+        # 按相似度排序
         all_results.sort(key=lambda x: x.similarity, reverse=True)
-        # return all_results[: len(all_results) // len(kb_ids)]
         return all_results
 
+    @staticmethod
+    async def _timed(timings: dict[str, float], stage: str, coro: Awaitable[T]) -> T:
+        """执行协程并将耗时 (毫秒) 记录到 timings[stage]"""
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            timings[stage] = (time.perf_counter() - start) * 1000
+
     async def _rerank(
         self,
         query: str,
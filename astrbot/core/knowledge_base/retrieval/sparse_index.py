@@ -0,0 +1,337 @@
+"""BM25 倒排索引
+
+为每个知识库维护一份持久化、可增量更新的 BM25 倒排索引。
+索引文件与 FAISS 索引文件存放在同一目录下，由 KBHelper 在上传和删除文档时增量维护，
+检索时只需遍历查询词对应的倒排链，而无需对整个语料库重新分词和建索引。
+"""
+
+import asyncio
+import heapq
+import json
+import math
+import os
+from collections import Counter
+from collections.abc import Iterable
+
+import jieba
+
+from astrbot.core import logger
+
+_STOPWORDS_PATH = os.path.join(os.path.dirname(__file__), "hit_stopwords.txt")
+_stopwords: frozenset[str] | None = None
+
+
+def load_stopwords() -> frozenset[str]:
+    """加载停用词表（进程内只加载一次）"""
+    global _stopwords
+    if _stopwords is None:
+        with open(_STOPWORDS_PATH, encoding="utf-8") as f:
+            _stopwords = frozenset(
+                word.strip() for word in f.read().splitlines() if word.strip()
+            )
+    return _stopwords
+
+
+def tokenize(text: str) -> list[str]:
+    """使用 jieba 分词并去除停用词和空白"""
+    stopwords = load_stopwords()
+    return [word for word in jieba.cut(text) if word.strip() and word not in stopwords]
+
+
+class BM25Index:
+    """可增量更新的 BM25 倒排索引
+
+    持久化内容:
+    - postings: 词项 -> [(块整数 ID, 词频), ...]
+    - chunks: 块整数 ID -> (chunk_id, kb_doc_id, chunk_index, 文档长度)
+
+    IDF 使用 Lucene 的非负形式 ``log(1 + (N - n + 0.5) / (n + 0.5))``，
+    这样增删文档时无需重新计算全局的平均 IDF。
+
+    增删块后不立即写盘，而是最多延迟 save_interval 秒将期间的所有修改合并写入一次，
+    关闭时写入尚未保存的修改。进程异常退出导致磁盘上的索引与文档存储的块数不一致时，
+    KBHelper 加载时会全量重建。
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75) -> None:
+        self.path = path
+        self.k1 = k1
+        self.b = b
+
+        self.postings: dict[str, dict[int, int]] = {}
+        self.chunks: dict[int, tuple[str, str, int, int]] = {}
+        self.total_len = 0
+        # 以下为派生结构，不持久化，加载时重建
+        self._doc_terms: dict[int, list[str]] = {}
+        self._chunk_id_map: dict[str, int] = {}
+        self._kb_doc_map: dict[str, set[int]] = {}
+
+        self._lock = asyncio.Lock()
+        self.save_interval = 5.0
+        """增删块后最多延迟 save_interval 秒写入磁盘"""
+        self._dirty = False
+        self._save_task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    async def load(self) -> bool:
+        """从磁盘加载索引
+
+        Returns:
+            bool: 是否成功加载。文件不存在或格式不兼容时返回 False。
+
+        """
+        if not os.path.exists(self.path):
+            return False
+        try:
+            data = await asyncio.to_thread(self._read_file)
+        except Exception as e:
+            logger.warning(f"读取 BM25 索引 {self.path} 失败: {e}")
+            return False
+        if data.get("version") != self.FORMAT_VERSION:
+            return False
+
+        async with self._lock:
+            self._reset()
+            for int_id, chunk_id, kb_doc_id, chunk_index, doc_len in data["chunks"]:
+                self._register_chunk(int_id, chunk_id, kb_doc_id, chunk_index, doc_len)
+            for term, flat in data["postings"].items():
+                posting = dict(zip(flat[::2], flat[1::2]))
+                self.postings[term] = posting
+                for int_id in posting:
+                    self._doc_terms.setdefault(int_id, []).append(term)
+        return True
+
+    async def save(self) -> None:
+        """原子地将索引写入磁盘"""
+        async with self._lock:
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self._write_file)
+            except Exception:
+                # 保持为脏, 下次重试
+                self._dirty = True
+                raise
+
+    async def close(self) -> None:
+        """取消延迟写入任务, 并立即写入尚未保存的修改"""
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+        self._save_task = None
+        if self._dirty:
+            await self.save()
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(
+                self._save_later(),
+                name="bm25_index_save",
+            )
+
+    async def _save_later(self) -> None:
+        # 写入期间可能有新的修改 (或写入失败), 直到没有未保存的修改才退出
+        while self._dirty:
+            await asyncio.sleep(self.save_interval)
+            try:
+                await self.save()
+            except Exception as e:
+                logger.error(f"写入 BM25 索引 {self.path} 失败: {e}")
+
+    async def rebuild(self, document_storage, page_size: int = 1000) -> None:
+        """从文档存储全量重建索引
+
+        Args:
+            document_storage: FaissVecDB 的 DocumentStorage 实例
+            page_size: 每次从数据库读取的块数量
+
+        """
+        async with self._lock:
+            self._reset()
+        offset = 0
+        while True:
+            docs = await document_storage.get_documents(
+                metadata_filters={},
+                offset=offset,
+                limit=page_size,
+            )
+            if not docs:
+                break
+            metadatas = [json.loads(doc["metadata"]) for doc in docs]
+            await self._add(
+                [doc["id"] for doc in docs],
+                [doc["doc_id"] for doc in docs],
+                [doc["text"] for doc in docs],
+                metadatas,
+            )
+            offset += len(docs)
+        await self.save()
+
+    async def add_chunks(
+        self,
+        int_ids: list[int],
+        chunk_ids: list[str],
+        texts: list[str],
+        metadatas: list[dict],
+    ) -> None:
+        """增量添加文本块, 稍后持久化
+
+        Args:
+            int_ids: 块在文档存储中的整数 ID（同时也是 FAISS 中的向量 ID）
+            chunk_ids: 块的字符串 ID
+            texts: 块文本
+            metadatas: 块元数据，需包含 kb_doc_id 和 chunk_index
+
+        """
+        await self._add(int_ids, chunk_ids, texts, metadatas)
+        self._mark_dirty()
+
+    async def remove_chunks(self, chunk_ids: Iterable[str]) -> None:
+        """按块的字符串 ID 删除, 稍后持久化"""
+        async with self._lock:
+            for chunk_id in chunk_ids:
+                int_id = self._chunk_id_map.get(chunk_id)
+                if int_id is not None:
+                    self._remove(int_id)
+        self._mark_dirty()
+
+    async def remove_document(self, kb_doc_id: str) -> None:
+        """删除某个知识库文档的所有块, 稍后持久化"""
+        async with self._lock:
+            for int_id in list(self._kb_doc_map.get(kb_doc_id, ())):
+                self._remove(int_id)
+        self._mark_dirty()
+
+    async def search(self, tokens: list[str], top_k: int) -> list[tuple[int, float]]:
+        """计算 BM25 分数并返回 Top-K
+
+        只遍历查询词的倒排链，复杂度与命中的倒排项数量成正比，而与语料库大小无关。
+        高频词的倒排链可能很长，计算放到线程中执行，避免阻塞事件循环。
+
+        Args:
+            tokens: 已分词的查询
+            top_k: 返回结果数量
+
+        Returns:
+            list[tuple[int, float]]: (块整数 ID, 分数) 列表，按分数降序排列
+
+        """
+        # 持有锁期间倒排表不会被修改，可以安全地在线程中遍历
+        async with self._lock:
+            return await asyncio.to_thread(self._search, tokens, top_k)
+
+    def _search(self, tokens: list[str], top_k: int) -> list[tuple[int, float]]:
+        n_docs = len(self.chunks)
+        if not n_docs or top_k <= 0:
+            return []
+        avgdl = self.total_len / n_docs or 1.0
+        k1, b = self.k1, self.b
+
+        scores: dict[int, float] = {}
+        for term, qf in Counter(tokens).items():
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for int_id, tf in posting.items():
+                doc_len = self.chunks[int_id][3]
+                denom = tf + k1 * (1.0 - b + b * doc_len / avgdl)
+                scores[int_id] = (
+                    scores.get(int_id, 0.0) + qf * idf * tf * (k1 + 1.0) / denom
+                )
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def get_chunk_info(self, int_id: int) -> tuple[str, str, int] | None:
+        """返回 (chunk_id, kb_doc_id, chunk_index)"""
+        info = self.chunks.get(int_id)
+        if info is None:
+            return None
+        return info[0], info[1], info[2]
+
+    async def _add(
+        self,
+        int_ids: list[int],
+        chunk_ids: list[str],
+        texts: list[str],
+        metadatas: list[dict],
+    ) -> None:
+        # 分词是 CPU 密集型操作，放到线程中执行，避免阻塞事件循环
+        tokenized = await asyncio.to_thread(lambda: [tokenize(t) for t in texts])
+        async with self._lock:
+            for int_id, chunk_id, tokens, metadata in zip(
+                int_ids, chunk_ids, tokenized, metadatas
+            ):
+                if int_id in self.chunks:
+                    self._remove(int_id)
+                tfs = Counter(tokens)
+                self._register_chunk(
+                    int_id,
+                    chunk_id,
+                    metadata.get("kb_doc_id", ""),
+                    metadata.get("chunk_index", 0),
+                    len(tokens),
+                )
+                self._doc_terms[int_id] = list(tfs)
+                for term, tf in tfs.items():
+                    self.postings.setdefault(term, {})[int_id] = tf
+
+    def _register_chunk(
+        self,
+        int_id: int,
+        chunk_id: str,
+        kb_doc_id: str,
+        chunk_index: int,
+        doc_len: int,
+    ) -> None:
+        self.chunks[int_id] = (chunk_id, kb_doc_id, chunk_index, doc_len)
+        self.total_len += doc_len
+        self._chunk_id_map[chunk_id] = int_id
+        self._kb_doc_map.setdefault(kb_doc_id, set()).add(int_id)
+
+    def _remove(self, int_id: int) -> None:
+        chunk_id, kb_doc_id, _, doc_len = self.chunks.pop(int_id)
+        self.total_len -= doc_len
+        self._chunk_id_map.pop(chunk_id, None)
+        doc_chunks = self._kb_doc_map.get(kb_doc_id)
+        if doc_chunks is not None:
+            doc_chunks.discard(int_id)
+            if not doc_chunks:
+                del self._kb_doc_map[kb_doc_id]
+        for term in self._doc_terms.pop(int_id, ()):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(int_id, None)
+            if not posting:
+                del self.postings[term]
+
+    def _reset(self) -> None:
+        self.postings = {}
+        self.chunks = {}
+        self.total_len = 0
+        self._doc_terms = {}
+        self._chunk_id_map = {}
+        self._kb_doc_map = {}
+
+    def _read_file(self) -> dict:
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_file(self) -> None:
+        data = {
+            "version": self.FORMAT_VERSION,
+            "chunks": [[int_id, *info] for int_id, info in self.chunks.items()],
+            "postings": {
+                term: [v for item in posting.items() for v in item]
+                for term, posting in self.postings.items()
+            },
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
@@ -3,16 +3,15 @@
 使用 BM25 算法进行基于关键词的文档检索
 """
 
-import json
-import os
+import asyncio
 from dataclasses import dataclass
 
-import jieba
-from rank_bm25 import BM25Okapi
-
+from astrbot.core import logger
 from astrbot.core.db.vec_db.faiss_impl import FaissVecDB
 from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
 
+from .sparse_index import BM25Index, load_stopwords, tokenize
+
 
 @dataclass
 class SparseResult:
@@ -31,7 +30,7 @@ class SparseRetriever:
 
     职责:
     - 基于关键词的文档检索
-    - 使用 BM25 算法计算相关度
+    - 基于各知识库持久化的 BM25 倒排索引计算相关度
     """
 
     def __init__(self, kb_db: KBSQLiteDatabase) -> None:
@@ -42,15 +41,7 @@ class SparseRetriever:
 
         """
         self.kb_db = kb_db
-        self._index_cache = {}  # 缓存 BM25 索引
-
-        with open(
-            os.path.join(os.path.dirname(__file__), "hit_stopwords.txt"),
-            encoding="utf-8",
-        ) as f:
-            self.hit_stopwords = {
-                word.strip() for word in set(f.read().splitlines()) if word.strip()
-            }
+        self.hit_stopwords = load_stopwords()
 
     async def retrieve(
         self,
@@ -69,68 +60,75 @@ class SparseRetriever:
             List[SparseResult]: 检索结果列表
 
         """
-        # 1. 获取所有相关块
+        tokenized_query = tokenize(query)
+        if not tokenized_query:
+            return []
+
+        # 各知识库的检索相互独立, 并发执行
+        tasks = []
         top_k_sparse = 0
-        chunks = []
         for kb_id in kb_ids:
-            vec_db: FaissVecDB = kb_options.get(kb_id, {}).get("vec_db")
-            if not vec_db:
+            options = kb_options.get(kb_id, {})
+            if not options.get("vec_db"):
                 continue
-            result = await vec_db.document_storage.get_documents(
-                metadata_filters={},
-                limit=None,
-                offset=None,
-            )
-            chunk_mds = [json.loads(doc["metadata"]) for doc in result]
-            result = [
-                {
-                    "chunk_id": doc["doc_id"],
-                    "chunk_index": chunk_md["chunk_index"],
-                    "doc_id": chunk_md["kb_doc_id"],
-                    "kb_id": kb_id,
-                    "text": doc["text"],
-                }
-                for doc, chunk_md in zip(result, chunk_mds)
-            ]
-            chunks.extend(result)
-            top_k_sparse += kb_options.get(kb_id, {}).get("top_k_sparse", 50)
-
-        if not chunks:
-            return []
+            if options.get("sparse_index") is None:
+                logger.warning(f"知识库 {kb_id} 的 BM25 索引尚未加载, 已跳过稀疏检索")
+                continue
+            top_k_sparse += options.get("top_k_sparse", 50)
+            tasks.append(self._retrieve_kb(tokenized_query, kb_id, options))
+
+        results: list[SparseResult] = []
+        for kb_results in await asyncio.gather(*tasks):
+            results.extend(kb_results)
+
+        # 3. 排序并返回 Top-K
+        results.sort(key=lambda x: x.score, reverse=True)
+        return results[:top_k_sparse]
 
-        # 2. 准备文档和索引
-        corpus = [chunk["text"] for chunk in chunks]
-        tokenized_corpus = [list(jieba.cut(doc)) for doc in corpus]
-        tokenized_corpus = [
-            [word for word in doc if word not in self.hit_stopwords]
-            for doc in tokenized_corpus
-        ]
-
-        # 3. 构建 BM25 索引
-        bm25 = BM25Okapi(tokenized_corpus)
-
-        # 4. 执行检索
-        tokenized_query = list(jieba.cut(query))
-        tokenized_query = [
-            word for word in tokenized_query if word not in self.hit_stopwords
-        ]
-        scores = bm25.get_scores(tokenized_query)
-
-        # 5. 排序并返回 Top-K
+    async def _retrieve_kb(
+        self,
+        tokenized_query: list[str],
+        kb_id: str,
+        options: dict,
+    ) -> list[SparseResult]:
+        """在单个知识库中执行稀疏检索"""
+        vec_db: FaissVecDB = options["vec_db"]
+        sparse_index: BM25Index = options["sparse_index"]
+
+        # 1. 通过倒排索引计算分数
+        hits = await sparse_index.search(
+            tokenized_query, options.get("top_k_sparse", 50)
+        )
+        if not hits:
+            return []
+        infos = [sparse_index.get_chunk_info(int_id) for int_id, _ in hits]
+
+        # 2. 仅取回命中块的文本
+        docs = await vec_db.document_storage.get_documents(
+            metadata_filters={},
+            ids=[int_id for int_id, _ in hits],
+            offset=None,
+            limit=None,
+        )
+        text_map = {doc["id"]: doc["text"] for doc in docs}
+        uncommitted: set[str] = options.get("uncommitted_doc_ids") or set()
         results = []
-        for idx, score in enumerate(scores):
-            chunk = chunks[idx]
+        for (int_id, score), info in zip(hits, infos):
+            text = text_map.get(int_id)
+            if info is None or text is None:
+                continue
+            chunk_id, kb_doc_id, chunk_index = info
+            if kb_doc_id in uncommitted:
+                # 文档记录尚未保存 (上传中或上传失败留有断点)
+                continue
             results.append(
                 SparseResult(
-                    chunk_id=chunk["chunk_id"],
-                    chunk_index=chunk["chunk_index"],
-                    doc_id=chunk["doc_id"],
-                    kb_id=chunk["kb_id"],
-                    content=chunk["text"],
+                    chunk_id=chunk_id,
+                    chunk_index=chunk_index,
+                    doc_id=kb_doc_id,
+                    kb_id=kb_id,
+                    content=text,
                     score=float(score),
                 ),
             )
-
-        results.sort(key=lambda x: x.score, reverse=True)
-        # return results[: len(results) // len(kb_ids)]
-        return results[:top_k_sparse]
+        return results
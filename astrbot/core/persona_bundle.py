@@ -0,0 +1,257 @@
+"""Precomputed per-persona request bundles for the main agent.
+
+Applying a persona to a request used to rebuild everything on every message:
+the persona prompt, a deep copy of the begin dialogs, the persona ToolSet
+(``get_full_tool_set`` plus one ``remove_tool`` per inactive tool) and, with
+the subagent orchestrator enabled, the handoff tools and the set of tools
+assigned to subagents. None of this depends on the message, so it is built
+once per persona and reused until one of its inputs changes.
+
+A bundle is invalidated when any of the following changes:
+
+- personas (``PersonaManager.version``);
+- registered tools, including MCP servers (``FunctionToolManager.version``);
+- plugins being loaded, reloaded or toggled, which also toggles their tools
+  (``star_handlers_registry.generation``);
+- the subagent orchestrator config or its handoff tools.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from astrbot.core.agent.handoff import HandoffTool
+from astrbot.core.agent.tool import FunctionTool, ToolSet
+from astrbot.core.astr_main_agent_resources import (
+    CHATUI_SPECIAL_DEFAULT_PERSONA_PROMPT,
+)
+from astrbot.core.provider.entities import ProviderRequest
+from astrbot.core.star.star_handler import star_handlers_registry
+
+if TYPE_CHECKING:
+    from astrbot.core.star.context import Context
+
+
+@dataclass(frozen=True, slots=True)
+class PersonaBundle:
+    """Immutable, request-independent part of applying a persona."""
+
+    persona_prompt: str
+    """Appended to the system prompt before the skills prompt."""
+    begin_dialogs: tuple[dict, ...]
+    """Begin dialogs, copied into each request."""
+    persona_tools: tuple[FunctionTool, ...]
+    """The persona ToolSet, used when the request already carries tools."""
+    handoffs: tuple[HandoffTool, ...]
+    removed_tool_names: frozenset[str]
+    """Tools assigned to subagents and removed from the main agent."""
+    final_tools: tuple[FunctionTool, ...]
+    """Persona tools + handoffs - removed tools, for requests without tools."""
+    router_prompt: str
+    """Appended to the system prompt after the tools are set up."""
+
+    @property
+    def persona_tool_names(self) -> list[str]:
+        return [tool.name for tool in self.persona_tools]
+
+    def apply_begin_dialogs(self, req: ProviderRequest) -> None:
+        if self.begin_dialogs:
+            # dialog entries only hold str / bool values, a shallow copy is enough
+            req.contexts[:0] = [dict(dialog) for dialog in self.begin_dialogs]
+
+    def apply_tools(self, req: ProviderRequest) -> None:
+        if not req.func_tool:
+            req.func_tool = ToolSet()
+            req.func_tool.tools = list(self.final_tools)
+            return
+        for tool in self.persona_tools:
+            req.func_tool.add_tool(tool)
+        for tool in self.handoffs:
+            req.func_tool.add_tool(tool)
+        for name in self.removed_tool_names:
+            req.func_tool.remove_tool(name)
+
+
+def _build_persona_toolset(tmgr: Any, persona: dict | None) -> ToolSet:
+    if (persona and persona.get("tools") is None) or not persona:
+        persona_toolset = tmgr.get_full_tool_set()
+        for tool in list(persona_toolset):
+            if not tool.active:
+                persona_toolset.remove_tool(tool.name)
+    else:
+        persona_toolset = ToolSet()
+        if persona["tools"]:
+            for tool_name in persona["tools"]:
+                tool = tmgr.get_func(tool_name)
+                if tool and tool.active:
+                    persona_toolset.add_tool(tool)
+    return persona_toolset
+
+
+def _collect_subagent_tools(
+    plugin_context: Context,
+    tmgr: Any,
+    orch_cfg: dict,
+) -> set[str]:
+    """Names of the tools assigned to enabled subagents."""
+    assigned_tools: set[str] = set()
+    agents = orch_cfg.get("agents", [])
+    if not isinstance(agents, list):
+        return assigned_tools
+    for a in agents:
+        if not isinstance(a, dict):
+            continue
+        if a.get("enabled", True) is False:
+            continue
+        persona_tools = None
+        pid = a.get("persona_id")
+        if pid:
+            persona = plugin_context.persona_manager.get_persona_v3_by_id(pid)
+            if persona is not None:
+                persona_tools = persona.get("tools")
+        tools = a.get("tools", [])
+        if persona_tools is not None:
+            tools = persona_tools
+        if tools is None:
+            assigned_tools.update(
+                [
+                    tool.name
+                    for tool in tmgr.func_list
+                    if not isinstance(tool, HandoffTool)
+                ]
+            )
+            continue
+        if not isinstance(tools, list):
+            continue
+        for t in tools:
+            name = str(t).strip()
+            if name:
+                assigned_tools.add(name)
+    return assigned_tools
+
+
+def build_persona_bundle(
+    plugin_context: Context,
+    persona: dict | None,
+    use_webchat_special_default: bool,
+    orch_cfg: dict | None,
+) -> PersonaBundle:
+    """Build the bundle for a resolved persona.
+
+    orch_cfg: The subagent orchestrator config, or None when the main agent
+        does not use subagents.
+    """
+    persona_prompt = ""
+    begin_dialogs: tuple[dict, ...] = ()
+    if persona:
+        if prompt := persona["prompt"]:
+            persona_prompt = f"\n# Persona Instructions\n\n{prompt}\n"
+        if processed := persona.get("_begin_dialogs_processed"):
+            begin_dialogs = tuple(dict(dialog) for dialog in processed)
+    elif use_webchat_special_default:
+        persona_prompt = CHATUI_SPECIAL_DEFAULT_PERSONA_PROMPT
+
+    tmgr = plugin_context.get_llm_tool_manager()
+    persona_toolset = _build_persona_toolset(tmgr, persona)
+    persona_tools = tuple(persona_toolset.tools)
+
+    handoffs: tuple[HandoffTool, ...] = ()
+    removed_tool_names: frozenset[str] = frozenset()
+    router_prompt = ""
+    so = plugin_context.subagent_orchestrator
+    if orch_cfg is not None and so:
+        handoffs = tuple(so.handoffs)
+        if orch_cfg.get("remove_main_duplicate_tools", False):
+            handoff_names = {tool.name for tool in handoffs}
+            removed_tool_names = frozenset(
+                name
+                for name in _collect_subagent_tools(plugin_context, tmgr, orch_cfg)
+                if name not in handoff_names
+            )
+        router_prompt = str(orch_cfg.get("router_system_prompt", "") or "").strip()
+        if router_prompt:
+            router_prompt = f"\n{router_prompt}\n"
+
+    final_toolset = ToolSet()
+    final_toolset.merge(persona_toolset)
+    for tool in handoffs:
+        final_toolset.add_tool(tool)
+    for name in removed_tool_names:
+        final_toolset.remove_tool(name)
+
+    return PersonaBundle(
+        persona_prompt=persona_prompt,
+        begin_dialogs=begin_dialogs,
+        persona_tools=persona_tools,
+        handoffs=handoffs,
+        removed_tool_names=removed_tool_names,
+        final_tools=tuple(final_toolset.tools),
+        router_prompt=router_prompt,
+    )
+
+
+class PersonaBundleCache:
+    """Caches PersonaBundle per resolved persona.
+
+    Entries are keyed by the identity of the persona object: PersonaManager
+    rebuilds all persona objects whenever a persona changes. The whole cache
+    is dropped when the fingerprint of the other inputs changes. Objects in
+    the fingerprint are kept referenced so their ids cannot be reused.
+    """
+
+    def __init__(self) -> None:
+        self._bundles: dict[tuple[int | None, bool], PersonaBundle] = {}
+        self._fingerprint: tuple | None = None
+        self._pinned: tuple = ()
+
+    def clear(self) -> None:
+        self._bundles.clear()
+        self._fingerprint = None
+        self._pinned = ()
+
+    def get(
+        self,
+        plugin_context: Context,
+        persona: dict | None,
+        use_webchat_special_default: bool,
+    ) -> PersonaBundle:
+        persona_mgr = plugin_context.persona_manager
+        tmgr = plugin_context.get_llm_tool_manager()
+        so = plugin_context.subagent_orchestrator
+        orch_cfg: dict | None = plugin_context.get_config().get(
+            "subagent_orchestrator", {}
+        )
+        if not (orch_cfg and orch_cfg.get("main_enable", False) and so):
+            orch_cfg = None
+        handoffs = so.handoffs if orch_cfg is not None else None
+
+        pinned = (persona_mgr, tmgr, so, orch_cfg, handoffs)
+        fingerprint = (
+            *(id(obj) for obj in pinned),
+            getattr(persona_mgr, "version", None),
+            getattr(tmgr, "version", None),
+            star_handlers_registry.generation,
+        )
+        if fingerprint != self._fingerprint:
+            self._bundles.clear()
+            self._fingerprint = fingerprint
+            self._pinned = pinned
+
+        key = (id(persona) if persona else None, use_webchat_special_default)
+        bundle = self._bundles.get(key)
+        if bundle is None:
+            bundle = build_persona_bundle(
+                plugin_context,
+                persona,
+                use_webchat_special_default,
+                orch_cfg,
+            )
+            self._bundles[key] = bundle
+            if persona:
+                # keep the persona alive so its id stays unique while cached
+                self._pinned = (*self._pinned, persona)
+        return bundle
+
+
+persona_bundle_cache = PersonaBundleCache()
@@ -31,6 +31,8 @@ class PersonaManager:
         self.personas_v3: list[Personality] = []
         self.selected_default_persona_v3: Personality | None = None
         self.persona_v3_config: list[dict] = []
+        self.version = 0
+        """personas_v3 重建时递增"""
 
     async def initialize(self) -> None:
         self.personas = await self.get_all_personas()
@@ -418,6 +420,7 @@ class PersonaManager:
             personas_v3.append(selected_default_persona)
 
         self.personas_v3 = personas_v3
+        self.version += 1
         self.selected_default_persona_v3 = selected_default_persona
         self.persona_v3_config = v3_persona_config
         self.selected_default_persona = Persona(
@@ -20,6 +20,10 @@ class ContentSafetyCheckStage(Stage):
         config = ctx.astrbot_config["content_safety"]
         self.strategy_selector = StrategySelector(config)
 
+    def applies(self, event: AstrMessageEvent) -> bool:
+        # 未启用任何审核策略时无需检查
+        return bool(self.strategy_selector.enabled_strategies)
+
     async def process(
         self,
         event: AstrMessageEvent,
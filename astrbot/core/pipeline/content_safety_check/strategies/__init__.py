@@ -1,7 +1,16 @@
 import abc
+from typing import Protocol
+
+
+class ContentSafetyStreamScanner(Protocol):
+    def feed(self, chunk: str) -> str | None: ...
 
 
 class ContentSafetyStrategy(abc.ABC):
     @abc.abstractmethod
     def check(self, content: str) -> tuple[bool, str]:
         raise NotImplementedError
+
+    def stream_scanner(self) -> ContentSafetyStreamScanner | None:
+        """返回逐段检查流式输出的扫描器, 命中时 feed 返回命中的内容。不支持流式检查时返回 None。"""
+        return None
@@ -1,7 +1,158 @@
 import re
+from collections import deque
+from collections.abc import Iterable
+from functools import lru_cache
+
+from astrbot import logger
 
 from . import ContentSafetyStrategy
 
+# 含有这些字符的关键词按正则表达式处理, 其余按普通字符串匹配
+_REGEX_META = re.compile(r"[.^$*+?{}\[\]\\|()]")
+# 流式检查时正则表达式可跨越的最大分段边界长度
+STREAM_PATTERN_WINDOW = 512
+
+
+class KeywordMatcher:
+    """多模式敏感词匹配器
+
+    - 普通关键词构建为 Aho–Corasick 自动机, 一次扫描匹配全部关键词, 耗时与关键词数量无关
+    - 含正则元字符的关键词在不含捕获组时合并为一个正则表达式
+    - 空关键词会被忽略, 无法编译的正则表达式按普通字符串处理
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        literals: list[str] = []
+        self.patterns: list[re.Pattern[str]] = []
+        for keyword in dict.fromkeys(keywords):
+            if not isinstance(keyword, str) or not keyword:
+                continue
+            if _REGEX_META.search(keyword) is None:
+                literals.append(keyword)
+                continue
+            try:
+                self.patterns.append(re.compile(keyword))
+            except re.error as e:
+                logger.warning(
+                    f"敏感词 {keyword!r} 不是合法的正则表达式 ({e})，将按普通文本匹配。"
+                )
+                literals.append(keyword)
+
+        self.literal_count = len(literals)
+        self._build_automaton(literals)
+
+        # 合并后捕获组会被重新编号, 反向引用将指向错误的组且不会报错,
+        # 因此只有在所有表达式都不含捕获组时才合并, 否则逐个匹配
+        self._combined: re.Pattern[str] | None = None
+        if self.patterns and all(p.groups == 0 for p in self.patterns):
+            try:
+                self._combined = re.compile(
+                    "|".join(f"(?:{p.pattern})" for p in self.patterns)
+                )
+            except re.error:
+                # 含有全局标志的表达式无法合并
+                self._combined = None
+
+    def __len__(self) -> int:
+        return self.literal_count + len(self.patterns)
+
+    def _build_automaton(self, literals: list[str]) -> None:
+        goto: list[dict[str, int]] = [{}]
+        output: list[str | None] = [None]
+        for word in literals:
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    output.append(None)
+                    goto[state][ch] = nxt
+                state = nxt
+            if output[state] is None:
+                output[state] = word
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if output[nxt] is None:
+                    output[nxt] = output[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def _scan_literals(self, text: str, state: int = 0) -> tuple[str | None, int]:
+        """从自动机状态 state 开始扫描 text, 返回 (首个命中的关键词, 结束状态)"""
+        if self.literal_count == 0:
+            return None, 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for ch in text:
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            if output[state] is not None:
+                return output[state], state
+        return None, state
+
+    def _search_patterns(self, text: str) -> str | None:
+        if not self.patterns:
+            return None
+        if self._combined is not None and self._combined.search(text) is None:
+            return None
+        for pattern in self.patterns:
+            if pattern.search(text):
+                return pattern.pattern
+        return None
+
+    def search(self, text: str) -> str | None:
+        """返回 text 中命中的关键词, 未命中返回 None"""
+        keyword, _ = self._scan_literals(text)
+        return keyword if keyword is not None else self._search_patterns(text)
+
+    def scanner(self) -> "KeywordStreamScanner":
+        return KeywordStreamScanner(self)
+
+
+class KeywordStreamScanner:
+    """逐段检查流式文本, 跨分段的关键词同样可以命中
+
+    普通关键词沿用上一分段结束时的自动机状态; 正则表达式在上一分段末尾
+    STREAM_PATTERN_WINDOW 个字符与新分段拼接后的文本上匹配。
+    """
+
+    def __init__(self, matcher: KeywordMatcher) -> None:
+        self._matcher = matcher
+        self._state = 0
+        self._tail = ""
+
+    def feed(self, chunk: str) -> str | None:
+        """检查新的分段, 返回命中的关键词, 未命中返回 None"""
+        keyword, self._state = self._matcher._scan_literals(chunk, self._state)
+        if keyword is not None or not self._matcher.patterns:
+            return keyword
+        text = self._tail + chunk
+        self._tail = text[-STREAM_PATTERN_WINDOW:]
+        return self._matcher._search_patterns(text)
+
+
+@lru_cache(maxsize=8)
+def get_keyword_matcher(keywords: tuple[str, ...]) -> KeywordMatcher:
+    """获取关键词列表对应的匹配器。相同的关键词列表只构建一次, 修改配置后自动重建。"""
+    return KeywordMatcher(keywords)
+
 
 class KeywordsStrategy(ContentSafetyStrategy):
     def __init__(self, extra_keywords: list) -> None:
@@ -16,9 +167,13 @@ class KeywordsStrategy(ContentSafetyStrategy):
         #         self.keywords.extend(
         #             json.loads(base64.b64decode(f.read()).decode("utf-8"))["keywords"]
         #         )
+        self.matcher = get_keyword_matcher(tuple(self.keywords))
 
     def check(self, content: str) -> tuple[bool, str]:
-        for keyword in self.keywords:
-            if re.search(keyword, content):
-                return False, "内容安全检查不通过，匹配到敏感词。"
+        keyword = self.matcher.search(content)
+        if keyword is not None:
+            return False, f"内容安全检查不通过，匹配到敏感词：{keyword}"
         return True, ""
+
+    def stream_scanner(self) -> KeywordStreamScanner | None:
+        return self.matcher.scanner() if len(self.matcher) else None
@@ -1,12 +1,16 @@
 from astrbot import logger
 
-from . import ContentSafetyStrategy
+from . import ContentSafetyStrategy, ContentSafetyStreamScanner
 
 
 class StrategySelector:
     def __init__(self, config: dict) -> None:
         self.enabled_strategies: list[ContentSafetyStrategy] = []
-        if config["internal_keywords"]["enable"]:
+        # 未配置任何关键词时关键词策略必然通过，无需启用
+        if (
+            config["internal_keywords"]["enable"]
+            and config["internal_keywords"]["extra_keywords"]
+        ):
             from .keywords import KeywordsStrategy
 
             self.enabled_strategies.append(
@@ -32,3 +36,12 @@ class StrategySelector:
             if not ok:
                 return False, info
         return True, ""
+
+    def stream_scanners(self) -> list[ContentSafetyStreamScanner]:
+        """为一次流式输出创建各策略的扫描器，不支持流式检查的策略会被跳过"""
+        scanners = []
+        for strategy in self.enabled_strategies:
+            scanner = strategy.stream_scanner()
+            if scanner is not None:
+                scanners.append(scanner)
+        return scanners
@@ -1,4 +1,5 @@
 import inspect
+import time
 import traceback
 import typing as T
 
@@ -8,6 +9,8 @@ from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.star.star import star_map
 from astrbot.core.star.star_handler import EventType, star_handlers_registry
 
+from .profiler import pipeline_profiler
+
 
 async def call_handler(
     event: AstrMessageEvent,
@@ -90,14 +93,22 @@ async def call_event_hook(
         plugins_name=event.plugins_name,
     )
     for handler in handlers:
+        md = star_map.get(handler.handler_module_path)
+        plugin_name = md.name if md else handler.handler_module_path
+        start = time.perf_counter()
         try:
             assert inspect.iscoroutinefunction(handler.handler)
             logger.debug(
-                f"hook({hook_type.name}) -> {star_map[handler.handler_module_path].name} - {handler.handler_name}",
+                f"hook({hook_type.name}) -> {plugin_name} - {handler.handler_name}",
             )
             await handler.handler(event, *args, **kwargs)
         except BaseException:
             logger.error(traceback.format_exc())
+        finally:
+            pipeline_profiler.observe_handler(
+                f"{plugin_name}.{handler.handler_name}",
+                time.perf_counter() - start,
+            )
 
         if event.is_stopped():
             logger.info(
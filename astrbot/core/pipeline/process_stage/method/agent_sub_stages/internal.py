@@ -13,6 +13,7 @@ from astrbot.core.astr_main_agent import (
     MainAgentBuildResult,
     build_main_agent,
 )
+from astrbot.core.config.astrbot_config import RateLimitStrategy
 from astrbot.core.message.components import File, Image
 from astrbot.core.message.message_event_result import (
     MessageChain,
@@ -30,6 +31,7 @@ from astrbot.core.provider.entities import (
 )
 from astrbot.core.star.star_handler import EventType
 from astrbot.core.utils.metrics import Metric
+from astrbot.core.utils.rate_limiter import rate_limiter
 from astrbot.core.utils.session_lock import session_lock_manager
 
 from .....astr_agent_run_util import AgentRunner, run_agent, run_live_agent
@@ -62,6 +64,8 @@ class InternalAgentSubStage(Stage):
                 self.tool_schema_mode,
             )
             self.tool_schema_mode = "full"
+        self.parallel_tool_calls: bool = settings.get("parallel_tool_calls", False)
+        self.max_parallel_tool_calls: int = settings.get("max_parallel_tool_calls", 4)
         if isinstance(self.max_step, bool):  # workaround: #2622
             self.max_step = 30
         self.show_tool_use: bool = settings.get("show_tool_use_status", True)
@@ -111,11 +115,18 @@ class InternalAgentSubStage(Stage):
         proactive_cfg = settings.get("proactive_capability", {})
         self.add_cron_tools = proactive_cfg.get("add_cron_tools", True)
 
+        # 模型提供商限额由默认配置文件设置，排队策略沿用当前配置文件
+        rl_conf = ctx.astrbot_config["platform_settings"]["rate_limit"]
+        self.provider_rl_stall = rl_conf["strategy"] == RateLimitStrategy.STALL.value
+        self.provider_rl_timeout = rl_conf.get("stall_timeout", 60)
+
         self.conv_manager = ctx.plugin_manager.context.conversation_manager
 
         self.main_agent_cfg = MainAgentBuildConfig(
             tool_call_timeout=self.tool_call_timeout,
             tool_schema_mode=self.tool_schema_mode,
+            parallel_tool_calls=self.parallel_tool_calls,
+            max_parallel_tool_calls=self.max_parallel_tool_calls,
             sanitize_context_by_modalities=self.sanitize_context_by_modalities,
             kb_agentic_mode=self.kb_agentic_mode,
             file_extract_enabled=self.file_extract_enabled,
@@ -231,6 +242,22 @@ class InternalAgentSubStage(Stage):
                             reset_coro.close()
                         return
 
+                    provider_id = (
+                        provider.provider_config.get("id", "") or provider.meta().id
+                    )
+                    waited = await rate_limiter.acquire(
+                        [(rate_limiter.tier("provider"), provider_id)],
+                        stall=self.provider_rl_stall,
+                        timeout=self.provider_rl_timeout,
+                    )
+                    if waited is None:
+                        logger.info(
+                            f"模型提供商 {provider_id} 请求过于频繁, 已丢弃本次 LLM 请求。"
+                        )
+                        if reset_coro:
+                            reset_coro.close()
+                        return
+
                     # apply reset
                     if reset_coro:
                         await reset_coro
@@ -464,6 +491,7 @@ class InternalAgentSubStage(Stage):
             req.conversation.cid,
             history=message_to_save,
             token_usage=token_usage,
+            history_offset=req.conversation.history_offset,
         )
 
 
@@ -1,5 +1,6 @@
 """本地 Agent 模式的 AstrBot 插件调用 Stage"""
 
+import time
 import traceback
 from collections.abc import AsyncGenerator
 from typing import Any
@@ -11,6 +12,7 @@ from astrbot.core.star.star import star_map
 from astrbot.core.star.star_handler import EventType, StarHandlerMetadata
 
 from ...context import PipelineContext, call_event_hook, call_handler
+from ...profiler import pipeline_profiler
 from ..stage import Stage
 
 
@@ -43,9 +45,25 @@ class StarRequestSubStage(Stage):
                 continue
             logger.debug(f"plugin -> {md.name} - {handler.handler_name}")
             try:
+                start = time.perf_counter()
+                downstream = 0.0
+                downstream_start: float | None = None
                 wrapper = call_handler(event, handler.handler, **params)
-                async for ret in wrapper:
-                    yield ret
+                try:
+                    async for ret in wrapper:
+                        downstream_start = time.perf_counter()
+                        yield ret
+                        downstream += time.perf_counter() - downstream_start
+                        downstream_start = None
+                finally:
+                    # 处理函数抛出异常, 或管道在 yield 处提前结束时同样记录耗时
+                    end = time.perf_counter()
+                    if downstream_start is not None:
+                        downstream += end - downstream_start
+                    pipeline_profiler.observe_handler(
+                        f"{md.name}.{handler.handler_name}",
+                        end - start - downstream,
+                    )
                 event.clear_result()  # 清除上一个 handler 的结果
             except Exception as e:
                 traceback_text = traceback.format_exc()
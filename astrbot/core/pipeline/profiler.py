@@ -0,0 +1,119 @@
+"""消息流水线性能剖析
+
+按配置文件 ID 和平台统计每个阶段、每个插件 Handler 的耗时,
+使用滑动窗口直方图计算 p50/p95/p99, 可导出为 JSON 或 Prometheus 文本格式。
+
+当前事件的标签 (配置文件 ID、平台) 保存在 ContextVar 中, 由 PipelineScheduler 在执行事件时设置,
+因此在流水线内部调用的 Handler 和事件钩子无需显式传递标签。
+"""
+
+from contextvars import ContextVar
+
+from astrbot.core.utils.histogram import RollingHistogram
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_labels: ContextVar[tuple[str, str]] = ContextVar(
+    "pipeline_profile_labels",
+    default=("", ""),
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PipelineProfiler:
+    """阶段与 Handler 的耗时统计"""
+
+    METRICS = {
+        "stage": (
+            "astrbot_pipeline_stage_seconds",
+            "Time spent in each pipeline stage, excluding downstream stages.",
+        ),
+        "handler": (
+            "astrbot_plugin_handler_seconds",
+            "Time spent in each plugin handler or event hook.",
+        ),
+    }
+
+    def __init__(self) -> None:
+        # (kind, conf_id, platform, name) -> histogram
+        self._histograms: dict[tuple[str, str, str, str], RollingHistogram] = {}
+
+    def set_labels(self, conf_id: str, platform: str):
+        """设置当前上下文的标签, 返回可用于 reset_labels 的 token"""
+        return _labels.set((conf_id, platform))
+
+    def reset_labels(self, token) -> None:
+        _labels.reset(token)
+
+    def observe(self, kind: str, name: str, seconds: float) -> None:
+        conf_id, platform = _labels.get()
+        key = (kind, conf_id, platform, name)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = RollingHistogram()
+        histogram.observe(seconds)
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        self.observe("stage", name, seconds)
+
+    def observe_handler(self, name: str, seconds: float) -> None:
+        self.observe("handler", name, seconds)
+
+    def reset(self) -> None:
+        self._histograms.clear()
+
+    def snapshot(self) -> dict[str, list[dict]]:
+        """返回各阶段和 Handler 的耗时统计, 时间单位为毫秒"""
+        result: dict[str, list[dict]] = {kind: [] for kind in self.METRICS}
+        for (kind, conf_id, platform, name), histogram in self._histograms.items():
+            quantiles = histogram.quantiles(QUANTILES)
+            result[kind].append(
+                {
+                    "name": name,
+                    "conf_id": conf_id,
+                    "platform": platform,
+                    "count": histogram.count,
+                    "window_count": quantiles["window_count"],
+                    "avg_ms": histogram.total / histogram.count * 1000
+                    if histogram.count
+                    else 0.0,
+                    "p50_ms": quantiles[0.5] * 1000,
+                    "p95_ms": quantiles[0.95] * 1000,
+                    "p99_ms": quantiles[0.99] * 1000,
+                    "max_ms": quantiles["max"] * 1000,
+                },
+            )
+        for items in result.values():
+            items.sort(key=lambda item: item["p95_ms"], reverse=True)
+        return result
+
+    def render_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式 (summary 类型)"""
+        lines: list[str] = []
+        for kind, (metric, help_text) in self.METRICS.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} summary")
+            for (
+                h_kind,
+                conf_id,
+                platform,
+                name,
+            ), histogram in self._histograms.items():
+                if h_kind != kind:
+                    continue
+                labels = (
+                    f'conf_id="{_escape(conf_id)}",platform="{_escape(platform)}",'
+                    f'{kind}="{_escape(name)}"'
+                )
+                quantiles = histogram.quantiles(QUANTILES)
+                for q in QUANTILES:
+                    lines.append(f'{metric}{{{labels},quantile="{q}"}} {quantiles[q]}')
+                lines.append(f"{metric}_sum{{{labels}}} {histogram.total}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+pipeline_profiler = PipelineProfiler()
@@ -167,6 +167,9 @@ class RespondStage(Stage):
 
         return extracted
 
+    def applies(self, event: AstrMessageEvent) -> bool:
+        return event.get_result() is not None
+
     async def process(
         self,
         event: AstrMessageEvent,
@@ -6,7 +6,7 @@ from collections.abc import AsyncGenerator
 
 from astrbot.core import file_token_service, html_renderer, logger
 from astrbot.core.message.components import At, Image, Json, Node, Plain, Record, Reply
-from astrbot.core.message.message_event_result import ResultContentType
+from astrbot.core.message.message_event_result import MessageChain, ResultContentType
 from astrbot.core.pipeline.content_safety_check.stage import ContentSafetyCheckStage
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.platform.message_type import MessageType
@@ -123,15 +123,73 @@ class ResultDecorateStage(Stage):
                 result.append(seg)
         return result if result else [text]
 
+    def applies(self, event: AstrMessageEvent) -> bool:
+        result = event.get_result()
+        if result is None:
+            return False
+        if result.result_content_type == ResultContentType.STREAMING_RESULT:
+            return self._should_guard_stream(result)
+        return bool(result.chain)
+
+    def _should_guard_stream(self, result) -> bool:
+        return (
+            self.content_safe_check_reply
+            and isinstance(self.content_safe_check_stage, ContentSafetyCheckStage)
+            and result.async_stream is not None
+        )
+
+    async def _guard_stream(
+        self,
+        stream: AsyncGenerator,
+        scanners: list,
+    ) -> AsyncGenerator:
+        """逐段检查流式输出，命中后替换为屏蔽提示，并继续消费剩余分段以保证 Agent 正常结束"""
+        blocked = False
+        async for chain in stream:
+            if blocked:
+                continue
+            if isinstance(chain, MessageChain):
+                for comp in chain.chain:
+                    if not isinstance(comp, Plain):
+                        continue
+                    for scanner in scanners:
+                        if (hit := scanner.feed(comp.text)) is not None:
+                            blocked = True
+                            logger.info(
+                                f"内容安全检查不通过，原因：流式输出匹配到 {hit}",
+                            )
+                            break
+                    if blocked:
+                        break
+            if blocked:
+                yield MessageChain().message(
+                    "你的消息或者大模型的响应中包含不适当的内容，已被屏蔽。",
+                )
+                continue
+            yield chain
+
     async def process(
         self,
         event: AstrMessageEvent,
     ) -> None | AsyncGenerator[None, None]:
         result = event.get_result()
-        if result is None or not result.chain:
+        if result is None:
             return
 
         if result.result_content_type == ResultContentType.STREAMING_RESULT:
+            # 流式输出在发送过程中逐段检查内容安全
+            if self._should_guard_stream(result):
+                assert isinstance(
+                    self.content_safe_check_stage, ContentSafetyCheckStage
+                )
+                selector = self.content_safe_check_stage.strategy_selector
+                if scanners := selector.stream_scanners():
+                    result.async_stream = self._guard_stream(
+                        result.async_stream, scanners
+                    )
+            return
+
+        if not result.chain:
             return
 
         is_stream = result.result_content_type == ResultContentType.STREAMING_FINISH
@@ -141,7 +199,7 @@ class ResultDecorateStage(Stage):
             self.content_safe_check_reply
             and self.content_safe_check_stage
             and result.is_llm_result()
-            and not is_stream  # 流式输出不检查内容安全
+            and not is_stream  # 流式输出已在发送时逐段检查
         ):
             text = ""
             for comp in result.chain:
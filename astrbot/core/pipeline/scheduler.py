@@ -1,4 +1,7 @@
-from collections.abc import AsyncGenerator
+import inspect
+import time
+from collections.abc import Callable
+from typing import NamedTuple
 
 from astrbot.core import logger
 from astrbot.core.platform import AstrMessageEvent
@@ -10,10 +13,34 @@ from astrbot.core.utils.active_event_registry import active_event_registry
 
 from .bootstrap import ensure_builtin_stages_registered
 from .context import PipelineContext
-from .stage import registered_stages
+from .profiler import pipeline_profiler
+from .stage import Stage, registered_stages
 from .stage_order import STAGES_ORDER
 
 
+class CompiledStage(NamedTuple):
+    """预编译的阶段信息, 在初始化时计算一次, 避免每个事件重复判断"""
+
+    stage: Stage
+    name: str
+    is_generator: bool
+    """process 是否为异步生成器 (洋葱模型)"""
+    applies: Callable[[AstrMessageEvent], bool] | None
+    """阶段是否需要处理事件的前置判断, None 表示总是需要处理"""
+
+
+def compile_stage(stage: Stage) -> CompiledStage:
+    applies = None
+    if type(stage).applies is not Stage.applies:
+        applies = stage.applies
+    return CompiledStage(
+        stage=stage,
+        name=stage.__class__.__name__,
+        is_generator=inspect.isasyncgenfunction(stage.process),
+        applies=applies,
+    )
+
+
 class PipelineScheduler:
     """管道调度器，负责调度各个阶段的执行"""
 
@@ -24,55 +51,69 @@ class PipelineScheduler:
         )  # 按照顺序排序
         self.ctx = context  # 上下文对象
         self.stages = []  # 存储阶段实例
+        self.chain: tuple[CompiledStage, ...] = ()  # 预编译的阶段链
 
     async def initialize(self) -> None:
-        """初始化管道调度器时, 初始化所有阶段"""
+        """初始化管道调度器时, 初始化所有阶段并编译阶段链"""
         for stage_cls in registered_stages:
             stage_instance = stage_cls()  # 创建实例
             await stage_instance.initialize(self.ctx)
             self.stages.append(stage_instance)
+        self.compile()
+
+    def compile(self) -> None:
+        """根据 self.stages 编译阶段链"""
+        self.chain = tuple(compile_stage(stage) for stage in self.stages)
 
     async def _process_stages(self, event: AstrMessageEvent, from_stage=0) -> None:
         """依次执行各个阶段
 
+        普通协程阶段在同一层循环中依次执行; 只有进入异步生成器阶段时,
+        才会为其后续阶段递归一层 (洋葱模型)。前置判断不通过的阶段直接跳过。
+        每个阶段的耗时 (不含其后续阶段) 记录到 pipeline_profiler。
+
         Args:
             event (AstrMessageEvent): 事件对象
             from_stage (int): 从第几个阶段开始执行, 默认从0开始
 
         """
-        for i in range(from_stage, len(self.stages)):
-            stage = self.stages[i]  # 获取当前要执行的阶段
-            # logger.debug(f"执行阶段 {stage.__class__.__name__}")
-            coroutine = stage.process(
-                event,
-            )  # 调用阶段的process方法, 返回协程或者异步生成器
-
-            if isinstance(coroutine, AsyncGenerator):
+        chain = self.chain
+        for i in range(from_stage, len(chain)):
+            stage, name, is_generator, applies = chain[i]
+            if applies is not None and not applies(event):
+                continue
+
+            start = time.perf_counter()
+            if is_generator:
+                downstream = 0.0
                 # 如果返回的是异步生成器, 实现洋葱模型的核心
-                async for _ in coroutine:
+                async for _ in stage.process(event):  # type: ignore
                     # 此处是前置处理完成后的暂停点(yield), 下面开始执行后续阶段
                     if event.is_stopped():
-                        logger.debug(
-                            f"阶段 {stage.__class__.__name__} 已终止事件传播。",
-                        )
+                        logger.debug(f"阶段 {name} 已终止事件传播。")
                         break
 
                     # 递归调用, 处理所有后续阶段
+                    downstream_start = time.perf_counter()
                     await self._process_stages(event, i + 1)
+                    downstream += time.perf_counter() - downstream_start
 
                     # 此处是后续所有阶段处理完毕后返回的点, 执行后置处理
                     if event.is_stopped():
-                        logger.debug(
-                            f"阶段 {stage.__class__.__name__} 已终止事件传播。",
-                        )
+                        logger.debug(f"阶段 {name} 已终止事件传播。")
                         break
+                pipeline_profiler.observe_stage(
+                    name,
+                    time.perf_counter() - start - downstream,
+                )
             else:
                 # 如果返回的是普通协程(不含yield的async函数), 则不进入下一层(基线条件)
                 # 简单地等待它执行完成, 然后继续执行下一个阶段
-                await coroutine
+                await stage.process(event)  # type: ignore
+                pipeline_profiler.observe_stage(name, time.perf_counter() - start)
 
                 if event.is_stopped():
-                    logger.debug(f"阶段 {stage.__class__.__name__} 已终止事件传播。")
+                    logger.debug(f"阶段 {name} 已终止事件传播。")
                     break
 
     async def execute(self, event: AstrMessageEvent) -> None:
@@ -83,6 +124,10 @@ class PipelineScheduler:
 
         """
         active_event_registry.register(event)
+        labels = pipeline_profiler.set_labels(
+            str(self.ctx.astrbot_config_id),
+            event.get_platform_name(),
+        )
         try:
             await self._process_stages(event)
 
@@ -92,5 +137,6 @@ class PipelineScheduler:
 
             logger.debug("pipeline 执行完毕。")
         finally:
+            pipeline_profiler.reset_labels(labels)
             event.cleanup_temporary_local_files()
             active_event_registry.unregister(event)
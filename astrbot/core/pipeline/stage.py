@@ -43,3 +43,13 @@ class Stage(abc.ABC):
 
         """
         raise NotImplementedError
+
+    def applies(self, event: AstrMessageEvent) -> bool:
+        """判断该阶段是否需要处理此事件
+
+        PipelineScheduler 会在调用 process 之前调用此方法, 返回 False 时直接跳过该阶段,
+        不会创建协程或异步生成器。子类可以覆盖此方法来提供廉价的前置判断,
+        判断必须与 process 中对应的提前返回逻辑保持一致。
+
+        """
+        return True
@@ -0,0 +1,149 @@
+"""消息事件 Handler 派发索引
+
+WakingCheckStage 需要对每条消息找出可能通过过滤器的插件 Handler。逐个执行所有 Handler 的过滤器
+开销与已安装插件数量成正比, 因此预先按 Handler 的"必要条件"建立索引:
+
+- 带有 CommandFilter / CommandGroupFilter 的 Handler: 消息必须以其某个完整指令名开头,
+  指令名 (含别名和父指令组前缀) 插入前缀树, 每条消息只需沿前缀树走一遍;
+- 带有 RegexFilter 的 Handler: 消息必须匹配该正则, 每个正则每条消息只执行一次;
+- 其余 Handler: 始终作为候选。
+
+索引只负责筛选候选, 候选 Handler 仍按原优先级顺序执行完整的过滤器链, 因此行为与逐个过滤一致。
+索引在 star_handlers_registry.generation 变化 (插件载入、卸载、启停, 指令配置变更) 时重建。
+"""
+
+import re
+
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.star.filter.command import CommandFilter
+from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.filter.regex import RegexFilter
+from astrbot.core.star.star_handler import (
+    EventType,
+    StarHandlerMetadata,
+    star_handlers_registry,
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_command_text(text: str) -> str:
+    """与 CommandFilter 相同的归一化: 去除首尾空白, 连续空白合并为一个空格"""
+    return _WHITESPACE.sub(" ", text.strip())
+
+
+class _TrieNode:
+    __slots__ = ("children", "word_handlers", "prefix_handlers")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.word_handlers: list[int] = []
+        """指令名之后须为空格或消息结尾 (CommandFilter)"""
+        self.prefix_handlers: list[int] = []
+        """只要求消息以指令名开头 (CommandGroupFilter)"""
+
+
+class CommandTrie:
+    """指令名前缀树, 查询消息文本的所有前缀命中的 Handler"""
+
+    def __init__(self) -> None:
+        self._root = _TrieNode()
+
+    def insert(self, command: str, handler_index: int, whole_word: bool) -> None:
+        node = self._root
+        for ch in command:
+            child = node.children.get(ch)
+            if child is None:
+                child = node.children[ch] = _TrieNode()
+            node = child
+        if whole_word:
+            node.word_handlers.append(handler_index)
+        else:
+            node.prefix_handlers.append(handler_index)
+
+    def match_prefixes(self, text: str) -> list[int]:
+        node = self._root
+        # 空指令名挂在根节点上
+        matched = list(node.prefix_handlers)
+        if not text:
+            matched.extend(node.word_handlers)
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            node = node.children.get(ch)
+            if node is None:
+                break
+            if node.prefix_handlers:
+                matched.extend(node.prefix_handlers)
+            if node.word_handlers and (i == last or text[i + 1] == " "):
+                matched.extend(node.word_handlers)
+        return matched
+
+
+class HandlerDispatchIndex:
+    def __init__(self, handlers: list[StarHandlerMetadata]) -> None:
+        self.handlers = handlers
+        self.command_trie = CommandTrie()
+        self.regex_handlers: list[tuple[int, re.Pattern]] = []
+        self.unconditional: list[int] = []
+        """没有可索引的必要条件, 每条消息都需执行过滤器的 Handler"""
+
+        for idx, handler in enumerate(handlers):
+            command_filter = None
+            regex_filter = None
+            for f in handler.event_filters:
+                if isinstance(f, CommandFilter | CommandGroupFilter):
+                    command_filter = f
+                    break
+                if regex_filter is None and isinstance(f, RegexFilter):
+                    regex_filter = f
+            if command_filter is not None:
+                whole_word = isinstance(command_filter, CommandFilter)
+                for name in set(command_filter.get_complete_command_names()):
+                    self.command_trie.insert(
+                        normalize_command_text(name),
+                        idx,
+                        whole_word,
+                    )
+            elif regex_filter is not None:
+                self.regex_handlers.append((idx, regex_filter.regex))
+            else:
+                self.unconditional.append(idx)
+
+    def candidates(self, event: AstrMessageEvent) -> list[StarHandlerMetadata]:
+        """按优先级顺序返回可能通过过滤器的 Handler"""
+        message_str = event.get_message_str().strip()
+        matched = set(self.unconditional)
+        # 指令 (组) 过滤器要求消息被唤醒
+        if event.is_at_or_wake_command:
+            matched.update(
+                self.command_trie.match_prefixes(normalize_command_text(message_str)),
+            )
+        for idx, regex in self.regex_handlers:
+            if regex.search(message_str):
+                matched.add(idx)
+        return [self.handlers[idx] for idx in sorted(matched)]
+
+
+_index_cache: dict[tuple[str, ...] | None, HandlerDispatchIndex] = {}
+_index_generation = -1
+
+
+def get_dispatch_index(plugins_name: list[str] | None) -> HandlerDispatchIndex:
+    """获取 AdapterMessageEvent 的派发索引, 按启用的插件列表缓存"""
+    global _index_generation
+    if _index_generation != star_handlers_registry.generation:
+        _index_cache.clear()
+        _index_generation = star_handlers_registry.generation
+    key = tuple(plugins_name) if plugins_name is not None else None
+    index = _index_cache.get(key)
+    if index is None:
+        handlers = [
+            handler
+            for handler in star_handlers_registry.get_handlers_by_event_type(
+                EventType.AdapterMessageEvent,
+                plugins_name=plugins_name,
+            )
+            if handler.event_filters
+        ]
+        index = _index_cache[key] = HandlerDispatchIndex(handlers)
+    return index
@@ -9,10 +9,10 @@ from astrbot.core.star.filter.command_group import CommandGroupFilter
 from astrbot.core.star.filter.permission import PermissionTypeFilter
 from astrbot.core.star.session_plugin_manager import SessionPluginManager
 from astrbot.core.star.star import star_map
-from astrbot.core.star.star_handler import EventType, star_handlers_registry
 
 from ..context import PipelineContext
 from ..stage import Stage, register_stage
+from .dispatch_index import get_dispatch_index
 
 UNIQUE_SESSION_ID_BUILDERS: dict[str, Callable[[AstrMessageEvent], str | None]] = {
     "aiocqhttp": lambda e: f"{e.get_sender_id()}_{e.get_group_id()}",
@@ -156,10 +156,8 @@ class WakingCheckStage(Stage):
             event.plugins_name = enabled_plugins_name
         logger.debug(f"enabled_plugins_name: {enabled_plugins_name}")
 
-        for handler in star_handlers_registry.get_handlers_by_event_type(
-            EventType.AdapterMessageEvent,
-            plugins_name=event.plugins_name,
-        ):
+        # 通过派发索引只对可能命中的 Handler 执行过滤器
+        for handler in get_dispatch_index(event.plugins_name).candidates(event):
             if (
                 self.disable_builtin_commands
                 and handler.handler_module_path
@@ -171,8 +169,6 @@ class WakingCheckStage(Stage):
             passed = True
             permission_not_pass = False
             permission_filter_raise_error = False
-            if len(handler.event_filters) == 0:
-                continue
 
             for filter in handler.event_filters:
                 try:
@@ -28,6 +28,10 @@ class WhitelistCheckStage(Stage):
         ]
         self.wl_log = ctx.astrbot_config["platform_settings"]["id_whitelist_log"]
 
+    def applies(self, event: AstrMessageEvent) -> bool:
+        # 白名单检查未启用或白名单为空时不检查
+        return bool(self.enable_whitelist_check and self.whitelist)
+
     async def process(
         self,
         event: AstrMessageEvent,
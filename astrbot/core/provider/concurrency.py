@@ -0,0 +1,170 @@
+"""自适应并发控制
+
+按 AIMD (加性增、乘性减) 调整对同一个 Provider 的并发请求数:
+
+- 并发已被用满、请求成功且延迟没有明显高于基线时, 每完成一轮 (当前并发数个) 请求, 并发数加 1;
+- 遇到限流 (429) 或服务端错误 (5xx) 时并发数减半, 并按 Retry-After 暂停发出新请求;
+- 平均延迟超过基线的 latency_tolerance 倍时视为过载, 并发数乘以 0.75。
+
+每次减小之后, 在一个平均延迟的时间内不会再次减小, 以免同一批并发请求的失败被重复计算。
+控制器挂在 Provider 实例上, 同时使用同一个 Provider 的所有调用方 (例如同时向多个知识库上传文档)
+共用同一个并发上限。
+"""
+
+import asyncio
+import email.utils
+import time
+from contextlib import asynccontextmanager
+
+MAX_RETRY_AFTER = 60.0
+"""Retry-After 的上限 (秒), 避免异常的响应头导致长时间暂停"""
+
+
+def get_http_status(error: BaseException) -> int | None:
+    """从 openai / httpx / google-genai 等 SDK 的异常中提取 HTTP 状态码"""
+    for obj in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "code", "status"):
+            value = getattr(obj, attr, None)
+            if isinstance(value, int) and 100 <= value < 600:
+                return value
+    return None
+
+
+def get_retry_after(error: BaseException) -> float | None:
+    """从异常携带的响应头中读取 Retry-After (秒)"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if value := headers.get("retry-after-ms"):
+            return min(float(value) / 1000, MAX_RETRY_AFTER)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            date = email.utils.parsedate_to_datetime(value)
+            seconds = date.timestamp() - time.time()
+    except Exception:
+        return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """是否为限流或服务端错误, 即应当降低并发的错误"""
+    status = get_http_status(error)
+    return status is not None and (status == 429 or 500 <= status < 600)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD 并发控制器, 用法: ``async with limiter.slot(): ...``"""
+
+    def __init__(
+        self,
+        initial: int = 3,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        latency_tolerance: float = 2.0,
+    ) -> None:
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.latency: float | None = None
+        """请求延迟的指数移动平均"""
+        self.baseline: float | None = None
+        """延迟基线, 跟随最小延迟并缓慢上浮, 以适应请求本身变慢 (如批次变大)"""
+        self.successes = 0
+        self.overloads = 0
+        self._round = 0
+        self._saturated = False
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._released = asyncio.Event()
+
+    @property
+    def concurrency(self) -> int:
+        """当前允许的并发请求数"""
+        return int(self.limit)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "latency": self.latency,
+            "baseline": self.baseline,
+            "successes": self.successes,
+            "overloads": self.overloads,
+            "paused_for": max(0.0, self._paused_until - time.monotonic()),
+        }
+
+    @asynccontextmanager
+    async def slot(self):
+        """占用一个并发名额, 并根据请求结果调整并发数"""
+        await self._acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_overload_error(e):
+                self._on_overload(get_retry_after(e))
+            raise
+        else:
+            self._on_success(time.monotonic() - start)
+        finally:
+            self.in_flight -= 1
+            self._released.set()
+
+    async def _acquire(self) -> None:
+        while True:
+            delay = self._paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            if self.in_flight < self.concurrency:
+                self.in_flight += 1
+                if self.in_flight >= self.concurrency:
+                    self._saturated = True
+                return
+            self._saturated = True
+            self._released.clear()
+            await self._released.wait()
+
+    def _on_success(self, latency: float) -> None:
+        self.successes += 1
+        self.latency = (
+            latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        )
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += 0.01 * (latency - self.baseline)
+
+        if self.latency > self.latency_tolerance * self.baseline:
+            self._decrease(0.75)
+            return
+        self._round += 1
+        if self._round >= self.concurrency:
+            self._round = 0
+            # 只有并发上限确实成为瓶颈时才增大, 否则上限会在低负载时无限增长
+            if self._saturated and self.limit < self.max_limit:
+                self.limit = min(self.limit + 1, self.max_limit)
+            self._saturated = False
+
+    def _on_overload(self, retry_after: float | None) -> None:
+        self.overloads += 1
+        now = time.monotonic()
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+        self._decrease(0.5)
+
+    def _decrease(self, factor: float) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < (self.latency or 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.limit * factor, float(self.min_limit))
+        self._round = 0
+        self._saturated = False
@@ -204,8 +204,55 @@ async def _quick_test_mcp_connection(config: dict) -> tuple[bool, str]:
         return False, f"{e!s}"
 
 
+class _FuncToolList(list):
+    """func_list 的任何增删改都会递增所属 FunctionToolManager 的 version
+
+    插件和核心代码会直接修改 func_list (append / remove 等), 因此在列表本身上跟踪变更,
+    依赖工具列表的缓存 (如人格的工具集) 只需比较 version。
+    """
+
+    def __init__(self, iterable=(), on_change: Callable[[], None] | None = None):
+        super().__init__(iterable)
+        self._on_change = on_change
+
+    def _changed(self) -> None:
+        if self._on_change is not None:
+            self._on_change()
+
+
+def _mutator(name: str):
+    method = getattr(list, name)
+
+    def wrapper(self: _FuncToolList, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._changed()
+        return result
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in (
+    "append",
+    "extend",
+    "insert",
+    "remove",
+    "pop",
+    "clear",
+    "sort",
+    "reverse",
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+):
+    setattr(_FuncToolList, _name, _mutator(_name))
+
+
 class FunctionToolManager:
     def __init__(self) -> None:
+        self.version = 0
+        """工具列表或工具启用状态变化时递增"""
         self.func_list: list[FuncTool] = []
         self._mcp_server_runtime: dict[str, _MCPServerRuntime] = {}
         """MCP 服务运行时状态（唯一事实来源）"""
@@ -251,6 +298,18 @@ class FunctionToolManager:
         """
         return self._mcp_server_runtime_view
 
+    @property
+    def func_list(self) -> list[FuncTool]:
+        return self._func_list
+
+    @func_list.setter
+    def func_list(self, value: list[FuncTool]) -> None:
+        self._func_list = _FuncToolList(value, on_change=self._bump_version)
+        self._bump_version()
+
+    def _bump_version(self) -> None:
+        self.version += 1
+
     def empty(self) -> bool:
         return len(self.func_list) == 0
 
@@ -786,6 +845,7 @@ class FunctionToolManager:
         func_tool = self.get_func(name)
         if func_tool is not None:
             func_tool.active = False
+            self._bump_version()
 
             inactivated_llm_tools: list = sp.get(
                 "inactivated_llm_tools",
@@ -816,6 +876,7 @@ class FunctionToolManager:
                     )
 
             func_tool.active = True
+            self._bump_version()
 
             inactivated_llm_tools: list = sp.get(
                 "inactivated_llm_tools",
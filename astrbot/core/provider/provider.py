@@ -1,11 +1,17 @@
 import abc
 import asyncio
 import os
+from collections import deque
 from collections.abc import AsyncGenerator
+from contextlib import aclosing
 from typing import Literal, TypeAlias, Union
 
 from astrbot.core.agent.message import ContentPart, Message
 from astrbot.core.agent.tool import ToolSet
+from astrbot.core.provider.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    get_retry_after,
+)
 from astrbot.core.provider.entities import (
     LLMResponse,
     ProviderMeta,
@@ -306,10 +312,13 @@ class TTSProvider(AbstractProvider):
 
 
 class EmbeddingProvider(AbstractProvider):
+    DEFAULT_MAX_CONCURRENCY = 16
+
     def __init__(self, provider_config: dict, provider_settings: dict) -> None:
         super().__init__(provider_config)
         self.provider_config = provider_config
         self.provider_settings = provider_settings
+        self._concurrency_limiter: AdaptiveConcurrencyLimiter | None = None
 
     @abc.abstractmethod
     async def get_embedding(self, text: str) -> list[float]:
@@ -329,6 +338,29 @@ class EmbeddingProvider(AbstractProvider):
     async def test(self) -> None:
         await self.get_embedding("astrbot")
 
+    def get_concurrency_limiter(self, initial: int = 3) -> AdaptiveConcurrencyLimiter:
+        """获取该 Provider 共用的自适应并发控制器, 首次调用时以 initial 为初始并发数创建
+
+        并发上限由 embedding_max_concurrency 配置项决定。
+        """
+        limiter = getattr(self, "_concurrency_limiter", None)
+        if limiter is None:
+            try:
+                max_limit = int(
+                    self.provider_config.get(
+                        "embedding_max_concurrency",
+                        self.DEFAULT_MAX_CONCURRENCY,
+                    ),
+                )
+            except (TypeError, ValueError):
+                max_limit = self.DEFAULT_MAX_CONCURRENCY
+            limiter = AdaptiveConcurrencyLimiter(
+                initial=initial,
+                max_limit=max(max_limit, 1),
+            )
+            self._concurrency_limiter = limiter
+        return limiter
+
     async def get_embeddings_batch(
         self,
         texts: list[str],
@@ -342,59 +374,110 @@ class EmbeddingProvider(AbstractProvider):
         Args:
             texts: 文本列表
             batch_size: 每批处理的文本数量
-            tasks_limit: 并发任务数量限制
+            tasks_limit: 初始并发数, 仅在该 Provider 首次批量请求时生效
             max_retries: 失败时的最大重试次数
             progress_callback: 进度回调函数，接收参数 (current, total)
 
         Returns:
-            向量列表
+            向量列表, 与 texts 一一对应
 
         """
-        semaphore = asyncio.Semaphore(tasks_limit)
         all_embeddings: list[list[float]] = []
-        failed_batches: list[tuple[int, list[str]]] = []
+        async with aclosing(
+            self.iter_embeddings_batches(
+                texts,
+                batch_size=batch_size,
+                tasks_limit=tasks_limit,
+                max_retries=max_retries,
+                progress_callback=progress_callback,
+            ),
+        ) as batches:
+            async for _, batch_embeddings in batches:
+                all_embeddings.extend(batch_embeddings)
+        return all_embeddings
+
+    async def iter_embeddings_batches(
+        self,
+        texts: list[str],
+        batch_size: int = 16,
+        tasks_limit: int = 3,
+        max_retries: int = 3,
+        progress_callback=None,
+    ) -> AsyncGenerator[tuple[int, list[list[float]]], None]:
+        """分批并发获取向量, 按提交顺序逐批产出 (批次起始下标, 向量列表)
+
+        并发数由该 Provider 共用的自适应并发控制器 (见 get_concurrency_limiter) 决定,
+        最多提前调度两倍于当前并发数的批次, 因此内存中只保留少量尚未被消费的向量。
+        某个批次重试后仍失败时抛出异常并取消其余批次, 此前产出的批次不受影响,
+        调用方可以据此记录断点。
+
+        Args:
+            texts: 文本列表
+            batch_size: 每批处理的文本数量
+            tasks_limit: 初始并发数, 仅在该 Provider 首次批量请求时生效
+            max_retries: 失败时的最大重试次数
+            progress_callback: 进度回调函数，接收参数 (current, total), 按完成顺序调用
+
+        """
+        limiter = self.get_concurrency_limiter(tasks_limit)
         completed_count = 0
         total_count = len(texts)
 
-        async def process_batch(batch_idx: int, batch_texts: list[str]) -> None:
+        async def process_batch(batch_idx: int, batch_texts: list[str]):
             nonlocal completed_count
-            async with semaphore:
-                for attempt in range(max_retries):
-                    try:
+            for attempt in range(max_retries):
+                try:
+                    async with limiter.slot():
                         batch_embeddings = await self.get_embeddings(batch_texts)
-                        all_embeddings.extend(batch_embeddings)
-                        completed_count += len(batch_texts)
-                        if progress_callback:
-                            await progress_callback(completed_count, total_count)
-                        return
-                    except Exception as e:
-                        if attempt == max_retries - 1:
-                            # 最后一次重试失败，记录失败的批次
-                            failed_batches.append((batch_idx, batch_texts))
-                            raise Exception(
-                                f"批次 {batch_idx} 处理失败，已重试 {max_retries} 次: {e!s}",
-                            )
-                        # 等待一段时间后重试，使用指数退避
-                        await asyncio.sleep(2**attempt)
-
-        tasks = []
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i : i + batch_size]
-            batch_idx = i // batch_size
-            tasks.append(process_batch(batch_idx, batch_texts))
-
-        # 收集所有任务的结果，包括失败的任务
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # 检查是否有失败的任务
-        errors = [r for r in results if isinstance(r, Exception)]
-        if errors:
-            error_msg = (
-                f"有 {len(errors)} 个批次处理失败: {'; '.join(str(e) for e in errors)}"
-            )
-            raise Exception(error_msg)
+                    if len(batch_embeddings) != len(batch_texts):
+                        raise ValueError(
+                            f"返回的向量数量 {len(batch_embeddings)} 与文本数量 {len(batch_texts)} 不一致",
+                        )
+                    break
+                except Exception as e:
+                    if attempt == max_retries - 1:
+                        raise Exception(
+                            f"批次 {batch_idx} 处理失败，已重试 {max_retries} 次: {e!s}",
+                        ) from e
+                    # 优先遵循服务端给出的 Retry-After, 否则使用指数退避。等待期间不占用并发名额
+                    await asyncio.sleep(get_retry_after(e) or 2**attempt)
+            completed_count += len(batch_texts)
+            if progress_callback:
+                await progress_callback(completed_count, total_count)
+            return batch_embeddings
+
+        starts = iter(range(0, total_count, batch_size))
+        pending: deque[tuple[int, asyncio.Task]] = deque()
+
+        def schedule() -> None:
+            # 并发由 limiter 控制, 这里只需保持足够的已调度批次
+            while len(pending) < max(limiter.concurrency, 1) * 2:
+                start = next(starts, None)
+                if start is None:
+                    return
+                task = asyncio.create_task(
+                    process_batch(
+                        start // batch_size, texts[start : start + batch_size]
+                    ),
+                )
+                pending.append((start, task))
 
-        return all_embeddings
+        try:
+            schedule()
+            while pending:
+                start, task = pending[0]
+                batch_embeddings = await task
+                pending.popleft()
+                # 在调用方处理当前批次期间, 后续批次继续执行
+                schedule()
+                yield start, batch_embeddings
+        finally:
+            for _, task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(
+                    *(task for _, task in pending), return_exceptions=True
+                )
 
 
 class RerankProvider(AbstractProvider):
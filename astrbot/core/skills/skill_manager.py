@@ -8,7 +8,7 @@ import shutil
 import tempfile
 import uuid
 import zipfile
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
 from pathlib import Path, PurePosixPath
 
@@ -19,6 +19,7 @@ from astrbot.core.utils.astrbot_path import (
     get_astrbot_skills_path,
     get_astrbot_temp_path,
 )
+from astrbot.core.utils.ttl_cache import TTLCache
 
 SKILLS_CONFIG_FILENAME = "skills.json"
 SANDBOX_SKILLS_CACHE_FILENAME = "sandbox_skills_cache.json"
@@ -29,6 +30,40 @@ _SANDBOX_SKILLS_CACHE_VERSION = 1
 
 _SKILL_NAME_RE = re.compile(r"^[\w.-]+$")
 
+# Process-wide caches shared by all SkillManager instances. Entries are
+# validated against file mtimes, so the TTL only bounds how long stale
+# entries of removed skill roots are kept around.
+_SKILLS_CACHE_TTL = 3600.0
+_description_cache: TTLCache[str, tuple[tuple[int, int], str]] = TTLCache(
+    maxsize=4096, ttl=_SKILLS_CACHE_TTL
+)
+"""SKILL.md path -> (file signature, parsed description)"""
+_listing_cache: TTLCache[tuple, tuple[tuple, list[SkillInfo]]] = TTLCache(
+    maxsize=64, ttl=_SKILLS_CACHE_TTL
+)
+"""list_skills arguments -> (skills fingerprint, result)"""
+_prompt_cache: TTLCache[tuple, tuple[tuple, str]] = TTLCache(
+    maxsize=256, ttl=_SKILLS_CACHE_TTL
+)
+"""(runtime, allowed skills) -> (skills fingerprint, rendered skills prompt)"""
+_skills_generation = 0
+"""Bumped on every write through SkillManager, so changes made within the
+same mtime tick are never served from cache."""
+
+
+def invalidate_skills_cache() -> None:
+    """Drop all cached skill listings and prompts."""
+    global _skills_generation
+    _skills_generation += 1
+
+
+def _file_signature(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
 
 def _normalize_skill_name(name: str | None) -> str:
     raw = str(name or "")
@@ -137,6 +172,25 @@ def _parse_frontmatter_description(text: str) -> str:
     return description.strip()
 
 
+def _read_skill_description(skill_md: Path) -> str:
+    """Read the frontmatter description, reparsing only when the file changed."""
+    path = str(skill_md)
+    signature = _file_signature(path)
+    if signature is None:
+        return ""
+    cached = _description_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    try:
+        description = _parse_frontmatter_description(
+            skill_md.read_text(encoding="utf-8")
+        )
+    except Exception:
+        description = ""
+    _description_cache.set(path, (signature, description))
+    return description
+
+
 # Regex for sanitizing paths used in prompt examples — only allow
 # safe path characters to prevent prompt injection via crafted skill paths.
 _SAFE_PATH_RE = re.compile(r"[^\w./ ,()'\-]", re.UNICODE)
@@ -294,6 +348,7 @@ class SkillManager:
     def _save_config(self, config: dict) -> None:
         with open(self.config_path, "w", encoding="utf-8") as f:
             json.dump(config, f, ensure_ascii=False, indent=4)
+        invalidate_skills_cache()
 
     def _load_sandbox_skills_cache(self) -> dict:
         if not os.path.exists(self.sandbox_skills_cache_path):
@@ -319,6 +374,7 @@ class SkillManager:
         cache["updated_at"] = datetime.now(timezone.utc).isoformat()
         with open(self.sandbox_skills_cache_path, "w", encoding="utf-8") as f:
             json.dump(cache, f, ensure_ascii=False, indent=2)
+        invalidate_skills_cache()
 
     def set_sandbox_skills_cache(self, skills: list[dict]) -> None:
         """Persist sandbox skill metadata discovered from runtime side."""
@@ -355,6 +411,36 @@ class SkillManager:
             "updated_at": cache.get("updated_at"),
         }
 
+    def _skills_fingerprint(self) -> tuple:
+        """Cheap signature of everything list_skills reads.
+
+        Only stats files: the skills config, the sandbox skills cache and the
+        SKILL.md of every skill directory. Any write, rename or removal changes
+        the signature and invalidates the cached listing.
+        """
+        entries: list[tuple[str, tuple[int, int] | None, tuple[int, int] | None]] = []
+        try:
+            with os.scandir(self.skills_root) as it:
+                for entry in it:
+                    if not entry.is_dir():
+                        continue
+                    canonical = _file_signature(os.path.join(entry.path, "SKILL.md"))
+                    legacy = (
+                        _file_signature(os.path.join(entry.path, "skill.md"))
+                        if canonical is None
+                        else None
+                    )
+                    entries.append((entry.name, canonical, legacy))
+        except OSError:
+            pass
+        entries.sort()
+        return (
+            _skills_generation,
+            _file_signature(self.config_path),
+            _file_signature(self.sandbox_skills_cache_path),
+            tuple(entries),
+        )
+
     def list_skills(
         self,
         *,
@@ -367,7 +453,73 @@ class SkillManager:
         show_sandbox_path: If True and runtime is "sandbox",
             return the path as it would appear in the sandbox environment,
             otherwise return the local filesystem path.
+
+        The result is cached process-wide and reused until one of the files
+        it is built from changes.
         """
+        key = (
+            self.skills_root,
+            self.config_path,
+            self.sandbox_skills_cache_path,
+            active_only,
+            runtime,
+            show_sandbox_path,
+        )
+        # Taken before scanning, so changes made during the scan are picked up
+        # by the next call.
+        fingerprint = self._skills_fingerprint()
+        cached = _listing_cache.get(key)
+        if cached is None or cached[0] != fingerprint:
+            skills = self._scan_skills(
+                active_only=active_only,
+                runtime=runtime,
+                show_sandbox_path=show_sandbox_path,
+            )
+            cached = (fingerprint, skills)
+            _listing_cache.set(key, cached)
+        # SkillInfo is mutable, hand out copies to keep the cache intact
+        return [replace(skill) for skill in cached[1]]
+
+    def build_skills_prompt(
+        self,
+        *,
+        runtime: str = "local",
+        allowed_skills: list[str] | None = None,
+    ) -> str:
+        """Render the skills prompt for the active skills.
+
+        allowed_skills: Optional allowlist (e.g. from a persona). ``None``
+            allows every active skill, an empty list allows none.
+
+        Returns an empty string when no skill is available. The rendered prompt
+        is cached per (runtime, allowlist) until the skills change.
+        """
+        allowed = None if allowed_skills is None else tuple(sorted(allowed_skills))
+        key = (
+            self.skills_root,
+            self.config_path,
+            self.sandbox_skills_cache_path,
+            runtime,
+            allowed,
+        )
+        fingerprint = self._skills_fingerprint()
+        cached = _prompt_cache.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        skills = self.list_skills(active_only=True, runtime=runtime)
+        if allowed is not None:
+            skills = [skill for skill in skills if skill.name in allowed]
+        prompt = build_skills_prompt(skills) if skills else ""
+        _prompt_cache.set(key, (fingerprint, prompt))
+        return prompt
+
+    def _scan_skills(
+        self,
+        *,
+        active_only: bool,
+        runtime: str,
+        show_sandbox_path: bool,
+    ) -> list[SkillInfo]:
         config = self._load_config()
         skill_configs = config.get("skills", {})
         modified = False
@@ -401,12 +553,7 @@ class SkillManager:
                 modified = True
             if active_only and not active:
                 continue
-            description = ""
-            try:
-                content = skill_md.read_text(encoding="utf-8")
-                description = _parse_frontmatter_description(content)
-            except Exception:
-                description = ""
+            description = _read_skill_description(skill_md)
             sandbox_exists = (
                 runtime == "sandbox" and skill_name in sandbox_cached_descriptions
             )
@@ -525,6 +672,7 @@ class SkillManager:
         skill_dir = Path(self.skills_root) / name
         if skill_dir.exists():
             shutil.rmtree(skill_dir)
+            invalidate_skills_cache()
 
         # Ensure UI consistency even when there is no active sandbox session
         # to refresh cache from runtime side.
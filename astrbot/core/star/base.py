@@ -8,6 +8,7 @@ from astrbot.core.utils.command_parser import CommandParserMixin
 from astrbot.core.utils.plugin_kv_store import PluginKVStoreMixin
 
 from .star import StarMetadata, star_map, star_registry
+from .star_handler import star_handlers_registry
 
 logger = logging.getLogger("astrbot")
 
@@ -43,6 +44,7 @@ class Star(CommandParserMixin, PluginKVStoreMixin):
             )
             star_map[cls.__module__] = metadata
             star_registry.append(metadata)
+            star_handlers_registry.invalidate()
         else:
             star_map[cls.__module__].star_cls_type = cls
             star_map[cls.__module__].module_path = cls.__module__
@@ -446,6 +446,7 @@ def _apply_config_to_runtime(
                 descriptor.filter_ref,
                 [str(x) for x in resolved_aliases if str(x).strip()],
             )
+    star_handlers_registry.invalidate()
 
 
 def _bind_configs_to_descriptors(
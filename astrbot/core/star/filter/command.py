@@ -11,6 +11,8 @@ from ..star_handler import StarHandlerMetadata
 from . import HandlerFilter
 from .custom_filter import CustomFilter
 
+_WHITESPACE = re.compile(r"\s+")
+
 
 class GreedyStr(str):
     """标记指令完成其他参数接收后的所有剩余文本。"""
@@ -196,7 +198,7 @@ class CommandFilter(HandlerFilter):
             return False
 
         # 检查是否以指令开头
-        message_str = re.sub(r"\s+", " ", event.get_message_str().strip())
+        message_str = _WHITESPACE.sub(" ", event.get_message_str().strip())
         ok = False
         for full_cmd in self.get_complete_command_names():
             if message_str.startswith(f"{full_cmd} ") or message_str == full_cmd:
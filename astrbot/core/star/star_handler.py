@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import bisect
 import enum
 from collections.abc import AsyncGenerator, Awaitable, Callable
 from dataclasses import dataclass, field
@@ -11,19 +12,38 @@ from .star import star_map
 T = TypeVar("T", bound="StarHandlerMetadata")
 
 
+def _priority_key(handler: StarHandlerMetadata) -> int:
+    return -handler.extras_configs["priority"]
+
+
 class StarHandlerRegistry(Generic[T]):
     def __init__(self) -> None:
         self.star_handlers_map: dict[str, StarHandlerMetadata] = {}
         self._handlers: list[StarHandlerMetadata] = []
+        self._handlers_by_event_type: dict[EventType, list[StarHandlerMetadata]] = {}
+        """按事件类型分桶, 各桶与 _handlers 一样按优先级有序"""
+        self.generation = 0
+        """Handler 集合、过滤器或插件启用状态变化时递增, 供派发索引等缓存判断是否失效"""
+        self._query_cache: dict[tuple, list[StarHandlerMetadata]] = {}
+        self._query_cache_generation = 0
+
+    def invalidate(self) -> None:
+        """通知依赖 Handler 集合的缓存失效"""
+        self.generation += 1
 
     def append(self, handler: StarHandlerMetadata) -> None:
-        """添加一个 Handler，并保持按优先级有序"""
+        """添加一个 Handler，并保持按优先级有序 (同优先级按添加顺序)"""
         if "priority" not in handler.extras_configs:
             handler.extras_configs["priority"] = 0
 
         self.star_handlers_map[handler.handler_full_name] = handler
-        self._handlers.append(handler)
-        self._handlers.sort(key=lambda h: -h.extras_configs["priority"])
+        bisect.insort_right(self._handlers, handler, key=_priority_key)
+        bisect.insort_right(
+            self._handlers_by_event_type.setdefault(handler.event_type, []),
+            handler,
+            key=_priority_key,
+        )
+        self.invalidate()
 
     def _print_handlers(self) -> None:
         for handler in self._handlers:
@@ -136,12 +156,38 @@ class StarHandlerRegistry(Generic[T]):
         event_type: EventType,
         only_activated=True,
         plugins_name: list[str] | None = None,
+    ) -> list[StarHandlerMetadata]:
+        """获取指定事件类型的 Handler, 按优先级排序。
+
+        结果按 (事件类型, only_activated, 插件白名单) 缓存, 在 generation 变化时失效。
+        返回的列表为缓存对象, 调用方不应修改。
+        """
+        if self._query_cache_generation != self.generation:
+            self._query_cache.clear()
+            self._query_cache_generation = self.generation
+        whitelist = (
+            tuple(plugins_name)
+            if plugins_name is not None and plugins_name != ["*"]
+            else None
+        )
+        key = (event_type, bool(only_activated), whitelist)
+        handlers = self._query_cache.get(key)
+        if handlers is None:
+            handlers = self._query_cache[key] = self._collect_handlers(
+                event_type,
+                only_activated,
+                plugins_name,
+            )
+        return handlers
+
+    def _collect_handlers(
+        self,
+        event_type: EventType,
+        only_activated,
+        plugins_name: list[str] | None,
     ) -> list[StarHandlerMetadata]:
         handlers = []
-        for handler in self._handlers:
-            # 过滤事件类型
-            if handler.event_type != event_type:
-                continue
+        for handler in self._handlers_by_event_type.get(event_type, ()):
             if not handler.enabled:
                 continue
             # 过滤启用状态
@@ -185,10 +231,18 @@ class StarHandlerRegistry(Generic[T]):
     def clear(self) -> None:
         self.star_handlers_map.clear()
         self._handlers.clear()
+        self._handlers_by_event_type.clear()
+        self.invalidate()
 
     def remove(self, handler: StarHandlerMetadata) -> None:
         self.star_handlers_map.pop(handler.handler_full_name, None)
         self._handlers = [h for h in self._handlers if h != handler]
+        bucket = self._handlers_by_event_type.get(handler.event_type)
+        if bucket is not None:
+            self._handlers_by_event_type[handler.event_type] = [
+                h for h in bucket if h != handler
+            ]
+        self.invalidate()
 
     def __iter__(self):
         return iter(self._handlers)
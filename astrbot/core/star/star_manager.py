@@ -999,6 +999,8 @@ class PluginManager:
                 # 禁用/启用插件
                 if metadata.module_path in inactivated_plugins:
                     metadata.activated = False
+                # 插件元数据 (star_map、reserved、activated) 已更新, 使 Handler 列表缓存失效
+                star_handlers_registry.invalidate()
 
                 # Plugin logo path
                 if os.path.exists(logo_path):
@@ -1093,6 +1095,8 @@ class PluginManager:
         except Exception as e:
             logger.error(f"同步指令配置失败: {e!s}")
             logger.error(traceback.format_exc())
+        # 载入过程中可能追加了过滤器或修改了插件启用状态
+        star_handlers_registry.invalidate()
 
         self._rebuild_failed_plugin_info()
         if has_load_error:
@@ -1554,6 +1558,7 @@ class PluginManager:
             await sp.global_put("inactivated_llm_tools", inactivated_llm_tools)
 
             plugin.activated = False
+            star_handlers_registry.invalidate()
 
     @staticmethod
     async def _terminate_plugin(star_metadata: StarMetadata) -> None:
@@ -0,0 +1,84 @@
+import math
+import time
+
+# 对数分桶: 每翻一倍分为 16 个子桶, 相对误差约 4.4%
+_SUB_BUCKETS = 16
+_MIN_VALUE = 1e-6  # 1 微秒
+_MAX_INDEX = _SUB_BUCKETS * 28  # 约 268 秒
+
+
+def _bucket_index(value: float) -> int:
+    if value <= _MIN_VALUE:
+        return 0
+    index = int(math.log2(value / _MIN_VALUE) * _SUB_BUCKETS) + 1
+    return min(index, _MAX_INDEX)
+
+
+def _bucket_upper(index: int) -> float:
+    if index == 0:
+        return _MIN_VALUE
+    return _MIN_VALUE * 2 ** (index / _SUB_BUCKETS)
+
+
+class RollingHistogram:
+    """滑动窗口的对数分桶直方图 (HDR 风格)
+
+    最近 window * slots 秒内的观测值用于计算分位数, 每个时间片使用稀疏的桶计数,
+    内存占用与实际出现的桶数量成正比。count 和 total 为累计值, 不随窗口滑动清零。
+    """
+
+    def __init__(self, window: float = 60.0, slots: int = 5) -> None:
+        self.window = window
+        self.slots = slots
+        # 每个时间片: [时间片编号, {桶下标: 计数}, 最大值]
+        self._slots: list[list] = [[-1, {}, 0.0] for _ in range(slots)]
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """记录一次观测值 (单位: 秒)"""
+        epoch = int(time.monotonic() // self.window)
+        slot = self._slots[epoch % self.slots]
+        if slot[0] != epoch:
+            slot[0] = epoch
+            slot[1] = {}
+            slot[2] = 0.0
+        index = _bucket_index(value)
+        buckets = slot[1]
+        buckets[index] = buckets.get(index, 0) + 1
+        if value > slot[2]:
+            slot[2] = value
+        self.count += 1
+        self.total += value
+
+    def _merged(self) -> tuple[dict[int, int], float]:
+        oldest = int(time.monotonic() // self.window) - self.slots + 1
+        merged: dict[int, int] = {}
+        max_value = 0.0
+        for epoch, buckets, slot_max in self._slots:
+            if epoch < oldest:
+                continue
+            for index, n in buckets.items():
+                merged[index] = merged.get(index, 0) + n
+            max_value = max(max_value, slot_max)
+        return merged, max_value
+
+    def quantiles(self, qs: tuple[float, ...] = (0.5, 0.95, 0.99)) -> dict:
+        """计算滑动窗口内的分位数 (单位: 秒), 取所在桶的上界"""
+        merged, max_value = self._merged()
+        n = sum(merged.values())
+        result: dict = {"window_count": n, "max": max_value}
+        if not n:
+            for q in qs:
+                result[q] = 0.0
+            return result
+        ordered = sorted(merged.items())
+        for q in qs:
+            target = max(1, math.ceil(q * n))
+            seen = 0
+            for index, bucket_n in ordered:
+                seen += bucket_n
+                if seen >= target:
+                    result[q] = min(_bucket_upper(index), max_value)
+                    break
+        return result
@@ -5,7 +5,7 @@ import uuid
 
 import aiohttp
 
-from astrbot.core import db_helper, logger
+from astrbot.core import logger, platform_stats
 from astrbot.core.config import VERSION
 
 
@@ -61,7 +61,7 @@ class Metric:
             pass
         try:
             if "adapter_name" in kwargs:
-                await db_helper.insert_platform_stats(
+                platform_stats.record(
                     platform_id=kwargs["adapter_name"],
                     platform_type=kwargs.get("adapter_type", "unknown"),
                 )
@@ -0,0 +1,179 @@
+"""平台消息统计服务
+
+消息计数先在内存中按分钟 / 小时预聚合, 由后台任务定期批量写入 platform_stats (小时粒度的汇总表),
+取代每条消息一次数据库写入。仪表盘查询直接读取内存中的小时汇总与累计总数,
+耗时与历史数据量无关; 仅当查询范围超出内存保留窗口时才回退到数据库。
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+from astrbot.core.db import BaseDatabase
+
+logger = logging.getLogger("astrbot")
+
+# (小时时间戳, platform_id, platform_type)
+_HourKey = tuple[datetime, str, str]
+
+
+def _hour_bucket(now: datetime | None = None) -> datetime:
+    # 与 platform_stats 既有数据保持一致: 本地时间, 截断到整点
+    return (now or datetime.now()).replace(minute=0, second=0, microsecond=0)
+
+
+class PlatformStatsService:
+    FLUSH_INTERVAL_SECONDS = 5.0
+    HOURLY_RETENTION = timedelta(days=7, hours=1)
+    """内存中保留的小时汇总范围, 覆盖仪表盘最长 7 天的统计区间"""
+    MINUTE_RETENTION = 60
+    """内存中保留的分钟汇总数量, 仅用于实时消息速率"""
+
+    def __init__(self, db: BaseDatabase) -> None:
+        self._db = db
+        self._pending: dict[_HourKey, int] = defaultdict(int)
+        """尚未写入数据库的增量"""
+        self._hourly: dict[_HourKey, int] | None = None
+        """最近 HOURLY_RETENTION 内的小时汇总 (已写入 + 未写入), 首次查询时从数据库加载"""
+        self._total: int | None = None
+        self._minutes: deque[tuple[int, dict[str, int]]] = deque(
+            maxlen=self.MINUTE_RETENTION,
+        )
+        self._lock = asyncio.Lock()
+        self._stop_event = asyncio.Event()
+
+    def record(self, platform_id: str, platform_type: str, count: int = 1) -> None:
+        """记录消息, 仅修改内存计数, 不访问数据库"""
+        key = (_hour_bucket(), platform_id, platform_type)
+        self._pending[key] += count
+        if self._hourly is not None:
+            self._hourly[key] = self._hourly.get(key, 0) + count
+        if self._total is not None:
+            self._total += count
+
+        minute = int(time.time() // 60) * 60
+        if not self._minutes or self._minutes[-1][0] != minute:
+            self._minutes.append((minute, {}))
+        per_platform = self._minutes[-1][1]
+        per_platform[platform_id] = per_platform.get(platform_id, 0) + count
+
+    async def flush(self) -> None:
+        """将内存中的增量批量写入数据库"""
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, defaultdict(int)
+            try:
+                await self._db.insert_platform_stats_batch(
+                    [(*key, count) for key, count in pending.items()],
+                )
+            except Exception:
+                # 写入失败时把增量放回, 下次重试
+                for key, count in pending.items():
+                    self._pending[key] += count
+                raise
+            self._prune()
+
+    def _prune(self) -> None:
+        if self._hourly is None:
+            return
+        oldest = _hour_bucket() - self.HOURLY_RETENTION
+        for key in [key for key in self._hourly if key[0] < oldest]:
+            del self._hourly[key]
+
+    async def _ensure_loaded(self) -> None:
+        if self._hourly is not None and self._total is not None:
+            return
+        # 与 flush 互斥: 加载期间的新记录留在 _pending 中, 加载完成后并入
+        async with self._lock:
+            if self._hourly is not None and self._total is not None:
+                return
+            start_time = _hour_bucket() - self.HOURLY_RETENTION
+            rows = await self._db.get_platform_stats_rows(start_time)
+            total = await self._db.get_platform_stats_total()
+            hourly: dict[_HourKey, int] = defaultdict(int)
+            for timestamp, platform_id, platform_type, count in rows:
+                hourly[(timestamp, platform_id, platform_type)] += count
+            for key, count in self._pending.items():
+                hourly[key] += count
+                total += count
+            self._hourly = dict(hourly)
+            self._total = total
+
+    async def get_hourly_stats(
+        self,
+        offset_sec: int = 86400,
+    ) -> list[tuple[datetime, str, str, int]]:
+        """获取最近 offset_sec 秒内的小时汇总, 按时间升序"""
+        start_time = datetime.now() - timedelta(seconds=offset_sec)
+        if timedelta(seconds=offset_sec) > self.HOURLY_RETENTION:
+            # 超出内存保留范围, 从数据库读取并合并尚未写入的增量
+            merged: dict[_HourKey, int] = defaultdict(int)
+            for (
+                timestamp,
+                platform_id,
+                platform_type,
+                count,
+            ) in await self._db.get_platform_stats_rows(start_time):
+                merged[(timestamp, platform_id, platform_type)] += count
+            for key, count in self._pending.items():
+                merged[key] += count
+            items = merged.items()
+        else:
+            await self._ensure_loaded()
+            assert self._hourly is not None
+            items = self._hourly.items()
+        return sorted(
+            (
+                (timestamp, platform_id, platform_type, count)
+                for (timestamp, platform_id, platform_type), count in items
+                if timestamp >= start_time
+            ),
+            key=lambda row: row[0],
+        )
+
+    async def get_grouped_stats(self, offset_sec: int = 86400) -> dict[str, int]:
+        """获取最近 offset_sec 秒内按 platform_id 汇总的消息数"""
+        grouped: dict[str, int] = defaultdict(int)
+        for _, platform_id, _, count in await self.get_hourly_stats(offset_sec):
+            grouped[platform_id] += count
+        return dict(grouped)
+
+    async def get_total_message_count(self) -> int:
+        await self._ensure_loaded()
+        assert self._total is not None
+        return self._total
+
+    def get_minute_series(self) -> list[list[int]]:
+        """最近 MINUTE_RETENTION 分钟内每分钟的消息数 [[分钟时间戳, 消息数], ...]"""
+        oldest = int(time.time() // 60) * 60 - (self.MINUTE_RETENTION - 1) * 60
+        return [
+            [minute, sum(per_platform.values())]
+            for minute, per_platform in self._minutes
+            if minute >= oldest
+        ]
+
+    async def run(self) -> None:
+        """定期写入数据库, 直到 stop 被调用"""
+        self._stop_event.clear()
+        while not self._stop_event.is_set():
+            try:
+                await asyncio.wait_for(
+                    self._stop_event.wait(),
+                    timeout=self.FLUSH_INTERVAL_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"写入平台消息统计失败: {e}")
+
+    async def stop(self) -> None:
+        self._stop_event.set()
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"写入平台消息统计失败: {e}")
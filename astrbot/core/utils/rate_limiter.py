@@ -0,0 +1,170 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+
+
+class TokenBucket:
+    """按 key 维护令牌数的令牌桶
+
+    - 每个 key 只保存 [剩余令牌, 上次更新时间] 两个数, 桶容量为 count, 每 period 秒补满
+    - 允许令牌数为负, 表示已被排队的请求预订, 预订的等待时间即为排队时间
+    - 令牌补满的 key 与新建的 key 等价, 会被惰性清除; 超过 max_keys 时淘汰最久未更新的 key
+    - count <= 0 时不限流
+    """
+
+    def __init__(
+        self,
+        name: str,
+        count: int = 0,
+        period: float = 60.0,
+        max_keys: int = 100_000,
+    ) -> None:
+        self.name = name
+        self.max_keys = max_keys
+        self.count = 0
+        self.period = 60.0
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self.throttled = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.configure(count, period)
+
+    @property
+    def enabled(self) -> bool:
+        return self.count > 0 and self.period > 0
+
+    @property
+    def rate(self) -> float:
+        """每秒补充的令牌数"""
+        return self.count / self.period if self.enabled else 0.0
+
+    def configure(self, count: int, period: float) -> None:
+        count, period = int(count or 0), float(period or 0)
+        if (count, period) != (self.count, self.period):
+            self._buckets.clear()
+        self.count, self.period = count, period
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _tokens(self, key: str, now: float) -> float:
+        state = self._buckets.get(key)
+        if state is None:
+            return float(self.count)
+        tokens, updated = state
+        return min(float(self.count), tokens + (now - updated) * self.rate)
+
+    def wait_time(self, key: str, now: float) -> float:
+        """取得一个令牌需要等待的秒数, 不消耗令牌"""
+        if not self.enabled:
+            return 0.0
+        tokens = self._tokens(key, now)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def consume(self, key: str, now: float) -> None:
+        """消耗一个令牌, 令牌不足时记为预订 (令牌数变为负数)"""
+        if not self.enabled:
+            return
+        self._buckets[key] = [self._tokens(key, now) - 1, now]
+        self._buckets.move_to_end(key)
+        self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        while self._buckets:
+            key, (tokens, updated) = next(iter(self._buckets.items()))
+            full = tokens + (now - updated) * self.rate >= self.count
+            if not full and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "count": self.count,
+            "period": self.period,
+            "keys": len(self._buckets),
+            "throttled": self.throttled,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+        }
+
+
+class RateLimiter:
+    """分层令牌桶限流器
+
+    一次 acquire 需要同时从多个层级 (会话、配置文件、平台、全局、模型提供商) 各取一个令牌,
+    等待时间取各层级中最长者。stall 模式下请求按到达顺序预订令牌并排队等待,
+    预计等待超过 timeout 的请求直接丢弃; discard 模式下令牌不足即丢弃。
+
+    非线程安全, 仅供事件循环内使用。
+    """
+
+    def __init__(self) -> None:
+        self._tiers: dict[str, TokenBucket] = {}
+        self.admitted = 0
+        self.throttled = 0
+        self.dropped = 0
+
+    def tier(self, name: str) -> TokenBucket:
+        """获取或创建指定名称的层级"""
+        bucket = self._tiers.get(name)
+        if bucket is None:
+            bucket = self._tiers[name] = TokenBucket(name)
+        return bucket
+
+    def remove_tier(self, name: str) -> None:
+        self._tiers.pop(name, None)
+
+    def reserve(
+        self,
+        keys: Sequence[tuple[TokenBucket, str]],
+        *,
+        stall: bool,
+        timeout: float,
+    ) -> float | None:
+        """预订令牌。返回需要等待的秒数; 返回 None 表示请求应被丢弃, 此时不消耗任何令牌。"""
+        now = time.monotonic()
+        wait, bottleneck = 0.0, None
+        for bucket, key in keys:
+            bucket_wait = bucket.wait_time(key, now)
+            if bucket_wait > wait:
+                wait, bottleneck = bucket_wait, bucket
+
+        if bottleneck is not None and (not stall or wait > timeout):
+            bottleneck.dropped += 1
+            self.dropped += 1
+            return None
+
+        for bucket, key in keys:
+            bucket.consume(key, now)
+        self.admitted += 1
+        if bottleneck is not None:
+            bottleneck.throttled += 1
+            self.throttled += 1
+        return wait
+
+    async def acquire(
+        self,
+        keys: Sequence[tuple[TokenBucket, str]],
+        *,
+        stall: bool,
+        timeout: float,
+    ) -> float | None:
+        """预订令牌并等待到可放行。返回实际等待的秒数, 返回 None 表示请求被丢弃。"""
+        wait = self.reserve(keys, stall=stall, timeout=timeout)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "throttled": self.throttled,
+            "dropped": self.dropped,
+            "tiers": [bucket.stats() for bucket in self._tiers.values()],
+        }
+
+
+rate_limiter = RateLimiter()
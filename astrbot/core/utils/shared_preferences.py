@@ -1,4 +1,6 @@
 import asyncio
+import copy
+import json
 import os
 import threading
 from collections import defaultdict
@@ -10,9 +12,34 @@ from astrbot.core.db import BaseDatabase
 from astrbot.core.db.po import Preference
 
 from .astrbot_path import get_astrbot_data_path
+from .ttl_cache import TTLCache
 
 _VT = TypeVar("_VT")
 
+PREFERENCE_CACHE_MAXSIZE = 8192
+# 所有写入都经由 SharedPreferences 透写缓存, TTL 仅作为兜底
+PREFERENCE_CACHE_TTL = 3600.0
+
+_ABSENT = object()
+"""缓存中表示数据库里不存在该键"""
+_MISS = object()
+
+_IMMUTABLE_TYPES = (str, int, float, bool, type(None))
+
+
+def _copy_value(value: Any) -> Any:
+    # 调用方可能原地修改取回的 list / dict, 返回副本以免污染缓存
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    return copy.deepcopy(value)
+
+
+def _stored_value(value: Any) -> Any:
+    """与数据库 JSON 列往返后的值一致 (如 tuple 变为 list、字典键变为字符串)"""
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    return json.loads(json.dumps(value))
+
 
 class SharedPreferences:
     def __init__(self, db_helper: BaseDatabase, json_storage_path=None) -> None:
@@ -26,6 +53,15 @@ class SharedPreferences:
         self.temporary_cache: dict[str, dict[str, Any]] = defaultdict(dict)
         """automatically clear per 24 hours. Might be helpful in some cases XD"""
 
+        self._cache: TTLCache[tuple[str, str, str], Any] = TTLCache(
+            maxsize=PREFERENCE_CACHE_MAXSIZE,
+            ttl=PREFERENCE_CACHE_TTL,
+        )
+        """(scope, scope_id, key) -> 值。同步接口运行在独立线程的事件循环中, 因此访问需加锁"""
+        self._cache_lock = threading.Lock()
+        self._write_generation = 0
+        """每次写入递增, 用于丢弃与写入并发的读操作回填的旧值"""
+
         self._sync_loop = asyncio.new_event_loop()
         t = threading.Thread(target=self._sync_loop.run_forever, daemon=True)
         t.start()
@@ -39,6 +75,34 @@ class SharedPreferences:
     def _clear_temporary_cache(self) -> None:
         self.temporary_cache.clear()
 
+    def _cache_get(self, key: tuple[str, str, str]) -> Any:
+        with self._cache_lock:
+            return self._cache.get(key, _MISS)
+
+    def _cache_fill(
+        self, key: tuple[str, str, str], value: Any, generation: int
+    ) -> None:
+        """回填读取结果; 若读取期间发生过写入则放弃, 以免覆盖更新的值"""
+        with self._cache_lock:
+            if generation == self._write_generation:
+                self._cache.set(key, value)
+
+    def _cache_write(self, key: tuple[str, str, str], value: Any) -> None:
+        with self._cache_lock:
+            self._write_generation += 1
+            self._cache.set(key, value)
+
+    def cache_stats(self) -> dict:
+        """偏好设置缓存的命中统计"""
+        with self._cache_lock:
+            return self._cache.stats()
+
+    def invalidate_cache(self) -> None:
+        """清空偏好设置缓存, 用于绕过 SharedPreferences 直接修改数据库之后"""
+        with self._cache_lock:
+            self._write_generation += 1
+            self._cache.clear()
+
     async def get_async(
         self,
         scope: str,
@@ -48,12 +112,16 @@ class SharedPreferences:
     ) -> _VT:
         """获取指定范围和键的偏好设置"""
         if scope_id is not None and key is not None:
-            result = await self.db_helper.get_preference(scope, scope_id, key)
-            if result:
-                ret = result.value["val"]
-            else:
-                ret = default
-            return ret
+            cache_key = (scope, scope_id, key)
+            cached = self._cache_get(cache_key)
+            if cached is _MISS:
+                generation = self._write_generation
+                result = await self.db_helper.get_preference(scope, scope_id, key)
+                cached = result.value["val"] if result else _ABSENT
+                self._cache_fill(cache_key, cached, generation)
+            if cached is _ABSENT:
+                return default
+            return _copy_value(cached)
 
     async def range_get_async(
         self,
@@ -140,6 +208,24 @@ class SharedPreferences:
             key,
             {"val": value},
         )
+        self._cache_write((scope, scope_id, key), _stored_value(value))
+
+    async def put_many_async(self, items: list[tuple[str, str, str, Any]]) -> None:
+        """在一个事务中批量设置偏好设置
+
+        Args:
+            items: (scope, scope_id, key, value) 列表
+        """
+        if not items:
+            return
+        await self.db_helper.insert_preferences_or_update(
+            [
+                (scope, scope_id, key, {"val": value})
+                for scope, scope_id, key, value in items
+            ],
+        )
+        for scope, scope_id, key, value in items:
+            self._cache_write((scope, scope_id, key), _stored_value(value))
 
     async def session_put(self, umo: str, key: str, value: Any) -> None:
         await self.put_async("umo", umo, key, value)
@@ -150,6 +236,7 @@ class SharedPreferences:
     async def remove_async(self, scope: str, scope_id: str, key: str) -> None:
         """删除指定范围和键的偏好设置"""
         await self.db_helper.remove_preference(scope, scope_id, key)
+        self._cache_write((scope, scope_id, key), _ABSENT)
 
     async def session_remove(self, umo: str, key: str) -> None:
         await self.remove_async("umo", umo, key)
@@ -161,6 +248,9 @@ class SharedPreferences:
     async def clear_async(self, scope: str, scope_id: str) -> None:
         """清空指定范围的所有偏好设置"""
         await self.db_helper.clear_preferences(scope, scope_id)
+        with self._cache_lock:
+            self._write_generation += 1
+            self._cache.invalidate(lambda k: k[0] == scope and k[1] == scope_id)
 
     # ====
     # DEPRECATED METHODS
@@ -1,8 +1,12 @@
 import re
 import os
+import asyncio
+import hashlib
+import weakref
 import aiohttp
 import ssl
 import certifi
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from typing import List, Tuple
 from abc import ABC, abstractmethod
@@ -12,12 +16,39 @@ from . import RenderStrategy
 from PIL import ImageFont, Image, ImageDraw
 from astrbot.core.utils.io import save_temp_img
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.ttl_cache import TTLCache
+
+# 粗体与斜体字体的候选列表
+BOLD_FONTS = (
+    "msyhbd.ttc",  # 微软雅黑粗体 (Windows)
+    "Arial-Bold.ttf",  # Arial粗体
+    "DejaVuSans-Bold.ttf",  # Linux粗体
+)
+ITALIC_FONTS = (
+    "msyhi.ttc",  # 微软雅黑斜体 (Windows)
+    "Arial-Italic.ttf",  # Arial斜体
+    "DejaVuSans-Oblique.ttf",  # Linux斜体
+)
+
+# 本地渲染在独立线程中执行, 避免阻塞事件循环。
+# 同一字体对象的 FreeType face 不是线程安全的, 因此只使用一个工作线程。
+_render_executor: ThreadPoolExecutor | None = None
+
+
+def get_render_executor() -> ThreadPoolExecutor:
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="astrbot-t2i"
+        )
+    return _render_executor
 
 
 class FontManager:
     """字体管理类，负责加载和缓存字体"""
 
     _font_cache = {}
+    _named_font_cache = {}
 
     @classmethod
     def get_font(cls, size: int) -> ImageFont.FreeTypeFont|ImageFont.ImageFont:
@@ -61,46 +92,91 @@ class FontManager:
         except Exception:
             raise RuntimeError("无法加载任何字体")
 
+    @classmethod
+    def get_first_available_font(
+        cls, font_names: tuple[str, ...], size: int
+    ) -> ImageFont.FreeTypeFont | None:
+        """按顺序加载候选字体中第一个可用的字体，结果（包括都不可用）会被缓存"""
+        key = (font_names, size)
+        if key in cls._named_font_cache:
+            return cls._named_font_cache[key]
+
+        font = None
+        for font_name in font_names:
+            try:
+                font = ImageFont.truetype(font_name, size)
+                break
+            except Exception:
+                continue
+        cls._named_font_cache[key] = font
+        return font
+
 
 class TextMeasurer:
     """测量文本尺寸的工具类"""
 
+    # 每个字体对象的单字符步进宽度缓存
+    _advance_cache: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
     @staticmethod
     def get_text_size(text: str, font: ImageFont.FreeTypeFont|ImageFont.ImageFont) -> tuple[int, int]:
         """获取文本的尺寸"""
 
         # 依赖库Pillow>=11.2.1，不再需要考虑<9.0.0
-        left, top, right, bottom = font.getbbox("Hello world")
+        left, top, right, bottom = font.getbbox(text)
         return int(right - left), int(bottom - top)
 
+    @staticmethod
+    def _get_advances(font: ImageFont.FreeTypeFont|ImageFont.ImageFont) -> dict[str, float]:
+        advances = TextMeasurer._advance_cache.get(font)
+        if advances is None:
+            advances = TextMeasurer._advance_cache[font] = {}
+        return advances
+
     @staticmethod
     def split_text_to_fit_width(
         text: str, font: ImageFont.FreeTypeFont|ImageFont.ImageFont, max_width: int
     ) -> list[str]:
-        """将文本拆分为多行，确保每行不超过指定宽度"""
+        """将文本拆分为多行，确保每行不超过指定宽度
+
+        逐字累加缓存的字形步进宽度得到每行的候选断点，再整行测量一次校验；
+        字距调整使整行略宽时，二分查找能放下的最长前缀。
+        """
         lines = []
         if not text:
             return lines
 
-        remaining_text = text
-        while remaining_text:
-            # 如果文本宽度小于最大宽度，直接添加
-            text_width = TextMeasurer.get_text_size(remaining_text, font)[0]
-            if text_width <= max_width:
-                lines.append(remaining_text)
-                break
-
-            # 尝试逐字计算能放入当前行的最多字符
-            for i in range(len(remaining_text), 0, -1):
-                width = TextMeasurer.get_text_size(remaining_text[:i], font)[0]
-                if width <= max_width:
-                    lines.append(remaining_text[:i])
-                    remaining_text = remaining_text[i:]
+        advances = TextMeasurer._get_advances(font)
+        n = len(text)
+        start = 0
+        while start < n:
+            width = 0.0
+            end = start
+            while end < n:
+                ch = text[end]
+                advance = advances.get(ch)
+                if advance is None:
+                    advance = advances[ch] = font.getlength(ch)
+                if width + advance > max_width:
                     break
-            else:
+                width += advance
+                end += 1
+
+            if end == start:
                 # 如果单个字符都放不下，强制放一个字符
-                lines.append(remaining_text[0])
-                remaining_text = remaining_text[1:]
+                end = start + 1
+            elif font.getlength(text[start:end]) > max_width:
+                lo, hi = start + 1, end - 1
+                while lo < hi:
+                    mid = (lo + hi + 1) // 2
+                    if font.getlength(text[start:mid]) <= max_width:
+                        lo = mid
+                    else:
+                        hi = mid - 1
+                end = lo
+
+            lines.append(text[start:end])
+            start = end
 
         return lines
 
@@ -171,7 +247,9 @@ class BoldTextElement(MarkdownElement):
     """粗体文本元素"""
 
     def calculate_height(self, image_width: int, font_size: int) -> int:
-        font = FontManager.get_font(font_size)
+        font = FontManager.get_first_available_font(
+            BOLD_FONTS, font_size
+        ) or FontManager.get_font(font_size)
         lines = TextMeasurer.split_text_to_fit_width(
             self.content, font, image_width - 20
         )
@@ -188,19 +266,7 @@ class BoldTextElement(MarkdownElement):
     ) -> int:
         # 尝试使用粗体字体，如果没有则绘制两次模拟粗体效果
         try:
-            bold_fonts = [
-                "msyhbd.ttc",  # 微软雅黑粗体 (Windows)
-                "Arial-Bold.ttf",  # Arial粗体
-                "DejaVuSans-Bold.ttf",  # Linux粗体
-            ]
-
-            bold_font = None
-            for font_name in bold_fonts:
-                try:
-                    bold_font = ImageFont.truetype(font_name, font_size)
-                    break
-                except Exception:
-                    continue
+            bold_font = FontManager.get_first_available_font(BOLD_FONTS, font_size)
 
             if bold_font:
                 lines = TextMeasurer.split_text_to_fit_width(
@@ -236,7 +302,9 @@ class ItalicTextElement(MarkdownElement):
     """斜体文本元素"""
 
     def calculate_height(self, image_width: int, font_size: int) -> int:
-        font = FontManager.get_font(font_size)
+        font = FontManager.get_first_available_font(
+            ITALIC_FONTS, font_size
+        ) or FontManager.get_font(font_size)
         lines = TextMeasurer.split_text_to_fit_width(
             self.content, font, image_width - 20
         )
@@ -253,19 +321,9 @@ class ItalicTextElement(MarkdownElement):
     ) -> int:
         # 尝试使用斜体字体，如果没有则使用倾斜变换模拟斜体效果
         try:
-            italic_fonts = [
-                "msyhi.ttc",  # 微软雅黑斜体 (Windows)
-                "Arial-Italic.ttf",  # Arial斜体
-                "DejaVuSans-Oblique.ttf",  # Linux斜体
-            ]
-
-            italic_font = None
-            for font_name in italic_fonts:
-                try:
-                    italic_font = ImageFont.truetype(font_name, font_size)
-                    break
-                except Exception:
-                    continue
+            italic_font = FontManager.get_first_available_font(
+                ITALIC_FONTS, font_size
+            )
 
             if italic_font:
                 lines = TextMeasurer.split_text_to_fit_width(
@@ -848,9 +906,21 @@ class MarkdownRenderer:
         self.bg_color = bg_color
 
     async def render(self, markdown_text: str) -> Image.Image:
-        # 解析Markdown文本
+        # 解析Markdown文本（可能需要下载图片），绘制在渲染线程中进行
         elements = await MarkdownParser.parse(markdown_text)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_render_executor(), self.draw, elements)
 
+    async def render_to_file(self, markdown_text: str) -> str:
+        """渲染并保存为临时图片文件，返回文件路径"""
+        elements = await MarkdownParser.parse(markdown_text)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_render_executor(), lambda: save_temp_img(self.draw(elements))
+        )
+
+    def draw(self, elements: list[MarkdownElement]) -> Image.Image:
+        """将解析后的元素绘制为图像。该方法是同步的 CPU 密集操作，不应在事件循环中直接调用。"""
         # 计算总高度
         total_height = 20  # 初始边距
         for element in elements:
@@ -883,8 +953,9 @@ class MarkdownRenderer:
         powered_by_text = "Powered by "
         astrbot_text = f"AstrBot v{VERSION}"
 
-        powered_by_width, _ = TextMeasurer.get_text_size(powered_by_text, footer_font)
-        astrbot_width, _ = TextMeasurer.get_text_size(astrbot_text, footer_font)
+        # 使用步进宽度，保留 "Powered by " 末尾的空格
+        powered_by_width = int(footer_font.getlength(powered_by_text))
+        astrbot_width = int(footer_font.getlength(astrbot_text))
 
         total_width = powered_by_width + astrbot_width
         x_start = (self.width - total_width) // 2
@@ -908,7 +979,15 @@ class MarkdownRenderer:
 
 
 class LocalRenderStrategy(RenderStrategy):
-    """本地渲染策略实现"""
+    """本地渲染策略实现
+
+    渲染结果按 (文本哈希, 模板, 宽度) 缓存，相同文本在缓存有效期内直接复用已生成的图片文件。
+    """
+
+    def __init__(self, cache_size: int = 64, cache_ttl: float = 600.0):
+        self.render_cache: TTLCache[tuple, str] = TTLCache(
+            maxsize=cache_size, ttl=cache_ttl
+        )
 
     async def render_custom_template(
         self, tmpl_str: str, tmpl_data: dict, return_url: bool = True
@@ -919,8 +998,17 @@ class LocalRenderStrategy(RenderStrategy):
         # 创建渲染器
         renderer = MarkdownRenderer(font_size=26, width=800)
 
-        # 渲染Markdown文本
-        image = await renderer.render(text)
-
-        # 保存图像并返回路径/URL
-        return save_temp_img(image)
+        key = (
+            hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            f"markdown@{renderer.font_size}",
+            renderer.width,
+        )
+        path = self.render_cache.get(key)
+        # 临时文件可能已被清理
+        if path and os.path.exists(path):
+            return path
+
+        # 渲染Markdown文本，保存图像并返回路径/URL
+        path = await renderer.render_to_file(text)
+        self.render_cache.set(key, path)
+        return path
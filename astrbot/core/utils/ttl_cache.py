@@ -0,0 +1,82 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """带过期时间的 LRU 缓存, 并统计命中情况
+
+    - 超过 maxsize 时淘汰最久未使用的条目
+    - 条目在写入 ttl 秒后过期, 过期条目在访问时惰性清除
+    - 非线程安全, 仅供事件循环内使用
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[0] > time.monotonic()
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = item  # type: ignore[misc]
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def invalidate(self, predicate: Callable[[K], bool]) -> int:
+        """删除所有满足 predicate 的条目, 返回删除数量"""
+        keys = [key for key in self._data if predicate(key)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
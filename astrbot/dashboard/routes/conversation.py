@@ -325,8 +325,7 @@ class ConversationRoute(Route):
                         )
                         continue
 
-                    # 解析对话内容 (history is always a JSON string from _convert_conv_from_v2_to_v1)
-                    content = json.loads(conversation.history)
+                    content = conversation.get_messages()
 
                     # 创建导出记录
                     export_record = {
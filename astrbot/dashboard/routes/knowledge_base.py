@@ -11,6 +11,7 @@ from quart import request
 
 from astrbot.core import logger
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
+from astrbot.core.knowledge_base.import_queue import ImportItem
 from astrbot.core.provider.provider import EmbeddingProvider, RerankProvider
 from astrbot.core.utils.astrbot_path import get_astrbot_temp_path
 
@@ -47,6 +48,9 @@ class KnowledgeBaseRoute(Route):
             "/kb/update": ("POST", self.update_kb),
             "/kb/delete": ("POST", self.delete_kb),
             "/kb/stats": ("GET", self.get_kb_stats),
+            # 向量索引
+            "/kb/index/rebuild": ("POST", self.rebuild_index),
+            "/kb/index/report": ("GET", self.get_index_report),
             # 文档管理
             "/kb/document/list": ("GET", self.list_documents),
             "/kb/document/upload": ("POST", self.upload_document),
@@ -55,6 +59,12 @@ class KnowledgeBaseRoute(Route):
             "/kb/document/upload/progress": ("GET", self.get_upload_progress),
             "/kb/document/get": ("GET", self.get_document),
             "/kb/document/delete": ("POST", self.delete_document),
+            # 批量导入队列
+            "/kb/import/submit": ("POST", self.submit_import_job),
+            "/kb/import/jobs": ("GET", self.list_import_jobs),
+            "/kb/import/job": ("GET", self.get_import_job),
+            "/kb/import/cancel": ("POST", self.cancel_import_job),
+            "/kb/import/retry": ("POST", self.retry_import_job),
             # # 块管理
             "/kb/chunk/list": ("GET", self.list_chunks),
             "/kb/chunk/delete": ("POST", self.delete_chunk),
@@ -63,6 +73,8 @@ class KnowledgeBaseRoute(Route):
             # "/kb/media/delete": ("POST", self.delete_media),
             # 检索
             "/kb/retrieve": ("POST", self.retrieve),
+            "/kb/cache/stats": ("GET", self.get_cache_stats),
+            "/kb/cache/clear": ("POST", self.clear_cache),
         }
         self.register_routes()
 
@@ -342,6 +354,8 @@ class KnowledgeBaseRoute(Route):
         - top_k_dense: 密集检索数量 (可选, 默认50)
         - top_k_sparse: 稀疏检索数量 (可选, 默认50)
         - top_m_final: 最终返回数量 (可选, 默认5)
+        - index_type: 向量索引类型 flat/ivf_flat/hnsw/ivf_pq/ivf_sq8 (可选, 默认 flat)
+        - index_params: 向量索引参数 (可选)
         """
         try:
             kb_manager = self._get_kb_manager()
@@ -359,6 +373,8 @@ class KnowledgeBaseRoute(Route):
             top_k_dense = data.get("top_k_dense")
             top_k_sparse = data.get("top_k_sparse")
             top_m_final = data.get("top_m_final")
+            index_type = data.get("index_type")
+            index_params = data.get("index_params")
 
             # pre-check embedding dim
             if not embedding_provider_id:
@@ -413,6 +429,8 @@ class KnowledgeBaseRoute(Route):
                 top_k_dense=top_k_dense,
                 top_k_sparse=top_k_sparse,
                 top_m_final=top_m_final,
+                index_type=index_type,
+                index_params=index_params,
             )
             kb = kb_helper.kb
 
@@ -466,6 +484,8 @@ class KnowledgeBaseRoute(Route):
         - top_k_dense: 密集检索数量 (可选)
         - top_k_sparse: 稀疏检索数量 (可选)
         - top_m_final: 最终返回数量 (可选)
+        - index_type: 向量索引类型 (可选, 修改后会在后台迁移已有向量)
+        - index_params: 向量索引参数 (可选)
         """
         try:
             kb_manager = self._get_kb_manager()
@@ -485,6 +505,8 @@ class KnowledgeBaseRoute(Route):
             top_k_dense = data.get("top_k_dense")
             top_k_sparse = data.get("top_k_sparse")
             top_m_final = data.get("top_m_final")
+            index_type = data.get("index_type")
+            index_params = data.get("index_params")
 
             # 检查是否至少提供了一个更新字段
             if all(
@@ -500,6 +522,8 @@ class KnowledgeBaseRoute(Route):
                     top_k_dense,
                     top_k_sparse,
                     top_m_final,
+                    index_type,
+                    index_params,
                 ]
             ):
                 return Response().error("至少需要提供一个更新字段").__dict__
@@ -516,6 +540,8 @@ class KnowledgeBaseRoute(Route):
                 top_k_dense=top_k_dense,
                 top_k_sparse=top_k_sparse,
                 top_m_final=top_m_final,
+                index_type=index_type,
+                index_params=index_params,
             )
 
             if not kb_helper:
@@ -593,6 +619,64 @@ class KnowledgeBaseRoute(Route):
             logger.error(traceback.format_exc())
             return Response().error(f"获取知识库统计失败: {e!s}").__dict__
 
+    async def rebuild_index(self):
+        """在后台重建知识库的向量索引
+
+        Body:
+        - kb_id: 知识库 ID (必填)
+        """
+        try:
+            kb_manager = self._get_kb_manager()
+            data = await request.json
+            kb_id = data.get("kb_id")
+            if not kb_id:
+                return Response().error("缺少参数 kb_id").__dict__
+
+            kb_helper = await kb_manager.get_kb(kb_id)
+            if not kb_helper:
+                return Response().error("知识库不存在").__dict__
+
+            started = kb_helper.schedule_index_rebuild(force=True)
+            message = "已开始重建向量索引" if started else "向量索引正在重建中"
+            return Response().ok({"started": started}, message).__dict__
+
+        except ValueError as e:
+            return Response().error(str(e)).__dict__
+        except Exception as e:
+            logger.error(f"重建向量索引失败: {e}")
+            logger.error(traceback.format_exc())
+            return Response().error(f"重建向量索引失败: {e!s}").__dict__
+
+    async def get_index_report(self):
+        """获取向量索引的召回率与延迟报告
+
+        Query 参数:
+        - kb_id: 知识库 ID (必填)
+        - sample_size: 采样查询数量 (默认 100)
+        - k: 计算 recall@k 时的 k (默认 10)
+        """
+        try:
+            kb_manager = self._get_kb_manager()
+            kb_id = request.args.get("kb_id")
+            if not kb_id:
+                return Response().error("缺少参数 kb_id").__dict__
+            sample_size = request.args.get("sample_size", 100, type=int)
+            k = request.args.get("k", 10, type=int)
+
+            kb_helper = await kb_manager.get_kb(kb_id)
+            if not kb_helper:
+                return Response().error("知识库不存在").__dict__
+
+            report = await kb_helper.evaluate_index(sample_size=sample_size, k=k)
+            return Response().ok(report).__dict__
+
+        except ValueError as e:
+            return Response().error(str(e)).__dict__
+        except Exception as e:
+            logger.error(f"获取向量索引报告失败: {e}")
+            logger.error(traceback.format_exc())
+            return Response().error(f"获取向量索引报告失败: {e!s}").__dict__
+
     # ===== 文档管理 API =====
 
     async def list_documents(self):
@@ -810,7 +894,7 @@ class KnowledgeBaseRoute(Route):
             - chunks: 切片列表 (必填, list[str])
             - file_type: 文件类型 (可选, 默认从文件名推断或为 txt)
         - batch_size: 批处理大小 (可选, 默认32)
-        - tasks_limit: 并发任务限制 (可选, 默认3)
+        - tasks_limit: 初始并发数, 之后按 Embedding 提供商的负载自动调整 (可选, 默认3)
         - max_retries: 最大重试次数 (可选, 默认3)
         """
         try:
@@ -916,6 +1000,201 @@ class KnowledgeBaseRoute(Route):
             logger.error(traceback.format_exc())
             return Response().error(f"获取上传进度失败: {e!s}").__dict__
 
+    async def submit_import_job(self):
+        """提交批量导入任务
+
+        文件暂存后在后台排队导入, 进程重启后继续; 知识库中已有内容相同的文档时跳过该文件,
+        已有内容相同的块时直接复用其向量。
+
+        Form Data (multipart/form-data):
+        - kb_id: 知识库 ID (必填)
+        - file: 文件对象 (必填，可多个，字段名为 file, file1, file2, ... 或 files[])
+        - chunk_size, chunk_overlap, batch_size, tasks_limit, max_retries (可选)
+
+        JSON Body (application/json), 导入预切片文档:
+        - kb_id: 知识库 ID (必填)
+        - documents: 文档列表 (必填), 格式同 /kb/document/import
+        - batch_size, tasks_limit, max_retries (可选)
+
+        返回:
+        - job_id: 任务 ID, 用于查询任务进度
+        """
+        try:
+            kb_manager = self._get_kb_manager()
+            option_keys = (
+                "chunk_size",
+                "chunk_overlap",
+                "batch_size",
+                "tasks_limit",
+                "max_retries",
+            )
+            items: list[ImportItem] = []
+
+            if request.content_type and "application/json" in request.content_type:
+                data = await request.json
+                kb_id, documents, *_ = self._validate_import_request(data)
+                options = {key: data.get(key) for key in option_keys}
+                for file_idx, doc_info in enumerate(documents):
+                    file_name = doc_info.get("file_name") or f"imported_doc_{file_idx}"
+                    items.append(
+                        ImportItem(
+                            file_name=file_name,
+                            file_type=doc_info.get("file_type")
+                            or (
+                                file_name.rsplit(".", 1)[-1].lower()
+                                if "." in file_name
+                                else "txt"
+                            ),
+                            chunks=doc_info["chunks"],
+                        ),
+                    )
+            else:
+                form_data = await request.form
+                files = await request.files
+                kb_id = form_data.get("kb_id")
+                if not kb_id:
+                    return Response().error("缺少参数 kb_id").__dict__
+                options = {key: form_data.get(key) for key in option_keys}
+
+                file_list = []
+                for key in files.keys():
+                    if key.startswith("file") or key == "files[]":
+                        file_list.extend(files.getlist(key))
+                if not file_list:
+                    return Response().error("缺少文件").__dict__
+
+                for file in file_list:
+                    file_name = file.filename
+                    temp_file_path = os.path.join(
+                        get_astrbot_temp_path(),
+                        f"kb_import_{uuid.uuid4()}",
+                    )
+                    await file.save(temp_file_path)
+                    items.append(
+                        ImportItem(
+                            file_name=file_name,
+                            file_type=(
+                                file_name.rsplit(".", 1)[-1].lower()
+                                if "." in file_name
+                                else ""
+                            ),
+                            path=temp_file_path,
+                        ),
+                    )
+
+            try:
+                if not await kb_manager.get_kb(kb_id):
+                    return Response().error("知识库不存在").__dict__
+                job = await kb_manager.import_queue.submit(kb_id, items, options)
+            finally:
+                # 提交成功的文件已被移动到暂存目录
+                for item in items:
+                    if item.path and os.path.exists(item.path):
+                        os.remove(item.path)
+            return (
+                Response()
+                .ok({"job_id": job.job_id, "file_count": job.file_total})
+                .__dict__
+            )
+
+        except ValueError as e:
+            return Response().error(str(e)).__dict__
+        except Exception as e:
+            logger.error(f"提交导入任务失败: {e}")
+            logger.error(traceback.format_exc())
+            return Response().error(f"提交导入任务失败: {e!s}").__dict__
+
+    async def list_import_jobs(self):
+        """列出批量导入任务
+
+        Query 参数:
+        - kb_id: 知识库 ID (可选)
+        - page: 页码 (默认 1)
+        - page_size: 每页数量 (默认 20)
+        """
+        try:
+            kb_manager = self._get_kb_manager()
+            kb_id = request.args.get("kb_id")
+            page = request.args.get("page", 1, type=int)
+            page_size = request.args.get("page_size", 20, type=int)
+            jobs = await kb_manager.import_queue.list_jobs(
+                kb_id,
+                offset=(page - 1) * page_size,
+                limit=page_size,
+            )
+            return (
+                Response()
+                .ok({"items": jobs, "page": page, "page_size": page_size})
+                .__dict__
+            )
+        except Exception as e:
+            logger.error(f"获取导入任务列表失败: {e}")
+            logger.error(traceback.format_exc())
+            return Response().error(f"获取导入任务列表失败: {e!s}").__dict__
+
+    async def get_import_job(self):
+        """获取批量导入任务详情, 包括每个文件的状态与进度
+
+        Query 参数:
+        - job_id: 任务 ID (必填)
+
+        文件状态:
+        - pending: 排队中
+        - processing: 导入中
+        - completed: 导入完成
+        - skipped: 与知识库中已有文档内容相同, 已跳过
+        - failed: 导入失败
+        - cancelled: 已取消
+        """
+        try:
+            job_id = request.args.get("job_id")
+            if not job_id:
+                return Response().error("缺少参数 job_id").__dict__
+            job = await self._get_kb_manager().import_queue.get_job(job_id)
+            if job is None:
+                return Response().error("找不到该任务").__dict__
+            return Response().ok(job).__dict__
+        except Exception as e:
+            logger.error(f"获取导入任务失败: {e}")
+            logger.error(traceback.format_exc())
+            return Response().error(f"获取导入任务失败: {e!s}").__dict__
+
+    async def cancel_import_job(self):
+        """取消批量导入任务中尚未导入以及导入失败的文件
+
+        Body:
+        - job_id: 任务 ID (必填)
+        """
+        try:
+            data = await request.json
+            job_id = data.get("job_id")
+            if not job_id:
+                return Response().error("缺少参数 job_id").__dict__
+            count = await self._get_kb_manager().import_queue.cancel_job(job_id)
+            return Response().ok({"cancelled": count}).__dict__
+        except Exception as e:
+            logger.error(f"取消导入任务失败: {e}")
+            logger.error(traceback.format_exc())
+            return Response().error(f"取消导入任务失败: {e!s}").__dict__
+
+    async def retry_import_job(self):
+        """重新导入批量导入任务中失败的文件
+
+        Body:
+        - job_id: 任务 ID (必填)
+        """
+        try:
+            data = await request.json
+            job_id = data.get("job_id")
+            if not job_id:
+                return Response().error("缺少参数 job_id").__dict__
+            count = await self._get_kb_manager().import_queue.retry_job(job_id)
+            return Response().ok({"retried": count}).__dict__
+        except Exception as e:
+            logger.error(f"重试导入任务失败: {e}")
+            logger.error(traceback.format_exc())
+            return Response().error(f"重试导入任务失败: {e!s}").__dict__
+
     async def get_document(self):
         """获取文档详情
 
@@ -1093,13 +1372,19 @@ class KnowledgeBaseRoute(Route):
                 top_m_final=top_k,
             )
             result_list = []
+            timings = {}
+            cached = False
             if results:
                 result_list = results["results"]
+                timings = results.get("timings", {})
+                cached = results.get("cached", False)
 
             response_data = {
                 "results": result_list,
                 "total": len(result_list),
                 "query": query,
+                "timings": timings,
+                "cached": cached,
             }
 
             # Debug 模式：生成 t-SNE 可视化
@@ -1126,6 +1411,27 @@ class KnowledgeBaseRoute(Route):
             logger.error(traceback.format_exc())
             return Response().error(f"检索失败: {e!s}").__dict__
 
+    async def get_cache_stats(self):
+        """获取查询向量缓存和检索结果缓存的命中统计"""
+        try:
+            kb_manager = self._get_kb_manager()
+            return Response().ok(kb_manager.retrieval_manager.cache_stats()).__dict__
+        except Exception as e:
+            logger.error(f"获取检索缓存统计失败: {e}")
+            logger.error(traceback.format_exc())
+            return Response().error(f"获取检索缓存统计失败: {e!s}").__dict__
+
+    async def clear_cache(self):
+        """清空查询向量缓存和检索结果缓存"""
+        try:
+            kb_manager = self._get_kb_manager()
+            kb_manager.retrieval_manager.clear_cache()
+            return Response().ok(message="检索缓存已清空").__dict__
+        except Exception as e:
+            logger.error(f"清空检索缓存失败: {e}")
+            logger.error(traceback.format_exc())
+            return Response().error(f"清空检索缓存失败: {e!s}").__dict__
+
     async def upload_document_from_url(self):
         """从 URL 上传文档
 
@@ -1135,7 +1441,7 @@ class KnowledgeBaseRoute(Route):
         - chunk_size: 分块大小 (可选, 默认512)
         - chunk_overlap: 块重叠大小 (可选, 默认50)
         - batch_size: 批处理大小 (可选, 默认32)
-        - tasks_limit: 并发任务限制 (可选, 默认3)
+        - tasks_limit: 初始并发数, 之后按 Embedding 提供商的负载自动调整 (可选, 默认3)
         - max_retries: 最大重试次数 (可选, 默认3)
 
         返回:
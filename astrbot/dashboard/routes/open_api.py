@@ -3,11 +3,13 @@ import hashlib
 import json
 from uuid import uuid4
 
+from quart import Response as QuartResponse
 from quart import g, request, websocket
 
 from astrbot.core import logger
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
 from astrbot.core.db import BaseDatabase
+from astrbot.core.pipeline.profiler import pipeline_profiler
 from astrbot.core.platform.message_session import MessageSesion
 from astrbot.core.platform.sources.webchat.message_parts_helper import (
     build_message_chain_from_payload,
@@ -19,6 +21,7 @@ from astrbot.core.utils.datetime_utils import to_utc_isoformat
 
 from .api_key import ALL_OPEN_API_SCOPES
 from .chat import ChatRoute
+from .knowledge_base import KnowledgeBaseRoute
 from .route import Response, Route, RouteContext
 
 
@@ -29,12 +32,14 @@ class OpenApiRoute(Route):
         db: BaseDatabase,
         core_lifecycle: AstrBotCoreLifecycle,
         chat_route: ChatRoute,
+        kb_route: KnowledgeBaseRoute,
     ) -> None:
         super().__init__(context)
         self.db = db
         self.core_lifecycle = core_lifecycle
         self.platform_manager = core_lifecycle.platform_manager
         self.chat_route = chat_route
+        self.kb_route = kb_route
 
         self.routes = {
             "/v1/chat": ("POST", self.chat_send),
@@ -46,6 +51,10 @@ class OpenApiRoute(Route):
             ],
             "/v1/im/message": ("POST", self.send_message),
             "/v1/im/bots": ("GET", self.get_bots),
+            "/v1/metrics": ("GET", self.get_metrics),
+            "/v1/kb/import": ("POST", self.kb_import_submit),
+            "/v1/kb/import/jobs": ("GET", self.kb_import_list_jobs),
+            "/v1/kb/import/job": ("GET", self.kb_import_get_job),
         }
         self.register_routes()
         self.app.websocket("/api/v1/chat/ws")(self.chat_ws)
@@ -543,6 +552,15 @@ class OpenApiRoute(Route):
     async def openapi_get_file(self):
         return await self.chat_route.get_attachment()
 
+    async def kb_import_submit(self):
+        return await self.kb_route.submit_import_job()
+
+    async def kb_import_list_jobs(self):
+        return await self.kb_route.list_import_jobs()
+
+    async def kb_import_get_job(self):
+        return await self.kb_route.get_import_job()
+
     async def get_chat_sessions(self):
         username, username_err = self._resolve_open_username(
             request.args.get("username")
@@ -674,3 +692,10 @@ class OpenApiRoute(Route):
             ):
                 bot_ids.append(platform_id)
         return Response().ok(data={"bot_ids": bot_ids}).__dict__
+
+    async def get_metrics(self):
+        """以 Prometheus 文本格式导出流水线阶段与插件 Handler 的耗时统计"""
+        return QuartResponse(
+            pipeline_profiler.render_prometheus(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
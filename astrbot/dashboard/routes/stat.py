@@ -14,14 +14,16 @@ import psutil
 from quart import request
 from sqlmodel import select
 
-from astrbot.core import DEMO_MODE, logger
+from astrbot.core import DEMO_MODE, logger, platform_stats
 from astrbot.core.config import VERSION
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
 from astrbot.core.db import BaseDatabase
 from astrbot.core.db.migration.helper import check_migration_needed_v4
 from astrbot.core.db.po import ProviderStat
+from astrbot.core.pipeline.profiler import pipeline_profiler
 from astrbot.core.utils.astrbot_path import get_astrbot_path
 from astrbot.core.utils.io import get_dashboard_version
+from astrbot.core.utils.rate_limiter import rate_limiter
 from astrbot.core.utils.storage_cleaner import StorageCleaner
 from astrbot.core.utils.version_comparator import VersionComparator
 
@@ -41,6 +43,12 @@ class StatRoute(Route):
             "/stat/provider-tokens": ("GET", self.get_provider_token_stats),
             "/stat/version": ("GET", self.get_version),
             "/stat/start-time": ("GET", self.get_start_time),
+            "/stat/event-bus": ("GET", self.get_event_bus_stats),
+            "/stat/rate-limit": ("GET", self.get_rate_limit_stats),
+            "/stat/pipeline-profile": [
+                ("GET", self.get_pipeline_profile),
+                ("DELETE", self.reset_pipeline_profile),
+            ],
             "/stat/restart-core": ("POST", self.restart_core),
             "/stat/test-ghproxy-connection": ("POST", self.test_ghproxy_connection),
             "/stat/changelog": ("GET", self.get_changelog),
@@ -99,6 +107,22 @@ class StatRoute(Route):
     async def get_start_time(self):
         return Response().ok({"start_time": self.core_lifecycle.start_time}).__dict__
 
+    async def get_event_bus_stats(self):
+        """获取事件队列深度、各配置文件分发通道的排队与延迟统计"""
+        return Response().ok(self.core_lifecycle.event_bus.stats()).__dict__
+
+    async def get_rate_limit_stats(self):
+        """获取各限流层级的放行、排队与丢弃计数"""
+        return Response().ok(rate_limiter.stats()).__dict__
+
+    async def get_pipeline_profile(self):
+        """获取流水线各阶段与插件 Handler 的耗时分位数 (毫秒)"""
+        return Response().ok(pipeline_profiler.snapshot()).__dict__
+
+    async def reset_pipeline_profile(self):
+        pipeline_profiler.reset()
+        return Response().ok(message="已重置").__dict__
+
     async def get_storage_status(self):
         try:
             status = await asyncio.to_thread(self.storage_cleaner.get_status)
@@ -128,7 +152,7 @@ class StatRoute(Route):
         offset_sec = request.args.get("offset_sec", 86400)
         offset_sec = int(offset_sec)
         try:
-            stat = self.db_helper.get_base_stats(offset_sec)
+            hourly_stats = await platform_stats.get_hourly_stats(offset_sec)
             now = int(time.time())
             start_time = now - offset_sec
             message_time_based_stats = []
@@ -137,16 +161,17 @@ class StatRoute(Route):
             for bucket_end in range(start_time, now, 3600):
                 cnt = 0
                 while (
-                    idx < len(stat.platform)
-                    and stat.platform[idx].timestamp < bucket_end
+                    idx < len(hourly_stats)
+                    and hourly_stats[idx][0].timestamp() < bucket_end
                 ):
-                    cnt += stat.platform[idx].count
+                    cnt += hourly_stats[idx][3]
                     idx += 1
                 message_time_based_stats.append([bucket_end, cnt])
 
-            stat_dict = stat.__dict__
+            grouped_stats = await platform_stats.get_grouped_stats(offset_sec)
 
-            cpu_percent = psutil.cpu_percent(interval=0.5)
+            # cpu_percent 需要采样 0.5 秒, 放到线程中避免阻塞事件循环
+            cpu_percent = await asyncio.to_thread(psutil.cpu_percent, 0.5)
             thread_count = threading.active_count()
 
             # 获取插件信息
@@ -165,28 +190,28 @@ class StatRoute(Route):
                 int(time.time()) - self.core_lifecycle.start_time,
             )
 
-            stat_dict.update(
-                {
-                    "platform": self.db_helper.get_grouped_base_stats(
-                        offset_sec,
-                    ).platform,
-                    "message_count": self.db_helper.get_total_message_count() or 0,
-                    "platform_count": len(
-                        self.core_lifecycle.platform_manager.get_insts(),
-                    ),
-                    "plugin_count": len(plugins),
-                    "plugins": plugin_info,
-                    "message_time_series": message_time_based_stats,
-                    "running": running_time,  # 现在返回时间组件而不是格式化的字符串
-                    "memory": {
-                        "process": psutil.Process().memory_info().rss >> 20,
-                        "system": psutil.virtual_memory().total >> 20,
-                    },
-                    "cpu_percent": round(cpu_percent, 1),
-                    "thread_count": thread_count,
-                    "start_time": self.core_lifecycle.start_time,
+            stat_dict = {
+                "platform": [
+                    {"name": name, "count": count, "timestamp": start_time}
+                    for name, count in grouped_stats.items()
+                ],
+                "message_count": await platform_stats.get_total_message_count(),
+                "platform_count": len(
+                    self.core_lifecycle.platform_manager.get_insts(),
+                ),
+                "plugin_count": len(plugins),
+                "plugins": plugin_info,
+                "message_time_series": message_time_based_stats,
+                "message_minute_series": platform_stats.get_minute_series(),
+                "running": running_time,  # 现在返回时间组件而不是格式化的字符串
+                "memory": {
+                    "process": psutil.Process().memory_info().rss >> 20,
+                    "system": psutil.virtual_memory().total >> 20,
                 },
-            )
+                "cpu_percent": round(cpu_percent, 1),
+                "thread_count": thread_count,
+                "start_time": self.core_lifecycle.start_time,
+            }
 
             return Response().ok(stat_dict).__dict__
         except Exception as e:
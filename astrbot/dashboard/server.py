@@ -115,12 +115,6 @@ class AstrBotDashboard:
         self.ar = AuthRoute(self.context)
         self.api_key_route = ApiKeyRoute(self.context, db)
         self.chat_route = ChatRoute(self.context, db, core_lifecycle)
-        self.open_api_route = OpenApiRoute(
-            self.context,
-            db,
-            core_lifecycle,
-            self.chat_route,
-        )
         self.chatui_project_route = ChatUIProjectRoute(self.context, db)
         self.tools_root = ToolsRoute(self.context, core_lifecycle)
         self.subagent_route = SubAgentRoute(self.context, core_lifecycle)
@@ -136,6 +130,13 @@ class AstrBotDashboard:
         self.cron_route = CronRoute(self.context, core_lifecycle)
         self.t2i_route = T2iRoute(self.context, core_lifecycle)
         self.kb_route = KnowledgeBaseRoute(self.context, core_lifecycle)
+        self.open_api_route = OpenApiRoute(
+            self.context,
+            db,
+            core_lifecycle,
+            self.chat_route,
+            self.kb_route,
+        )
         self.platform_route = PlatformRoute(self.context, core_lifecycle)
         self.backup_route = BackupRoute(self.context, db, core_lifecycle)
         self.live_chat_route = LiveChatRoute(self.context, db, core_lifecycle)
@@ -248,7 +249,11 @@ class AstrBotDashboard:
             "/api/v1/configs": "config",
             "/api/v1/file": "file",
             "/api/v1/im/message": "im",
+            "/api/v1/metrics": "metrics",
             "/api/v1/im/bots": "im",
+            "/api/v1/kb/import": "kb",
+            "/api/v1/kb/import/jobs": "kb",
+            "/api/v1/kb/import/job": "kb",
         }
         return scope_map.get(path)
 
@@ -4,6 +4,7 @@ from io import BytesIO
 
 from astrbot.api import logger
 from astrbot.core.db.vec_db.faiss_impl import FaissVecDB
+from astrbot.core.db.vec_db.faiss_impl.embedding_storage import reconstruct_vectors
 from astrbot.core.knowledge_base.kb_helper import KBHelper
 from astrbot.core.knowledge_base.kb_mgr import KnowledgeBaseManager
 
@@ -65,20 +66,7 @@ async def generate_tsne_visualization(
 
         # 提取所有向量
         logger.info(f"提取 {index.ntotal} 个向量用于可视化...")
-        if isinstance(index, faiss.IndexIDMap):
-            base_index = faiss.downcast_index(index.index)
-            if hasattr(base_index, "reconstruct_n"):
-                vectors = base_index.reconstruct_n(0, index.ntotal)
-            else:
-                vectors = np.zeros((index.ntotal, index.d), dtype=np.float32)
-                for i in range(index.ntotal):
-                    base_index.reconstruct(i, vectors[i])
-        elif hasattr(index, "reconstruct_n"):
-            vectors = index.reconstruct_n(0, index.ntotal)
-        else:
-            vectors = np.zeros((index.ntotal, index.d), dtype=np.float32)
-            for i in range(index.ntotal):
-                index.reconstruct(i, vectors[i])
+        _, vectors = reconstruct_vectors(index)
 
         # 获取查询向量
         vec_db: FaissVecDB = kb_helper.vec_db  # type: ignore
@@ -5,26 +5,29 @@ import os
 import sys
 from pathlib import Path
 
-import runtime_bootstrap
-
-runtime_bootstrap.initialize_runtime_bootstrap()
-
-from astrbot.core import LogBroker, LogManager, db_helper, logger  # noqa: E402
-from astrbot.core.config.default import VERSION  # noqa: E402
-from astrbot.core.initial_loader import InitialLoader  # noqa: E402
-from astrbot.core.utils.astrbot_path import (  # noqa: E402
-    get_astrbot_config_path,
-    get_astrbot_data_path,
-    get_astrbot_knowledge_base_path,
-    get_astrbot_plugin_path,
-    get_astrbot_root,
-    get_astrbot_site_packages_path,
-    get_astrbot_temp_path,
-)
-from astrbot.core.utils.io import (  # noqa: E402
-    download_dashboard,
-    get_dashboard_version,
-)
+# multiprocessing 以 spawn 方式启动的子进程 (如知识库文档解析进程池的工作进程) 会以
+# __mp_main__ 的名义重新执行本文件, 子进程不需要初始化 AstrBot
+if __name__ != "__mp_main__":
+    import runtime_bootstrap
+
+    runtime_bootstrap.initialize_runtime_bootstrap()
+
+    from astrbot.core import LogBroker, LogManager, db_helper, logger
+    from astrbot.core.config.default import VERSION
+    from astrbot.core.initial_loader import InitialLoader
+    from astrbot.core.utils.astrbot_path import (
+        get_astrbot_config_path,
+        get_astrbot_data_path,
+        get_astrbot_knowledge_base_path,
+        get_astrbot_plugin_path,
+        get_astrbot_root,
+        get_astrbot_site_packages_path,
+        get_astrbot_temp_path,
+    )
+    from astrbot.core.utils.io import (
+        download_dashboard,
+        get_dashboard_version,
+    )
 
 # 将父目录添加到 sys.path
 sys.path.append(Path(__file__).parent.as_posix())
@@ -0,0 +1,154 @@
+"""PipelineScheduler 单事件调度开销的微基准
+
+对比逐事件 isinstance 判断 + 递归的旧调度方式与预编译阶段链的调度方式。
+模拟 10 个阶段 (其中 3 个为洋葱模型的异步生成器阶段, 4 个阶段对大多数事件无事可做)
+以及一个遍历 100 个插件 Handler 过滤器的阶段。
+
+用法:
+    uv run python scripts/bench_pipeline.py [--events 20000]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from astrbot.core.pipeline.scheduler import PipelineScheduler  # noqa: E402
+from astrbot.core.pipeline.stage import Stage  # noqa: E402
+
+N_PLUGINS = 100
+
+
+class FakeEvent:
+    def __init__(self) -> None:
+        self._stopped = False
+        self.result = None
+        self.message_str = "hello"
+
+    def is_stopped(self) -> bool:
+        return self._stopped
+
+    def get_result(self):
+        return self.result
+
+
+class NoopStage(Stage):
+    async def initialize(self, ctx) -> None:
+        pass
+
+    async def process(self, event) -> None:
+        return
+
+
+class OnionStage(Stage):
+    async def initialize(self, ctx) -> None:
+        pass
+
+    async def process(self, event) -> AsyncGenerator[None, None]:
+        yield
+
+
+class IdleStage(Stage):
+    """对大多数事件无事可做的阶段, 例如未启用的白名单或没有结果时的发送阶段"""
+
+    async def initialize(self, ctx) -> None:
+        pass
+
+    def applies(self, event) -> bool:
+        return event.result is not None
+
+    async def process(self, event) -> None:
+        if event.result is None:
+            return
+
+
+class IdleOnionStage(IdleStage):
+    async def process(self, event) -> AsyncGenerator[None, None]:
+        if event.result is None:
+            return
+        yield
+
+
+class PluginStage(Stage):
+    """模拟遍历已加载插件的 Handler 过滤器"""
+
+    async def initialize(self, ctx) -> None:
+        self.filters = [f"/cmd{i}" for i in range(N_PLUGINS)]
+
+    async def process(self, event) -> None:
+        for prefix in self.filters:
+            if event.message_str.startswith(prefix):
+                break
+
+
+def build_stages() -> list[Stage]:
+    return [
+        NoopStage(),
+        IdleStage(),
+        NoopStage(),
+        NoopStage(),
+        IdleOnionStage(),
+        NoopStage(),
+        OnionStage(),
+        PluginStage(),
+        IdleOnionStage(),
+        IdleStage(),
+    ]
+
+
+async def legacy_process_stages(stages, event, from_stage=0) -> None:
+    """优化前的调度实现"""
+    for i in range(from_stage, len(stages)):
+        stage = stages[i]
+        coroutine = stage.process(event)
+        if isinstance(coroutine, AsyncGenerator):
+            async for _ in coroutine:
+                if event.is_stopped():
+                    break
+                await legacy_process_stages(stages, event, i + 1)
+                if event.is_stopped():
+                    break
+        else:
+            await coroutine
+            if event.is_stopped():
+                break
+
+
+async def bench(n_events: int) -> None:
+    stages = build_stages()
+    for stage in stages:
+        await stage.initialize(None)
+
+    scheduler = PipelineScheduler(None)  # type: ignore[arg-type]
+    scheduler.stages = stages
+    scheduler.compile()
+
+    async def run_legacy() -> None:
+        await legacy_process_stages(stages, FakeEvent())
+
+    async def run_compiled() -> None:
+        await scheduler._process_stages(FakeEvent())  # type: ignore[arg-type]
+
+    for name, fn in (("legacy", run_legacy), ("compiled", run_compiled)):
+        for _ in range(1000):
+            await fn()
+        start = time.perf_counter()
+        for _ in range(n_events):
+            await fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>9}: {elapsed / n_events * 1e6:8.2f} us/event")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(bench(args.events))
+
+
+if __name__ == "__main__":
+    main()
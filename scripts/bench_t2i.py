@@ -0,0 +1,144 @@
+"""本地文转图 (LocalRenderStrategy) 的基准
+
+- 断行: 对比逐个前缀从长到短重新测量的旧断行方式与缓存字形步进宽度的累加 + 二分断行
+- 渲染: 2k / 10k 字符 Markdown 的端到端渲染耗时, 以及渲染期间事件循环的最大停顿
+- 缓存: 相同文本再次渲染的耗时
+
+用法:
+    uv run python scripts/bench_t2i.py [--sizes 2000 10000] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from astrbot.core.utils.t2i.local_strategy import (  # noqa: E402
+    FontManager,
+    LocalRenderStrategy,
+    MarkdownParser,
+    MarkdownRenderer,
+    TextMeasurer,
+)
+
+SENTENCES = [
+    "AstrBot 是一个易于上手的多平台聊天机器人及开发框架。",
+    "The quick brown fox jumps over the lazy dog, again and again.",
+    "这一段用于测试中英文混排时的自动换行效果，以及较长段落的渲染性能。",
+]
+
+
+def make_markdown(n_chars: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts: list[str] = []
+    size = 0
+    while size < n_chars:
+        kind = rng.random()
+        if kind < 0.1:
+            block = f"## 第 {len(parts)} 节"
+        elif kind < 0.25:
+            block = f"- 列表项 **{rng.choice(SENTENCES)}**"
+        elif kind < 0.35:
+            block = (
+                "```\n"
+                + "\n".join(f"print({i!r} * {rng.randint(1, 99)})" for i in range(4))
+                + "\n```"
+            )
+        else:
+            block = "".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 6)))
+        parts.append(block)
+        size += len(block)
+    return "\n".join(parts)
+
+
+def legacy_split(text: str, font, max_width: int) -> list[str]:
+    """旧的断行方式 (已修正 get_text_size 测量常量字符串的问题)"""
+    lines = []
+    remaining = text
+    while remaining:
+        if TextMeasurer.get_text_size(remaining, font)[0] <= max_width:
+            lines.append(remaining)
+            break
+        for i in range(len(remaining), 0, -1):
+            if TextMeasurer.get_text_size(remaining[:i], font)[0] <= max_width:
+                lines.append(remaining[:i])
+                remaining = remaining[i:]
+                break
+        else:
+            lines.append(remaining[0])
+            remaining = remaining[1:]
+    return lines
+
+
+def bench_split(text: str, repeat: int) -> None:
+    font = FontManager.get_font(26)
+    paragraphs = [line for line in text.split("\n") if line]
+    for name, split in (
+        ("legacy", legacy_split),
+        ("advance", TextMeasurer.split_text_to_fit_width),
+    ):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for para in paragraphs:
+                split(para, font, 780)
+            best = min(best, time.perf_counter() - start)
+        print(f"  split[{name:>7}]  {best * 1000:9.1f} ms")
+
+
+async def _max_loop_lag(task: asyncio.Future) -> float:
+    lag = 0.0
+    while not task.done():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lag = max(lag, time.perf_counter() - start - 0.005)
+    return lag
+
+
+async def bench_render(text: str, repeat: int) -> None:
+    renderer = MarkdownRenderer(font_size=26, width=800)
+    elements = await MarkdownParser.parse(text)
+
+    # 旧方式: 在事件循环中直接绘制
+    start = time.perf_counter()
+    renderer.draw(elements)
+    print(
+        f"  draw on loop      {(time.perf_counter() - start) * 1000:9.1f} ms (loop blocked)"
+    )
+
+    best, lag = float("inf"), 0.0
+    for _ in range(repeat):
+        strategy = LocalRenderStrategy()
+        start = time.perf_counter()
+        task = asyncio.ensure_future(strategy.render(text))
+        lag = max(lag, await _max_loop_lag(task))
+        await task
+        best = min(best, time.perf_counter() - start)
+    print(
+        f"  render off loop   {best * 1000:9.1f} ms (max loop lag {lag * 1000:.1f} ms)"
+    )
+
+    start = time.perf_counter()
+    await strategy.render(text)
+    print(f"  render cached     {(time.perf_counter() - start) * 1000:9.3f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_chars in args.sizes:
+        text = make_markdown(n_chars)
+        print(f"{n_chars} chars ({text.count(chr(10)) + 1} lines)")
+        bench_split(text, args.repeat)
+        await bench_render(text, args.repeat)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -155,3 +155,91 @@ def test_sandbox_and_local_path_resolution_with_show_sandbox_path_false(
     assert local_skill_path == skills_root / "custom-local" / "SKILL.md"
     assert by_name["python-sandbox"].path == "/app/skills/python-sandbox/SKILL.md"
 
+
+def test_list_skills_cached_until_skill_files_change(monkeypatch, tmp_path: Path):
+    data_dir = tmp_path / "data"
+    skills_root = tmp_path / "skills"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    skills_root.mkdir(parents=True, exist_ok=True)
+
+    monkeypatch.setattr(
+        "astrbot.core.skills.skill_manager.get_astrbot_data_path",
+        lambda: str(data_dir),
+    )
+    reads: list[str] = []
+    original_read_text = Path.read_text
+
+    def counting_read_text(self, *args, **kwargs):
+        reads.append(self.name)
+        return original_read_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "read_text", counting_read_text)
+
+    _write_skill(skills_root, "alpha", "first")
+    _write_skill(skills_root, "beta", "second")
+
+    mgr = SkillManager(skills_root=str(skills_root))
+    assert [s.description for s in mgr.list_skills()] == ["first", "second"]
+    reads.clear()
+
+    # a fresh manager shares the process-wide cache
+    skills = SkillManager(skills_root=str(skills_root)).list_skills()
+    assert [s.description for s in skills] == ["first", "second"]
+    assert reads == []
+
+    # returned objects are copies
+    skills[0].description = "mutated"
+    assert mgr.list_skills()[0].description == "first"
+
+    _write_skill(skills_root, "alpha", "changed description")
+    assert [s.description for s in mgr.list_skills()] == [
+        "changed description",
+        "second",
+    ]
+    # only the modified SKILL.md is parsed again
+    assert reads == ["SKILL.md"]
+
+    _write_skill(skills_root, "gamma", "third")
+    assert [s.name for s in mgr.list_skills()] == ["alpha", "beta", "gamma"]
+
+    mgr.set_skill_active("beta", False)
+    assert [s.name for s in mgr.list_skills(active_only=True)] == [
+        "alpha",
+        "gamma",
+    ]
+
+
+def test_build_skills_prompt_cached_per_allowlist(monkeypatch, tmp_path: Path):
+    data_dir = tmp_path / "data"
+    skills_root = tmp_path / "skills"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    skills_root.mkdir(parents=True, exist_ok=True)
+    monkeypatch.setattr(
+        "astrbot.core.skills.skill_manager.get_astrbot_data_path",
+        lambda: str(data_dir),
+    )
+    _write_skill(skills_root, "alpha", "first")
+    _write_skill(skills_root, "beta", "second")
+    mgr = SkillManager(skills_root=str(skills_root))
+
+    full_prompt = mgr.build_skills_prompt()
+    assert "**alpha**" in full_prompt and "**beta**" in full_prompt
+    only_beta = mgr.build_skills_prompt(allowed_skills=["beta"])
+    assert "**alpha**" not in only_beta and "**beta**" in only_beta
+    assert mgr.build_skills_prompt(allowed_skills=[]) == ""
+
+    scans = 0
+    original_scan = SkillManager._scan_skills
+
+    def counting_scan(self, **kwargs):
+        nonlocal scans
+        scans += 1
+        return original_scan(self, **kwargs)
+
+    monkeypatch.setattr(SkillManager, "_scan_skills", counting_scan)
+    assert mgr.build_skills_prompt(allowed_skills=["beta"]) == only_beta
+    assert scans == 0
+
+    mgr.delete_skill("beta")
+    assert mgr.build_skills_prompt(allowed_skills=["beta"]) == ""
+    assert scans == 1
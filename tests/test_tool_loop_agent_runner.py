@@ -1222,3 +1222,130 @@ async def test_follow_up_after_stop_not_merged_into_tool_result(
 if __name__ == "__main__":
     # 运行测试
     pytest.main([__file__, "-v"])
+
+
+class MockMultiToolCallProvider(MockProvider):
+    def __init__(self, tool_names: list[str]):
+        super().__init__()
+        self.tool_names = tool_names
+
+    async def text_chat(self, **kwargs) -> LLMResponse:
+        self.call_count += 1
+        if self.call_count > 1:
+            return LLMResponse(role="assistant", completion_text="done")
+        return LLMResponse(
+            role="assistant",
+            completion_text="",
+            tools_call_name=list(self.tool_names),
+            tools_call_args=[{"query": name} for name in self.tool_names],
+            tools_call_ids=[f"call_{i}" for i in range(len(self.tool_names))],
+        )
+
+
+class ConcurrencyTrackingToolExecutor:
+    """记录同时执行的工具数量, 工具按名称中的延迟返回"""
+
+    def __init__(self, delays: dict[str, float]):
+        self.delays = delays
+        self.running: set[str] = set()
+        self.peak = 0
+        self.overlaps: dict[str, set[str]] = {}
+
+    def execute(self, tool, run_context, **tool_args):
+        async def generator():
+            from mcp.types import CallToolResult, TextContent
+
+            self.running.add(tool.name)
+            self.peak = max(self.peak, len(self.running))
+            for name in self.running:
+                self.overlaps.setdefault(name, set()).update(self.running - {name})
+            try:
+                await asyncio.sleep(self.delays[tool.name])
+            finally:
+                self.running.discard(tool.name)
+            yield CallToolResult(
+                content=[TextContent(type="text", text=f"result of {tool.name}")]
+            )
+
+        return generator()
+
+
+def _make_tools(*names: str, serial: tuple[str, ...] = ()) -> ToolSet:
+    return ToolSet(
+        tools=[
+            FunctionTool(
+                name=name,
+                description=name,
+                parameters={
+                    "type": "object",
+                    "properties": {"query": {"type": "string"}},
+                },
+                handler=AsyncMock(),
+                serial_execution=name in serial,
+            )
+            for name in names
+        ]
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("parallel", [False, True])
+async def test_parallel_tool_calls_keep_result_order(mock_hooks, parallel):
+    names = ["slow", "medium", "fast"]
+    executor = ConcurrencyTrackingToolExecutor(
+        {"slow": 0.2, "medium": 0.1, "fast": 0.01}
+    )
+    runner = ToolLoopAgentRunner()
+    await runner.reset(
+        provider=MockMultiToolCallProvider(names),
+        request=ProviderRequest(prompt="hi", func_tool=_make_tools(*names)),
+        run_context=ContextWrapper(context=None),
+        tool_executor=cast(Any, executor),
+        agent_hooks=mock_hooks,
+        parallel_tool_calls=parallel,
+    )
+
+    tool_call_ids = []
+    async for resp in runner.step():
+        if resp.type == "tool_call":
+            tool_call_ids.append(resp.data["chain"].chain[0].data["id"])
+
+    assert tool_call_ids == ["call_0", "call_1", "call_2"]
+    assert executor.peak == (3 if parallel else 1)
+    tool_messages = [m for m in runner.run_context.messages if m.role == "tool"]
+    assert [m.tool_call_id for m in tool_messages] == ["call_0", "call_1", "call_2"]
+    assert [m.content for m in tool_messages] == [
+        "result of slow",
+        "result of medium",
+        "result of fast",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_parallel_tool_calls_respect_limit_and_serial_tools(mock_hooks):
+    names = ["a", "b", "c", "send", "d", "e"]
+    executor = ConcurrencyTrackingToolExecutor(dict.fromkeys(names, 0.05))
+    runner = ToolLoopAgentRunner()
+    await runner.reset(
+        provider=MockMultiToolCallProvider(names),
+        request=ProviderRequest(
+            prompt="hi", func_tool=_make_tools(*names, serial=("send",))
+        ),
+        run_context=ContextWrapper(context=None),
+        tool_executor=cast(Any, executor),
+        agent_hooks=mock_hooks,
+        parallel_tool_calls=True,
+        max_parallel_tool_calls=2,
+    )
+
+    async for _ in runner.step():
+        pass
+
+    assert executor.peak == 2
+    assert executor.overlaps.get("send", set()) == set()
+    # 串行工具前后的调用不会跨越它并发执行
+    assert not executor.overlaps["d"] & {"a", "b", "c"}
+    tool_messages = [m for m in runner.run_context.messages if m.role == "tool"]
+    assert [m.tool_call_id for m in tool_messages] == [
+        f"call_{i}" for i in range(len(names))
+    ]
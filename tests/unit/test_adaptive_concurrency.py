@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from astrbot.core.provider.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    get_http_status,
+    get_retry_after,
+)
+from astrbot.core.provider.provider import EmbeddingProvider
+
+
+class _Response:
+    def __init__(self, status_code: int, headers: dict | None = None) -> None:
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code: int, headers: dict | None = None) -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.response = _Response(status_code, headers)
+
+
+class _Provider(EmbeddingProvider):
+    """Counts concurrent requests and rejects more than `capacity` of them."""
+
+    def __init__(self, capacity: int = 100, max_concurrency: int = 16) -> None:
+        super().__init__({"embedding_max_concurrency": max_concurrency}, {})
+        self.capacity = capacity
+        self.in_flight = 0
+        self.peak = 0
+        self.rejected = 0
+
+    async def get_embedding(self, text: str) -> list[float]:
+        return [float(text)]
+
+    async def get_embeddings(self, text: list[str]) -> list[list[float]]:
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise _StatusError(429, {"retry-after-ms": "10"})
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.005)
+        finally:
+            self.in_flight -= 1
+        return [[float(t)] for t in text]
+
+    def get_dim(self) -> int:
+        return 1
+
+
+def test_status_and_retry_after_extraction() -> None:
+    assert get_http_status(_StatusError(503)) == 503
+    assert get_http_status(ValueError("x")) is None
+    assert get_retry_after(_StatusError(429, {"retry-after": "2"})) == 2.0
+    assert get_retry_after(_StatusError(429, {"retry-after": "9999"})) == 60.0
+    assert get_retry_after(_StatusError(429)) is None
+
+
+@pytest.mark.asyncio
+async def test_concurrency_grows_while_healthy() -> None:
+    provider = _Provider(max_concurrency=8)
+    texts = [str(i) for i in range(400)]
+
+    vectors = await provider.get_embeddings_batch(texts, batch_size=1, tasks_limit=2)
+
+    assert [v[0] for v in vectors] == list(range(400))
+    limiter = provider.get_concurrency_limiter()
+    assert limiter.concurrency > 2
+    assert provider.peak <= limiter.max_limit
+
+
+@pytest.mark.asyncio
+async def test_overload_halves_concurrency_and_pauses() -> None:
+    limiter = AdaptiveConcurrencyLimiter(initial=8)
+    with pytest.raises(_StatusError):
+        async with limiter.slot():
+            raise _StatusError(429, {"retry-after": "0.05"})
+    assert limiter.concurrency == 4
+    assert limiter.stats()["paused_for"] > 0
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    async with limiter.slot():
+        pass
+    assert loop.time() - start >= 0.04
+
+    # other errors are not capacity signals
+    with pytest.raises(ValueError):
+        async with limiter.slot():
+            raise ValueError("bad input")
+    assert limiter.concurrency == 4
+
+
+@pytest.mark.asyncio
+async def test_limiter_is_shared_by_concurrent_uploads() -> None:
+    provider = _Provider(capacity=3, max_concurrency=16)
+    texts = [str(i) for i in range(60)]
+
+    first, second = await asyncio.gather(
+        provider.get_embeddings_batch(texts, batch_size=1, tasks_limit=2),
+        provider.get_embeddings_batch(texts, batch_size=1, tasks_limit=2),
+    )
+
+    assert first == second == [[float(i)] for i in range(60)]
+    limiter = provider.get_concurrency_limiter()
+    assert provider.peak <= 3
+    assert limiter.overloads == provider.rejected
@@ -82,6 +82,7 @@ def mock_conversation():
     conv.cid = "conv-id"
     conv.persona_id = None
     conv.history = "[]"
+    conv.get_messages.return_value = []
     return conv
 
 
@@ -103,6 +104,7 @@ def _new_mock_conversation(cid: str = "conv-id") -> MagicMock:
     conv.cid = cid
     conv.persona_id = None
     conv.history = "[]"
+    conv.get_messages.return_value = []
     return conv
 
 
@@ -237,7 +239,10 @@ class TestGetSessionConv:
             mock_event.unified_msg_origin
         )
         conv_mgr.get_conversation.assert_called_once_with(
-            mock_event.unified_msg_origin, "existing-conv-id"
+            mock_event.unified_msg_origin,
+            "existing-conv-id",
+            max_turns=None,
+            dequeue_turns=1,
         )
 
     @pytest.mark.asyncio
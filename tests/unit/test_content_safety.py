@@ -0,0 +1,113 @@
+"""Tests for the keyword content safety strategy."""
+
+import pytest
+
+from astrbot.core.message.components import Plain
+from astrbot.core.message.message_event_result import MessageChain
+from astrbot.core.pipeline.content_safety_check.strategies.keywords import (
+    KeywordMatcher,
+    KeywordsStrategy,
+    get_keyword_matcher,
+)
+from astrbot.core.pipeline.content_safety_check.strategies.strategy import (
+    StrategySelector,
+)
+from astrbot.core.pipeline.result_decorate.stage import ResultDecorateStage
+
+
+def _selector(keywords: list[str]) -> StrategySelector:
+    return StrategySelector(
+        {
+            "internal_keywords": {"enable": True, "extra_keywords": keywords},
+            "baidu_aip": {"enable": False},
+        },
+    )
+
+
+def test_matcher_finds_overlapping_literals() -> None:
+    matcher = KeywordMatcher(["she", "he", "hers", "his"])
+    assert matcher.search("ushers") == "she"
+    assert matcher.search("ahishers") == "his"
+    assert matcher.search("nothing here") == "he"
+    assert matcher.search("sh") is None
+
+
+def test_matcher_handles_cjk_and_regex_keywords() -> None:
+    matcher = KeywordMatcher(["敏感词", r"\d{11}", "违规", "", "(unclosed"])
+    assert len(matcher) == 4
+    assert matcher.search("这里有个敏感词啊") == "敏感词"
+    assert matcher.search("电话 13800138000") == r"\d{11}"
+    assert matcher.search("这是 (unclosed 括号") == "(unclosed"
+    assert matcher.search("正常内容") is None
+
+
+def test_matcher_falls_back_when_patterns_cannot_be_combined() -> None:
+    matcher = KeywordMatcher([r"(a)\1", r"b+c"])
+    assert matcher.search("xaay") == r"(a)\1"
+    assert matcher.search("bbbc") == r"b+c"
+    assert matcher.search("abc") == r"b+c"
+    assert matcher.search("ac") is None
+
+
+def test_backreference_keywords_are_not_renumbered() -> None:
+    matcher = KeywordMatcher(["(foo|bar)baz", r"(.)\1{4}"])
+    assert matcher._combined is None
+    assert matcher.search("aaaaa") == r"(.)\1{4}"
+    assert matcher.search("barbaz") == "(foo|bar)baz"
+    assert matcher.search("abcde") is None
+    assert KeywordsStrategy(["(foo|bar)baz", r"(.)\1{4}"]).check("aaaaa")[0] is False
+
+
+def test_matcher_is_cached_per_keyword_list() -> None:
+    first = KeywordsStrategy(["foo", "bar"]).matcher
+    assert KeywordsStrategy(["foo", "bar"]).matcher is first
+    assert KeywordsStrategy(["foo"]).matcher is not first
+    assert get_keyword_matcher(("foo", "bar")) is first
+
+
+def test_strategy_reports_matched_keyword() -> None:
+    ok, info = KeywordsStrategy(["违规"]).check("包含违规内容")
+    assert not ok
+    assert "违规" in info
+    assert KeywordsStrategy(["违规"]).check("正常内容") == (True, "")
+
+
+def test_stream_scanner_matches_across_chunks() -> None:
+    scanner = KeywordMatcher(["敏感词", r"ab+c"]).scanner()
+    assert scanner.feed("前面是正常的敏") is None
+    assert scanner.feed("感") is None
+    assert scanner.feed("词") == "敏感词"
+
+    scanner = KeywordMatcher([r"ab+c"]).scanner()
+    assert scanner.feed("xa") is None
+    assert scanner.feed("bb") is None
+    assert scanner.feed("cy") == r"ab+c"
+
+
+def test_selector_skips_empty_keyword_list() -> None:
+    assert _selector([]).enabled_strategies == []
+    assert _selector([]).stream_scanners() == []
+    assert len(_selector(["x"]).stream_scanners()) == 1
+
+
+@pytest.mark.asyncio
+async def test_streaming_output_is_blocked_after_match() -> None:
+    consumed = []
+
+    async def stream():
+        for text in ["你好，", "这是敏", "感词", "后面的内容"]:
+            consumed.append(text)
+            yield MessageChain(chain=[Plain(text)])
+
+    stage = ResultDecorateStage()
+    scanners = _selector(["敏感词"]).stream_scanners()
+    sent = [
+        "".join(comp.text for comp in chain.chain if isinstance(comp, Plain))
+        async for chain in stage._guard_stream(stream(), scanners)
+    ]
+
+    assert sent[:2] == ["你好，", "这是敏"]
+    assert sent[2].endswith("已被屏蔽。")
+    assert len(sent) == 3
+    # 剩余分段仍会被消费，保证 Agent 正常结束
+    assert consumed == ["你好，", "这是敏", "感词", "后面的内容"]
@@ -0,0 +1,195 @@
+"""Tests for the append-only conversation message store."""
+
+from unittest.mock import patch
+
+import pytest
+from sqlmodel import select
+
+from astrbot.core.conversation_mgr import ConversationManager
+from astrbot.core.db.po import ConversationMessage, ConversationV2, window_turns
+
+
+def _turn(idx: int) -> list[dict]:
+    return [
+        {"role": "user", "content": f"question {idx}"},
+        {"role": "assistant", "content": f"answer {idx}"},
+    ]
+
+
+async def _stored_rows(db, cid: str) -> list[ConversationMessage]:
+    async with db.get_db() as session:
+        result = await session.execute(
+            select(ConversationMessage)
+            .where(ConversationMessage.conversation_id == cid)
+            .order_by(ConversationMessage.seq),
+        )
+        return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_update_only_writes_new_messages(temp_db) -> None:
+    conv = await temp_db.create_conversation("umo", "test", content=_turn(0))
+    cid = conv.conversation_id
+    first_ids = [row.id for row in await _stored_rows(temp_db, cid)]
+
+    await temp_db.update_conversation(cid, content=_turn(0) + _turn(1))
+
+    rows = await _stored_rows(temp_db, cid)
+    assert [row.seq for row in rows] == [0, 1, 2, 3]
+    assert [row.id for row in rows[:2]] == first_ids
+    assert all(row.token_count > 0 for row in rows)
+    stored = await temp_db.get_conversation_by_id(cid)
+    assert stored.content == _turn(0) + _turn(1)
+
+
+@pytest.mark.asyncio
+async def test_update_handles_truncated_and_rewritten_history(temp_db) -> None:
+    conv = await temp_db.create_conversation(
+        "umo", "test", content=_turn(0) + _turn(1) + _turn(2)
+    )
+    cid = conv.conversation_id
+
+    # 截断最早的一轮并追加新的一轮
+    await temp_db.update_conversation(cid, content=_turn(1) + _turn(2) + _turn(3))
+    rows = await _stored_rows(temp_db, cid)
+    assert [row.seq for row in rows] == [2, 3, 4, 5, 6, 7]
+    assert [row.content for row in rows] == _turn(1) + _turn(2) + _turn(3)
+
+    # 完全不同的历史（例如 LLM 压缩后的摘要）
+    summary = [{"role": "user", "content": "summary"}]
+    await temp_db.update_conversation(cid, content=summary)
+    assert [row.content for row in await _stored_rows(temp_db, cid)] == summary
+
+    await temp_db.update_conversation(cid, content=[])
+    assert await _stored_rows(temp_db, cid) == []
+
+
+@pytest.mark.asyncio
+async def test_windowed_load_and_write_back(temp_db) -> None:
+    conv = await temp_db.create_conversation(
+        "umo", "test", content=_turn(0) + _turn(1) + _turn(2)
+    )
+    cid = conv.conversation_id
+
+    messages, offset = await temp_db.get_conversation_messages(cid, max_turns=2)
+    assert messages == _turn(1) + _turn(2)
+    assert offset == 2
+
+    await temp_db.update_conversation(
+        cid,
+        content=messages + _turn(3),
+        content_offset=offset,
+    )
+    stored = await temp_db.get_conversation_by_id(cid)
+    assert stored.content == _turn(0) + _turn(1) + _turn(2) + _turn(3)
+
+
+@pytest.mark.asyncio
+async def test_legacy_json_history_is_migrated_on_write(temp_db) -> None:
+    async with temp_db.get_db() as session:
+        async with session.begin():
+            session.add(
+                ConversationV2(
+                    conversation_id="legacy",
+                    user_id="umo",
+                    platform_id="test",
+                    content=_turn(0) + _turn(1),
+                ),
+            )
+
+    messages, offset = await temp_db.get_conversation_messages("legacy", max_turns=1)
+    assert (messages, offset) == (_turn(1), 2)
+    assert await _stored_rows(temp_db, "legacy") == []
+
+    await temp_db.append_conversation_messages("legacy", _turn(2))
+
+    rows = await _stored_rows(temp_db, "legacy")
+    assert [row.content for row in rows] == _turn(0) + _turn(1) + _turn(2)
+    async with temp_db.get_db() as session:
+        result = await session.execute(
+            select(ConversationV2.content).where(
+                ConversationV2.conversation_id == "legacy"
+            ),
+        )
+        assert result.scalar_one() is None
+
+
+@pytest.mark.asyncio
+async def test_conversation_manager_window_round_trip(temp_db) -> None:
+    conv_mgr = ConversationManager(temp_db)
+    conv = await temp_db.create_conversation("umo", "test", content=_turn(0) + _turn(1))
+    cid = conv.conversation_id
+
+    with patch.object(
+        temp_db, "get_conversation_messages", wraps=temp_db.get_conversation_messages
+    ) as get_messages:
+        windowed = await conv_mgr.get_conversation("umo", cid, max_turns=1)
+    get_messages.assert_awaited_once()
+    assert windowed.history_offset == 2
+
+    await conv_mgr.add_message_pair(cid, *_turn(2))
+    await conv_mgr.update_conversation(
+        "umo",
+        cid,
+        history=_turn(1) + _turn(2) + _turn(3),
+        history_offset=windowed.history_offset,
+    )
+
+    full = await conv_mgr.get_conversation("umo", cid)
+    assert full.history_offset == 0
+    stored = await temp_db.get_conversation_by_id(cid)
+    assert stored.content == _turn(0) + _turn(1) + _turn(2) + _turn(3)
+
+    await conv_mgr.delete_conversation("umo", cid)
+    assert await _stored_rows(temp_db, cid) == []
+    await conv_mgr.terminate()
+
+
+@pytest.mark.asyncio
+async def test_conversation_lists_include_message_history(temp_db) -> None:
+    conv_mgr = ConversationManager(temp_db)
+    cid = await conv_mgr.new_conversation("umo", content=_turn(0) + _turn(1))
+    empty = await conv_mgr.new_conversation("umo")
+
+    histories = {
+        conv.cid: conv.get_messages() for conv in await conv_mgr.get_conversations()
+    }
+    assert histories == {cid: _turn(0) + _turn(1), empty: []}
+
+    filtered, total = await conv_mgr.get_filtered_conversations(search_query="answer 1")
+    assert total == 1
+    assert filtered[0].get_messages() == _turn(0) + _turn(1)
+
+    page = await temp_db.get_all_conversations(page=1, page_size=10)
+    assert {conv.conversation_id: conv.content for conv in page} == {
+        cid: _turn(0) + _turn(1),
+        empty: [],
+    }
+    await conv_mgr.terminate()
+
+
+@pytest.mark.parametrize(("max_turns", "dequeue_turns"), [(4, 1), (5, 3), (6, 5)])
+def test_window_matches_batched_truncation(max_turns, dequeue_turns) -> None:
+    # 旧实现: 保存的历史超过 max_turns 时截断为 max_turns - dequeue_turns + 1 轮
+    stored = 0
+    for total in range(30):
+        if stored > max_turns:
+            stored = max_turns - dequeue_turns + 1
+        assert window_turns(total, max_turns, dequeue_turns) == stored
+        stored += 1
+
+
+@pytest.mark.asyncio
+async def test_windowed_load_slides_in_dequeue_batches(temp_db) -> None:
+    conv = await temp_db.create_conversation("umo", "test")
+    cid = conv.conversation_id
+    starts = []
+    for idx in range(8):
+        await temp_db.append_conversation_messages(cid, _turn(idx))
+        messages, offset = await temp_db.get_conversation_messages(
+            cid, max_turns=4, dequeue_turns=3
+        )
+        assert messages[0] == _turn(offset // 2)[0]
+        starts.append(offset // 2)
+    # 1..4 轮时全部可见, 之后窗口起点每 3 轮移动一次
+    assert starts == [0, 0, 0, 0, 3, 3, 3, 6]
@@ -0,0 +1,125 @@
+"""Tests for the ConversationManager hot cache and write-behind flush."""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+from astrbot.core.conversation_mgr import ConversationManager
+
+
+def _turn(idx: int) -> list[dict]:
+    return [
+        {"role": "user", "content": f"question {idx}"},
+        {"role": "assistant", "content": f"answer {idx}"},
+    ]
+
+
+@pytest_asyncio.fixture
+async def conv_mgr(temp_db):
+    mgr = ConversationManager(temp_db)
+    mgr.save_interval = 3600  # 测试中手动 flush
+    yield mgr
+    await mgr.terminate()
+
+
+@pytest.mark.asyncio
+async def test_reads_are_served_from_cache(conv_mgr, temp_db) -> None:
+    cid = await conv_mgr.new_conversation("test:group:1", content=_turn(0))
+
+    with patch.object(
+        temp_db, "get_conversation_by_id", wraps=temp_db.get_conversation_by_id
+    ) as get_by_id:
+        first = await conv_mgr.get_conversation("test:group:1", cid)
+        second = await conv_mgr.get_conversation("test:group:1", cid, max_turns=5)
+
+    get_by_id.assert_not_awaited()
+    assert first.get_messages() == _turn(0)
+    assert second.get_messages() == _turn(0)
+    # 修改返回的消息不影响缓存
+    first.get_messages()[0]["content"] = "changed"
+    assert second.get_messages() == _turn(0)
+    assert json.loads(first.history) == _turn(0)
+
+
+@pytest.mark.asyncio
+async def test_writes_are_coalesced(conv_mgr, temp_db) -> None:
+    cid = await conv_mgr.new_conversation("test:group:1")
+
+    with patch.object(
+        temp_db, "update_conversation", wraps=temp_db.update_conversation
+    ) as update:
+        await conv_mgr.update_conversation(
+            "test:group:1", cid, history=_turn(0), token_usage=10
+        )
+        await conv_mgr.add_message_pair(cid, *_turn(1))
+        conv = await conv_mgr.get_conversation("test:group:1", cid)
+        assert conv.get_messages() == _turn(0) + _turn(1)
+        assert conv.token_usage == 10
+        update.assert_not_awaited()
+        assert (await temp_db.get_conversation_by_id(cid)).content == []
+
+        await conv_mgr.flush()
+        await conv_mgr.flush()
+
+    update.assert_awaited_once()
+    stored = await temp_db.get_conversation_by_id(cid)
+    assert stored.content == _turn(0) + _turn(1)
+    assert stored.token_usage == 10
+
+
+@pytest.mark.asyncio
+async def test_terminate_flushes_and_delete_discards(conv_mgr, temp_db) -> None:
+    kept = await conv_mgr.new_conversation("test:group:1")
+    deleted = await conv_mgr.new_conversation("test:group:1")
+    await conv_mgr.update_conversation("test:group:1", kept, history=_turn(0))
+    await conv_mgr.update_conversation("test:group:1", deleted, history=_turn(0))
+
+    await conv_mgr.delete_conversation("test:group:1", deleted)
+    await conv_mgr.terminate()
+
+    assert (await temp_db.get_conversation_by_id(kept)).content == _turn(0)
+    assert await temp_db.get_conversation_by_id(deleted) is None
+
+
+@pytest.mark.asyncio
+async def test_eviction_keeps_dirty_conversations(conv_mgr, temp_db) -> None:
+    conv_mgr.cache_size = 1
+    first = await conv_mgr.new_conversation("test:group:1")
+    await conv_mgr.update_conversation("test:group:1", first, history=_turn(0))
+    second = await conv_mgr.new_conversation("test:group:2")
+
+    assert set(conv_mgr._cache) == {first, second}
+    await conv_mgr.flush()
+    assert len(conv_mgr._cache) == 1
+    assert (await temp_db.get_conversation_by_id(first)).content == _turn(0)
+
+
+@pytest.mark.asyncio
+async def test_conversation_dirtied_during_flush_is_written(conv_mgr, temp_db) -> None:
+    conv_mgr.save_interval = 0.05
+    first = await conv_mgr.new_conversation("test:group:1")
+    second = await conv_mgr.new_conversation("test:group:2")
+    original_update = temp_db.update_conversation
+    dirtied = False
+
+    async def update_conversation(*args, **kwargs):
+        nonlocal dirtied
+        if not dirtied:
+            # 第一个对话写入过程中, 另一个对话变脏
+            dirtied = True
+            await conv_mgr.update_conversation("test:group:2", second, history=_turn(1))
+        return await original_update(*args, **kwargs)
+
+    with patch.object(temp_db, "update_conversation", update_conversation):
+        await conv_mgr.update_conversation("test:group:1", first, history=_turn(0))
+        for _ in range(40):
+            await asyncio.sleep(0.05)
+            if not any(entry.dirty for entry in conv_mgr._cache.values()):
+                break
+
+    assert not conv_mgr._cache[second].dirty
+    assert (await temp_db.get_conversation_by_id(first)).content == _turn(0)
+    assert (await temp_db.get_conversation_by_id(second)).content == _turn(1)
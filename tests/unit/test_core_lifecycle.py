@@ -690,6 +690,9 @@ class TestAstrBotCoreLifecycleStopAdditional:
         lifecycle.kb_manager = MagicMock()
         lifecycle.kb_manager.terminate = AsyncMock()
 
+        lifecycle.conversation_manager = MagicMock()
+        lifecycle.conversation_manager.terminate = AsyncMock()
+
         lifecycle.dashboard_shutdown_event = asyncio.Event()
 
         lifecycle.curr_tasks = []
@@ -700,6 +703,7 @@ class TestAstrBotCoreLifecycleStopAdditional:
         lifecycle.provider_manager.terminate.assert_awaited_once()
         lifecycle.platform_manager.terminate.assert_awaited_once()
         lifecycle.kb_manager.terminate.assert_awaited_once()
+        lifecycle.conversation_manager.terminate.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_stop_handles_plugin_termination_error(
@@ -0,0 +1,101 @@
+"""Tests for the AdapterMessageEvent handler dispatch index."""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from astrbot.core.pipeline.waking_check import dispatch_index
+from astrbot.core.pipeline.waking_check.dispatch_index import (
+    HandlerDispatchIndex,
+    get_dispatch_index,
+)
+from astrbot.core.star.filter.command import CommandFilter
+from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.filter.event_message_type import (
+    EventMessageType,
+    EventMessageTypeFilter,
+)
+from astrbot.core.star.filter.regex import RegexFilter
+from astrbot.core.star.star_handler import EventType, StarHandlerMetadata
+
+
+async def _handler(self, event) -> None:
+    pass
+
+
+def _md(name: str, *filters) -> StarHandlerMetadata:
+    return StarHandlerMetadata(
+        event_type=EventType.AdapterMessageEvent,
+        handler_full_name=f"plugin_{name}",
+        handler_name=name,
+        handler_module_path="plugin",
+        handler=_handler,
+        event_filters=list(filters),
+    )
+
+
+def _event(message: str, wake: bool = True) -> SimpleNamespace:
+    return SimpleNamespace(
+        message_str=message,
+        is_at_or_wake_command=wake,
+        get_message_str=lambda: message,
+    )
+
+
+def _build() -> tuple[HandlerDispatchIndex, dict[str, StarHandlerMetadata]]:
+    group = CommandGroupFilter("kb")
+    handlers = {
+        "help": _md("help", CommandFilter("help", alias={"h"})),
+        "kb_group": _md("kb_group", group),
+        "kb_search": _md(
+            "kb_search", CommandFilter("search", parent_command_names=["kb"])
+        ),
+        "regex": _md("regex", RegexFilter(r"^\d+$")),
+        "all": _md("all", EventMessageTypeFilter(EventMessageType.ALL)),
+    }
+    return HandlerDispatchIndex(list(handlers.values())), handlers
+
+
+def _names(index: HandlerDispatchIndex, event) -> list[str]:
+    return [h.handler_name for h in index.candidates(event)]
+
+
+def test_non_matching_message_only_yields_unconditional_handlers() -> None:
+    index, _ = _build()
+    assert _names(index, _event("hello there")) == ["all"]
+
+
+def test_command_prefixes_and_aliases() -> None:
+    index, _ = _build()
+    assert _names(index, _event("help me")) == ["help", "all"]
+    assert _names(index, _event("h")) == ["help", "all"]
+    # 多余空白与 CommandFilter 一样被归一化
+    assert _names(index, _event("kb   search  foo")) == [
+        "kb_group",
+        "kb_search",
+        "all",
+    ]
+    # 未唤醒时指令 Handler 不会被选中
+    assert _names(index, _event("help", wake=False)) == ["all"]
+
+
+def test_regex_handlers_are_preselected() -> None:
+    index, _ = _build()
+    assert _names(index, _event("12345", wake=False)) == ["regex", "all"]
+
+
+def test_index_is_rebuilt_when_registry_changes() -> None:
+    registry = SimpleNamespace(generation=0, handlers=[_md("a", CommandFilter("a"))])
+    registry.get_handlers_by_event_type = lambda event_type, plugins_name: list(
+        registry.handlers
+    )
+
+    with patch.object(dispatch_index, "star_handlers_registry", registry):
+        first = get_dispatch_index(None)
+        assert get_dispatch_index(None) is first
+
+        registry.handlers.append(_md("b", CommandFilter("b")))
+        registry.generation += 1
+        second = get_dispatch_index(None)
+
+    assert second is not first
+    assert _names(second, _event("b")) == ["b"]
@@ -0,0 +1,152 @@
+import asyncio
+
+import faiss
+import numpy as np
+import pytest
+
+from astrbot.core.db.vec_db.faiss_impl.embedding_storage import (
+    MIN_TRAIN_VECTORS,
+    EmbeddingStorage,
+    normalize_index_params,
+)
+
+DIM = 16
+
+
+def _vectors(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).random((n, DIM), dtype=np.float32)
+
+
+async def _open(*args, **kwargs) -> EmbeddingStorage:
+    storage = EmbeddingStorage(DIM, *args, **kwargs)
+    await storage.initialize()
+    return storage
+
+
+@pytest.mark.asyncio
+async def test_migrate_flat_to_hnsw_and_tombstone_deletes(tmp_path) -> None:
+    path = str(tmp_path / "index.faiss")
+    storage = await _open(path)
+    vectors = _vectors(200)
+    await storage.insert_batch(vectors, list(range(1, 201)))
+
+    storage.configure("hnsw", {"m": 16})
+    assert storage.needs_rebuild()
+    await storage.rebuild()
+    assert storage.current_type == "hnsw"
+    assert not storage.needs_rebuild()
+
+    await storage.delete([1])
+    _, indices = await storage.search(vectors[:1].copy(), 5)
+    assert 1 not in indices[0]
+
+    reloaded = await _open(path, index_type="hnsw", index_params={"m": 16})
+    assert reloaded.current_type == "hnsw"
+    assert reloaded.tombstones == {1}
+    assert not reloaded.needs_rebuild()
+
+
+@pytest.mark.asyncio
+async def test_ivf_waits_for_enough_training_vectors(tmp_path) -> None:
+    storage = await _open(str(tmp_path / "index.faiss"), "ivf_flat")
+    await storage.insert_batch(_vectors(100), list(range(100)))
+    assert not storage.needs_rebuild()
+
+    await storage.insert_batch(
+        _vectors(MIN_TRAIN_VECTORS, seed=1),
+        list(range(100, 100 + MIN_TRAIN_VECTORS)),
+    )
+    assert storage.needs_rebuild()
+    await storage.rebuild()
+    assert storage.current_type == "ivf_flat"
+    assert storage.index.ntotal == 100 + MIN_TRAIN_VECTORS
+
+    await storage.delete([0, 1])
+    assert storage.index.ntotal == 98 + MIN_TRAIN_VECTORS
+
+    report = await storage.evaluate(sample_size=20, k=5)
+    assert report["index_type"] == "ivf_flat"
+    assert 0.0 <= report["recall"] <= 1.0
+    assert report["latency_ms"] >= 0
+
+
+def test_normalize_index_params_rejects_unknown_type() -> None:
+    with pytest.raises(ValueError):
+        normalize_index_params("lsh")
+    assert normalize_index_params("hnsw")["ef_search"] == 64
+
+
+@pytest.mark.asyncio
+async def test_writes_are_coalesced_and_recovered_from_wal(tmp_path) -> None:
+    path = str(tmp_path / "index.faiss")
+    storage = await _open(path, flush_interval=3600)
+    vectors = _vectors(10)
+    for i in range(10):
+        await storage.insert(vectors[i], i)
+    await storage.delete([3])
+
+    # nothing has been snapshotted yet, only the delta log was written
+    assert not (tmp_path / "index.faiss").exists()
+    assert (tmp_path / "index.faiss.wal").stat().st_size > 0
+
+    # simulate a crash: reopen without flushing
+    recovered = await _open(path)
+    assert recovered.index.ntotal == 9
+    assert (tmp_path / "index.faiss").exists()
+    assert (tmp_path / "index.faiss.wal").stat().st_size == 0
+
+    # flushing the stale instance on shutdown must not duplicate vectors
+    await storage.close()
+    assert (await _open(path)).index.ntotal == 9
+
+
+@pytest.mark.asyncio
+async def test_flush_threshold_triggers_background_snapshot(tmp_path) -> None:
+    path = str(tmp_path / "index.faiss")
+    storage = await _open(path, flush_interval=3600, flush_threshold=5)
+    await storage.insert_batch(_vectors(5), list(range(5)))
+    await asyncio.sleep(0.2)
+
+    assert (tmp_path / "index.faiss").exists()
+    assert storage._dirty == 0
+    await storage.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf_flat"])
+async def test_get_vectors_by_id(tmp_path, index_type) -> None:
+    storage = await _open(str(tmp_path / "index.faiss"), index_type)
+    vectors = _vectors(MIN_TRAIN_VECTORS)
+    await storage.insert_batch(vectors, list(range(MIN_TRAIN_VECTORS)))
+    await storage.rebuild()
+    await storage.delete([3])
+
+    found = await storage.get_vectors([2, 3, 7, 10**6])
+
+    assert sorted(found) == [2, 7]
+    np.testing.assert_allclose(found[2], vectors[2], rtol=1e-5)
+    np.testing.assert_allclose(found[7], vectors[7], rtol=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_torn_wal_tail_is_truncated_before_new_writes(tmp_path) -> None:
+    path = str(tmp_path / "index.faiss")
+    storage = await _open(path, flush_interval=3600)
+    vectors = _vectors(3)
+    await storage.insert_batch(vectors[:2], [1, 2])
+    await storage.close()
+
+    # crash while appending: only part of a record reached the log
+    wal = tmp_path / "index.faiss.wal"
+    assert wal.stat().st_size == 0
+    wal.write_bytes(b"\x01\x05\x00\x00\x00partial")
+
+    restarted = await _open(path, flush_interval=3600)
+    assert restarted.index.ntotal == 2
+    assert wal.stat().st_size == 0
+    await restarted.insert(vectors[2], 7)
+
+    # crash again before the snapshot: the new record must still be replayed
+    recovered = await _open(path)
+    ids = sorted(faiss.vector_to_array(recovered.index.id_map).tolist())
+    assert ids == [1, 2, 7]
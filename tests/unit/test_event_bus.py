@@ -6,7 +6,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from astrbot.core.event_bus import EventBus
+from astrbot.core.event_bus import DispatchLane, EventBus
 
 
 @pytest.fixture
@@ -699,3 +699,116 @@ class TestEventFiltering:
 
             # Verify error was logged for missing scheduler
             mock_logger.error.assert_called_once()
+
+
+def _lane_event(umo: str, text: str = "msg") -> MagicMock:
+    event = MagicMock()
+    event.unified_msg_origin = umo
+    event.get_message_outline.return_value = text
+    event.send = AsyncMock()
+    return event
+
+
+class TestDispatchLane:
+    """Tests for concurrency limits, ordering and overload policies."""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_and_session_order(self):
+        release = asyncio.Event()
+        started: list[str] = []
+        active = 0
+        peak = 0
+
+        async def execute(event):
+            nonlocal active, peak
+            started.append(event.get_message_outline())
+            active += 1
+            peak = max(peak, active)
+            await release.wait()
+            active -= 1
+
+        scheduler = MagicMock()
+        scheduler.execute = AsyncMock(side_effect=execute)
+        lane = DispatchLane("conf", {"conf": scheduler}.get)
+        lane.configure({"max_concurrency": 1})
+
+        for text in ("a1", "a2", "a3"):
+            lane.submit(_lane_event("big-group", text))
+        lane.submit(_lane_event("other", "b1"))
+        await asyncio.sleep(0)
+        assert started == ["a1"]
+        assert lane.pending == 3
+
+        release.set()
+        for _ in range(20):
+            await asyncio.sleep(0)
+        # 同一会话内按顺序执行, 各会话轮流获得执行机会
+        assert started == ["a1", "a2", "b1", "a3"]
+        assert peak == 1
+        assert lane.stats()["processed"] == 4
+
+    @pytest.mark.asyncio
+    async def test_session_concurrency_serializes_session(self):
+        release = asyncio.Event()
+        async def execute(event):  # noqa: ARG001
+            await release.wait()
+
+        scheduler = MagicMock()
+        scheduler.execute = AsyncMock(side_effect=execute)
+        lane = DispatchLane("conf", {"conf": scheduler}.get)
+        lane.configure({"max_concurrency": 8, "session_concurrency": 1})
+
+        lane.submit(_lane_event("s"))
+        lane.submit(_lane_event("s"))
+        await asyncio.sleep(0)
+        assert lane.inflight == 1
+        assert lane.pending == 1
+
+        release.set()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert lane.inflight == 0
+        assert scheduler.execute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_overload_policies(self):
+        async def execute(event):  # noqa: ARG001
+            await asyncio.sleep(3600)
+
+        scheduler = MagicMock()
+        scheduler.execute = AsyncMock(side_effect=execute)
+
+        lane = DispatchLane("conf", {"conf": scheduler}.get)
+        lane.configure({"max_concurrency": 1, "max_pending": 2})
+        for text in ("running", "old", "mid", "new"):
+            lane.submit(_lane_event(f"u-{text}", text))
+        await asyncio.sleep(0)
+        assert lane.dropped == 1
+        assert [q[0].event.get_message_outline() for q in lane._sessions.values()] == [
+            "mid",
+            "new",
+        ]
+
+        lane.configure(
+            {"max_concurrency": 1, "max_pending": 2, "overload_policy": "coalesce"}
+        )
+        assert lane.submit(_lane_event("u-mid", "mid2"))
+        assert lane.coalesced == 1
+        assert lane.pending == 2
+
+        lane.configure(
+            {
+                "max_concurrency": 1,
+                "max_pending": 2,
+                "overload_policy": "reject",
+                "overload_reply": "busy",
+            }
+        )
+        rejected = _lane_event("u-x")
+        assert not lane.submit(rejected)
+        await asyncio.sleep(0)
+        rejected.send.assert_awaited_once()
+        assert lane.stats()["rejected"] == 1
+
+        for task in list(lane._tasks):
+            task.cancel()
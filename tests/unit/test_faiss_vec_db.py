@@ -1,8 +1,14 @@
+import asyncio
 from unittest.mock import AsyncMock
 
 import pytest
 
+from astrbot.core.db.vec_db.faiss_impl.embedding_storage import (
+    EmbeddingStorage,
+    reconstruct_vectors,
+)
 from astrbot.core.db.vec_db.faiss_impl.vec_db import FaissVecDB
+from astrbot.core.provider.provider import EmbeddingProvider
 
 
 @pytest.mark.asyncio
@@ -18,3 +24,148 @@ async def test_insert_batch_skips_empty_contents() -> None:
     vec_db.embedding_provider.get_embeddings_batch.assert_not_awaited()
     vec_db.document_storage.insert_documents_batch.assert_not_awaited()
     vec_db.embedding_storage.insert_batch.assert_not_awaited()
+
+
+class _FakeEmbeddingProvider(EmbeddingProvider):
+    """Embeds "i" as [i, 1, 0, 0]; earlier batches take longer to finish."""
+
+    def __init__(self, fail_texts: set[str] | None = None) -> None:
+        super().__init__({}, {})
+        self.fail_texts = fail_texts or set()
+        self.embedded: list[str] = []
+
+    async def get_embedding(self, text: str) -> list[float]:
+        return [float(text), 1.0, 0.0, 0.0]
+
+    async def get_embeddings(self, text: list[str]) -> list[list[float]]:
+        if self.fail_texts.intersection(text):
+            raise RuntimeError("boom")
+        await asyncio.sleep(0.01 * (10 - int(text[0]) % 10))
+        self.embedded.extend(text)
+        return [await self.get_embedding(t) for t in text]
+
+    def get_dim(self) -> int:
+        return 4
+
+
+@pytest.mark.asyncio
+async def test_get_embeddings_batch_keeps_submission_order() -> None:
+    provider = _FakeEmbeddingProvider()
+    texts = [str(i) for i in range(10)]
+
+    vectors = await provider.get_embeddings_batch(texts, batch_size=1, tasks_limit=5)
+
+    assert [v[0] for v in vectors] == list(range(10))
+
+
+class _FakeDocumentStorage:
+    def __init__(self) -> None:
+        self.docs: dict[int, str] = {}
+        self.hashes: dict[int, str] = {}
+        self.next_id = 1000
+
+    async def insert_documents_batch(self, doc_ids, texts, metadatas) -> list[int]:
+        int_ids = list(range(self.next_id, self.next_id + len(doc_ids)))
+        self.next_id += len(doc_ids)
+        self.docs.update(zip(int_ids, doc_ids))
+        for int_id, metadata in zip(int_ids, metadatas):
+            if "content_hash" in metadata:
+                self.hashes[int_id] = metadata["content_hash"]
+        return int_ids
+
+    async def get_ids_by_content_hashes(self, hashes: list[str]) -> dict[str, int]:
+        return {h: i for i, h in self.hashes.items() if h in hashes}
+
+    async def delete_documents_by_ids(self, ids: list[int]) -> None:
+        for i in ids:
+            self.docs.pop(i, None)
+
+
+def _make_vec_db(provider) -> FaissVecDB:
+    vec_db = FaissVecDB.__new__(FaissVecDB)
+    vec_db.embedding_provider = provider
+    vec_db.document_storage = _FakeDocumentStorage()
+    vec_db.embedding_storage = EmbeddingStorage(provider.get_dim())
+    return vec_db
+
+
+@pytest.mark.asyncio
+async def test_insert_batch_keeps_completed_batches_for_resume() -> None:
+    provider = _FakeEmbeddingProvider(fail_texts={"6"})
+    vec_db = _make_vec_db(provider)
+    texts = [str(i) for i in range(10)]
+    ids = [f"chunk-{i}" for i in range(10)]
+    checkpoints: list[tuple[int, list[int]]] = []
+
+    async def checkpoint(completed: int, int_ids: list[int]) -> None:
+        checkpoints.append((completed, int_ids))
+
+    with pytest.raises(Exception, match="批次 3"):
+        await vec_db.insert_batch(
+            texts,
+            ids=ids,
+            batch_size=2,
+            tasks_limit=2,
+            max_retries=1,
+            checkpoint_callback=checkpoint,
+        )
+    completed = checkpoints[-1][0]
+    assert [c for c, _ in checkpoints] == [2, 4, 6]
+    assert len(vec_db.document_storage.docs) == completed
+    assert vec_db.embedding_storage.index.ntotal == completed
+
+    provider.fail_texts = set()
+    await vec_db.insert_batch(
+        texts[completed:],
+        ids=ids[completed:],
+        batch_size=2,
+        checkpoint_callback=checkpoint,
+    )
+    docs = vec_db.document_storage.docs
+    assert sorted(docs.values()) == sorted(ids)
+    # every vector is stored under the id of its own text
+    int_ids, vectors = reconstruct_vectors(vec_db.embedding_storage.index)
+    for int_id, vector in zip(int_ids, vectors):
+        assert docs[int(int_id)] == f"chunk-{int(vector[0])}"
+
+
+@pytest.mark.asyncio
+async def test_insert_batch_rolls_back_without_checkpoint() -> None:
+    vec_db = _make_vec_db(_FakeEmbeddingProvider(fail_texts={"6"}))
+
+    with pytest.raises(Exception):
+        await vec_db.insert_batch(
+            [str(i) for i in range(10)], batch_size=2, max_retries=1
+        )
+
+    assert vec_db.document_storage.docs == {}
+    assert vec_db.embedding_storage.index.ntotal == 0
+
+
+@pytest.mark.asyncio
+async def test_insert_batch_reuses_existing_vectors() -> None:
+    provider = _FakeEmbeddingProvider()
+    vec_db = _make_vec_db(provider)
+    await vec_db.insert_batch(["1", "2", "3"], batch_size=2, reuse_vectors=True)
+    assert sorted(provider.embedded) == ["1", "2", "3"]
+
+    provider.embedded.clear()
+    progress: list[tuple[int, int]] = []
+
+    async def on_progress(current: int, total: int) -> None:
+        progress.append((current, total))
+
+    texts = ["2", "4", "4", "3", "5"]
+    int_ids = await vec_db.insert_batch(
+        texts,
+        ids=[f"chunk-{i}" for i in range(5)],
+        batch_size=2,
+        progress_callback=on_progress,
+        reuse_vectors=True,
+    )
+
+    # only new, distinct texts are embedded
+    assert sorted(provider.embedded) == ["4", "5"]
+    assert progress == [(2, 5), (4, 5), (5, 5)]
+    stored = await vec_db.embedding_storage.get_vectors(int_ids)
+    assert [stored[i][0] for i in int_ids] == [2.0, 4.0, 4.0, 3.0, 5.0]
@@ -0,0 +1,160 @@
+"""Tests for parsing and chunking documents in the ingest process pool."""
+
+import pytest
+import pytest_asyncio
+
+from astrbot.core.knowledge_base.chunking.recursive import RecursiveCharacterChunker
+from astrbot.core.knowledge_base.ingest_pool import PAGES_PER_TASK, IngestPool
+from astrbot.core.knowledge_base.parsers.pdf_parser import PDFParser
+
+
+def make_pdf(pages: list[str]) -> bytes:
+    """Build a minimal PDF with one line of Helvetica text per page."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (len(objects)),
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = (
+        f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(out)
+
+
+class UnpicklableChunker(RecursiveCharacterChunker):
+    def __init__(self) -> None:
+        super().__init__()
+        self.hook = lambda text: text
+
+
+@pytest_asyncio.fixture
+async def pool():
+    pool = IngestPool(max_workers=2)
+    yield pool
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pdf_pages_are_parsed_in_order(pool: IngestPool):
+    page_count = PAGES_PER_TASK * 2 + 3
+    pdf = make_pdf([f"Page number {i}" for i in range(page_count)])
+    assert PDFParser.count_pages(pdf) == page_count
+
+    chunker = RecursiveCharacterChunker()
+    progress = []
+
+    async def on_progress(done, total):
+        progress.append((done, total))
+
+    segments = [
+        segment
+        async for segment in pool.iter_segments(
+            pdf,
+            "doc.pdf",
+            "pdf",
+            chunker,
+            chunk_size=512,
+            chunk_overlap=0,
+            cpu_budget=2,
+            progress_callback=on_progress,
+        )
+    ]
+
+    assert len(segments) == 3
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    for idx, (chunks, media) in enumerate(segments):
+        start = idx * PAGES_PER_TASK
+        expected = PDFParser.parse_pages(pdf, start, start + PAGES_PER_TASK)
+        assert chunks == await chunker.chunk(
+            expected.text, chunk_size=512, chunk_overlap=0
+        )
+        assert media == []
+    text = "".join(chunk for chunks, _ in segments for chunk in chunks)
+    positions = [text.index(f"Page number {i}") for i in range(page_count)]
+    assert positions == sorted(positions)
+
+
+@pytest.mark.asyncio
+async def test_unpicklable_chunker_runs_on_the_event_loop(pool: IngestPool):
+    pdf = make_pdf(["alpha", "beta"])
+    segments = [
+        segment
+        async for segment in pool.iter_segments(
+            pdf,
+            "doc.pdf",
+            "pdf",
+            UnpicklableChunker(),
+            chunk_size=512,
+            chunk_overlap=0,
+        )
+    ]
+    assert len(segments) == 1
+    chunks, _ = segments[0]
+    assert "alpha" in chunks[0]
+    assert "beta" in chunks[0]
+
+
+@pytest.mark.asyncio
+async def test_parse_errors_are_raised(pool: IngestPool):
+    with pytest.raises(Exception):
+        async for _ in pool.iter_segments(
+            b"not a pdf",
+            "broken.pdf",
+            "pdf",
+            RecursiveCharacterChunker(),
+            chunk_size=512,
+            chunk_overlap=0,
+        ):
+            pass
+
+
+def _loaded_astrbot_modules() -> list[str]:
+    import sys
+
+    return sorted(name for name in sys.modules if name.startswith("astrbot"))
+
+
+@pytest.mark.asyncio
+async def test_worker_does_not_initialize_astrbot_core(pool: IngestPool):
+    pdf = make_pdf(["alpha"])
+    async for _ in pool.iter_segments(
+        pdf,
+        "doc.pdf",
+        "pdf",
+        RecursiveCharacterChunker(),
+        chunk_size=512,
+        chunk_overlap=0,
+    ):
+        pass
+
+    modules = await pool.run(_loaded_astrbot_modules)
+    assert "astrbot.core.knowledge_base.ingest_worker" in modules
+    assert "astrbot.core.config" not in modules
+    assert "astrbot.core.db" not in modules
+    assert "astrbot.core.log" not in modules
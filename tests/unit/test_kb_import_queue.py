@@ -0,0 +1,203 @@
+"""Tests for the persistent knowledge base import queue."""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from astrbot.core.knowledge_base.import_queue import (
+    ImportItem,
+    KBImportQueue,
+    compute_content_hash,
+)
+from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
+from astrbot.core.knowledge_base.models import KBDocument
+
+
+class FakeKBHelper:
+    def __init__(self, kb_db: KBSQLiteDatabase, fail_names: set[str] | None = None):
+        self.kb_db = kb_db
+        self.fail_names = fail_names or set()
+        self.uploads: list[dict] = []
+
+    async def upload_document(self, **kwargs) -> KBDocument:
+        self.uploads.append(kwargs)
+        if kwargs["file_name"] in self.fail_names:
+            raise RuntimeError("embedding failed")
+        source = kwargs["pre_chunked_text"] or kwargs["file_content"]
+        doc = KBDocument(
+            kb_id="kb",
+            doc_name=kwargs["file_name"],
+            file_type=kwargs["file_type"],
+            file_size=len(source),
+            file_path="",
+            content_hash=compute_content_hash(source),
+        )
+        async with self.kb_db.get_db() as session, session.begin():
+            session.add(doc)
+        return doc
+
+
+class FakeKBManager:
+    def __init__(self, kb_db: KBSQLiteDatabase, helper: FakeKBHelper) -> None:
+        self.kb_db = kb_db
+        self.helper = helper
+
+    async def get_kb(self, kb_id: str):
+        return self.helper if kb_id == "kb" else None
+
+
+@pytest_asyncio.fixture
+async def kb_db(tmp_path):
+    db = KBSQLiteDatabase(str(tmp_path / "kb.db"))
+    await db.initialize()
+    yield db
+    await db.close()
+
+
+def make_queue(kb_db, tmp_path, **helper_kwargs) -> tuple[KBImportQueue, FakeKBHelper]:
+    helper = FakeKBHelper(kb_db, **helper_kwargs)
+    queue = KBImportQueue(FakeKBManager(kb_db, helper), tmp_path / "staging")  # type: ignore
+    return queue, helper
+
+
+def write_upload(tmp_path, name: str, content: bytes) -> str:
+    path = tmp_path / f"upload_{name}"
+    path.write_bytes(content)
+    return str(path)
+
+
+async def wait_for_job(queue: KBImportQueue, job_id: str) -> dict:
+    for _ in range(200):
+        job = await queue.get_job(job_id)
+        assert job is not None
+        if job["status"] in ("completed", "partial", "failed", "cancelled"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job not finished: {job}")
+
+
+@pytest.mark.asyncio
+async def test_import_skips_duplicate_documents(kb_db, tmp_path):
+    queue, helper = make_queue(kb_db, tmp_path)
+    await queue.start()
+    try:
+        job = await queue.submit(
+            "kb",
+            [
+                ImportItem("a.txt", "txt", path=write_upload(tmp_path, "a", b"same")),
+                ImportItem("b.txt", "txt", path=write_upload(tmp_path, "b", b"same")),
+                ImportItem("c.txt", "txt", chunks=["one", "two"]),
+            ],
+            {"chunk_size": 256, "batch_size": None},
+        )
+        result = await wait_for_job(queue, job.job_id)
+    finally:
+        await queue.stop()
+
+    files = {f["file_name"]: f for f in result["files"]}
+    assert result["status"] == "completed"
+    assert result["counts"] == {"completed": 2, "skipped": 1}
+    assert files["a.txt"]["status"] == "completed"
+    assert files["b.txt"]["status"] == "skipped"
+    assert files["b.txt"]["doc_id"] == files["a.txt"]["doc_id"]
+    uploads = {u["file_name"]: u for u in helper.uploads}
+    assert len(helper.uploads) == 2
+    assert uploads["a.txt"]["chunk_size"] == 256
+    assert uploads["a.txt"]["batch_size"] == 32
+    assert uploads["c.txt"]["pre_chunked_text"] == ["one", "two"]
+    assert not (tmp_path / "staging" / job.job_id).exists()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_files_resume_after_restart(kb_db, tmp_path):
+    queue, _ = make_queue(kb_db, tmp_path)
+    job = await queue.submit(
+        "kb",
+        [ImportItem("a.txt", "txt", path=write_upload(tmp_path, "a", b"a"))],
+    )
+    # a worker claimed the file, then the process exited
+    claimed = await kb_db.claim_next_import_file()
+    assert claimed is not None
+    assert (await queue.get_job(job.job_id))["status"] == "processing"
+
+    restarted, helper = make_queue(kb_db, tmp_path)
+    await restarted.start()
+    try:
+        result = await wait_for_job(restarted, job.job_id)
+    finally:
+        await restarted.stop()
+    assert result["counts"] == {"completed": 1}
+    assert helper.uploads[0]["file_content"] == b"a"
+
+
+@pytest.mark.asyncio
+async def test_failed_files_can_be_retried(kb_db, tmp_path):
+    queue, helper = make_queue(kb_db, tmp_path, fail_names={"a.txt"})
+    await queue.start()
+    try:
+        job = await queue.submit(
+            "kb",
+            [
+                ImportItem("a.txt", "txt", path=write_upload(tmp_path, "a", b"a")),
+                ImportItem("b.txt", "txt", path=write_upload(tmp_path, "b", b"b")),
+            ],
+        )
+        result = await wait_for_job(queue, job.job_id)
+        assert result["status"] == "partial"
+        assert result["counts"] == {"completed": 1, "failed": 1}
+        failed = next(f for f in result["files"] if f["status"] == "failed")
+        assert failed["error"] == "embedding failed"
+
+        helper.fail_names.clear()
+        assert await queue.retry_job(job.job_id) == 1
+        result = await wait_for_job(queue, job.job_id)
+    finally:
+        await queue.stop()
+    assert result["status"] == "completed"
+    assert result["counts"] == {"completed": 2}
+    assert sorted(u["file_name"] for u in helper.uploads) == ["a.txt", "a.txt", "b.txt"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_pending_files(kb_db, tmp_path):
+    queue, helper = make_queue(kb_db, tmp_path)
+    job = await queue.submit(
+        "kb",
+        [ImportItem("a.txt", "txt", path=write_upload(tmp_path, "a", b"a"))],
+    )
+    assert await queue.cancel_job(job.job_id) == 1
+
+    result = await queue.get_job(job.job_id)
+    assert result["status"] == "cancelled"
+    assert result["counts"] == {"cancelled": 1}
+    assert not (tmp_path / "staging" / job.job_id).exists()
+    assert helper.uploads == []
+
+
+@pytest.mark.asyncio
+async def test_job_fails_when_no_file_is_imported(kb_db, tmp_path):
+    queue, _ = make_queue(kb_db, tmp_path, fail_names={"a.txt"})
+    await queue.start()
+    try:
+        job = await queue.submit(
+            "kb",
+            [ImportItem("a.txt", "txt", path=write_upload(tmp_path, "a", b"a"))],
+        )
+        result = await wait_for_job(queue, job.job_id)
+    finally:
+        await queue.stop()
+    assert result["status"] == "failed"
+    assert result["counts"] == {"failed": 1}
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_unknown_file_type(kb_db, tmp_path):
+    queue, _ = make_queue(kb_db, tmp_path)
+    upload = write_upload(tmp_path, "a", b"a")
+    with pytest.raises(ValueError):
+        await queue.submit("kb", [ImportItem("README", "", path=upload)])
+    assert await queue.list_jobs("kb") == []
+    assert not (tmp_path / "staging").exists() or not any(
+        (tmp_path / "staging").iterdir()
+    )
@@ -0,0 +1,95 @@
+from unittest.mock import MagicMock
+
+from astrbot.core.agent.tool import FunctionTool
+from astrbot.core.persona_bundle import PersonaBundleCache
+from astrbot.core.provider.entities import ProviderRequest
+from astrbot.core.provider.func_tool_manager import FunctionToolManager
+
+
+def _tool(name: str, active: bool = True) -> FunctionTool:
+    return FunctionTool(
+        name=name,
+        parameters={"type": "object", "properties": {}},
+        description=name,
+        active=active,
+    )
+
+
+def _context(tmgr: FunctionToolManager, orch_cfg: dict | None = None):
+    ctx = MagicMock()
+    ctx.get_llm_tool_manager.return_value = tmgr
+    ctx.get_config.return_value = {"subagent_orchestrator": orch_cfg or {}}
+    ctx.persona_manager = MagicMock(version=0)
+    ctx.persona_manager.get_persona_v3_by_id.return_value = None
+    ctx.subagent_orchestrator = None
+    return ctx
+
+
+def test_bundle_reused_until_tools_change():
+    tmgr = FunctionToolManager()
+    tmgr.func_list.extend([_tool("a"), _tool("b", active=False)])
+    ctx = _context(tmgr)
+    cache = PersonaBundleCache()
+    persona = {
+        "name": "p",
+        "prompt": "be nice",
+        "tools": None,
+        "_begin_dialogs_processed": [{"role": "user", "content": "hi"}],
+    }
+
+    bundle = cache.get(ctx, persona, False)
+    assert bundle.persona_prompt == "\n# Persona Instructions\n\nbe nice\n"
+    assert bundle.persona_tool_names == ["a"]
+    assert cache.get(ctx, persona, False) is bundle
+
+    req = ProviderRequest()
+    bundle.apply_begin_dialogs(req)
+    bundle.apply_tools(req)
+    req.contexts[0]["content"] = "changed"
+    req.func_tool.add_tool(_tool("extra"))
+    assert persona["_begin_dialogs_processed"][0]["content"] == "hi"
+    assert cache.get(ctx, persona, False).persona_tool_names == ["a"]
+
+    # 直接修改 func_list 也会使缓存失效
+    tmgr.func_list.append(_tool("c"))
+    rebuilt = cache.get(ctx, persona, False)
+    assert rebuilt is not bundle
+    assert rebuilt.persona_tool_names == ["a", "c"]
+
+    ctx.persona_manager.version = 1
+    assert cache.get(ctx, persona, False) is not rebuilt
+
+
+def test_bundle_with_subagents_removes_assigned_tools():
+    tmgr = FunctionToolManager()
+    tmgr.func_list.extend([_tool("a"), _tool("b")])
+    ctx = _context(
+        tmgr,
+        {
+            "main_enable": True,
+            "remove_main_duplicate_tools": True,
+            "router_system_prompt": "route wisely",
+            "agents": [{"name": "planner", "tools": ["a"]}],
+        },
+    )
+    handoff = _tool("transfer_to_planner")
+    ctx.subagent_orchestrator = MagicMock(handoffs=[handoff])
+    cache = PersonaBundleCache()
+
+    bundle = cache.get(ctx, None, False)
+    assert bundle.router_prompt == "\nroute wisely\n"
+
+    req = ProviderRequest()
+    bundle.apply_tools(req)
+    assert req.func_tool.names() == ["b", "transfer_to_planner"]
+
+    # 请求已带有工具时按原顺序合并
+    req = ProviderRequest()
+    req.func_tool = MagicMock()
+    req.func_tool.__bool__.return_value = True
+    bundle.apply_tools(req)
+    req.func_tool.remove_tool.assert_called_once_with("a")
+
+    # 子代理配置变化后重建
+    ctx.subagent_orchestrator = MagicMock(handoffs=[])
+    assert cache.get(ctx, None, False).handoffs == ()
@@ -0,0 +1,136 @@
+"""Tests for pipeline latency histograms and the profiler."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from astrbot.core.pipeline.profiler import PipelineProfiler, pipeline_profiler
+from astrbot.core.pipeline.scheduler import PipelineScheduler
+from astrbot.core.pipeline.stage import Stage
+from astrbot.core.star.star import star_map
+from astrbot.core.star.star_handler import EventType, StarHandlerMetadata
+from astrbot.core.utils.histogram import RollingHistogram
+
+
+def test_histogram_quantiles_within_bucket_error() -> None:
+    histogram = RollingHistogram()
+    for i in range(1, 1001):
+        histogram.observe(i / 1000)
+
+    quantiles = histogram.quantiles((0.5, 0.95, 0.99))
+
+    assert quantiles["window_count"] == 1000
+    assert quantiles["max"] == 1.0
+    assert quantiles[0.5] == pytest.approx(0.5, rel=0.05)
+    assert quantiles[0.95] == pytest.approx(0.95, rel=0.05)
+    assert quantiles[0.99] <= 1.0
+    assert histogram.total == pytest.approx(500.5)
+
+
+def test_empty_histogram_reports_zero() -> None:
+    quantiles = RollingHistogram().quantiles((0.5,))
+    assert quantiles == {"window_count": 0, "max": 0.0, 0.5: 0.0}
+
+
+def test_profiler_labels_and_prometheus_output() -> None:
+    profiler = PipelineProfiler()
+    token = profiler.set_labels("default", "aiocqhttp")
+    try:
+        profiler.observe_stage("WakingCheckStage", 0.002)
+        profiler.observe_handler('plugin."quoted".handler', 0.01)
+    finally:
+        profiler.reset_labels(token)
+
+    snapshot = profiler.snapshot()
+    stage = snapshot["stage"][0]
+    assert stage["name"] == "WakingCheckStage"
+    assert (stage["conf_id"], stage["platform"]) == ("default", "aiocqhttp")
+    assert stage["count"] == 1
+    assert stage["p95_ms"] == pytest.approx(2.0, rel=0.05)
+
+    text = profiler.render_prometheus()
+    assert "# TYPE astrbot_pipeline_stage_seconds summary" in text
+    assert (
+        'astrbot_pipeline_stage_seconds_count{conf_id="default",'
+        'platform="aiocqhttp",stage="WakingCheckStage"} 1'
+    ) in text
+    assert 'handler="plugin.\\"quoted\\".handler",quantile="0.99"' in text
+
+
+class _Stage(Stage):
+    async def initialize(self, ctx) -> None:
+        pass
+
+    async def process(self, event) -> None:
+        pass
+
+
+class _OnionStage(_Stage):
+    async def process(self, event):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_scheduler_records_each_stage() -> None:
+    pipeline_profiler.reset()
+    event = MagicMock()
+    event.is_stopped.return_value = False
+    event.get_platform_name.return_value = "test"
+    ctx = MagicMock()
+    ctx.astrbot_config_id = "conf"
+    scheduler = PipelineScheduler(ctx)
+    scheduler.stages = [_OnionStage(), _Stage()]
+    scheduler.compile()
+
+    token = pipeline_profiler.set_labels("conf", "test")
+    try:
+        await scheduler._process_stages(event)
+    finally:
+        pipeline_profiler.reset_labels(token)
+
+    stages = {s["name"]: s for s in pipeline_profiler.snapshot()["stage"]}
+    assert stages["_OnionStage"]["count"] == 1
+    # 洋葱阶段之后的阶段会再执行一次
+    assert stages["_Stage"]["count"] == 2
+    assert stages["_Stage"]["conf_id"] == "conf"
+    pipeline_profiler.reset()
+
+
+@pytest.mark.asyncio
+async def test_failed_handler_latency_is_recorded(monkeypatch) -> None:
+    # 直接导入 star_request 会触发循环导入, 需在 pipeline 加载之后导入
+    from astrbot.core.pipeline.process_stage.method.star_request import (
+        StarRequestSubStage,
+    )
+
+    pipeline_profiler.reset()
+
+    async def handler(event):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    metadata = StarHandlerMetadata(
+        event_type=EventType.AdapterMessageEvent,
+        handler_full_name="fake_plugin_handler",
+        handler_name="handler",
+        handler_module_path="fake_plugin",
+        handler=handler,
+        event_filters=[],
+    )
+    monkeypatch.setitem(star_map, "fake_plugin", SimpleNamespace(name="fake"))
+    event = MagicMock()
+    event.get_extra.side_effect = {
+        "activated_handlers": [metadata],
+        "handlers_parsed_params": {},
+    }.get
+    event.is_stopped.return_value = True
+
+    async for _ in StarRequestSubStage().process(event):
+        pass
+
+    handlers = {h["name"]: h for h in pipeline_profiler.snapshot()["handler"]}
+    assert handlers["fake.handler"]["count"] == 1
+    assert handlers["fake.handler"]["max_ms"] >= 10
+    pipeline_profiler.reset()
@@ -0,0 +1,109 @@
+"""Tests for the compiled stage chain in PipelineScheduler."""
+
+from collections.abc import AsyncGenerator
+from unittest.mock import MagicMock
+
+import pytest
+
+from astrbot.core.pipeline.scheduler import PipelineScheduler
+from astrbot.core.pipeline.stage import Stage
+
+
+class RecordingStage(Stage):
+    def __init__(self, name: str, log: list[str]) -> None:
+        self.name = name
+        self.log = log
+
+    async def initialize(self, ctx) -> None:
+        pass
+
+    async def process(self, event) -> None:
+        self.log.append(self.name)
+
+
+class OnionStage(RecordingStage):
+    async def process(self, event) -> AsyncGenerator[None, None]:
+        self.log.append(f"{self.name}:before")
+        yield
+        self.log.append(f"{self.name}:after")
+
+
+class SkippedStage(RecordingStage):
+    def __init__(self, name: str, log: list[str]) -> None:
+        super().__init__(name, log)
+        self.process = MagicMock(side_effect=AssertionError("should be skipped"))
+
+    def applies(self, event) -> bool:
+        return False
+
+
+class StoppingStage(RecordingStage):
+    async def process(self, event) -> None:
+        self.log.append(self.name)
+        event.stop_event()
+
+
+def _event() -> MagicMock:
+    event = MagicMock()
+    stopped = False
+
+    def stop_event() -> None:
+        nonlocal stopped
+        stopped = True
+
+    event.stop_event.side_effect = stop_event
+    event.is_stopped.side_effect = lambda: stopped
+    return event
+
+
+def _scheduler(stages: list[Stage]) -> PipelineScheduler:
+    scheduler = PipelineScheduler(MagicMock())
+    scheduler.stages = stages
+    scheduler.compile()
+    return scheduler
+
+
+def test_compile_detects_generators_and_predicates() -> None:
+    log: list[str] = []
+    scheduler = _scheduler(
+        [RecordingStage("a", log), OnionStage("b", log), SkippedStage("c", log)]
+    )
+
+    assert [c.is_generator for c in scheduler.chain] == [False, True, False]
+    assert scheduler.chain[0].applies is None
+    assert scheduler.chain[2].applies is not None
+
+
+@pytest.mark.asyncio
+async def test_skips_stages_and_keeps_onion_order() -> None:
+    log: list[str] = []
+    scheduler = _scheduler(
+        [
+            RecordingStage("a", log),
+            SkippedStage("skipped", log),
+            OnionStage("onion", log),
+            RecordingStage("b", log),
+        ]
+    )
+
+    await scheduler._process_stages(_event())
+
+    # 生成器阶段结束后, 后续阶段会再执行一次 (与原有调度语义一致)
+    assert log == ["a", "onion:before", "b", "onion:after", "b"]
+
+
+@pytest.mark.asyncio
+async def test_stop_event_halts_chain() -> None:
+    log: list[str] = []
+    scheduler = _scheduler(
+        [
+            RecordingStage("a", log),
+            StoppingStage("stop", log),
+            OnionStage("never", log),
+            RecordingStage("never", log),
+        ]
+    )
+
+    await scheduler._process_stages(_event())
+
+    assert log == ["a", "stop"]
@@ -0,0 +1,67 @@
+"""Tests for the in-memory pre-aggregating platform stats service."""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from astrbot.core.utils.platform_stats import PlatformStatsService
+
+
+@pytest.mark.asyncio
+async def test_record_flush_and_query(temp_db) -> None:
+    hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+    await temp_db.insert_platform_stats(
+        "qq", "aiocqhttp", count=5, timestamp=hour - timedelta(hours=2)
+    )
+    await temp_db.insert_platform_stats(
+        "qq", "aiocqhttp", count=100, timestamp=hour - timedelta(days=30)
+    )
+    service = PlatformStatsService(temp_db)
+
+    for _ in range(3):
+        service.record("qq", "aiocqhttp")
+    service.record("tg", "telegram", count=2)
+
+    # 查询不需要等待写入
+    assert await service.get_total_message_count() == 110
+    assert await service.get_grouped_stats(86400) == {"qq": 8, "tg": 2}
+
+    with patch.object(
+        temp_db,
+        "insert_platform_stats_batch",
+        wraps=temp_db.insert_platform_stats_batch,
+    ) as batch:
+        await service.flush()
+        await service.flush()  # 没有新增量时不访问数据库
+    assert batch.await_count == 1
+
+    rows = await temp_db.get_platform_stats_rows(hour)
+    assert {(r[1], r[3]) for r in rows} == {("qq", 3), ("tg", 2)}
+
+    service.record("qq", "aiocqhttp")
+    await service.flush()
+    rows = await temp_db.get_platform_stats_rows(hour)
+    assert {(r[1], r[3]) for r in rows} == {("qq", 4), ("tg", 2)}
+    assert await service.get_total_message_count() == 111
+    # 超出内存保留范围时回退到数据库
+    assert await service.get_grouped_stats(86400 * 60) == {"qq": 109, "tg": 2}
+    assert sum(count for _, count in service.get_minute_series()) == 6
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_retried(temp_db) -> None:
+    service = PlatformStatsService(temp_db)
+    service.record("qq", "aiocqhttp", count=2)
+
+    with patch.object(
+        temp_db,
+        "insert_platform_stats_batch",
+        AsyncMock(side_effect=RuntimeError("database is locked")),
+    ):
+        with pytest.raises(RuntimeError):
+            await service.flush()
+
+    service.record("qq", "aiocqhttp")
+    await service.flush()
+    assert await temp_db.get_platform_stats_total() == 3
@@ -0,0 +1,102 @@
+"""Tests for the hierarchical token-bucket rate limiter."""
+
+from unittest.mock import patch
+
+import pytest
+
+from astrbot.core.utils.rate_limiter import RateLimiter, TokenBucket
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = _Clock()
+    with patch("astrbot.core.utils.rate_limiter.time.monotonic", clock):
+        yield clock
+
+
+def test_bucket_refills_and_evicts_idle_keys() -> None:
+    bucket = TokenBucket("session", count=2, period=10)
+    bucket.consume("a", 0.0)
+    bucket.consume("a", 0.0)
+    assert bucket.wait_time("a", 0.0) == pytest.approx(5.0)
+    assert bucket.wait_time("a", 5.0) == 0.0
+
+    # 令牌补满的 key 在下一次写入时被清除
+    bucket.consume("b", 10.0)
+    assert len(bucket) == 1
+    assert bucket.evicted == 1
+
+
+def test_bucket_key_count_is_bounded() -> None:
+    bucket = TokenBucket("session", count=5, period=60, max_keys=3)
+    for idx in range(10):
+        bucket.consume(str(idx), 0.0)
+    assert len(bucket) == 3
+
+
+def test_disabled_bucket_keeps_no_state() -> None:
+    bucket = TokenBucket("global", count=0)
+    bucket.consume("", 0.0)
+    assert bucket.wait_time("", 0.0) == 0.0
+    assert len(bucket) == 0
+
+
+def test_discard_counts_dropped_against_bottleneck(clock) -> None:
+    limiter = RateLimiter()
+    session = limiter.tier("session")
+    session.configure(10, 60)
+    platform = limiter.tier("platform")
+    platform.configure(2, 60)
+
+    keys = [(session, "s1"), (platform, "qq")]
+    assert limiter.reserve(keys, stall=False, timeout=0) == 0.0
+    assert limiter.reserve(keys, stall=False, timeout=0) == 0.0
+    # 其他会话同样受到平台限额的约束
+    assert (
+        limiter.reserve([(session, "s2"), (platform, "qq")], stall=False, timeout=0)
+        is None
+    )
+
+    assert platform.dropped == 1
+    assert session.dropped == 0
+    assert limiter.stats()["dropped"] == 1
+
+
+def test_stall_queues_in_order_until_deadline(clock) -> None:
+    limiter = RateLimiter()
+    bucket = limiter.tier("global")
+    bucket.configure(1, 10)
+    keys = [(bucket, "")]
+
+    assert limiter.reserve(keys, stall=True, timeout=25) == 0.0
+    assert limiter.reserve(keys, stall=True, timeout=25) == pytest.approx(10.0)
+    assert limiter.reserve(keys, stall=True, timeout=25) == pytest.approx(20.0)
+    # 预计等待超过最长排队时间, 丢弃且不占用令牌
+    assert limiter.reserve(keys, stall=True, timeout=25) is None
+
+    clock.now += 15
+    assert limiter.reserve(keys, stall=True, timeout=25) == pytest.approx(15.0)
+    assert bucket.throttled == 3
+    assert bucket.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_acquire_sleeps_for_reserved_wait(clock) -> None:
+    limiter = RateLimiter()
+    bucket = limiter.tier("provider")
+    bucket.configure(1, 2)
+    keys = [(bucket, "openai")]
+
+    with patch("astrbot.core.utils.rate_limiter.asyncio.sleep") as sleep:
+        assert await limiter.acquire(keys, stall=True, timeout=60) == 0.0
+        sleep.assert_not_called()
+        assert await limiter.acquire(keys, stall=True, timeout=60) == pytest.approx(2.0)
+        sleep.assert_awaited_once_with(pytest.approx(2.0))
@@ -0,0 +1,190 @@
+import os
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import astrbot.api  # noqa: F401  先于 kb_helper 导入, 避免循环导入
+from astrbot.core.db.vec_db.base import Result
+from astrbot.core.knowledge_base.kb_helper import UPLOAD_CHECKPOINT_TTL, KBHelper
+from astrbot.core.knowledge_base.retrieval.manager import RetrievalManager
+from astrbot.core.knowledge_base.retrieval.rank_fusion import RankFusion
+
+
+def _kb_helper(kb_id: str, embedding_provider) -> SimpleNamespace:
+    vec_db = MagicMock()
+    vec_db.embedding_provider = embedding_provider
+    vec_db.rerank_provider = None
+    vec_db.retrieve = AsyncMock(
+        return_value=[
+            Result(
+                similarity=0.9,
+                data={
+                    "id": 1,
+                    "doc_id": f"{kb_id}-chunk",
+                    "text": f"content of {kb_id}",
+                    "metadata": (
+                        f'{{"kb_id": "{kb_id}", "kb_doc_id": "{kb_id}-doc",'
+                        ' "chunk_index": 0}'
+                    ),
+                },
+            ),
+        ],
+    )
+    kb = SimpleNamespace(
+        kb_id=kb_id,
+        top_k_dense=5,
+        top_k_sparse=5,
+        top_m_final=5,
+        rerank_provider_id=None,
+        embedding_provider_id="ep",
+    )
+    return SimpleNamespace(
+        kb=kb,
+        vec_db=vec_db,
+        sparse_index=None,
+        version=0,
+        uncommitted_doc_ids=set(),
+    )
+
+
+def _embedding_provider(provider_id: str, embedding: list[float]) -> MagicMock:
+    provider = MagicMock()
+    provider.meta.return_value = SimpleNamespace(id=provider_id, model="m")
+    provider.get_embedding = AsyncMock(return_value=embedding)
+    return provider
+
+
+def _manager() -> RetrievalManager:
+    sparse_retriever = MagicMock()
+    sparse_retriever.retrieve = AsyncMock(return_value=[])
+    kb_db = MagicMock()
+    kb_db.get_documents_with_metadata_batch = AsyncMock(
+        side_effect=lambda doc_ids: {
+            doc_id: {
+                "document": SimpleNamespace(doc_name=f"{doc_id}.txt"),
+                "knowledge_base": SimpleNamespace(kb_name=doc_id.split("-")[0]),
+            }
+            for doc_id in doc_ids
+        },
+    )
+    return RetrievalManager(sparse_retriever, RankFusion(kb_db), kb_db)
+
+
+@pytest.mark.asyncio
+async def test_query_embedding_is_shared_across_kbs() -> None:
+    shared = _embedding_provider("shared", [0.1, 0.2])
+    other = _embedding_provider("other", [0.3, 0.4])
+    helpers = {
+        "kb1": _kb_helper("kb1", shared),
+        "kb2": _kb_helper("kb2", shared),
+        "kb3": _kb_helper("kb3", other),
+    }
+
+    manager = _manager()
+
+    response = await manager.retrieve_with_timings(
+        "query", list(helpers), helpers, top_m_final=10
+    )
+
+    shared.get_embedding.assert_awaited_once_with("query")
+    other.get_embedding.assert_awaited_once_with("query")
+    call = helpers["kb2"].vec_db.retrieve.await_args
+    assert call.kwargs["embedding"] == [0.1, 0.2]
+    assert helpers["kb3"].vec_db.retrieve.await_args.kwargs["embedding"] == [0.3, 0.4]
+    assert {r.kb_id for r in response.results} == {"kb1", "kb2", "kb3"}
+    for stage in ("embedding", "dense", "sparse", "fusion", "metadata", "total"):
+        assert response.timings[stage] >= 0
+
+
+@pytest.mark.asyncio
+async def test_results_are_cached_until_kb_version_changes() -> None:
+    provider = _embedding_provider("ep", [0.1, 0.2])
+    helpers = {"kb1": _kb_helper("kb1", provider)}
+    manager = _manager()
+
+    first = await manager.retrieve_with_timings("Hello  world", ["kb1"], helpers)
+    second = await manager.retrieve_with_timings("hello world ", ["kb1"], helpers)
+    third = await manager.retrieve_with_timings("Hello world", ["kb1"], helpers)
+
+    assert not first.cached
+    assert not second.cached  # 归一化不改变大小写
+    assert third.cached
+    assert [r.chunk_id for r in third.results] == [r.chunk_id for r in first.results]
+    assert helpers["kb1"].vec_db.retrieve.await_count == 2
+
+    helpers["kb1"].version += 1
+    fourth = await manager.retrieve_with_timings("Hello world", ["kb1"], helpers)
+    assert not fourth.cached
+    # 查询向量仍然命中缓存
+    assert provider.get_embedding.await_count == 2
+    stats = manager.cache_stats()
+    assert stats["result"]["hits"] == 1
+    assert stats["embedding"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_results_are_not_shared_with_callers() -> None:
+    provider = _embedding_provider("ep", [0.1, 0.2])
+    helpers = {"kb1": _kb_helper("kb1", provider)}
+    manager = _manager()
+
+    first = await manager.retrieve_with_timings("query", ["kb1"], helpers)
+    first.results[0].content = "changed"
+    first.results[0].metadata["extra"] = True
+
+    second = await manager.retrieve_with_timings("query", ["kb1"], helpers)
+    assert second.cached
+    assert second.results[0].content == "content of kb1"
+    assert "extra" not in second.results[0].metadata
+    second.results[0].score = -1.0
+
+    third = await manager.retrieve_with_timings("query", ["kb1"], helpers)
+    assert third.results[0].score != -1.0
+
+
+@pytest.mark.asyncio
+async def test_uncommitted_documents_are_excluded() -> None:
+    provider = _embedding_provider("ep", [0.1, 0.2])
+    helpers = {
+        "kb1": _kb_helper("kb1", provider),
+        "kb2": _kb_helper("kb2", provider),
+    }
+    helpers["kb1"].uncommitted_doc_ids.add("kb1-doc")
+
+    response = await _manager().retrieve_with_timings(
+        "query", list(helpers), helpers, top_m_final=10
+    )
+
+    assert [r.doc_id for r in response.results] == ["kb2-doc"]
+
+
+@pytest.mark.asyncio
+async def test_abandoned_upload_checkpoints_are_swept(tmp_path) -> None:
+    kb_db = MagicMock()
+    kb_db.get_document_by_id = AsyncMock(
+        side_effect=lambda doc_id: object() if doc_id == "committed" else None,
+    )
+    kb = SimpleNamespace(kb_id="kb1", kb_name="kb1")
+    helper = KBHelper(kb_db, kb, MagicMock(), str(tmp_path), MagicMock())
+    helper.vec_db = MagicMock()
+    helper.vec_db.delete_documents = AsyncMock()
+
+    checkpoint_dir = helper.kb_dir / "upload_checkpoints"
+    checkpoint_dir.mkdir()
+    expired = time.time() - UPLOAD_CHECKPOINT_TTL - 60
+    for name in ("fresh", "stale", "committed"):
+        path = checkpoint_dir / f"{name}.jsonl"
+        path.write_text(f'{{"doc_id": "{name}"}}\n{{"chunk_ids": [], "int_ids": []}}\n')
+        if name != "fresh":
+            os.utime(path, (expired, expired))
+    (checkpoint_dir / "broken.jsonl").write_text("not json")
+
+    await helper._sweep_upload_checkpoints()
+
+    assert [p.stem for p in checkpoint_dir.iterdir()] == ["fresh"]
+    assert helper.uncommitted_doc_ids == {"fresh"}
+    helper.vec_db.delete_documents.assert_awaited_once_with(
+        metadata_filters={"kb_doc_id": "stale"},
+    )
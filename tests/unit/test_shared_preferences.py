@@ -0,0 +1,68 @@
+"""Tests for the SharedPreferences write-through cache and preference upserts."""
+
+from unittest.mock import patch
+
+import pytest
+
+from astrbot.core.utils.shared_preferences import SharedPreferences
+
+
+@pytest.fixture
+def sp(temp_db, tmp_path):
+    with patch("astrbot.core.utils.shared_preferences.BackgroundScheduler"):
+        return SharedPreferences(temp_db, json_storage_path=str(tmp_path / "sp.json"))
+
+
+@pytest.mark.asyncio
+async def test_reads_are_served_from_cache(sp, temp_db) -> None:
+    await sp.session_put("umo:1", "sel_conv_id", "conv-1")
+
+    with patch.object(
+        temp_db, "get_preference", wraps=temp_db.get_preference
+    ) as get_preference:
+        assert await sp.session_get("umo:1", "sel_conv_id") == "conv-1"
+        # 不存在的键也会被缓存
+        assert await sp.session_get("umo:2", "sel_conv_id", "none") == "none"
+        assert await sp.session_get("umo:2", "sel_conv_id", "none") == "none"
+
+    assert get_preference.await_count == 1
+    assert sp.cache_stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_write_through_and_remove(sp, temp_db) -> None:
+    await sp.global_put("alter_cmd", {"plugin": {"cmd": 1}})
+    await sp.global_put("alter_cmd", {"plugin": {"cmd": 2}})
+
+    value = await sp.global_get("alter_cmd")
+    assert value == {"plugin": {"cmd": 2}}
+    value["plugin"]["cmd"] = 3  # 修改返回值不影响缓存
+    assert await sp.global_get("alter_cmd") == {"plugin": {"cmd": 2}}
+
+    rows = await temp_db.get_preferences("global", "global", "alter_cmd")
+    assert len(rows) == 1
+    assert rows[0].value == {"val": {"plugin": {"cmd": 2}}}
+
+    await sp.global_remove("alter_cmd")
+    assert await sp.global_get("alter_cmd") is None
+
+
+@pytest.mark.asyncio
+async def test_put_many_and_clear(sp, temp_db) -> None:
+    await sp.put_many_async(
+        [
+            ("umo", "umo:1", "a", 1),
+            ("umo", "umo:1", "b", (1, 2)),
+            ("umo", "umo:2", "a", 3),
+            ("umo", "umo:1", "a", 4),
+        ],
+    )
+
+    assert await sp.session_get("umo:1", "a") == 4
+    assert await sp.session_get("umo:1", "b") == [1, 2]
+    rows = await temp_db.get_preferences("umo", "umo:1")
+    assert {row.key: row.value["val"] for row in rows} == {"a": 4, "b": [1, 2]}
+
+    await sp.clear_async("umo", "umo:1")
+    assert await sp.session_get("umo:1", "a") is None
+    assert await sp.session_get("umo:2", "a") == 3
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import threading
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from astrbot.core.knowledge_base.retrieval.sparse_index import BM25Index
+from astrbot.core.knowledge_base.retrieval.sparse_retriever import SparseRetriever
+
+TEXTS = [
+    "AstrBot supports knowledge base retrieval",
+    "FAISS stores dense vectors for retrieval",
+    "jieba tokenizes Chinese text",
+]
+
+
+def _metadatas(kb_doc_id: str = "doc-1") -> list[dict]:
+    return [
+        {"kb_id": "kb", "kb_doc_id": kb_doc_id, "chunk_index": i}
+        for i in range(len(TEXTS))
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_only_returns_matching_chunks(tmp_path) -> None:
+    index = BM25Index(str(tmp_path / "index.bm25"))
+    await index.add_chunks([1, 2, 3], ["c1", "c2", "c3"], TEXTS, _metadatas())
+
+    hits = await index.search(["retrieval"], top_k=10)
+
+    assert {int_id for int_id, _ in hits} == {1, 2}
+    assert (await index.search(["FAISS", "dense"], top_k=1))[0][0] == 2
+    assert index.get_chunk_info(3) == ("c3", "doc-1", 2)
+
+
+@pytest.mark.asyncio
+async def test_incremental_remove_and_reload(tmp_path) -> None:
+    path = str(tmp_path / "index.bm25")
+    index = BM25Index(path)
+    await index.add_chunks([1, 2, 3], ["c1", "c2", "c3"], TEXTS, _metadatas())
+    await index.add_chunks([4], ["c4"], ["another retrieval note"], _metadatas("d2"))
+
+    await index.remove_chunks(["c1"])
+    await index.remove_document("d2")
+    await index.close()
+
+    reloaded = BM25Index(path)
+    assert await reloaded.load()
+    assert len(reloaded) == 2
+    assert [int_id for int_id, _ in await reloaded.search(["retrieval"], 10)] == [2]
+    assert "another" not in reloaded.postings
+    assert reloaded.total_len == index.total_len
+
+
+@pytest.mark.asyncio
+async def test_rebuild_from_document_storage(tmp_path) -> None:
+    docs = [
+        {
+            "id": i + 1,
+            "doc_id": f"c{i + 1}",
+            "text": text,
+            "metadata": json.dumps(md),
+        }
+        for i, (text, md) in enumerate(zip(TEXTS, _metadatas()))
+    ]
+    storage = AsyncMock()
+    storage.get_documents.side_effect = [docs[:2], docs[2:], []]
+
+    index = BM25Index(str(tmp_path / "index.bm25"))
+    await index.rebuild(storage, page_size=2)
+
+    assert len(index) == 3
+    assert (tmp_path / "index.bm25").exists()
+
+
+@pytest.mark.asyncio
+async def test_sparse_retriever_uses_index(tmp_path) -> None:
+    index = BM25Index(str(tmp_path / "index.bm25"))
+    await index.add_chunks([1, 2, 3], ["c1", "c2", "c3"], TEXTS, _metadatas())
+    vec_db = AsyncMock()
+    vec_db.document_storage.get_documents.return_value = [
+        {"id": 2, "text": TEXTS[1]},
+    ]
+
+    retriever = SparseRetriever(kb_db=AsyncMock())
+    results = await retriever.retrieve(
+        "dense vectors",
+        ["kb"],
+        {"kb": {"vec_db": vec_db, "sparse_index": index, "top_k_sparse": 5}},
+    )
+
+    assert [r.chunk_id for r in results] == ["c2"]
+    assert results[0].doc_id == "doc-1"
+    call = vec_db.document_storage.get_documents.await_args
+    assert call.kwargs["ids"] == [2]
+
+
+@pytest.mark.asyncio
+async def test_search_scores_off_the_event_loop(tmp_path) -> None:
+    index = BM25Index(str(tmp_path / "index.bm25"))
+    await index.add_chunks([1, 2, 3], ["c1", "c2", "c3"], TEXTS, _metadatas())
+    threads = []
+    original_search = BM25Index._search
+
+    def search(self, tokens, top_k):
+        threads.append(threading.current_thread())
+        return original_search(self, tokens, top_k)
+
+    with patch.object(BM25Index, "_search", search):
+        hits = await index.search(["retrieval"], top_k=10)
+
+    assert {int_id for int_id, _ in hits} == {1, 2}
+    assert threads and threads[0] is not threading.main_thread()
+
+
+@pytest.mark.asyncio
+async def test_changes_are_batched_into_one_write(tmp_path) -> None:
+    path = tmp_path / "index.bm25"
+    index = BM25Index(str(path))
+    index.save_interval = 0.05
+    writes = []
+    original_write = BM25Index._write_file
+
+    def write_file(self):
+        writes.append(len(self))
+        original_write(self)
+
+    with patch.object(BM25Index, "_write_file", write_file):
+        await index.add_chunks([1, 2, 3], ["c1", "c2", "c3"], TEXTS, _metadatas())
+        await index.add_chunks([4], ["c4"], ["another note"], _metadatas("d2"))
+        await index.remove_chunks(["c1"])
+        assert not path.exists()
+
+        await asyncio.sleep(0.2)
+        assert writes == [3]
+
+        await index.remove_document("d2")
+        await index.close()
+        assert writes == [3, 2]
+
+    reloaded = BM25Index(str(path))
+    assert await reloaded.load()
+    assert len(reloaded) == 2
@@ -0,0 +1,96 @@
+"""Tests for StarHandlerRegistry ordering and cached per-event-type lookups."""
+
+from unittest.mock import patch
+
+import pytest
+
+from astrbot.core.star.star import StarMetadata
+from astrbot.core.star.star_handler import (
+    EventType,
+    StarHandlerMetadata,
+    StarHandlerRegistry,
+)
+
+
+async def _handler(*args) -> None:
+    pass
+
+
+def _md(
+    name: str,
+    priority: int | None = None,
+    event_type: EventType = EventType.OnLLMRequestEvent,
+    module: str = "plugin_a",
+) -> StarHandlerMetadata:
+    return StarHandlerMetadata(
+        event_type=event_type,
+        handler_full_name=f"{module}_{name}",
+        handler_name=name,
+        handler_module_path=module,
+        handler=_handler,
+        event_filters=[],
+        extras_configs={} if priority is None else {"priority": priority},
+    )
+
+
+@pytest.fixture
+def star_map():
+    plugins = {
+        "plugin_a": StarMetadata(name="a", module_path="plugin_a"),
+        "plugin_b": StarMetadata(name="b", module_path="plugin_b"),
+    }
+    with patch("astrbot.core.star.star_handler.star_map", plugins):
+        yield plugins
+
+
+def _names(handlers) -> list[str]:
+    return [h.handler_name for h in handlers]
+
+
+def test_append_keeps_priority_order_and_insertion_order(star_map) -> None:
+    registry = StarHandlerRegistry()
+    for md in (_md("low", -1), _md("first"), _md("high", 10), _md("second", 0)):
+        registry.append(md)
+
+    assert _names(registry) == ["high", "first", "second", "low"]
+    assert _names(registry.get_handlers_by_event_type(EventType.OnLLMRequestEvent)) == [
+        "high",
+        "first",
+        "second",
+        "low",
+    ]
+
+
+def test_lookups_are_cached_until_invalidated(star_map) -> None:
+    registry = StarHandlerRegistry()
+    registry.append(_md("a_hook"))
+    registry.append(_md("b_hook", module="plugin_b"))
+    registry.append(_md("other", event_type=EventType.OnDecoratingResultEvent))
+
+    first = registry.get_handlers_by_event_type(EventType.OnLLMRequestEvent)
+    assert registry.get_handlers_by_event_type(EventType.OnLLMRequestEvent) is first
+    assert _names(first) == ["a_hook", "b_hook"]
+    assert _names(
+        registry.get_handlers_by_event_type(
+            EventType.OnLLMRequestEvent, plugins_name=["b"]
+        )
+    ) == ["b_hook"]
+
+    star_map["plugin_a"].activated = False
+    # 未通知失效前仍返回缓存结果
+    assert registry.get_handlers_by_event_type(EventType.OnLLMRequestEvent) is first
+    registry.invalidate()
+    assert _names(registry.get_handlers_by_event_type(EventType.OnLLMRequestEvent)) == [
+        "b_hook"
+    ]
+
+
+def test_remove_updates_buckets(star_map) -> None:
+    registry = StarHandlerRegistry()
+    hook = _md("hook")
+    registry.append(hook)
+    assert registry.get_handlers_by_event_type(EventType.OnLLMRequestEvent) == [hook]
+
+    registry.remove(hook)
+    assert registry.get_handlers_by_event_type(EventType.OnLLMRequestEvent) == []
+    assert registry.get_handler_by_full_name(hook.handler_full_name) is None
@@ -0,0 +1,92 @@
+"""Tests for the local text-to-image renderer."""
+
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from astrbot.core.utils.t2i.local_strategy import (
+    FontManager,
+    LocalRenderStrategy,
+    MarkdownRenderer,
+    TextMeasurer,
+)
+
+
+@pytest.fixture
+def font():
+    return FontManager.get_font(26)
+
+
+def test_get_text_size_measures_given_text(font) -> None:
+    short_width, _ = TextMeasurer.get_text_size("a", font)
+    long_width, _ = TextMeasurer.get_text_size("a" * 40, font)
+    assert long_width > short_width * 10
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "hello world " * 40,
+        "这是一段需要自动换行的中文文本，" * 30,
+        "AVAVAVAVTo Ta Yo " * 30,
+        "",
+    ],
+)
+def test_split_lines_fit_width_and_keep_text(font, text: str) -> None:
+    max_width = 300
+    lines = TextMeasurer.split_text_to_fit_width(text, font, max_width)
+    assert "".join(lines) == text
+    for idx, line in enumerate(lines):
+        assert font.getlength(line) <= max_width
+        if idx + 1 < len(lines):
+            # 每行都尽可能长: 再多放一个字符就会超宽
+            assert font.getlength(line + lines[idx + 1][0]) > max_width
+
+
+def test_split_forces_one_char_when_too_narrow(font) -> None:
+    assert TextMeasurer.split_text_to_fit_width("中文", font, 1) == ["中", "文"]
+
+
+@pytest.mark.asyncio
+async def test_draw_runs_off_event_loop() -> None:
+    threads = []
+    original_draw = MarkdownRenderer.draw
+
+    def draw(self, elements):
+        threads.append(threading.current_thread())
+        return original_draw(self, elements)
+
+    with patch.object(MarkdownRenderer, "draw", draw):
+        image = await MarkdownRenderer().render("# title\n" + "text " * 500)
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert image.width == 800
+    assert image.height > 300
+
+
+@pytest.mark.asyncio
+async def test_render_reuses_cached_image() -> None:
+    strategy = LocalRenderStrategy()
+    text = "# cached\n- item **bold**"
+    calls = []
+    original_render_to_file = MarkdownRenderer.render_to_file
+
+    async def render_to_file(self, markdown_text):
+        calls.append(markdown_text)
+        return await original_render_to_file(self, markdown_text)
+
+    with patch.object(MarkdownRenderer, "render_to_file", render_to_file):
+        first = await strategy.render(text)
+        assert await strategy.render(text) == first
+        assert len(calls) == 1
+
+        # 缓存的临时文件被清理后重新渲染
+        os.remove(first)
+        second = await strategy.render(text)
+        assert second != first
+        assert os.path.exists(second)
+        assert len(calls) == 2
+
+    os.remove(second)
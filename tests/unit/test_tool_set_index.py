@@ -0,0 +1,101 @@
+"""Tests for the ToolSet name index and the memoized provider schemas."""
+
+from astrbot.core.agent.tool import FunctionTool, ToolSet
+
+
+def make_tool(name: str, parameters: dict | None = None) -> FunctionTool:
+    return FunctionTool(
+        name=name,
+        description=f"Test tool {name}",
+        parameters=parameters
+        or {
+            "type": "object",
+            "properties": {"q": {"type": "string", "default": "x"}},
+        },
+    )
+
+
+class TestToolSetIndex:
+    def test_add_get_remove_keeps_order(self):
+        toolset = ToolSet()
+        for name in ("a", "b", "c"):
+            toolset.add_tool(make_tool(name))
+        replacement = make_tool("b")
+        toolset.add_tool(replacement)
+
+        assert toolset.names() == ["a", "b", "c"]
+        assert toolset.get_tool("b") is replacement
+
+        toolset.remove_tool("a")
+        assert toolset.names() == ["b", "c"]
+        assert toolset.get_tool("a") is None
+        assert toolset.get_tool("c").name == "c"
+
+    def test_direct_list_mutation_is_seen(self):
+        toolset = ToolSet()
+        toolset.add_tool(make_tool("a"))
+        toolset.tools.append(make_tool("b"))
+        assert toolset.get_tool("b") is toolset.tools[1]
+
+        toolset.tools = [make_tool("c")]
+        assert toolset.get_tool("a") is None
+        assert toolset.get_tool("c") is toolset.tools[0]
+
+        toolset.tools[0] = make_tool("d")
+        assert toolset.get_tool("c") is None
+        assert toolset.get_tool("d") is toolset.tools[0]
+
+    def test_merge_large_sets(self):
+        first = ToolSet([make_tool(f"t{i}") for i in range(300)])
+        second = ToolSet([make_tool(f"t{i}") for i in range(150, 450)])
+        first.merge(second)
+        assert len(first) == 450
+        assert first.get_tool("t200") is second.get_tool("t200")
+        assert first.names() == [f"t{i}" for i in range(450)]
+
+
+class TestToolSetSchemaCache:
+    def test_schema_is_memoized_until_mutation(self):
+        toolset = ToolSet([make_tool("a"), make_tool("b")])
+        first = toolset.openai_schema()
+        second = toolset.openai_schema()
+        assert first == second
+        assert first is not second
+        assert first[0] is second[0]
+
+        toolset.add_tool(make_tool("c"))
+        assert [t["function"]["name"] for t in toolset.openai_schema()] == [
+            "a",
+            "b",
+            "c",
+        ]
+        toolset.remove_tool("a")
+        assert [t["name"] for t in toolset.anthropic_schema()] == ["b", "c"]
+
+    def test_schema_options_are_cached_separately(self):
+        toolset = ToolSet([make_tool("a", {"type": "object", "properties": {}})])
+        assert "parameters" in toolset.openai_schema()[0]["function"]
+        assert (
+            "parameters"
+            not in toolset.openai_schema(omit_empty_parameter_field=True)[0]["function"]
+        )
+
+    def test_tool_change_invalidates_schema(self):
+        tool = make_tool("a")
+        toolset = ToolSet([tool])
+        assert toolset.anthropic_schema()[0]["description"] == "Test tool a"
+        tool.description = "changed"
+        assert toolset.anthropic_schema()[0]["description"] == "changed"
+        tool.parameters = {"type": "object", "properties": {"n": {"type": "integer"}}}
+        assert toolset.google_schema()["function_declarations"][0]["parameters"] == {
+            "type": "object",
+            "properties": {"n": {"type": "integer"}},
+        }
+
+    def test_google_parameters_are_shared_across_sets(self):
+        tool = make_tool("a")
+        first = ToolSet([tool]).google_schema()["function_declarations"][0]
+        second = ToolSet([tool]).google_schema()["function_declarations"][0]
+        assert first["parameters"] is second["parameters"]
+        assert "default" not in first["parameters"]["properties"]["q"]
+        assert ToolSet().google_schema() == {}
@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+from astrbot.core.utils.ttl_cache import TTLCache
+
+
+def test_lru_eviction_and_stats() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_entries_expire_after_ttl() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=4, ttl=10)
+    with patch("astrbot.core.utils.ttl_cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("astrbot.core.utils.ttl_cache.time.monotonic", return_value=109.0):
+        assert cache.get("a") == 1
+    with patch("astrbot.core.utils.ttl_cache.time.monotonic", return_value=111.0):
+        assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_invalidate_by_predicate() -> None:
+    cache: TTLCache[tuple, int] = TTLCache()
+    cache.set(("kb1", "q"), 1)
+    cache.set(("kb2", "q"), 2)
+    assert cache.invalidate(lambda key: key[0] == "kb1") == 1
+    assert cache.get(("kb2", "q")) == 2